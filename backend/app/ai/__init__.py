@@ -1,9 +1,9 @@
 import os
 from typing import Literal
-from dotenv import load_dotenv
+from app.bootstrap_env import ensure_env
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (no-op once app.main has done it)
+ensure_env()
 
 # AI Feature Flags
 AI_LEADS_ENABLED = os.getenv("AI_LEADS_ENABLED", "true").lower() == "true"
@@ -57,16 +57,18 @@ def get_default_model() -> str:
 # Current active model
 ACTIVE_MODEL = get_default_model()
 
-print(f"🤖 AI Configuration:")
-print(f"   - AI Leads Enabled: {AI_LEADS_ENABLED}")
-print(f"   - Available Models: {get_available_models()}")
-print(f"   - Active Model: {ACTIVE_MODEL}")
-if ACTIVE_MODEL == "none":
-    print(f"   - ⚠️  No AI models available - will use rule-based fallbacks")
-elif ACTIVE_MODEL == "gemini":
-    print(f"   - 🆓 Using Gemini (free tier)")
-elif ACTIVE_MODEL == "openai":
-    print(f"   - 💰 Using OpenAI (paid)")
+def log_ai_configuration() -> None:
+    """Print the AI configuration (called at startup, not on import)"""
+    print(f"🤖 AI Configuration:")
+    print(f"   - AI Leads Enabled: {AI_LEADS_ENABLED}")
+    print(f"   - Available Models: {get_available_models()}")
+    print(f"   - Active Model: {ACTIVE_MODEL}")
+    if ACTIVE_MODEL == "none":
+        print(f"   - ⚠️  No AI models available - will use rule-based fallbacks")
+    elif ACTIVE_MODEL == "gemini":
+        print(f"   - 🆓 Using Gemini (free tier)")
+    elif ACTIVE_MODEL == "openai":
+        print(f"   - 💰 Using OpenAI (paid)")
 
 
 # Log Gemini mode to detect accidental Vertex routing
@@ -1,21 +1,28 @@
 from fastapi import APIRouter, HTTPException, Depends, Body
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, Union, Literal
 from datetime import datetime, timedelta
 import json
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, roc_auc_score, precision_recall_curve
 from sklearn.feature_selection import SelectKBest, f_classif
-import joblib
 import os
 from pathlib import Path
 from app.db.db import fetch, fetchrow, execute
 from app.cache import cached
+from app.ai.compiled_forest import compile_model
+from app.ai.model_registry import pipeline_model_entry
+from app.ai.training_routes import add_training_routes
+from app.ai.hyperparameter_search import HyperparameterSearchConfig, run_search
+from app.ai.calibration import calibrate_for_serving, fit_calibration
+from app.ai.training_data import load_training_frame
+from app.ai.feature_pipeline import FeaturePipeline, feature_groups, resolve_pipeline
 
 router = APIRouter(prefix="/ai/advanced-ml", tags=["advanced-ml"])
 
@@ -29,6 +36,8 @@ class MLModelConfig(BaseModel):
     hyperparameters: Dict[str, Any] = {}
     feature_selection: bool = True
     cross_validation_folds: int = 5
+    search: Optional[HyperparameterSearchConfig] = None  # set to tune instead of using fixed hyperparameters
+    calibration: Literal["isotonic", "platt", "none"] = "isotonic"  # fitted on the held-out split
 
 class FeatureEngineeringConfig(BaseModel):
     create_lag_features: bool = True
@@ -42,6 +51,7 @@ class ModelTrainingRequest(BaseModel):
     config: MLModelConfig
     feature_config: FeatureEngineeringConfig
     training_data_limit: Optional[int] = 1000
+    snapshot: Literal["off", "auto", "refresh"] = "off"  # "auto" reuses a recent Parquet snapshot
     save_model: bool = True
     model_name: Optional[str] = None
 
@@ -80,91 +90,23 @@ class AdvancedMLPipeline:
     def __init__(self):
         self.scaler = StandardScaler()
         self.label_encoders = {}
+        self.feature_pipeline: Optional[FeaturePipeline] = None
         self.feature_selector = None
         self.models = {}
         self.feature_names = []
         
-    async def load_training_data(self, limit: int = 1000) -> pd.DataFrame:
-        """Load lead data for training from database"""
+    async def load_training_data(self, limit: Optional[int] = 1000, snapshot: str = "off") -> pd.DataFrame:
+        """
+        Load lead data for training from database.
+        
+        Streams a binary COPY into typed, categorical columns (limit=None loads every
+        lead); snapshot="auto"/"refresh" reuses/rewrites a local Parquet copy.
+        """
         try:
-            print(f"🔍 Querying database for up to {limit} leads...")
-            
-            # Query enriched lead data using ACTUAL current schema
-            query = """
-            SELECT 
-                p.id, p.first_name, p.last_name, p.email, p.phone,
-                p.lead_score, p.lifecycle_state, p.created_at,
-                p.engagement_score, p.conversion_probability,
-                p.touchpoint_count, p.status,
-                (EXTRACT(EPOCH FROM (NOW() - p.created_at)) / 86400.0)::double precision as days_since_creation,
-                CASE WHEN a.id IS NOT NULL THEN 1 ELSE 0 END as has_application,
-                COALESCE(a.source, 'unknown') as application_source,
-                COALESCE(pr.name, 'unknown') as programme_name,
-                COALESCE(c.name, 'unknown') as campus_name,
-                CASE 
-                    WHEN p.engagement_score >= 80 THEN 'high'
-                    WHEN p.engagement_score >= 50 THEN 'medium'
-                    ELSE 'low'
-                END as engagement_level,
-                EXTRACT(MONTH FROM p.created_at) as created_month,
-                EXTRACT(DOW FROM p.created_at) as created_day_of_week,
-                EXTRACT(HOUR FROM p.created_at) as created_hour
-            FROM people p
-            LEFT JOIN applications a ON p.id = a.person_id
-            LEFT JOIN programmes pr ON a.programme_id = pr.id
-            LEFT JOIN campuses c ON pr.campus_id = c.id
-            WHERE p.lifecycle_state = 'lead'
-            ORDER BY p.created_at DESC
-            LIMIT %s
-            """
-            
-            print(f"📝 Executing query: {query}")
-            results = await fetch(query, limit)
-            print(f"📊 Query returned {len(results) if results else 0} results")
-            
-            if not results:
-                raise ValueError("No training data available")
-            
-            print(f"📋 First result sample: {results[0] if results else 'None'}")
-            
-            # Convert to DataFrame with proper column handling
-            df = pd.DataFrame(results)
-            print(f"✅ DataFrame created with shape: {df.shape}")
-            print(f"📋 DataFrame columns: {list(df.columns)}")
-            print(f"📋 DataFrame dtypes: {df.dtypes.to_dict()}")
-            
-            # Ensure numeric dtypes for numeric-like columns
-            if 'days_since_creation' in df.columns:
-                df['days_since_creation'] = pd.to_numeric(df['days_since_creation'], errors='coerce')
-            if 'conversion_probability' in df.columns:
-                df['conversion_probability'] = pd.to_numeric(df['conversion_probability'], errors='coerce')
-            if 'lead_score' in df.columns:
-                df['lead_score'] = pd.to_numeric(df['lead_score'], errors='coerce')
-            if 'engagement_score' in df.columns:
-                df['engagement_score'] = pd.to_numeric(df['engagement_score'], errors='coerce')
-            if 'touchpoint_count' in df.columns:
-                df['touchpoint_count'] = pd.to_numeric(df['touchpoint_count'], errors='coerce')
-
-            # Basic data cleaning
-            print(f"🧹 Cleaning data...")
-            print(f"📊 Before cleaning - rows: {len(df)}")
-            print(f"📊 Missing lead_score: {df['lead_score'].isna().sum()}")
-            print(f"📊 Missing has_application: {df['has_application'].isna().sum()}")
-            
-            # Fill missing values with defaults
-            df['lead_score'] = df['lead_score'].fillna(0)
-            df['engagement_score'] = df['engagement_score'].fillna(0)
-            df['touchpoint_count'] = df['touchpoint_count'].fillna(0)
-            df['has_application'] = df['has_application'].fillna(0)
-            df['conversion_probability'] = df['conversion_probability'].fillna(0.0)
-            
-            df['has_application'] = df['has_application'].astype(int)
-            
-            print(f"✅ After cleaning - rows: {len(df)}")
+            print(f"🔍 Streaming up to {limit if limit is not None else 'all'} leads for training...")
+            df = await load_training_frame(limit, snapshot=snapshot)
             print(f"📊 Target distribution: {df['has_application'].value_counts().to_dict()}")
-            
             return df
-            
         except Exception as e:
             import traceback
             print(f"❌ Error in load_training_data: {str(e)}")
@@ -172,72 +114,24 @@ class AdvancedMLPipeline:
             raise Exception(f"Failed to load training data: {str(e)}")
     
     def engineer_features(self, df: pd.DataFrame, config: FeatureEngineeringConfig) -> pd.DataFrame:
-        """Advanced feature engineering for lead intelligence"""
-        
-        df_engineered = df.copy()
-        
-        # 1. Temporal Features (already extracted in query)
-        if config.create_lag_features:
-            # These are already extracted in the SQL query, but ensure they exist
-            if 'created_month' not in df_engineered.columns:
-                df_engineered['created_month'] = pd.to_datetime(df_engineered['created_at']).dt.month
-            if 'created_day_of_week' not in df_engineered.columns:
-                df_engineered['created_day_of_week'] = pd.to_datetime(df_engineered['created_at']).dt.dayofweek
-            if 'created_hour' not in df_engineered.columns:
-                df_engineered['created_hour'] = pd.to_datetime(df_engineered['created_at']).dt.hour
-            
-            # Academic calendar features
-            df_engineered['academic_week'] = pd.to_datetime(df_engineered['created_at']).dt.isocalendar().week
-            df_engineered['is_application_season'] = df_engineered['created_month'].isin([9, 10, 11, 12, 1, 2]).astype(int)
-        
-        # 2. Score-based Features
-        df_engineered['score_squared'] = df_engineered['lead_score'] ** 2
-        df_engineered['score_log'] = np.log1p(df_engineered['lead_score'])
-        df_engineered['score_percentile'] = df_engineered['lead_score'].rank(pct=True)
-        
-        # Engagement features
-        if 'engagement_score' in df_engineered.columns:
-            df_engineered['engagement_squared'] = df_engineered['engagement_score'] ** 2
-            df_engineered['engagement_percentile'] = df_engineered['engagement_score'].rank(pct=True)
-        
-        # Touchpoint features
-        if 'touchpoint_count' in df_engineered.columns:
-            df_engineered['touchpoint_log'] = np.log1p(df_engineered['touchpoint_count'])
-            df_engineered['touchpoint_percentile'] = df_engineered['touchpoint_count'].rank(pct=True)
-        
-        # 3. Categorical Features
-        categorical_features = ['lifecycle_state', 'source', 'campus_preference', 'engagement_level', 'status']
-        for feature in categorical_features:
-            if feature in df_engineered.columns and df_engineered[feature].dtype == 'object':
-                le = LabelEncoder()
-                df_engineered[f'{feature}_encoded'] = le.fit_transform(df_engineered[feature].fillna('unknown'))
-                self.label_encoders[feature] = le
+        """
+        Advanced feature engineering for lead intelligence.
         
-        # 4. Interaction Features
-        if config.create_interaction_features:
-            df_engineered['score_engagement_interaction'] = df_engineered['lead_score'] * df_engineered.get('engagement_level_encoded', 1)
-            df_engineered['score_time_interaction'] = df_engineered['lead_score'] * df_engineered['days_since_creation']
-            
-            # Additional interactions
-            if 'engagement_score' in df_engineered.columns:
-                df_engineered['score_engagement_score_interaction'] = df_engineered['lead_score'] * df_engineered['engagement_score']
-            
-            if 'touchpoint_count' in df_engineered.columns:
-                df_engineered['score_touchpoint_interaction'] = df_engineered['lead_score'] * df_engineered['touchpoint_count']
+        Features come from the shared declarative pipeline (app.ai.feature_pipeline);
+        the fitted pipeline is kept on self and stored with the trained model so
+        serving computes exactly the same features.
+        """
         
-        # 5. Polynomial Features
-        if config.create_polynomial_features:
-            df_engineered['score_cubed'] = df_engineered['lead_score'] ** 3
-            df_engineered['days_squared'] = df_engineered['days_since_creation'] ** 2
+        df_engineered = df.copy()
+        self.feature_pipeline = FeaturePipeline()
+        features = self.feature_pipeline.fit_transform(
+            df, groups=feature_groups(config), handle_missing=config.handle_missing_values
+        )
+        for name in features.columns:
+            df_engineered[name] = features[name]
         
-        # 6. Handle Missing Values
-        if config.handle_missing_values == "impute":
-            numeric_columns = df_engineered.select_dtypes(include=[np.number]).columns
-            df_engineered[numeric_columns] = df_engineered[numeric_columns].fillna(df_engineered[numeric_columns].median())
-        elif config.handle_missing_values == "zero":
-            df_engineered = df_engineered.fillna(0)
-        else:  # drop
-            df_engineered = df_engineered.dropna()
+        if config.handle_missing_values == "drop":
+            df_engineered = df_engineered.dropna(subset=list(features.columns))
         
         return df_engineered
     
@@ -256,31 +150,15 @@ class AdvancedMLPipeline:
             print(f"Feature selection failed: {e}")
             return X
     
-    def train_model(self, X: pd.DataFrame, y: pd.Series, config: MLModelConfig) -> Any:
-        """Train advanced ML model based on configuration"""
-        
-        start_time = datetime.now()
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=config.test_size, random_state=config.random_state, stratify=y
-        )
-        
-        # Scale features
-        if config.feature_selection:
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-        else:
-            X_train_scaled = X_train
-            X_test_scaled = X_test
-        
-        # Initialize model based on type
+    def build_model(self, config: MLModelConfig, n_jobs: Optional[int] = None) -> Any:
+        """Instantiate the configured model type with its fixed hyperparameters"""
         if config.model_type == "random_forest":
             model = RandomForestClassifier(
                 n_estimators=config.hyperparameters.get('n_estimators', 100),
                 max_depth=config.hyperparameters.get('max_depth', 10),
                 random_state=config.random_state,
-                class_weight='balanced'  # Add class balancing
+                class_weight='balanced',  # Add class balancing
+                n_jobs=n_jobs
             )
         elif config.model_type == "gradient_boosting":
             model = GradientBoostingClassifier(
@@ -299,7 +177,7 @@ class AdvancedMLPipeline:
         elif config.model_type == "ensemble":
             # Create ensemble of multiple models
             models = [
-                RandomForestClassifier(n_estimators=50, random_state=config.random_state),
+                RandomForestClassifier(n_estimators=50, random_state=config.random_state, n_jobs=n_jobs),
                 GradientBoostingClassifier(n_estimators=50, random_state=config.random_state),
                 LogisticRegression(random_state=config.random_state)
             ]
@@ -307,16 +185,70 @@ class AdvancedMLPipeline:
         else:
             raise ValueError(f"Unsupported model type: {config.model_type}")
         
-        # Train model
-        model.fit(X_train_scaled, y_train)
+        return model
+    
+    def train_model(self, X: pd.DataFrame, y: pd.Series, config: MLModelConfig,
+                    n_jobs: Optional[int] = None, progress: Optional[Any] = None) -> Any:
+        """
+        Train advanced ML model based on configuration.
         
-        # Cross-validation
-        cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=config.cross_validation_folds)
+        n_jobs parallelises forest fitting and cross-validation; progress(stage, fraction)
+        is called between stages (training jobs use it for status and cancellation).
+        """
+        
+        start_time = datetime.now()
+        report = progress or (lambda stage, fraction: None)
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=config.test_size, random_state=config.random_state, stratify=y
+        )
+        
+        # Scale features
+        if config.feature_selection:
+            X_train_scaled = self.scaler.fit_transform(X_train)
+            X_test_scaled = self.scaler.transform(X_test)
+        else:
+            X_train_scaled = X_train
+            X_test_scaled = X_test
+        
+        
+        model_type = config.model_type
+        search_result = None
+        if config.search is not None:
+            # Search mode: stratified k-fold model selection; the winner comes back refit
+            search_result = run_search(
+                X_train_scaled, y_train, config.search, cv_folds=config.cross_validation_folds,
+                random_state=config.random_state, n_jobs=n_jobs, progress=report
+            )
+            model = search_result.estimator
+            model_type = search_result.best_model_type
+            cv_scores = np.array(search_result.best_cv_scores)
+        else:
+            model = self.build_model(config, n_jobs)
+            
+            # Train model
+            model.fit(X_train_scaled, y_train)
+            report("cross_validating", 0.6)
+            
+            # Cross-validation: folds run in parallel, so each forest fits single-threaded
+            cv_model = model
+            if n_jobs and n_jobs != 1 and hasattr(model, 'n_jobs'):
+                cv_model = clone(model).set_params(n_jobs=1)
+            cv_scores = cross_val_score(cv_model, X_train_scaled, y_train, cv=config.cross_validation_folds, n_jobs=n_jobs)
+        report("evaluating", 0.85)
         
         # Predictions
         y_pred = model.predict(X_test_scaled)
         y_pred_proba = model.predict_proba(X_test_scaled)[:, 1] if hasattr(model, 'predict_proba') else None
         
+        # Calibrator fitted on the held-out split, saved in the artifact and applied at serving
+        calibrator, calibration = None, None
+        if y_pred_proba is not None:
+            calibrator, calibration = fit_calibration(
+                y_pred_proba, y_test, config.calibration, random_state=config.random_state
+            )
+        
         # Performance metrics
         from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
         
@@ -329,6 +261,12 @@ class AdvancedMLPipeline:
             'cross_validation_scores': cv_scores.tolist(),
             'training_time': (datetime.now() - start_time).total_seconds()
         }
+        if search_result is not None:
+            performance['search'] = search_result.summary(config.search.strategy, config.search.scoring)
+        if self.feature_pipeline is not None:
+            performance['feature_engineering'] = self.feature_pipeline.summary()
+        if calibration is not None:
+            performance['calibration'] = calibration
         
         # Feature importance
         if hasattr(model, 'feature_importances_'):
@@ -339,15 +277,19 @@ class AdvancedMLPipeline:
             feature_importance = {}
         
         # Store model
-        model_id = f"{config.model_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        model_id = f"{model_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         self.models[model_id] = {
             'model': model,
             'scaler': self.scaler,
             'feature_selector': self.feature_selector,
             'feature_names': self.feature_names,
+            'feature_pipeline': self.feature_pipeline,
+            'calibrator': calibrator,
             'performance': performance,
             'feature_importance': feature_importance
         }
+        if search_result is not None:
+            self.models[model_id]['leaderboard'] = search_result.leaderboard
         
         return model_id, performance
     
@@ -396,28 +338,15 @@ class AdvancedMLPipeline:
             if not results:
                 return {"predictions": [], "model_used": model_id, "total_processed": 0, "successful_predictions": 0}
             
+            # Engineer every lead in one vectorised pass with the model's feature pipeline
+            matrix = self.prepare_feature_matrix(results, model_info['feature_names'], model_info.get('feature_pipeline'))
+            
             predictions = []
-            for lead_data in results:
+            scored = self.score_feature_matrix(model_info, matrix)
+            for lead_data, (prediction, prediction_proba, calibrated_prob) in zip(results, scored):
                 try:
-                    # Prepare features for this lead
-                    features = self.prepare_features_for_prediction(lead_data, model_info['feature_names'])
-                    
-                    # Scale features - ensure proper feature alignment with column names
-                    features_df = pd.DataFrame([features], columns=model_info['feature_names'])
-                    features_scaled = model_info['scaler'].transform(features_df)
-
-                    # Make prediction
-                    model = model_info['model']
-                    prediction = model.predict(features_scaled)[0]
-                    prediction_proba = model.predict_proba(features_scaled)[0] if hasattr(model, 'predict_proba') else None
-
-                    # Apply probability calibration
-                    if prediction_proba is not None:
-                        raw_prob = prediction_proba[1]
-                        calibrated_prob = 1 / (1 + np.exp(-2 * (raw_prob - 0.5)))
-                        calibrated_prob = max(0.05, min(0.95, calibrated_prob))
-                    else:
-                        calibrated_prob = 0.5
+                    if isinstance(prediction, Exception):
+                        raise prediction
 
                     predictions.append({
                         "lead_id": str(lead_data['id']),
@@ -453,16 +382,8 @@ class AdvancedMLPipeline:
             if model_files:
                 latest_model_file = max(model_files, key=lambda f: f.stat().st_mtime)
                 try:
-                    model_data = joblib.load(latest_model_file)
                     model_id = latest_model_file.stem
-                    self.models[model_id] = {
-                        'model': model_data['model'],
-                        'scaler': model_data['scaler'],
-                        'feature_selector': model_data.get('feature_selector'),
-                        'feature_names': model_data['feature_names'],
-                        'performance': model_data['performance'],
-                        'feature_importance': model_data['feature_importance']
-                    }
+                    self.models[model_id] = pipeline_model_entry(latest_model_file)
                     # Set as active model
                     global active_model_id
                     active_model_id = model_id
@@ -490,24 +411,29 @@ class AdvancedMLPipeline:
         feature_names = model_info['feature_names']
         
         # Prepare features
-        features = self.prepare_features_for_prediction(lead_data, feature_names)
+        features = self.prepare_features_for_prediction(lead_data, feature_names, model_info.get('feature_pipeline'))
         
-        # Scale features - ensure proper feature alignment with column names
-        features_df = pd.DataFrame([features], columns=feature_names)
-        features_scaled = scaler.transform(features_df)
+        # Forests are flattened once per model into NumPy arrays (scaler folded in)
+        if 'compiled' not in model_info:
+            model_info['compiled'] = compile_model(model, scaler)
+        compiled = model_info['compiled']
         
-        # Make prediction
         start_time = datetime.now()
-        prediction = model.predict(features_scaled)[0]
-        prediction_proba = model.predict_proba(features_scaled)[0] if hasattr(model, 'predict_proba') else None
+        if compiled is not None:
+            prediction_proba = compiled.predict_proba([features])[0]
+            prediction = compiled.classes_[int(np.argmax(prediction_proba))]
+        else:
+            # Scale features - ensure proper feature alignment with column names
+            features_df = pd.DataFrame([features], columns=feature_names)
+            features_scaled = scaler.transform(features_df)
+            
+            # Make prediction
+            prediction = model.predict(features_scaled)[0]
+            prediction_proba = model.predict_proba(features_scaled)[0] if hasattr(model, 'predict_proba') else None
         
-        # Apply probability calibration to spread out the scores
+        # Apply the model's fitted calibrator (legacy bounded sigmoid for older artifacts)
         if prediction_proba is not None:
-            # Simple sigmoid calibration to spread probabilities
-            raw_prob = prediction_proba[1]
-            calibrated_prob = 1 / (1 + np.exp(-2 * (raw_prob - 0.5)))
-            # Ensure probabilities are in reasonable range
-            calibrated_prob = max(0.05, min(0.95, calibrated_prob))
+            calibrated_prob = calibrate_for_serving([prediction_proba[1]], model_info.get('calibrator'))[0]
         else:
             calibrated_prob = 0.5
         
@@ -520,148 +446,34 @@ class AdvancedMLPipeline:
             'prediction_time': prediction_time
         }
     
-    def prepare_features_for_prediction(self, lead_data: Dict[str, Any], feature_names: List[str]) -> List[float]:
-        """Prepare lead data for model prediction - comprehensive feature engineering"""
-        
-        features = []
-        for feature in feature_names:
-            try:
-                if feature == 'lead_score':
-                    features.append(lead_data.get('lead_score', 0))
-                elif feature == 'days_since_creation':
-                    days = lead_data.get('days_since_creation', 0)
-                    features.append(float(days) if days is not None else 0.0)
-                elif feature == 'score_squared':
-                    score = lead_data.get('lead_score', 0)
-                    features.append(score ** 2)
-                elif feature == 'score_log':
-                    score = lead_data.get('lead_score', 0)
-                    features.append(np.log1p(score))
-                elif feature == 'score_percentile':
-                    # For prediction, we'll use a normalized score
-                    score = lead_data.get('lead_score', 0)
-                    features.append(score / 100.0)  # Normalize to 0-1 range
-                elif feature == 'created_month':
-                    created_at = lead_data.get('created_at')
-                    if created_at:
-                        features.append(pd.to_datetime(created_at).month)
-                    else:
-                        features.append(1)
-                elif feature == 'created_day_of_week':
-                    created_at = lead_data.get('created_at')
-                    if created_at:
-                        features.append(pd.to_datetime(created_at).dayofweek)
-                    else:
-                        features.append(0)
-                elif feature == 'created_hour':
-                    created_at = lead_data.get('created_at')
-                    if created_at:
-                        features.append(pd.to_datetime(created_at).hour)
-                    else:
-                        features.append(12)
-                elif feature == 'academic_week':
-                    created_at = lead_data.get('created_at')
-                    if created_at:
-                        features.append(pd.to_datetime(created_at).isocalendar().week)
-                    else:
-                        features.append(1)
-                elif feature == 'is_application_season':
-                    created_at = lead_data.get('created_at')
-                    if created_at:
-                        month = pd.to_datetime(created_at).month
-                        features.append(1 if month in [9, 10, 11, 12, 1, 2] else 0)
-                    else:
-                        features.append(0)
-                elif feature == 'engagement_score':
-                    features.append(lead_data.get('engagement_score', 0))
-                elif feature == 'engagement_squared':
-                    engagement = lead_data.get('engagement_score', 0)
-                    features.append(engagement ** 2)
-                elif feature == 'engagement_percentile':
-                    engagement = lead_data.get('engagement_score', 0)
-                    features.append(engagement / 100.0)  # Normalize to 0-1 range
-                elif feature == 'touchpoint_count':
-                    features.append(lead_data.get('touchpoint_count', 0))
-                elif feature == 'touchpoint_log':
-                    touchpoints = lead_data.get('touchpoint_count', 0)
-                    features.append(np.log1p(touchpoints))
-                elif feature == 'touchpoint_percentile':
-                    touchpoints = lead_data.get('touchpoint_count', 0)
-                    features.append(touchpoints / 10.0)  # Normalize assuming max ~10 touchpoints
-                elif feature == 'lifecycle_state_encoded':
-                    # Encode lifecycle state
-                    lifecycle = lead_data.get('lifecycle_state', 'unknown')
-                    if lifecycle == 'lead': features.append(0)
-                    elif lifecycle == 'applicant': features.append(1)
-                    elif lifecycle == 'student': features.append(2)
-                    else: features.append(0)
-                elif feature == 'source_encoded':
-                    # Encode source
-                    source = lead_data.get('source', 'unknown')
-                    if source == 'website': features.append(0)
-                    elif source == 'referral': features.append(1)
-                    elif source == 'social': features.append(2)
-                    elif source == 'email': features.append(3)
-                    else: features.append(0)
-                elif feature == 'campus_preference_encoded':
-                    # Encode campus preference
-                    campus = lead_data.get('campus_preference', 'unknown')
-                    if campus == 'london': features.append(0)
-                    elif campus == 'manchester': features.append(1)
-                    elif campus == 'birmingham': features.append(2)
-                    else: features.append(0)
-                elif feature == 'engagement_level_encoded':
-                    # Encode engagement level
-                    engagement = lead_data.get('engagement_score', 0)
-                    if engagement >= 80: features.append(2)  # high
-                    elif engagement >= 50: features.append(1)  # medium
-                    else: features.append(0)  # low
-                elif feature == 'status_encoded':
-                    # Encode status
-                    status = lead_data.get('status', 'unknown')
-                    if status == 'new': features.append(0)
-                    elif status == 'contacted': features.append(1)
-                    elif status == 'qualified': features.append(2)
-                    elif status == 'converted': features.append(3)
-                    else: features.append(0)
-                elif feature == 'score_engagement_interaction':
-                    score = lead_data.get('lead_score', 0)
-                    engagement = lead_data.get('engagement_score', 0)
-                    features.append(score * (engagement / 100.0))
-                elif feature == 'score_time_interaction':
-                    score = lead_data.get('lead_score', 0)
-                    days = lead_data.get('days_since_creation', 0)
-                    features.append(score * days)
-                elif feature == 'score_engagement_score_interaction':
-                    score = lead_data.get('lead_score', 0)
-                    engagement = lead_data.get('engagement_score', 0)
-                    features.append(score * engagement)
-                elif feature == 'score_touchpoint_interaction':
-                    score = lead_data.get('lead_score', 0)
-                    touchpoints = lead_data.get('touchpoint_count', 0)
-                    features.append(score * touchpoints)
-                elif feature == 'score_cubed':
-                    score = lead_data.get('lead_score', 0)
-                    features.append(score ** 3)
-                elif feature == 'days_squared':
-                    days = lead_data.get('days_since_creation', 0)
-                    features.append(days ** 2)
-                else:
-                    # For any other features, try to get from lead_data or use sensible defaults
-                    if feature in lead_data:
-                        value = lead_data[feature]
-                        if isinstance(value, (int, float)):
-                            features.append(float(value))
-                        else:
-                            features.append(0.0)
-                    else:
-                        # Default value for unknown features
-                        features.append(0.0)
-            except Exception as e:
-                print(f"⚠️ Feature preparation failed for {feature}: {e}")
-                features.append(0.0)
-        
-        return features
+    def prepare_features_for_prediction(self, lead_data: Dict[str, Any], feature_names: List[str],
+                                        pipeline: Optional[FeaturePipeline] = None) -> List[float]:
+        """Prepare one lead for model prediction with the model's training feature pipeline"""
+        return self.prepare_feature_matrix([lead_data], feature_names, pipeline)[0].tolist()
+    
+    def prepare_feature_matrix(self, rows: List[Dict[str, Any]], feature_names: List[str],
+                               pipeline: Optional[FeaturePipeline] = None) -> np.ndarray:
+        """Vectorised features for a batch of leads, (n_rows, n_features)"""
+        return resolve_pipeline(pipeline).transform_records(rows, feature_names)
+
+    def score_feature_matrix(self, model_info: Dict[str, Any], matrix: np.ndarray) -> List[tuple]:
+        """
+        (prediction, class probabilities, calibrated probability) per row, with one
+        scaler/model call and one calibration call for the whole batch. If the batch
+        cannot be scored every row carries the exception in place of its prediction.
+        """
+        try:
+            features_df = pd.DataFrame(matrix, columns=model_info['feature_names'])
+            features_scaled = model_info['scaler'].transform(features_df)
+            model = model_info['model']
+            predictions = model.predict(features_scaled)
+            if not hasattr(model, 'predict_proba'):
+                return [(prediction, None, 0.5) for prediction in predictions]
+            probas = np.asarray(model.predict_proba(features_scaled))
+            calibrated = calibrate_for_serving(probas[:, 1], model_info.get('calibrator'))
+            return list(zip(predictions, probas, calibrated))
+        except Exception as e:
+            return [(e, None, None)] * len(matrix)
 
 class EnsembleModel:
     """Ensemble model combining multiple ML algorithms"""
@@ -728,17 +540,8 @@ def load_latest_model():
         if model_files:
             latest_model_file = max(model_files, key=lambda f: f.stat().st_mtime)
             try:
-                import joblib
-                model_data = joblib.load(latest_model_file)
                 model_id = latest_model_file.stem
-                ml_pipeline.models[model_id] = {
-                    'model': model_data['model'],
-                    'scaler': model_data['scaler'],
-                    'feature_selector': model_data.get('feature_selector'),
-                    'feature_names': model_data['feature_names'],
-                    'performance': model_data['performance'],
-                    'feature_importance': model_data['feature_importance']
-                }
+                ml_pipeline.models[model_id] = pipeline_model_entry(latest_model_file)
                 global active_model_id
                 active_model_id = model_id
                 print(f"✅ Loaded latest model: {model_id}")
@@ -747,9 +550,10 @@ def load_latest_model():
                 print(f"❌ Failed to load model {latest_model_file}: {e}")
     return False
 
-# Load the latest model on startup
-print("🔄 Loading latest ML model on startup...")
-load_latest_model()
+# Load the latest model on startup (training worker processes skip this)
+if os.getenv("ML_LOAD_MODEL_ON_IMPORT", "true").lower() == "true":
+    print("🔄 Loading latest ML model on startup...")
+    load_latest_model()
 
 # API Endpoints
 @router.get("")
@@ -761,6 +565,7 @@ async def get_advanced_ml_info():
         "version": "1.0",
         "endpoints": [
             "/train",
+            "/train/jobs",
             "/predict", 
             "/predict-batch",
             "/models",
@@ -773,77 +578,7 @@ async def get_advanced_ml_info():
         "models_loaded": len(ml_pipeline.models) if hasattr(ml_pipeline, 'models') else 0
     }
 
-@router.post("/train")
-async def train_advanced_model(request: ModelTrainingRequest):
-    """Train advanced ML model with feature engineering"""
-    try:
-        print(f"🚀 Starting ML training with config: {request.config.model_type}")
-        
-        # Load training data
-        print("📊 Loading training data...")
-        df = await ml_pipeline.load_training_data(request.training_data_limit)
-        print(f"✅ Loaded {len(df)} training samples")
-        print(f"📋 DataFrame shape: {df.shape}")
-        print(f"📋 DataFrame columns: {list(df.columns)}")
-        
-        # Engineer features
-        print("🔧 Engineering features...")
-        df_engineered = ml_pipeline.engineer_features(df, request.feature_config)
-        print(f"✅ Engineered features shape: {df_engineered.shape}")
-        
-        # Prepare features and target: keep only numeric columns for modelling
-        feature_columns = [col for col in df_engineered.columns if col not in ['id', 'has_application', 'created_at', 'first_name', 'last_name', 'email', 'phone', 'application_source', 'programme_name', 'campus_name', 'lifecycle_state', 'engagement_level', 'status']]
-        X = df_engineered[feature_columns].select_dtypes(include=[np.number])
-        y = df_engineered['has_application']
-        
-        print(f"🎯 Features: {len(feature_columns)} columns")
-        print(f"🎯 Target distribution: {y.value_counts().to_dict()}")
-        
-        # Feature selection
-        if request.config.feature_selection:
-            print("🔍 Performing feature selection...")
-            try:
-                X = ml_pipeline.select_features(X, y)
-                print(f"✅ Selected {X.shape[1]} features")
-            except Exception as e:
-                print(f"⚠️  Feature selection skipped due to error: {e}")
-        
-        # Train model
-        print(f"🤖 Training {request.config.model_type} model...")
-        model_id, performance = ml_pipeline.train_model(X, y, request.config)
-        print(f"✅ Model trained successfully: {model_id}")
-        
-        # Save model if requested
-        if request.save_model:
-            model_name = request.model_name or f"advanced_ml_{model_id}"
-            model_path = MODEL_STORAGE_PATH / f"{model_name}.joblib"
-            
-            model_info = ml_pipeline.models[model_id]
-            model_data = {
-                'model': model_info['model'],
-                'scaler': model_info['scaler'],
-                'feature_selector': model_info['feature_selector'],
-                'feature_names': model_info['feature_names'],
-                'performance': model_info['performance'],
-                'feature_importance': model_info['feature_importance']
-            }
-            
-            joblib.dump(model_data, model_path)
-            print(f"💾 Model saved to: {model_path}")
-        
-        return {
-            "model_id": model_id,
-            "performance": performance,
-            "feature_count": len(ml_pipeline.feature_names),
-            "training_samples": len(df),
-            "model_saved": request.save_model
-        }
-        
-    except Exception as e:
-        import traceback
-        print(f"❌ Training failed with error: {str(e)}")
-        print(f"📋 Full traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
+add_training_routes(router, ModelTrainingRequest, ml_pipeline, __name__)
 
 @router.post("/predict")
 async def predict_lead_conversion(lead_data: Dict[str, Any], model_id: Optional[str] = None):
@@ -1039,28 +774,15 @@ async def predict_batch_leads_fallback(lead_ids: list[str]):
         if not results:
             return {"predictions": []}
 
+        # Engineer every lead in one vectorised pass with the model's feature pipeline
+        matrix = ml_pipeline.prepare_feature_matrix(results, active_model['feature_names'], active_model.get('feature_pipeline'))
+        
         predictions = []
-        for lead_data in results:
+        scored = ml_pipeline.score_feature_matrix(active_model, matrix)
+        for lead_data, (prediction, prediction_proba, calibrated_prob) in zip(results, scored):
             try:
-                # Prepare features for this lead
-                features = ml_pipeline.prepare_features_for_prediction(lead_data, active_model['feature_names'])
-                
-                # Scale features - ensure proper feature alignment with column names
-                features_df = pd.DataFrame([features], columns=active_model['feature_names'])
-                features_scaled = active_model['scaler'].transform(features_df)
-
-                # Make prediction
-                model = active_model['model']
-                prediction = model.predict(features_scaled)[0]
-                prediction_proba = model.predict_proba(features_scaled)[0] if hasattr(model, 'predict_proba') else None
-
-                # Apply probability calibration
-                if prediction_proba is not None:
-                    raw_prob = prediction_proba[1]
-                    calibrated_prob = 1 / (1 + np.exp(-2 * (raw_prob - 0.5)))
-                    calibrated_prob = max(0.05, min(0.95, calibrated_prob))
-                else:
-                    calibrated_prob = 0.5
+                if isinstance(prediction, Exception):
+                    raise prediction
 
                 predictions.append({
                     "lead_id": lead_data['id'],
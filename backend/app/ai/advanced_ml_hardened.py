@@ -12,18 +12,19 @@ This is the improved version of advanced_ml.py with:
 
 from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, Union, Literal
 from datetime import datetime, timedelta
+import asyncio
 import json
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, roc_auc_score, precision_recall_curve
 from sklearn.feature_selection import SelectKBest, f_classif
-import joblib
 import os
 import time
 from pathlib import Path
@@ -31,9 +32,13 @@ from app.db.db import fetch, fetchrow, execute
 from app.cache import cached
 
 # Import new components
-from app.ai.model_registry import get_model_registry, load_active_model, get_model_info
-from app.ai.calibration import calibrate_probability, calculate_confidence, apply_probability_bounds
-from app.ai.feature_safety import get_feature_guard, safe_prepare_features
+from app.ai.model_registry import get_model_registry, load_active_model, get_model_info, activate_model_version, score_rows, positive_class_index, pipeline_model_entry
+from app.ai.training_routes import add_training_routes
+from app.ai.hyperparameter_search import HyperparameterSearchConfig, run_search
+from app.ai.training_data import load_training_frame
+from app.ai.feature_pipeline import FeaturePipeline, feature_groups
+from app.ai.calibration import calculate_confidence, calibrate_for_serving, fit_calibration, serving_calibration_method
+from app.ai.feature_safety import get_feature_guard, safe_prepare_feature_matrix
 from app.ai.ml_telemetry import (
     log_prediction_request, log_prediction_success, log_prediction_error,
     log_model_load, log_feature_engineering, log_calibration
@@ -41,7 +46,7 @@ from app.ai.ml_telemetry import (
 from app.schemas.ai_ml import (
     PredictBatchRequest, PredictBatchResponse, PredictBatchResponseItem,
     PredictSingleRequest, PredictSingleResponse, ModelInfoResponse,
-    HealthCheckResponse, ErrorResponse, normalize_predict_batch_request
+    HealthCheckResponse, ErrorResponse, ActivateModelRequest, normalize_predict_batch_request
 )
 
 router = APIRouter(prefix="/ai/advanced-ml", tags=["advanced-ml"])
@@ -56,6 +61,8 @@ class MLModelConfig(BaseModel):
     hyperparameters: Dict[str, Any] = {}
     feature_selection: bool = True
     cross_validation_folds: int = 5
+    search: Optional[HyperparameterSearchConfig] = None  # set to tune instead of using fixed hyperparameters
+    calibration: Literal["isotonic", "platt", "none"] = "isotonic"  # fitted on the held-out split
 
 class FeatureEngineeringConfig(BaseModel):
     create_lag_features: bool = True
@@ -69,6 +76,7 @@ class ModelTrainingRequest(BaseModel):
     config: MLModelConfig
     feature_config: FeatureEngineeringConfig
     training_data_limit: Optional[int] = 1000
+    snapshot: Literal["off", "auto", "refresh"] = "off"  # "auto" reuses a recent Parquet snapshot
     save_model: bool = True
     model_name: Optional[str] = None
 
@@ -107,91 +115,23 @@ class AdvancedMLPipeline:
     def __init__(self):
         self.scaler = StandardScaler()
         self.label_encoders = {}
+        self.feature_pipeline: Optional[FeaturePipeline] = None
         self.feature_selector = None
         self.models = {}
         self.feature_names = []
         
-    async def load_training_data(self, limit: int = 1000) -> pd.DataFrame:
-        """Load lead data for training from database"""
+    async def load_training_data(self, limit: Optional[int] = 1000, snapshot: str = "off") -> pd.DataFrame:
+        """
+        Load lead data for training from database.
+        
+        Streams a binary COPY into typed, categorical columns (limit=None loads every
+        lead); snapshot="auto"/"refresh" reuses/rewrites a local Parquet copy.
+        """
         try:
-            print(f"🔍 Querying database for up to {limit} leads...")
-            
-            # Query enriched lead data using ACTUAL current schema
-            query = """
-            SELECT 
-                p.id, p.first_name, p.last_name, p.email, p.phone,
-                p.lead_score, p.lifecycle_state, p.created_at,
-                p.engagement_score, p.conversion_probability,
-                p.touchpoint_count, p.status,
-                (EXTRACT(EPOCH FROM (NOW() - p.created_at)) / 86400.0)::double precision as days_since_creation,
-                CASE WHEN a.id IS NOT NULL THEN 1 ELSE 0 END as has_application,
-                COALESCE(a.source, 'unknown') as application_source,
-                COALESCE(pr.name, 'unknown') as programme_name,
-                COALESCE(c.name, 'unknown') as campus_name,
-                CASE 
-                    WHEN p.engagement_score >= 80 THEN 'high'
-                    WHEN p.engagement_score >= 50 THEN 'medium'
-                    ELSE 'low'
-                END as engagement_level,
-                EXTRACT(MONTH FROM p.created_at) as created_month,
-                EXTRACT(DOW FROM p.created_at) as created_day_of_week,
-                EXTRACT(HOUR FROM p.created_at) as created_hour
-            FROM people p
-            LEFT JOIN applications a ON p.id = a.person_id
-            LEFT JOIN programmes pr ON a.programme_id = pr.id
-            LEFT JOIN campuses c ON pr.campus_id = c.id
-            WHERE p.lifecycle_state = 'lead'
-            ORDER BY p.created_at DESC
-            LIMIT %s
-            """
-            
-            print(f"📝 Executing query: {query}")
-            results = await fetch(query, limit)
-            print(f"📊 Query returned {len(results) if results else 0} results")
-            
-            if not results:
-                raise ValueError("No training data available")
-            
-            print(f"📋 First result sample: {results[0] if results else 'None'}")
-            
-            # Convert to DataFrame with proper column handling
-            df = pd.DataFrame(results)
-            print(f"✅ DataFrame created with shape: {df.shape}")
-            print(f"📋 DataFrame columns: {list(df.columns)}")
-            print(f"📋 DataFrame dtypes: {df.dtypes.to_dict()}")
-            
-            # Ensure numeric dtypes for numeric-like columns
-            if 'days_since_creation' in df.columns:
-                df['days_since_creation'] = pd.to_numeric(df['days_since_creation'], errors='coerce')
-            if 'conversion_probability' in df.columns:
-                df['conversion_probability'] = pd.to_numeric(df['conversion_probability'], errors='coerce')
-            if 'lead_score' in df.columns:
-                df['lead_score'] = pd.to_numeric(df['lead_score'], errors='coerce')
-            if 'engagement_score' in df.columns:
-                df['engagement_score'] = pd.to_numeric(df['engagement_score'], errors='coerce')
-            if 'touchpoint_count' in df.columns:
-                df['touchpoint_count'] = pd.to_numeric(df['touchpoint_count'], errors='coerce')
-
-            # Basic data cleaning
-            print(f"🧹 Cleaning data...")
-            print(f"📊 Before cleaning - rows: {len(df)}")
-            print(f"📊 Missing lead_score: {df['lead_score'].isna().sum()}")
-            print(f"📊 Missing has_application: {df['has_application'].isna().sum()}")
-            
-            # Fill missing values with defaults
-            df['lead_score'] = df['lead_score'].fillna(0)
-            df['engagement_score'] = df['engagement_score'].fillna(0)
-            df['touchpoint_count'] = df['touchpoint_count'].fillna(0)
-            df['has_application'] = df['has_application'].fillna(0)
-            df['conversion_probability'] = df['conversion_probability'].fillna(0.0)
-            
-            df['has_application'] = df['has_application'].astype(int)
-            
-            print(f"✅ After cleaning - rows: {len(df)}")
+            print(f"🔍 Streaming up to {limit if limit is not None else 'all'} leads for training...")
+            df = await load_training_frame(limit, snapshot=snapshot)
             print(f"📊 Target distribution: {df['has_application'].value_counts().to_dict()}")
-            
             return df
-            
         except Exception as e:
             import traceback
             print(f"❌ Error in load_training_data: {str(e)}")
@@ -199,72 +139,24 @@ class AdvancedMLPipeline:
             raise Exception(f"Failed to load training data: {str(e)}")
     
     def engineer_features(self, df: pd.DataFrame, config: FeatureEngineeringConfig) -> pd.DataFrame:
-        """Advanced feature engineering for lead intelligence"""
+        """
+        Advanced feature engineering for lead intelligence.
+        
+        Features come from the shared declarative pipeline (app.ai.feature_pipeline);
+        the fitted pipeline is kept on self and stored with the trained model so
+        serving computes exactly the same features.
+        """
         
         df_engineered = df.copy()
+        self.feature_pipeline = FeaturePipeline()
+        features = self.feature_pipeline.fit_transform(
+            df, groups=feature_groups(config), handle_missing=config.handle_missing_values
+        )
+        for name in features.columns:
+            df_engineered[name] = features[name]
         
-        # 1. Temporal Features (already extracted in query)
-        if config.create_lag_features:
-            # These are already extracted in the SQL query, but ensure they exist
-            if 'created_month' not in df_engineered.columns:
-                df_engineered['created_month'] = pd.to_datetime(df_engineered['created_at']).dt.month
-            if 'created_day_of_week' not in df_engineered.columns:
-                df_engineered['created_day_of_week'] = pd.to_datetime(df_engineered['created_at']).dt.dayofweek
-            if 'created_hour' not in df_engineered.columns:
-                df_engineered['created_hour'] = pd.to_datetime(df_engineered['created_at']).dt.hour
-            
-            # Academic calendar features
-            df_engineered['academic_week'] = pd.to_datetime(df_engineered['created_at']).dt.isocalendar().week
-            df_engineered['is_application_season'] = df_engineered['created_month'].isin([9, 10, 11, 12, 1, 2]).astype(int)
-        
-        # 2. Score-based Features
-        df_engineered['score_squared'] = df_engineered['lead_score'] ** 2
-        df_engineered['score_log'] = np.log1p(df_engineered['lead_score'])
-        df_engineered['score_percentile'] = df_engineered['lead_score'].rank(pct=True)
-        
-        # Engagement features
-        if 'engagement_score' in df_engineered.columns:
-            df_engineered['engagement_squared'] = df_engineered['engagement_score'] ** 2
-            df_engineered['engagement_percentile'] = df_engineered['engagement_score'].rank(pct=True)
-        
-        # Touchpoint features
-        if 'touchpoint_count' in df_engineered.columns:
-            df_engineered['touchpoint_log'] = np.log1p(df_engineered['touchpoint_count'])
-            df_engineered['touchpoint_percentile'] = df_engineered['touchpoint_count'].rank(pct=True)
-        
-        # 3. Categorical Features
-        categorical_features = ['lifecycle_state', 'source', 'campus_preference', 'engagement_level', 'status']
-        for feature in categorical_features:
-            if feature in df_engineered.columns and df_engineered[feature].dtype == 'object':
-                le = LabelEncoder()
-                df_engineered[f'{feature}_encoded'] = le.fit_transform(df_engineered[feature].fillna('unknown'))
-                self.label_encoders[feature] = le
-        
-        # 4. Interaction Features
-        if config.create_interaction_features:
-            df_engineered['score_engagement_interaction'] = df_engineered['lead_score'] * df_engineered.get('engagement_level_encoded', 1)
-            df_engineered['score_time_interaction'] = df_engineered['lead_score'] * df_engineered['days_since_creation']
-            
-            # Additional interactions
-            if 'engagement_score' in df_engineered.columns:
-                df_engineered['score_engagement_score_interaction'] = df_engineered['lead_score'] * df_engineered['engagement_score']
-            
-            if 'touchpoint_count' in df_engineered.columns:
-                df_engineered['score_touchpoint_interaction'] = df_engineered['lead_score'] * df_engineered['touchpoint_count']
-        
-        # 5. Polynomial Features
-        if config.create_polynomial_features:
-            df_engineered['score_cubed'] = df_engineered['lead_score'] ** 3
-            df_engineered['days_squared'] = df_engineered['days_since_creation'] ** 2
-        
-        # 6. Handle Missing Values
-        if config.handle_missing_values == "impute":
-            numeric_columns = df_engineered.select_dtypes(include=[np.number]).columns
-            df_engineered[numeric_columns] = df_engineered[numeric_columns].fillna(df_engineered[numeric_columns].median())
-        elif config.handle_missing_values == "zero":
-            df_engineered = df_engineered.fillna(0)
-        else:  # drop
-            df_engineered = df_engineered.dropna()
+        if config.handle_missing_values == "drop":
+            df_engineered = df_engineered.dropna(subset=list(features.columns))
         
         return df_engineered
     
@@ -283,31 +175,15 @@ class AdvancedMLPipeline:
             print(f"Feature selection failed: {e}")
             return X
     
-    def train_model(self, X: pd.DataFrame, y: pd.Series, config: MLModelConfig) -> Any:
-        """Train advanced ML model based on configuration"""
-        
-        start_time = datetime.now()
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=config.test_size, random_state=config.random_state, stratify=y
-        )
-        
-        # Scale features
-        if config.feature_selection:
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-        else:
-            X_train_scaled = X_train
-            X_test_scaled = X_test
-        
-        # Initialize model based on type
+    def build_model(self, config: MLModelConfig, n_jobs: Optional[int] = None) -> Any:
+        """Instantiate the configured model type with its fixed hyperparameters"""
         if config.model_type == "random_forest":
             model = RandomForestClassifier(
                 n_estimators=config.hyperparameters.get('n_estimators', 100),
                 max_depth=config.hyperparameters.get('max_depth', 10),
                 random_state=config.random_state,
-                class_weight='balanced'  # Add class balancing
+                class_weight='balanced',  # Add class balancing
+                n_jobs=n_jobs
             )
         elif config.model_type == "gradient_boosting":
             model = GradientBoostingClassifier(
@@ -326,7 +202,7 @@ class AdvancedMLPipeline:
         elif config.model_type == "ensemble":
             # Create ensemble of multiple models
             models = [
-                RandomForestClassifier(n_estimators=50, random_state=config.random_state),
+                RandomForestClassifier(n_estimators=50, random_state=config.random_state, n_jobs=n_jobs),
                 GradientBoostingClassifier(n_estimators=50, random_state=config.random_state),
                 LogisticRegression(random_state=config.random_state)
             ]
@@ -334,16 +210,70 @@ class AdvancedMLPipeline:
         else:
             raise ValueError(f"Unsupported model type: {config.model_type}")
         
-        # Train model
-        model.fit(X_train_scaled, y_train)
+        return model
+    
+    def train_model(self, X: pd.DataFrame, y: pd.Series, config: MLModelConfig,
+                    n_jobs: Optional[int] = None, progress: Optional[Any] = None) -> Any:
+        """
+        Train advanced ML model based on configuration.
+        
+        n_jobs parallelises forest fitting and cross-validation; progress(stage, fraction)
+        is called between stages (training jobs use it for status and cancellation).
+        """
+        
+        start_time = datetime.now()
+        report = progress or (lambda stage, fraction: None)
         
-        # Cross-validation
-        cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=config.cross_validation_folds)
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=config.test_size, random_state=config.random_state, stratify=y
+        )
+        
+        # Scale features
+        if config.feature_selection:
+            X_train_scaled = self.scaler.fit_transform(X_train)
+            X_test_scaled = self.scaler.transform(X_test)
+        else:
+            X_train_scaled = X_train
+            X_test_scaled = X_test
+        
+        
+        model_type = config.model_type
+        search_result = None
+        if config.search is not None:
+            # Search mode: stratified k-fold model selection; the winner comes back refit
+            search_result = run_search(
+                X_train_scaled, y_train, config.search, cv_folds=config.cross_validation_folds,
+                random_state=config.random_state, n_jobs=n_jobs, progress=report
+            )
+            model = search_result.estimator
+            model_type = search_result.best_model_type
+            cv_scores = np.array(search_result.best_cv_scores)
+        else:
+            model = self.build_model(config, n_jobs)
+            
+            # Train model
+            model.fit(X_train_scaled, y_train)
+            report("cross_validating", 0.6)
+            
+            # Cross-validation: folds run in parallel, so each forest fits single-threaded
+            cv_model = model
+            if n_jobs and n_jobs != 1 and hasattr(model, 'n_jobs'):
+                cv_model = clone(model).set_params(n_jobs=1)
+            cv_scores = cross_val_score(cv_model, X_train_scaled, y_train, cv=config.cross_validation_folds, n_jobs=n_jobs)
+        report("evaluating", 0.85)
         
         # Predictions
         y_pred = model.predict(X_test_scaled)
         y_pred_proba = model.predict_proba(X_test_scaled)[:, 1] if hasattr(model, 'predict_proba') else None
         
+        # Calibrator fitted on the held-out split, saved in the artifact and applied at serving
+        calibrator, calibration = None, None
+        if y_pred_proba is not None:
+            calibrator, calibration = fit_calibration(
+                y_pred_proba, y_test, config.calibration, random_state=config.random_state
+            )
+        
         # Performance metrics
         from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
         
@@ -356,6 +286,12 @@ class AdvancedMLPipeline:
             'cross_validation_scores': cv_scores.tolist(),
             'training_time': (datetime.now() - start_time).total_seconds()
         }
+        if search_result is not None:
+            performance['search'] = search_result.summary(config.search.strategy, config.search.scoring)
+        if self.feature_pipeline is not None:
+            performance['feature_engineering'] = self.feature_pipeline.summary()
+        if calibration is not None:
+            performance['calibration'] = calibration
         
         # Feature importance
         if hasattr(model, 'feature_importances_'):
@@ -366,15 +302,19 @@ class AdvancedMLPipeline:
             feature_importance = {}
         
         # Store model
-        model_id = f"{config.model_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        model_id = f"{model_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         self.models[model_id] = {
             'model': model,
             'scaler': self.scaler,
             'feature_selector': self.feature_selector,
             'feature_names': self.feature_names,
+            'feature_pipeline': self.feature_pipeline,
+            'calibrator': calibrator,
             'performance': performance,
             'feature_importance': feature_importance
         }
+        if search_result is not None:
+            self.models[model_id]['leaderboard'] = search_result.leaderboard
         
         return model_id, performance
     
@@ -475,53 +415,38 @@ class AdvancedMLPipeline:
             raw_probabilities = []
             calibrated_probabilities = []
             
-            for lead_data in results:
-                try:
-                    # Use feature safety guard for robust feature preparation
-                    features, features_present_ratio = safe_prepare_features(lead_data, loaded_model.feature_names)
-                    
-                    # Log feature engineering
+            # Engineer the whole batch with the model's feature pipeline, then score it in one call
+            try:
+                matrix, coverage = safe_prepare_feature_matrix(
+                    results, loaded_model.feature_names, loaded_model.feature_pipeline
+                )
+                prepared = []
+                for lead_data, features, features_present_ratio in zip(results, matrix, coverage):
                     log_feature_engineering(
-                        request_id, len(loaded_model.feature_names), features_present_ratio, 0, True
+                        request_id, len(loaded_model.feature_names), float(features_present_ratio), 0, True
                     )
-                    
-                    # Scale features
-                    features_df = pd.DataFrame([features], columns=loaded_model.feature_names)
-                    features_scaled = loaded_model.scaler.transform(features_df)
-
-                    # Make prediction
-                    model = loaded_model.model
-                    prediction = model.predict(features_scaled)[0]
-                    prediction_proba = model.predict_proba(features_scaled)[0] if hasattr(model, 'predict_proba') else None
-
-                    # Apply calibration
-                    if prediction_proba is not None:
-                        raw_prob = prediction_proba[1]
-                        calibrated_prob = calibrate_probability(raw_prob, method="sigmoid")
-                        calibrated_prob = apply_probability_bounds(calibrated_prob)
-                        
-                        raw_probabilities.append(raw_prob)
-                        calibrated_probabilities.append(calibrated_prob)
-                        
-                        # Calculate confidence
-                        confidence = calculate_confidence(prediction_proba, method="max_distance")
-                    else:
-                        calibrated_prob = 0.5
-                        confidence = 0.5
-                        raw_probabilities.append(0.5)
-                        calibrated_probabilities.append(0.5)
-
-                    predictions.append(PredictBatchResponseItem(
-                        lead_id=str(lead_data['id']),
-                        probability=float(calibrated_prob),
-                        confidence=float(confidence),
-                        calibrated_probability=float(calibrated_prob),
-                        features_present_ratio=float(features_present_ratio),
-                        prediction=bool(prediction)
-                    ))
-
+                    prepared.append((lead_data, features, float(features_present_ratio)))
+            except Exception as e:
+                print(f"❌ Feature preparation failed for batch: {e}")
+                prepared = [(lead_data, None, 0.0) for lead_data in results]
+            
+            ready = [i for i, row in enumerate(prepared) if row[1] is not None]
+            probas = {}
+            # Map columns through classes_ rather than assuming [0, 1]
+            positive = positive_class_index(loaded_model)
+            if ready:
+                try:
+                    batch_proba = np.asarray(score_rows(loaded_model, [prepared[i][1] for i in ready]))
+                    # One array operation for the whole batch with the model's fitted calibrator
+                    batch_calibrated = calibrate_for_serving(batch_proba[:, positive], loaded_model.calibrator)
+                    for i, proba, calibrated in zip(ready, batch_proba, batch_calibrated):
+                        probas[i] = (proba, int(np.argmax(proba)) == positive, calibrated)
                 except Exception as e:
-                    print(f"❌ Prediction failed for lead {lead_data['id']}: {e}")
+                    print(f"❌ Batch prediction failed: {e}")
+            
+            for i, (lead_data, features, features_present_ratio) in enumerate(prepared):
+                scored = probas.get(i)
+                if scored is None:
                     predictions.append(PredictBatchResponseItem(
                         lead_id=str(lead_data['id']),
                         probability=0.0,
@@ -530,6 +455,25 @@ class AdvancedMLPipeline:
                         features_present_ratio=0.0,
                         prediction=False
                     ))
+                    continue
+                
+                prediction_proba, prediction, calibrated_prob = scored
+                raw_prob = prediction_proba[positive]
+                
+                raw_probabilities.append(raw_prob)
+                calibrated_probabilities.append(calibrated_prob)
+                
+                # Calculate confidence
+                confidence = calculate_confidence(prediction_proba, method="max_distance")
+                
+                predictions.append(PredictBatchResponseItem(
+                    lead_id=str(lead_data['id']),
+                    probability=float(calibrated_prob),
+                    confidence=float(confidence),
+                    calibrated_probability=float(calibrated_prob),
+                    features_present_ratio=float(features_present_ratio),
+                    prediction=bool(prediction)
+                ))
 
             # Log calibration
             if raw_probabilities and calibrated_probabilities:
@@ -558,7 +502,7 @@ class AdvancedMLPipeline:
                 processing_time_ms=latency_ms,
                 cache_hit=cache_hit,
                 calibration_metadata={
-                    "calibration_method": "sigmoid",
+                    "calibration_method": serving_calibration_method(loaded_model.calibrator),
                     "raw_probabilities_count": len(raw_probabilities),
                     "calibrated_probabilities_count": len(calibrated_probabilities),
                     "avg_feature_coverage": avg_features_ratio
@@ -601,17 +545,8 @@ def load_latest_model():
         if model_files:
             latest_model_file = max(model_files, key=lambda f: f.stat().st_mtime)
             try:
-                import joblib
-                model_data = joblib.load(latest_model_file)
                 model_id = latest_model_file.stem
-                ml_pipeline.models[model_id] = {
-                    'model': model_data['model'],
-                    'scaler': model_data['scaler'],
-                    'feature_selector': model_data.get('feature_selector'),
-                    'feature_names': model_data['feature_names'],
-                    'performance': model_data['performance'],
-                    'feature_importance': model_data['feature_importance']
-                }
+                ml_pipeline.models[model_id] = pipeline_model_entry(latest_model_file)
                 global active_model_id
                 active_model_id = model_id
                 print(f"✅ Loaded latest model: {model_id}")
@@ -620,9 +555,10 @@ def load_latest_model():
                 print(f"❌ Failed to load model {latest_model_file}: {e}")
     return False
 
-# Load the latest model on startup
-print("🔄 Loading latest ML model on startup...")
-load_latest_model()
+# Load the latest model on startup (training worker processes skip this)
+if os.getenv("ML_LOAD_MODEL_ON_IMPORT", "true").lower() == "true":
+    print("🔄 Loading latest ML model on startup...")
+    load_latest_model()
 
 # API Endpoints
 @router.get("")
@@ -634,6 +570,7 @@ async def get_advanced_ml_info():
         "version": "1.0",
         "endpoints": [
             "/train",
+            "/train/jobs",
             "/predict", 
             "/predict-batch",
             "/models",
@@ -718,78 +655,20 @@ async def get_model_info_endpoint():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get model info: {str(e)}")
 
-# Keep existing endpoints for backward compatibility
-@router.post("/train")
-async def train_advanced_model(request: ModelTrainingRequest):
-    """Train advanced ML model with feature engineering"""
+@router.post("/models/activate", response_model=ModelInfoResponse)
+async def activate_model_endpoint(request: ActivateModelRequest):
+    """Pin the serving model to a specific version (or unpin with version=null)"""
     try:
-        print(f"🚀 Starting ML training with config: {request.config.model_type}")
-        
-        # Load training data
-        print("📊 Loading training data...")
-        df = await ml_pipeline.load_training_data(request.training_data_limit)
-        print(f"✅ Loaded {len(df)} training samples")
-        print(f"📋 DataFrame shape: {df.shape}")
-        print(f"📋 DataFrame columns: {list(df.columns)}")
-        
-        # Engineer features
-        print("🔧 Engineering features...")
-        df_engineered = ml_pipeline.engineer_features(df, request.feature_config)
-        print(f"✅ Engineered features shape: {df_engineered.shape}")
-        
-        # Prepare features and target: keep only numeric columns for modelling
-        feature_columns = [col for col in df_engineered.columns if col not in ['id', 'has_application', 'created_at', 'first_name', 'last_name', 'email', 'phone', 'application_source', 'programme_name', 'campus_name', 'lifecycle_state', 'engagement_level', 'status']]
-        X = df_engineered[feature_columns].select_dtypes(include=[np.number])
-        y = df_engineered['has_application']
-        
-        print(f"🎯 Features: {len(feature_columns)} columns")
-        print(f"🎯 Target distribution: {y.value_counts().to_dict()}")
-        
-        # Feature selection
-        if request.config.feature_selection:
-            print("🔍 Performing feature selection...")
-            try:
-                X = ml_pipeline.select_features(X, y)
-                print(f"✅ Selected {X.shape[1]} features")
-            except Exception as e:
-                print(f"⚠️  Feature selection skipped due to error: {e}")
-        
-        # Train model
-        print(f"🤖 Training {request.config.model_type} model...")
-        model_id, performance = ml_pipeline.train_model(X, y, request.config)
-        print(f"✅ Model trained successfully: {model_id}")
-        
-        # Save model if requested
-        if request.save_model:
-            model_name = request.model_name or f"advanced_ml_{model_id}"
-            model_path = MODEL_STORAGE_PATH / f"{model_name}.joblib"
-            
-            model_info = ml_pipeline.models[model_id]
-            model_data = {
-                'model': model_info['model'],
-                'scaler': model_info['scaler'],
-                'feature_selector': model_info['feature_selector'],
-                'feature_names': model_info['feature_names'],
-                'performance': model_info['performance'],
-                'feature_importance': model_info['feature_importance']
-            }
-            
-            joblib.dump(model_data, model_path)
-            print(f"💾 Model saved to: {model_path}")
-        
-        return {
-            "model_id": model_id,
-            "performance": performance,
-            "feature_count": len(ml_pipeline.feature_names),
-            "training_samples": len(df),
-            "model_saved": request.save_model
-        }
-        
+        # Loading is blocking I/O; keep it off the event loop
+        await asyncio.to_thread(activate_model_version, request.version)
+        return ModelInfoResponse(**get_model_info())
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        import traceback
-        print(f"❌ Training failed with error: {str(e)}")
-        print(f"📋 Full traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to activate model: {str(e)}")
+
+# Keep existing endpoints for backward compatibility
+add_training_routes(router, ModelTrainingRequest, ml_pipeline, __name__)
 
 # Additional endpoints for backward compatibility
 @router.get("/active")
@@ -6,6 +6,7 @@ from enum import Enum
 import math
 import statistics
 
+import numpy as np
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 
@@ -55,10 +56,18 @@ class AnomalyResponse(BaseModel):
     summary: Dict[str, Any]
     generated_at: str
 
+class AnomalyBatchRequest(BaseModel):
+    leads: List[AnomalyRequest]
+
+class AnomalyBatchResponse(BaseModel):
+    items: List[AnomalyResponse]
+
 # ------------------------------
 # Anomaly Detection Logic
 # ------------------------------
 
+ENGAGEMENT_FIELDS = ["email_opens", "email_clicks", "events_attended", "portal_logins", "web_visits"]
+
 def detect_engagement_anomalies(
     engagement_data: Dict[str, Any],
     lead_data: Dict[str, Any]
@@ -76,79 +85,82 @@ def detect_engagement_anomalies(
     # Suspicious engagement patterns
     if email_opens > 0 and email_clicks == 0:
         # Opens emails but never clicks - potential bot or low engagement
-        anomalies.append(AnomalyDetection(
-            lead_id=lead_data.get("id", "unknown"),
-            anomaly_type=AnomalyType.ENGAGEMENT_PATTERN,
-            severity=AnomalySeverity.MEDIUM,
-            confidence=0.75,
-            description="High email opens but zero clicks - potential low engagement or bot behavior",
-            evidence={
-                "email_opens": email_opens,
-                "email_clicks": email_clicks,
-                "click_to_open_ratio": 0.0
-            },
-            risk_score=65.0,
-            recommendations=[
-                "Investigate email engagement quality",
-                "Check for bot detection",
-                "Consider re-engagement strategy"
-            ],
-            detected_at=dt.datetime.now(dt.timezone.utc).isoformat()
-        ))
+        anomalies.append(_opens_without_clicks(email_opens, email_clicks, lead_data))
     
     # Unusually high engagement (potential bot)
     total_engagement = email_opens + email_clicks + events_attended + portal_logins + web_visits
     if total_engagement > 50:  # Threshold for suspicious high engagement
-        anomalies.append(AnomalyDetection(
-            lead_id=lead_data.get("id", "unknown"),
-            anomaly_type=AnomalyType.BOT_LIKE_BEHAVIOR,
-            severity=AnomalySeverity.HIGH,
-            confidence=0.85,
-            description="Extremely high engagement activity - potential bot or automated behavior",
-            evidence={
-                "total_engagement": total_engagement,
-                "threshold": 50,
-                "breakdown": {
-                    "email_opens": email_opens,
-                    "email_clicks": email_clicks,
-                    "events_attended": events_attended,
-                    "portal_logins": portal_logins,
-                    "web_visits": web_visits
-                }
-            },
-            risk_score=85.0,
-            recommendations=[
-                "Implement bot detection measures",
-                "Review engagement authenticity",
-                "Consider rate limiting"
-            ],
-            detected_at=dt.datetime.now(dt.timezone.utc).isoformat()
-        ))
+        anomalies.append(_high_engagement(total_engagement, engagement_data, lead_data))
     
     # Zero engagement after initial contact
     if total_engagement == 0 and lead_data.get("has_email") or lead_data.get("has_phone"):
-        anomalies.append(AnomalyDetection(
-            lead_id=lead_data.get("id", "unknown"),
-            anomaly_type=AnomalyType.ENGAGEMENT_PATTERN,
-            severity=AnomalySeverity.MEDIUM,
-            confidence=0.70,
-            description="No engagement activity despite having contact information",
-            evidence={
-                "total_engagement": total_engagement,
-                "has_email": lead_data.get("has_email"),
-                "has_phone": lead_data.get("has_phone")
-            },
-            risk_score=60.0,
-            recommendations=[
-                "Verify contact information validity",
-                "Implement re-engagement campaign",
-                "Check for technical issues"
-            ],
-            detected_at=dt.datetime.now(dt.timezone.utc).isoformat()
-        ))
+        anomalies.append(_no_engagement(total_engagement, lead_data))
     
     return anomalies
 
+def _opens_without_clicks(email_opens: Any, email_clicks: Any, lead_data: Dict[str, Any]) -> AnomalyDetection:
+    return AnomalyDetection(
+        lead_id=lead_data.get("id", "unknown"),
+        anomaly_type=AnomalyType.ENGAGEMENT_PATTERN,
+        severity=AnomalySeverity.MEDIUM,
+        confidence=0.75,
+        description="High email opens but zero clicks - potential low engagement or bot behavior",
+        evidence={
+            "email_opens": email_opens,
+            "email_clicks": email_clicks,
+            "click_to_open_ratio": 0.0
+        },
+        risk_score=65.0,
+        recommendations=[
+            "Investigate email engagement quality",
+            "Check for bot detection",
+            "Consider re-engagement strategy"
+        ],
+        detected_at=dt.datetime.now(dt.timezone.utc).isoformat()
+    )
+
+def _high_engagement(total_engagement: Any, engagement_data: Dict[str, Any], lead_data: Dict[str, Any]) -> AnomalyDetection:
+    return AnomalyDetection(
+        lead_id=lead_data.get("id", "unknown"),
+        anomaly_type=AnomalyType.BOT_LIKE_BEHAVIOR,
+        severity=AnomalySeverity.HIGH,
+        confidence=0.85,
+        description="Extremely high engagement activity - potential bot or automated behavior",
+        evidence={
+            "total_engagement": total_engagement,
+            "threshold": 50,
+            "breakdown": {name: engagement_data.get(name, 0) for name in ENGAGEMENT_FIELDS}
+        },
+        risk_score=85.0,
+        recommendations=[
+            "Implement bot detection measures",
+            "Review engagement authenticity",
+            "Consider rate limiting"
+        ],
+        detected_at=dt.datetime.now(dt.timezone.utc).isoformat()
+    )
+
+def _no_engagement(total_engagement: Any, lead_data: Dict[str, Any]) -> AnomalyDetection:
+    return AnomalyDetection(
+        lead_id=lead_data.get("id", "unknown"),
+        anomaly_type=AnomalyType.ENGAGEMENT_PATTERN,
+        severity=AnomalySeverity.MEDIUM,
+        confidence=0.70,
+        description="No engagement activity despite having contact information",
+        evidence={
+            "total_engagement": total_engagement,
+            "has_email": lead_data.get("has_email"),
+            "has_phone": lead_data.get("has_phone")
+        },
+        risk_score=60.0,
+        recommendations=[
+            "Verify contact information validity",
+            "Implement re-engagement campaign",
+            "Check for technical issues"
+        ],
+        detected_at=dt.datetime.now(dt.timezone.utc).isoformat()
+    )
+
 def detect_timing_anomalies(
     engagement_data: Dict[str, Any],
     lead_data: Dict[str, Any]
@@ -165,39 +177,36 @@ def detect_timing_anomalies(
             time_diff = (now - last_activity_dt).total_seconds()
             
             # Suspicious if very recent activity with high engagement
-            total_engagement = sum([
-                engagement_data.get("email_opens", 0),
-                engagement_data.get("email_clicks", 0),
-                engagement_data.get("events_attended", 0),
-                engagement_data.get("portal_logins", 0),
-                engagement_data.get("web_visits", 0)
-            ])
+            total_engagement = sum([engagement_data.get(name, 0) for name in ENGAGEMENT_FIELDS])
             
             if time_diff < 3600 and total_engagement > 20:  # 1 hour with high engagement
-                anomalies.append(AnomalyDetection(
-                    lead_id=lead_data.get("id", "unknown"),
-                    anomaly_type=AnomalyType.TIMING_BEHAVIOR,
-                    severity=AnomalySeverity.HIGH,
-                    confidence=0.80,
-                    description="High engagement activity in very recent timeframe - potential automated behavior",
-                    evidence={
-                        "time_since_last_activity_seconds": time_diff,
-                        "total_engagement": total_engagement,
-                        "threshold_hours": 1.0
-                    },
-                    risk_score=80.0,
-                    recommendations=[
-                        "Investigate timing patterns",
-                        "Check for automation tools",
-                        "Implement activity rate limiting"
-                    ],
-                    detected_at=dt.datetime.now(dt.timezone.utc).isoformat()
-                ))
+                anomalies.append(_recent_burst(time_diff, total_engagement, lead_data))
         except:
             pass  # Skip if date parsing fails
     
     return anomalies
 
+def _recent_burst(time_diff: float, total_engagement: Any, lead_data: Dict[str, Any]) -> AnomalyDetection:
+    return AnomalyDetection(
+        lead_id=lead_data.get("id", "unknown"),
+        anomaly_type=AnomalyType.TIMING_BEHAVIOR,
+        severity=AnomalySeverity.HIGH,
+        confidence=0.80,
+        description="High engagement activity in very recent timeframe - potential automated behavior",
+        evidence={
+            "time_since_last_activity_seconds": time_diff,
+            "total_engagement": total_engagement,
+            "threshold_hours": 1.0
+        },
+        risk_score=80.0,
+        recommendations=[
+            "Investigate timing patterns",
+            "Check for automation tools",
+            "Implement activity rate limiting"
+        ],
+        detected_at=dt.datetime.now(dt.timezone.utc).isoformat()
+    )
+
 def detect_data_inconsistencies(
     lead_data: Dict[str, Any],
     source_data: Dict[str, Any]
@@ -380,21 +389,64 @@ def detect_anomalies(
     
     return all_anomalies
 
+def detect_anomalies_batch(requests: List[AnomalyRequest]) -> List[List[AnomalyDetection]]:
+    """
+    detect_anomalies for many leads. The engagement counts of the whole batch
+    are one (n_leads, 5) array, so the engagement and timing thresholds are
+    evaluated as masks and only flagged leads build anomalies (and parse their
+    last_activity_at). Evidence keeps each lead's original values, so the result
+    is the same list detect_anomalies returns for every lead.
+    """
+    if not requests:
+        return []
+    engagement = [[req.engagement_data.get(name, 0) for name in ENGAGEMENT_FIELDS] for req in requests]
+    if not all(isinstance(value, (int, float)) for row in engagement for value in row):
+        # Non-numeric counts: the scalar path decides how to treat them
+        return [detect_anomalies(req.lead_id, req.engagement_data, req.lead_data, req.source_data)
+                for req in requests]
+    counts = np.array(engagement, dtype=np.float64)
+
+    opens, clicks = counts[:, 0], counts[:, 1]
+    total = counts[:, 0] + counts[:, 1] + counts[:, 2] + counts[:, 3] + counts[:, 4]
+    has_email = np.array([bool(req.lead_data.get("has_email")) for req in requests])
+    has_phone = np.array([bool(req.lead_data.get("has_phone")) for req in requests])
+
+    opens_without_clicks = (opens > 0) & (clicks == 0)
+    high_engagement = total > 50
+    # Same precedence as the scalar rule: (no engagement and email) or phone
+    no_engagement = ((total == 0) & has_email) | has_phone
+    burst_candidate = total > 20
+
+    results = []
+    for i, req in enumerate(requests):
+        lead_data = req.lead_data
+        row = engagement[i]
+        anomalies = []
+        if opens_without_clicks[i]:
+            anomalies.append(_opens_without_clicks(row[0], row[1], lead_data))
+        if high_engagement[i] or no_engagement[i]:
+            total_engagement = row[0] + row[1] + row[2] + row[3] + row[4]
+            if high_engagement[i]:
+                anomalies.append(_high_engagement(total_engagement, req.engagement_data, lead_data))
+            if no_engagement[i]:
+                anomalies.append(_no_engagement(total_engagement, lead_data))
+        if burst_candidate[i]:
+            anomalies.extend(detect_timing_anomalies(req.engagement_data, lead_data))
+        anomalies.extend(detect_data_inconsistencies(lead_data, req.source_data))
+        anomalies.extend(detect_source_anomalies(req.source_data, lead_data))
+        results.append(anomalies)
+    return results
+
 # ------------------------------
 # API Endpoints
 # ------------------------------
 
-@router.post("/detect", response_model=AnomalyResponse)
-async def detect_lead_anomalies(req: AnomalyRequest) -> AnomalyResponse:
-    """Detect anomalies for a specific lead"""
-    
-    # Detect all anomalies
-    anomalies = detect_anomalies(
-        req.lead_id,
-        req.engagement_data,
-        req.lead_data,
-        req.source_data
-    )
+def build_anomaly_response(
+    lead_id: str,
+    anomalies: List[AnomalyDetection],
+    generated_at: Optional[str] = None
+) -> AnomalyResponse:
+    """Overall risk and summary for a lead's detected anomalies"""
     
     # Calculate overall risk
     overall_risk_score, risk_level = calculate_overall_risk_score(anomalies)
@@ -428,14 +480,36 @@ async def detect_lead_anomalies(req: AnomalyRequest) -> AnomalyResponse:
         }
     
     return AnomalyResponse(
-        lead_id=req.lead_id,
+        lead_id=lead_id,
         anomalies=anomalies,
         overall_risk_score=round(overall_risk_score, 1),
         risk_level=risk_level,
         summary=summary,
-        generated_at=dt.datetime.now(dt.timezone.utc).isoformat()
+        generated_at=generated_at or dt.datetime.now(dt.timezone.utc).isoformat()
     )
 
+@router.post("/detect", response_model=AnomalyResponse)
+async def detect_lead_anomalies(req: AnomalyRequest) -> AnomalyResponse:
+    """Detect anomalies for a specific lead"""
+    
+    # Detect all anomalies
+    anomalies = detect_anomalies(
+        req.lead_id,
+        req.engagement_data,
+        req.lead_data,
+        req.source_data
+    )
+    return build_anomaly_response(req.lead_id, anomalies)
+
+@router.post("/detect/batch", response_model=AnomalyBatchResponse)
+async def detect_lead_anomalies_batch(req: AnomalyBatchRequest) -> AnomalyBatchResponse:
+    """Detect anomalies for many leads in one pass"""
+    generated_at = dt.datetime.now(dt.timezone.utc).isoformat()
+    return AnomalyBatchResponse(items=[
+        build_anomaly_response(lead.lead_id, anomalies, generated_at)
+        for lead, anomalies in zip(req.leads, detect_anomalies_batch(req.leads))
+    ])
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
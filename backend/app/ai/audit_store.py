@@ -0,0 +1,196 @@
+"""
+Bounded, indexed store for security audit events
+
+SecurityAuditTrail used to keep events in a list that was re-sliced on every
+append past the cap and linearly scanned for every user/type query. This
+store keeps a fixed-size ring buffer addressed by a monotonically increasing
+sequence number, plus per-user / per-type / per-IP index lists of sequence
+numbers. Because events arrive in time order, every index list is sorted by
+both sequence and timestamp, so "events for X in the last N hours" is a
+bisect over X's index instead of a scan over the whole buffer.
+
+Eviction is O(1) amortised: an evicted event is always the oldest entry in
+each of its index lists, so the lists only ever lose entries from the head
+(tracked with an offset and compacted occasionally).
+
+Optional persistence queues each event for the batched telemetry writer
+(app.telemetry.sink) into security_audit_events; set SECURITY_AUDIT_PERSIST=true.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SECURITY_AUDIT_PERSIST = os.getenv("SECURITY_AUDIT_PERSIST", "false").lower() == "true"
+AUDIT_TABLE = "security_audit_events"
+
+
+class _SeqIndex:
+    """Sorted list of sequence numbers with a head offset for cheap popleft"""
+
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+    def append(self, seq: int) -> None:
+        self.seqs.append(seq)
+
+    def drop_through(self, seq: int) -> None:
+        """Drop every entry <= seq (only ever the head entries)"""
+        seqs = self.seqs
+        while self.head < len(seqs) and seqs[self.head] <= seq:
+            self.head += 1
+        if self.head > 64 and self.head * 2 > len(seqs):
+            del seqs[:self.head]
+            self.head = 0
+
+    def live(self) -> List[int]:
+        return self.seqs[self.head:]
+
+
+class AuditEventStore:
+    """Ring buffer of SecurityEvents with per-user, per-type and per-IP indexes"""
+
+    def __init__(self, capacity: int = 10000, persist: Optional[bool] = None):
+        self.capacity = capacity
+        self.persist = SECURITY_AUDIT_PERSIST if persist is None else persist
+        self._ring: List[Any] = [None] * capacity
+        self._times: List[float] = [0.0] * capacity
+        self._next_seq = 0
+        self._by_user: Dict[str, _SeqIndex] = {}
+        self._by_type: Dict[Hashable, _SeqIndex] = {}
+        self._by_ip: Dict[str, _SeqIndex] = {}
+        self.type_counts: Counter = Counter()
+        self.threat_level_counts: Counter = Counter()
+        self.persist_dropped = 0
+
+    # ───────────── write path ─────────────
+
+    @property
+    def _oldest_seq(self) -> int:
+        return max(0, self._next_seq - self.capacity)
+
+    def __len__(self) -> int:
+        return self._next_seq - self._oldest_seq
+
+    def append(self, event: Any) -> None:
+        seq = self._next_seq
+        slot = seq % self.capacity
+        if seq >= self.capacity:
+            self._evict(self._ring[slot], seq - self.capacity)
+        self._ring[slot] = event
+        self._times[slot] = event.timestamp.timestamp()
+        self._next_seq = seq + 1
+
+        self._index(self._by_type, event.event_type, seq)
+        if event.user_id:
+            self._index(self._by_user, event.user_id, seq)
+        if event.ip_address:
+            self._index(self._by_ip, event.ip_address, seq)
+        self.type_counts[event.event_type] += 1
+        self.threat_level_counts[event.threat_level] += 1
+
+        if self.persist:
+            self._persist(event)
+
+    @staticmethod
+    def _index(indexes: Dict[Hashable, _SeqIndex], key: Hashable, seq: int) -> None:
+        idx = indexes.get(key)
+        if idx is None:
+            idx = indexes[key] = _SeqIndex()
+        idx.append(seq)
+
+    def _evict(self, event: Any, seq: int) -> None:
+        self._unindex(self._by_type, event.event_type, seq)
+        if event.user_id:
+            self._unindex(self._by_user, event.user_id, seq)
+        if event.ip_address:
+            self._unindex(self._by_ip, event.ip_address, seq)
+        self.type_counts[event.event_type] -= 1
+        self.threat_level_counts[event.threat_level] -= 1
+
+    @staticmethod
+    def _unindex(indexes: Dict[Hashable, _SeqIndex], key: Hashable, seq: int) -> None:
+        idx = indexes.get(key)
+        if idx is None:
+            return
+        idx.drop_through(seq)
+        if not len(idx):
+            del indexes[key]
+
+    def _persist(self, event: Any) -> None:
+        from app.telemetry.sink import TelemetryRow, get_telemetry_sink
+
+        row = TelemetryRow(AUDIT_TABLE, {
+            "event_id": event.event_id,
+            "event_type": event.event_type.value,
+            "occurred_at": event.timestamp,
+            "user_id": event.user_id,
+            "ip_address": event.ip_address,
+            "threat_level": event.threat_level.value,
+            "description": event.description,
+            "details": event.details or {},
+            "source": event.source,
+            "target_resource": event.target_resource,
+            "success": event.success,
+        })
+        if not get_telemetry_sink().enqueue(row):
+            self.persist_dropped += 1
+
+    # ───────────── read path ─────────────
+
+    def _event(self, seq: int) -> Any:
+        return self._ring[seq % self.capacity]
+
+    def _since(self, seqs: List[int], cutoff: float) -> List[Any]:
+        times, cap = self._times, self.capacity
+        start = bisect_left(seqs, cutoff, key=lambda s: times[s % cap])
+        return [self._ring[s % cap] for s in seqs[start:]]
+
+    def _live_seqs(self) -> range:
+        return range(self._oldest_seq, self._next_seq)
+
+    def __iter__(self) -> Iterator[Any]:
+        """Oldest to newest"""
+        for seq in self._live_seqs():
+            yield self._event(seq)
+
+    def events(self) -> List[Any]:
+        return list(self)
+
+    def since(self, cutoff: datetime) -> List[Any]:
+        return self._since(self._live_seqs(), cutoff.timestamp())
+
+    def by_user(self, user_id: str, cutoff: datetime) -> List[Any]:
+        idx = self._by_user.get(user_id)
+        return self._since(idx.live(), cutoff.timestamp()) if idx else []
+
+    def by_type(self, event_type: Hashable, cutoff: datetime) -> List[Any]:
+        idx = self._by_type.get(event_type)
+        return self._since(idx.live(), cutoff.timestamp()) if idx else []
+
+    def by_ip(self, ip_address: str, cutoff: datetime) -> List[Any]:
+        idx = self._by_ip.get(ip_address)
+        return self._since(idx.live(), cutoff.timestamp()) if idx else []
+
+    def count_by_ip(self, ip_address: str, cutoff: datetime, event_type: Optional[Hashable] = None) -> int:
+        """Events from an IP since cutoff, optionally of one type"""
+        events = self.by_ip(ip_address, cutoff)
+        if event_type is None:
+            return len(events)
+        return sum(1 for e in events if e.event_type == event_type)
+
+    def clear(self) -> None:
+        self.__init__(self.capacity, self.persist)
@@ -19,10 +19,11 @@ class _TTLCache:
         return val
 
     def set(self, k: str, v: Any):
+        # Re-insert so dict order stays oldest-first
+        self.store.pop(k, None)
         if len(self.store) >= self.max:
             # drop oldest
-            oldest = min(self.store.items(), key=lambda x: x[1][0])[0]
-            self.store.pop(oldest, None)
+            self.store.pop(next(iter(self.store)), None)
         self.store[k] = (time.time(), v)
 
 def make_key(prefix: str, payload: Any) -> str:
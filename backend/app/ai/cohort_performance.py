@@ -1,10 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
-from datetime import datetime, timedelta
-import json
-import random # Added for filter_by_date_range
-from app.db.db import fetch, fetchrow, execute
+from datetime import date, datetime, timedelta, timezone
+import os
+from app.ai.cache import _TTLCache, make_key
+from app.db.db import fetch
 
 router = APIRouter(prefix="/ai/cohort-performance", tags=["cohort-performance"])
 
@@ -68,87 +68,305 @@ class CohortPerformanceResponse(BaseModel):
     recommendations: List[str]
     generated_at: datetime
 
-# Real data functions for cohort analysis
-async def get_real_cohort_data(db_session=None) -> dict:
-    """Get real cohort data from database"""
-    try:
-        # Query 1: Get cohort metrics by source
-        cohort_query = """
-        SELECT 
-            COALESCE(p.source, 'Unknown') as cohort_id,
-            COALESCE(p.source, 'Unknown') as cohort_name,
-            COUNT(*) as total_leads,
-            COUNT(CASE WHEN EXISTS (SELECT 1 FROM applications a WHERE a.person_id = p.id) THEN 1 END) as converted_leads,
-            AVG(COALESCE(p.lead_score, 0)) as avg_lead_score,
-            AVG(CASE 
-                WHEN EXISTS (SELECT 1 FROM applications a WHERE a.person_id = p.id) 
-                THEN EXTRACT(EPOCH FROM (a.created_at - p.created_at))/86400 
-                ELSE NULL 
-            END) as avg_time_to_conversion,
-            -- Mock revenue for now (can be enhanced with real financial data)
-            COUNT(*) * 1500 as total_value,
-            -- Calculate ROI based on conversion rate and lead quality
-            CASE 
-                WHEN COUNT(*) > 0 THEN 
-                    (COUNT(CASE WHEN EXISTS (SELECT 1 FROM applications a WHERE a.person_id = p.id) THEN 1 END)::float / COUNT(*)) * 3.5
-                ELSE 0 
-            END as roi,
-            -- Growth trend based on recent vs older leads
-            CASE 
-                WHEN COUNT(CASE WHEN p.created_at >= CURRENT_DATE - INTERVAL '30 days' THEN 1 END) > 
-                     COUNT(CASE WHEN p.created_at < CURRENT_DATE - INTERVAL '30 days' AND p.created_at >= CURRENT_DATE - INTERVAL '60 days' THEN 1 END)
-                THEN 'increasing'
-                WHEN COUNT(CASE WHEN p.created_at >= CURRENT_DATE - INTERVAL '30 days' THEN 1 END) < 
-                     COUNT(CASE WHEN p.created_at < CURRENT_DATE - INTERVAL '30 days' AND p.created_at >= CURRENT_DATE - INTERVAL '60 days' THEN 1 END)
-                THEN 'decreasing'
-                ELSE 'stable'
-            END as growth_trend,
-            -- Performance tier based on conversion rate and lead score
-            CASE 
-                WHEN (COUNT(CASE WHEN EXISTS (SELECT 1 FROM applications a WHERE a.person_id = p.id) THEN 1 END)::float / COUNT(*)) > 0.6 
-                     AND AVG(COALESCE(p.lead_score, 0)) > 75
-                THEN 'high'
-                WHEN (COUNT(CASE WHEN EXISTS (SELECT 1 FROM applications a WHERE a.person_id = p.id) THEN 1 END)::float / COUNT(*)) > 0.4 
-                     AND AVG(COALESCE(p.lead_score, 0)) > 60
-                THEN 'medium'
-                ELSE 'low'
-            END as performance_tier
-        FROM people p
-        LEFT JOIN applications a ON a.person_id = p.id
-        WHERE p.lifecycle_state IN ('enquiry', 'pre_applicant')
-        GROUP BY COALESCE(p.source, 'Unknown')
-        HAVING COUNT(*) >= 5  -- Only show cohorts with at least 5 leads
-        ORDER BY total_leads DESC
-        """
-        
-        # Execute query using existing database functions
-        cohort_data = await fetch(cohort_query)
-        
-        # Convert to dictionary format
-        cohorts = {}
-        for row in cohort_data:
-            cohort_id = row['cohort_id']
-            cohorts[cohort_id] = {
-                "name": row['cohort_name'],
-                "total_leads": row['total_leads'],
-                "converted_leads": row['converted_leads'],
-                "avg_lead_score": float(row['avg_lead_score']) if row['avg_lead_score'] else 0,
-                "avg_time_to_conversion": float(row['avg_time_to_conversion']) if row['avg_time_to_conversion'] else 0,
-                "total_value": float(row['total_value']) if row['total_value'] else 0,
-                "roi": float(row['roi']) if row['roi'] else 0,
-                "growth_trend": row['growth_trend'],
-                "performance_tier": row['performance_tier']
-            }
-        
-        return cohorts
-        
-    except Exception as e:
-        print(f"Error getting real cohort data: {e}")
-        # Fallback to mock data if database query fails
-        return get_fallback_mock_data()
+# ───────────── cohort engine ─────────────
+#
+# Cohorts are lead sources. One query reads people once, LEFT JOINed to one
+# pre-aggregated row per applicant (first application, furthest progress),
+# and returns per (source, month) sums; the metrics, lifecycle, ROI and trend
+# views below are all folded from that snapshot, which is cached per date
+# range for COHORT_PERFORMANCE_CACHE_TTL_S seconds.
+
+COHORT_MIN_LEADS = int(os.getenv("COHORT_PERFORMANCE_MIN_LEADS", "5"))
+COHORT_TREND_MONTHS = int(os.getenv("COHORT_PERFORMANCE_TREND_MONTHS", "6"))
+# Value assumptions until real financial data is available
+VALUE_PER_LEAD = float(os.getenv("COHORT_VALUE_PER_LEAD", "1500"))
+COST_PER_LEAD = float(os.getenv("COHORT_COST_PER_LEAD", "300"))
+VALUE_PER_CONVERSION = float(os.getenv("COHORT_VALUE_PER_CONVERSION", "1050"))
+# Serve the demo dataset from /analyze instead of querying the database (local demos only)
+MOCK_DATA_ENABLED = os.getenv("COHORT_PERFORMANCE_MOCK_DATA", "false").lower() == "true"
+
+DATE_RANGE_DAYS = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}
+# growth_trend compares the last 30 days with the 30 before, whatever the range
+GROWTH_WINDOW_DAYS = 60
+
+_SNAPSHOT_CACHE = _TTLCache(
+    ttl_s=int(os.getenv("COHORT_PERFORMANCE_CACHE_TTL_S", "300")),
+    max_items=len(DATE_RANGE_DAYS) + 1,
+)
+
+COHORT_SQL = """
+WITH first_application AS (
+    SELECT
+        person_id,
+        MIN(created_at) AS applied_at,
+        MAX(updated_at) AS last_application_update,
+        bool_or(stage ~ 'offer' OR stage IN ('ready_to_enrol', 'enrolled')) AS offered,
+        bool_or(stage = 'enrolled') AS enrolled
+    FROM applications
+    GROUP BY person_id
+),
+leads AS (
+    SELECT
+        COALESCE(p.source, 'Unknown') AS cohort_id,
+        p.created_at,
+        COALESCE(p.lead_score, 0) AS lead_score,
+        fa.applied_at,
+        fa.last_application_update,
+        COALESCE(fa.offered, false) AS offered,
+        fa.applied_at IS NOT NULL
+            AND (fa.enrolled OR p.lifecycle_state IN ('enrolled', 'student', 'alumni')) AS enrolled,
+        (%s::timestamptz IS NULL OR p.created_at >= %s::timestamptz) AS in_range
+    FROM people p
+    LEFT JOIN first_application fa ON fa.person_id = p.id
+    WHERE %s::timestamptz IS NULL OR p.created_at >= %s::timestamptz
+)
+SELECT
+    cohort_id,
+    date_trunc('month', created_at)::date AS month,
+    in_range,
+    COUNT(*) AS leads,
+    COUNT(applied_at) AS converted,
+    COUNT(*) FILTER (WHERE offered) AS offered,
+    COUNT(*) FILTER (WHERE enrolled) AS enrolled,
+    SUM(lead_score) AS lead_score_sum,
+    SUM(EXTRACT(EPOCH FROM (applied_at - created_at)) / 86400) AS days_to_conversion_sum,
+    SUM(EXTRACT(EPOCH FROM (last_application_update - applied_at)) / 86400) AS days_in_application_sum,
+    COUNT(*) FILTER (WHERE created_at >= CURRENT_DATE - INTERVAL '30 days') AS recent_leads,
+    COUNT(*) FILTER (WHERE created_at < CURRENT_DATE - INTERVAL '30 days'
+                       AND created_at >= CURRENT_DATE - INTERVAL '60 days') AS prior_leads
+FROM leads
+GROUP BY cohort_id, month, in_range
+"""
+
+COUNT_FIELDS = ("leads", "converted", "offered", "enrolled", "recent_leads", "prior_leads")
+SUM_FIELDS = ("lead_score_sum", "days_to_conversion_sum", "days_in_application_sum")
+
+
+def _range_start(date_range: Optional[str]) -> Optional[datetime]:
+    days = DATE_RANGE_DAYS.get(date_range or "")
+    if date_range and days is None and date_range != "all":
+        raise ValueError(f"Unknown date_range {date_range!r}; expected one of {sorted(DATE_RANGE_DAYS)} or 'all'")
+    return datetime.now(timezone.utc) - timedelta(days=days) if days else None
+
+
+def fold_cohort_rows(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-cohort totals and monthly buckets from COHORT_SQL rows. Totals cover
+    the selected range; recent_leads/prior_leads and the monthly buckets also
+    count the rows scanned before it, so growth and trends are measured the
+    same way for every range.
+    """
+    cohorts: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        cohort = cohorts.setdefault(row["cohort_id"], {
+            **{f: 0 for f in COUNT_FIELDS}, **{f: 0.0 for f in SUM_FIELDS}, "months": {},
+        })
+        cohort["recent_leads"] += int(row["recent_leads"] or 0)
+        cohort["prior_leads"] += int(row["prior_leads"] or 0)
+        month = cohort["months"].setdefault(row["month"], {"leads": 0, "converted": 0})
+        month["leads"] += int(row["leads"] or 0)
+        month["converted"] += int(row["converted"] or 0)
+        if not row["in_range"]:
+            continue
+        for field in ("leads", "converted", "offered", "enrolled"):
+            cohort[field] += int(row[field] or 0)
+        for field in SUM_FIELDS:
+            cohort[field] += float(row[field] or 0)
+    return {cid: c for cid, c in cohorts.items() if c["leads"] >= COHORT_MIN_LEADS}
+
+
+async def load_cohort_snapshot(date_range: Optional[str] = None) -> Dict[str, Any]:
+    """
+    {"cohorts": fold_cohort_rows(...), "date_range", "generated_at"}, cached
+    per date range. Database errors propagate to the caller.
+    """
+    key = make_key("cohort_performance", date_range or "all")
+    cached = _SNAPSHOT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    since = _range_start(date_range)
+    # Growth needs GROWTH_WINDOW_DAYS and trends COHORT_TREND_MONTHS, whatever the range
+    now = datetime.now(timezone.utc)
+    trend_start = datetime.combine(_trend_months(now.date(), COHORT_TREND_MONTHS)[0], datetime.min.time(), timezone.utc)
+    scan_from = min(since, now - timedelta(days=GROWTH_WINDOW_DAYS), trend_start) if since else None
+    rows = await fetch(COHORT_SQL, since, since, scan_from, scan_from)
+    snapshot = {
+        "cohorts": fold_cohort_rows([dict(r) for r in rows]),
+        "date_range": date_range or "all",
+        "generated_at": datetime.utcnow().isoformat(),
+    }
+    _SNAPSHOT_CACHE.set(key, snapshot)
+    return snapshot
+
+
+def _rate(numerator: float, denominator: float) -> float:
+    return numerator / denominator if denominator else 0.0
+
+
+def _growth_trend(cohort: Dict[str, Any]) -> str:
+    if cohort["recent_leads"] > cohort["prior_leads"]:
+        return "increasing"
+    if cohort["recent_leads"] < cohort["prior_leads"]:
+        return "decreasing"
+    return "stable"
+
+
+def _performance_tier(conversion_rate: float, avg_lead_score: float) -> str:
+    if conversion_rate > 0.6 and avg_lead_score > 75:
+        return "high"
+    if conversion_rate > 0.4 and avg_lead_score > 60:
+        return "medium"
+    return "low"
+
+
+def build_cohort_metrics(snapshot: Dict[str, Any]) -> List[CohortMetrics]:
+    """Cohort metrics, largest cohort first"""
+    metrics = []
+    for cohort_id, c in snapshot["cohorts"].items():
+        conversion_rate = _rate(c["converted"], c["leads"])
+        avg_lead_score = _rate(c["lead_score_sum"], c["leads"])
+        metrics.append(CohortMetrics(
+            cohort_id=cohort_id,
+            cohort_name=cohort_id,
+            total_leads=c["leads"],
+            converted_leads=c["converted"],
+            conversion_rate=conversion_rate,
+            avg_lead_score=avg_lead_score,
+            avg_time_to_conversion=_rate(c["days_to_conversion_sum"], c["converted"]),
+            total_value=c["leads"] * VALUE_PER_LEAD,
+            roi=_rate(c["converted"] * VALUE_PER_CONVERSION, c["leads"] * COST_PER_LEAD),
+            growth_trend=_growth_trend(c),
+            performance_tier=_performance_tier(conversion_rate, avg_lead_score),
+        ))
+    metrics.sort(key=lambda m: m.total_leads, reverse=True)
+    return metrics
+
+
+def _lifecycle(cohort_id: str, cohort_name: str, c: Dict[str, Any]) -> CohortLifecycle:
+    # bottleneck_score is the share of the stage that has not moved on
+    funnel = [
+        ("lead", c["leads"], c["converted"], _rate(c["days_to_conversion_sum"], c["converted"])),
+        ("application", c["converted"], c["offered"], _rate(c["days_in_application_sum"], c["converted"])),
+        ("offer", c["offered"], c["enrolled"], 0.0),
+    ]
+    stages = [
+        LifecycleStage(
+            stage=stage,
+            lead_count=count,
+            conversion_rate=_rate(progressed, count),
+            avg_days_in_stage=avg_days,
+            bottleneck_score=1 - _rate(progressed, count) if count else 0.0,
+        )
+        for stage, count, progressed, avg_days in funnel
+    ]
+    stages.append(LifecycleStage(stage="enrolled", lead_count=c["enrolled"], conversion_rate=1.0,
+                                 avg_days_in_stage=0.0, bottleneck_score=0.0))
+    return CohortLifecycle(
+        cohort_id=cohort_id,
+        cohort_name=cohort_name,
+        stages=stages,
+        total_pipeline_value=c["leads"] * VALUE_PER_LEAD,
+        conversion_funnel={s.stage: _rate(s.lead_count, c["leads"]) for s in stages},
+    )
+
+
+def build_lifecycle_analysis(snapshot: Dict[str, Any]) -> List[CohortLifecycle]:
+    """Lifecycle funnel for the whole pipeline, then per cohort"""
+    cohorts = snapshot["cohorts"]
+    overall = {f: sum(c[f] for c in cohorts.values()) for f in COUNT_FIELDS + SUM_FIELDS}
+    return [_lifecycle("overall", "Overall Pipeline", overall)] + [
+        _lifecycle(cohort_id, cohort_id, c) for cohort_id, c in cohorts.items()
+    ]
+
+
+def build_roi_analysis(snapshot: Dict[str, Any]) -> List[ROIAnalysis]:
+    """ROI per cohort from the per-lead cost and per-conversion value assumptions"""
+    roi = []
+    for cohort_id, c in snapshot["cohorts"].items():
+        spend = c["leads"] * COST_PER_LEAD
+        revenue = c["converted"] * VALUE_PER_CONVERSION
+        roi.append(ROIAnalysis(
+            segment=cohort_id,
+            total_spend=spend,
+            total_revenue=revenue,
+            roi=_rate(revenue, spend),
+            cost_per_lead=COST_PER_LEAD,
+            revenue_per_lead=_rate(revenue, c["leads"]),
+            conversion_rate=_rate(c["converted"], c["leads"]),
+        ))
+    roi.sort(key=lambda r: r.roi, reverse=True)
+    return roi
+
+
+def _trend_months(today: date, count: int) -> List[date]:
+    months, year, month = [], today.year, today.month
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months[::-1]
+
+
+def build_trend_analysis(snapshot: Dict[str, Any], months: int = COHORT_TREND_MONTHS) -> List[CohortTrend]:
+    """
+    Monthly leads/conversion for the last `months` months (empty months
+    included), independent of the snapshot's date range, which only has to
+    be scanned back COHORT_TREND_MONTHS. growth_rate compares lead volume in the second half of the
+    window with the first; seasonality_factor is the busiest month over the
+    monthly average.
+    """
+    window = _trend_months(datetime.utcnow().date(), months)
+    trends = []
+    for cohort_id, c in snapshot["cohorts"].items():
+        points = []
+        for month in window:
+            bucket = c["months"].get(month, {"leads": 0, "converted": 0})
+            points.append(TrendData(
+                date=month.isoformat(),
+                conversion_rate=_rate(bucket["converted"], bucket["leads"]),
+                lead_count=bucket["leads"],
+                revenue=bucket["converted"] * VALUE_PER_CONVERSION,
+            ))
+        half = len(points) // 2
+        earlier = sum(p.lead_count for p in points[:half])
+        later = sum(p.lead_count for p in points[half:])
+        mean = _rate(earlier + later, len(points))
+        trends.append(CohortTrend(
+            cohort_id=cohort_id,
+            cohort_name=cohort_id,
+            trends=points,
+            growth_rate=_rate(later - earlier, earlier),
+            seasonality_factor=_rate(max((p.lead_count for p in points), default=0), mean) or 1.0,
+        ))
+    return trends
+
+
+def build_insights(metrics: List[CohortMetrics], roi: List[ROIAnalysis]) -> tuple[List[str], List[str]]:
+    """Insights and recommendations from the computed metrics"""
+    if not metrics:
+        return ["Not enough leads per source to compare cohorts yet"], []
+
+    best = max(metrics, key=lambda m: m.conversion_rate)
+    largest = metrics[0]
+    slowest = max(metrics, key=lambda m: m.avg_time_to_conversion)
+    insights = [
+        f"{best.cohort_name} converts best ({best.conversion_rate:.0%} of {best.total_leads} leads)",
+        f"{largest.cohort_name} is the largest cohort with {largest.total_leads} leads",
+        f"{slowest.cohort_name} takes longest to convert ({slowest.avg_time_to_conversion:.1f} days on average)",
+    ]
+    recommendations = []
+    if roi and roi[0].roi > 1:
+        recommendations.append(f"Increase investment in {roi[0].segment} (estimated ROI {roi[0].roi:.1f}x)")
+    for m in metrics:
+        if m.performance_tier == "low" and m.growth_trend == "increasing":
+            recommendations.append(f"Qualify the growing {m.cohort_name} cohort earlier: volume is rising but conversion is {m.conversion_rate:.0%}")
+        elif m.growth_trend == "decreasing" and m.performance_tier == "high":
+            recommendations.append(f"Protect {m.cohort_name}: a high-converting source with falling lead volume")
+    return insights, recommendations
 
+# Demo data (COHORT_PERFORMANCE_MOCK_DATA)
 def get_fallback_mock_data() -> dict:
-    """Fallback mock data if database query fails"""
+    """Demo cohorts for COHORT_PERFORMANCE_MOCK_DATA"""
     return {
         "tech_enthusiasts": {
             "name": "Tech Enthusiasts",
@@ -190,158 +408,6 @@ MOCK_ROI_DATA = [
     {"segment": "career_changers", "total_spend": 55000, "total_revenue": 272000, "roi": 4.9, "cost_per_lead": 250, "revenue_per_lead": 1236, "conversion_rate": 0.62}
 ]
 
-# Core Functions
-async def calculate_cohort_metrics(db_session=None) -> List[CohortMetrics]:
-    """Calculate comprehensive metrics for all cohorts using real data"""
-    metrics = []
-    
-    try:
-        # Get real cohort data
-        if db_session:
-            cohort_data = await get_real_cohort_data(db_session)
-        else:
-            # Fallback to mock data if no database session
-            cohort_data = get_fallback_mock_data()
-        
-        for cohort_id, data in cohort_data.items():
-            conversion_rate = data["converted_leads"] / data["total_leads"] if data["total_leads"] > 0 else 0
-            
-            metrics.append(CohortMetrics(
-                cohort_id=cohort_id,
-                cohort_name=data["name"],
-                total_leads=data["total_leads"],
-                converted_leads=data["converted_leads"],
-                conversion_rate=conversion_rate,
-                avg_lead_score=data["avg_lead_score"],
-                avg_time_to_conversion=data["avg_time_to_conversion"],
-                total_value=data["total_value"],
-                roi=data["roi"],
-                growth_trend=data["growth_trend"],
-                performance_tier=data["performance_tier"]
-            ))
-        
-        return metrics
-        
-    except Exception as e:
-        print(f"Error calculating cohort metrics: {e}")
-        # Return empty list if there's an error
-        return []
-
-async def analyze_cohort_lifecycle(db_session=None) -> List[CohortLifecycle]:
-    """Analyze how leads move through different lifecycle stages using real data"""
-    lifecycle_data = []
-    
-    try:
-        if db_session:
-            # Get real lifecycle data from database
-            lifecycle_query = """
-            SELECT 
-                'lead' as stage,
-                COUNT(*) as lead_count,
-                COUNT(CASE WHEN EXISTS (SELECT 1 FROM applications a WHERE a.person_id = p.id) THEN 1 END)::float / COUNT(*) as conversion_rate,
-                AVG(EXTRACT(EPOCH FROM (COALESCE(a.created_at, NOW()) - p.created_at))/86400 as avg_days_in_stage,
-                CASE 
-                    WHEN COUNT(CASE WHEN p.created_at < CURRENT_DATE - INTERVAL '7 days' AND NOT EXISTS (SELECT 1 FROM applications a WHERE a.person_id = p.id) THEN 1 END) > COUNT(*) * 0.3
-                    THEN 0.8
-                    ELSE 0.2
-                END as bottleneck_score
-            FROM people p
-            LEFT JOIN applications a ON a.person_id = p.id
-            WHERE p.lifecycle_state IN ('enquiry', 'pre_applicant')
-            
-            UNION ALL
-            
-            SELECT 
-                'qualified' as stage,
-                COUNT(*) as lead_count,
-                COUNT(CASE WHEN a.stage IN ('submitted', 'under_review', 'interview_scheduled') THEN 1 END)::float / COUNT(*) as conversion_rate,
-                AVG(EXTRACT(EPOCH FROM (a.updated_at - a.created_at))/86400 as avg_days_in_stage,
-                CASE 
-                    WHEN AVG(EXTRACT(EPOCH FROM (a.updated_at - a.created_at))/86400 > 14
-                    THEN 0.6
-                    ELSE 0.2
-                END as bottleneck_score
-            FROM applications a
-            WHERE a.stage IN ('submitted', 'under_review', 'interview_scheduled')
-            
-            UNION ALL
-            
-            SELECT 
-                'application' as stage,
-                COUNT(*) as lead_count,
-                COUNT(CASE WHEN a.stage IN ('offer_issued', 'enrolled') THEN 1 END)::float / COUNT(*) as conversion_rate,
-                AVG(EXTRACT(EPOCH FROM (a.updated_at - a.created_at))/86400 as avg_days_in_stage,
-                CASE 
-                    WHEN AVG(EXTRACT(EPOCH FROM (a.updated_at - a.created_at))/86400 > 21
-                    THEN 0.7
-                    ELSE 0.2
-                END as bottleneck_score
-            FROM applications a
-            WHERE a.stage IN ('offer_issued', 'enrolled')
-            
-            UNION ALL
-            
-            SELECT 
-                'enrolled' as stage,
-                COUNT(*) as lead_count,
-                1.0 as conversion_rate,
-                0 as avg_days_in_stage,
-                0.0 as bottleneck_score
-            FROM applications a
-            WHERE a.stage = 'enrolled'
-            """
-            
-            stages_data = await fetch(lifecycle_query)
-            
-            # Create lifecycle analysis for each stage
-            lifecycle_data = []
-            for stage_row in stages_data:
-                stage = LifecycleStage(
-                    stage=stage_row['stage'],
-                    lead_count=stage_row['lead_count'],
-                    conversion_rate=float(stage_row['conversion_rate']) if stage_row['conversion_rate'] else 0,
-                    avg_days_in_stage=float(stage_row['avg_days_in_stage']) if stage_row['avg_days_in_stage'] else 0,
-                    bottleneck_score=float(stage_row['bottleneck_score']) if stage_row['bottleneck_score'] else 0
-                )
-                lifecycle_data.append(stage)
-            
-            # Group by cohort (for now, using overall data)
-            overall_lifecycle = CohortLifecycle(
-                cohort_id="overall",
-                cohort_name="Overall Pipeline",
-                stages=lifecycle_data,
-                total_pipeline_value=sum(s.lead_count * 1500 for s in lifecycle_data),  # Mock value per lead
-                conversion_funnel={s.stage: s.conversion_rate for s in lifecycle_data}
-            )
-            
-            return [overall_lifecycle]
-            
-        else:
-            # Fallback to mock data if no database session
-            for cohort_id, stages in MOCK_LIFECYCLE_DATA.items():
-                cohort_name = get_fallback_mock_data().get(cohort_id, {}).get("name", "Unknown")
-                
-                # Calculate conversion funnel
-                conversion_funnel = {}
-                total_leads = stages[0]["lead_count"]
-                
-                for stage in stages:
-                    conversion_funnel[stage["stage"]] = stage["conversion_rate"]
-                
-                lifecycle_data.append(CohortLifecycle(
-                    cohort_id=cohort_id,
-                    cohort_name=cohort_name,
-                    stages=[LifecycleStage(**stage) for stage in stages],
-                    total_pipeline_value=total_leads * 1500,  # Mock value per lead
-                    conversion_funnel=conversion_funnel
-                ))
-        
-        return lifecycle_data
-        
-    except Exception as e:
-        print(f"Error analyzing cohort lifecycle: {e}")
-        # Return empty list if there's an error
-        return []
 
 def calculate_roi_by_segment() -> List[ROIAnalysis]:
     """Calculate ROI and cost metrics by segment"""
@@ -440,75 +506,28 @@ def filter_by_cohort(data: dict, cohort_id: str) -> dict:
     
     return filtered_data
 
-def filter_by_date_range(data: dict, date_range: str) -> dict:
-    """Filter data based on date range (mock implementation)"""
-    # In real implementation, this would filter actual date-based data
-    # For now, we'll simulate different data based on date range
-    
-    if date_range == "7d":
-        # Simulate recent data with higher volatility
-        for cohort in data["cohort_metrics"]:
-            cohort["conversion_rate"] *= random.uniform(0.8, 1.2)
-            cohort["total_value"] *= random.uniform(0.9, 1.1)
-    elif date_range == "30d":
-        # Simulate monthly data
-        for cohort in data["cohort_metrics"]:
-            cohort["conversion_rate"] *= random.uniform(0.9, 1.1)
-            cohort["total_value"] *= random.uniform(0.95, 1.05)
-    elif date_range == "1y":
-        # Simulate yearly data with more stable metrics
-        for cohort in data["cohort_metrics"]:
-            cohort["conversion_rate"] *= random.uniform(0.95, 1.05)
-            cohort["total_value"] *= random.uniform(0.98, 1.02)
-    
-    return data
-
-async def generate_real_cohort_data(db_session=None) -> dict:
-    """Generate comprehensive cohort performance data using real database queries"""
-    try:
-        # Calculate cohort metrics using real data
-        cohort_metrics = await calculate_cohort_metrics(db_session)
-        
-        # Analyze lifecycle using real data
-        lifecycle_analysis = await analyze_cohort_lifecycle(db_session)
-        
-        # Calculate ROI by segment (still using mock for now, can be enhanced)
-        roi_analysis = calculate_roi_by_segment()
-        
-        # Analyze trends (still using mock for now, can be enhanced)
-        trend_analysis = analyze_trends()
-        
-        # Generate insights and recommendations
-        insights, recommendations = generate_insights_and_recommendations()
-        
-        # Calculate summary metrics
-        summary = {
-            "total_cohorts": len(cohort_metrics),
-            "total_leads": sum(c.total_leads for c in cohort_metrics),
-            "total_conversions": sum(c.converted_leads for c in cohort_metrics),
-            "overall_conversion_rate": sum(c.converted_leads for c in cohort_metrics) / sum(c.total_leads for c in cohort_metrics) if sum(c.total_leads for c in cohort_metrics) > 0 else 0,
-            "total_revenue": sum(c.total_value for c in cohort_metrics),
-            "average_roi": sum(c.roi for c in cohort_metrics) / len(cohort_metrics) if cohort_metrics else 0,
-            "top_performing_cohort": max(cohort_metrics, key=lambda x: x.conversion_rate).cohort_name if cohort_metrics else "N/A",
-            "fastest_growing_cohort": max(cohort_metrics, key=lambda x: x.growth_trend == "increasing").cohort_name if cohort_metrics else "N/A"
-        }
-        
-        return {
-            "summary": summary,
-            "cohort_metrics": [c.dict() for c in cohort_metrics],
-            "lifecycle_analysis": [l.dict() for l in lifecycle_analysis],
-            "roi_analysis": [r.dict() for r in roi_analysis],
-            "trend_analysis": [t.dict() for t in trend_analysis],
-            "insights": insights,
-            "recommendations": recommendations,
-            "generated_at": datetime.utcnow().isoformat()
-        }
-        
-    except Exception as e:
-        print(f"Error generating real cohort data: {e}")
-        # Fallback to mock data if real data generation fails
+async def generate_real_cohort_data(date_range: Optional[str] = None) -> dict:
+    """Cohort performance response built from the cached cohort snapshot"""
+    if MOCK_DATA_ENABLED:
         return generate_mock_cohort_data()
 
+    snapshot = await load_cohort_snapshot(date_range)
+    cohort_metrics = build_cohort_metrics(snapshot)
+    roi_analysis = build_roi_analysis(snapshot)
+    insights, recommendations = build_insights(cohort_metrics, roi_analysis)
+    data = {
+        "cohort_metrics": [c.model_dump() for c in cohort_metrics],
+        "lifecycle_analysis": [l.model_dump() for l in build_lifecycle_analysis(snapshot)],
+        "roi_analysis": [r.model_dump() for r in roi_analysis],
+        "trend_analysis": [t.model_dump() for t in build_trend_analysis(snapshot)],
+        "insights": insights,
+        "recommendations": recommendations,
+        "date_range": snapshot["date_range"],
+        "generated_at": snapshot["generated_at"],
+    }
+    data["summary"] = recalculate_summary(data)
+    return data
+
 def generate_mock_cohort_data() -> dict:
     """Generate comprehensive mock data for cohort performance analysis (fallback)"""
     # Use fallback data directly for mock generation
@@ -628,77 +647,69 @@ async def health_check():
 
 @router.get("/test-real-data")
 async def test_real_data():
-    """Test endpoint to verify real data queries work"""
+    """Test endpoint to verify the cohort query works"""
     try:
-        # Test the real data function without database session
-        cohort_data = await get_real_cohort_data(None)
-        
+        cohorts = (await load_cohort_snapshot())["cohorts"]
         return {
             "status": "success",
-            "message": "Real data function working (using fallback)",
-            "cohorts_found": len(cohort_data),
-            "sample_data": list(cohort_data.keys())[:3] if cohort_data else []
+            "message": "Cohort query working",
+            "cohorts_found": len(cohorts),
+            "sample_data": list(cohorts)[:3]
         }
     except Exception as e:
         return {
             "status": "error",
-            "message": f"Real data function error: {str(e)}",
+            "message": f"Cohort query error: {str(e)}",
             "cohorts_found": 0,
             "sample_data": []
         }
 
+async def _snapshot_or_error(date_range: Optional[str]) -> Dict[str, Any]:
+    try:
+        return await load_cohort_snapshot(date_range)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Cohort data unavailable: {str(e)}")
+
 @router.post("/analyze")
 async def analyze_cohort_performance(
     request: CohortPerformanceRequest = CohortPerformanceRequest()
 ):
     """Analyze comprehensive cohort performance metrics with optional filters using real data"""
     try:
-        # Generate base data using real database queries
-        base_data = await generate_real_cohort_data()
-        
-        # Apply filters if specified
-        if request.cohort_filter and request.cohort_filter != "all":
-            base_data = filter_by_cohort(base_data, request.cohort_filter)
-        
-        if request.date_range:
-            base_data = filter_by_date_range(base_data, request.date_range)
-        
-        # Recalculate summary based on filtered data
-        base_data["summary"] = recalculate_summary(base_data)
-        
-        return base_data
-        
+        base_data = await generate_real_cohort_data(request.date_range)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to analyze cohort performance: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Cohort data unavailable: {str(e)}")
+
+    # Cohorts are lead sources, so either filter selects one
+    for cohort_id in (request.cohort_filter, request.source_filter):
+        if cohort_id and cohort_id != "all":
+            base_data = filter_by_cohort(base_data, cohort_id)
+
+    # Recalculate summary based on filtered data
+    base_data["summary"] = recalculate_summary(base_data)
+
+    return base_data
 
 @router.get("/metrics")
-async def get_cohort_metrics():
+async def get_cohort_metrics(date_range: Optional[str] = None):
     """Get basic cohort metrics"""
-    try:
-        return {"cohort_metrics": calculate_cohort_metrics()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get cohort metrics: {str(e)}")
+    return {"cohort_metrics": build_cohort_metrics(await _snapshot_or_error(date_range))}
 
 @router.get("/lifecycle")
-async def get_lifecycle_analysis():
+async def get_lifecycle_analysis(date_range: Optional[str] = None):
     """Get cohort lifecycle analysis"""
-    try:
-        return {"lifecycle_analysis": analyze_cohort_lifecycle()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get lifecycle analysis: {str(e)}")
+    return {"lifecycle_analysis": build_lifecycle_analysis(await _snapshot_or_error(date_range))}
 
 @router.get("/roi")
-async def get_roi_analysis():
+async def get_roi_analysis(date_range: Optional[str] = None):
     """Get ROI analysis by segment"""
-    try:
-        return {"roi_analysis": calculate_roi_by_segment()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get ROI analysis: {str(e)}")
+    return {"roi_analysis": build_roi_analysis(await _snapshot_or_error(date_range))}
 
 @router.get("/trends")
-async def get_trend_analysis():
+async def get_trend_analysis(date_range: Optional[str] = None):
     """Get trend analysis for cohorts"""
-    try:
-        return {"trend_analysis": analyze_trends()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get trend analysis: {str(e)}")
+    return {"trend_analysis": build_trend_analysis(await _snapshot_or_error(date_range))}
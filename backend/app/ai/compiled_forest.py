@@ -0,0 +1,185 @@
+"""
+Compiled tree-ensemble inference
+
+Flattens a fitted scikit-learn forest (RandomForestClassifier,
+ExtraTreesClassifier or a single DecisionTreeClassifier) into concatenated
+node arrays and evaluates every tree for every row with NumPy: all rows walk
+all trees one level per iteration, so a batch costs max_depth vectorised steps
+and no per-row Python. An optional StandardScaler is folded in so callers can
+pass raw feature vectors.
+
+Parity with sklearn: inputs are cast to float32 before comparing against the
+float64 thresholds, exactly as sklearn's tree code does, and leaf values are
+normalised per tree before averaging (RandomForestClassifier.predict_proba).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPILED_FOREST_ENABLED = os.getenv("ML_COMPILED_FOREST", "true").lower() == "true"
+
+_LEAF = -1
+
+
+class CompiledForest:
+    """Array-backed forest: node i of the flattened ensemble is
+    (feature[i], threshold[i], left[i], right[i], value[i]); left == -1 marks a leaf."""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray, roots: np.ndarray, max_depth: int,
+                 classes: np.ndarray, n_features: int,
+                 input_mean: Optional[np.ndarray] = None, input_scale: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        # Interleaved (left, right) per node; leaves loop back to themselves
+        idx = np.arange(len(feature), dtype=np.intp)
+        is_leaf = left == _LEAF
+        self.children = np.empty(2 * len(feature), dtype=np.intp)
+        self.children[0::2] = np.where(is_leaf, idx, left)
+        self.children[1::2] = np.where(is_leaf, idx, right)
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features = n_features
+        self.input_mean = input_mean
+        self.input_scale = input_scale
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model: Any, scaler: Any = None) -> "CompiledForest":
+        """Export a fitted sklearn tree classifier (and optional StandardScaler)"""
+        from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+        from sklearn.tree import DecisionTreeClassifier
+
+        # Averaged classification forests only: boosting sums regression trees
+        if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+            estimators = model.estimators_
+        elif isinstance(model, DecisionTreeClassifier):
+            estimators = [model]
+        else:
+            raise TypeError(f"Unsupported model for compilation: {type(model).__name__}")
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise TypeError("Multi-output forests are not supported")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in estimators:
+            tree = est.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == _LEAF
+            left = np.where(is_leaf, _LEAF, tree.children_left + offset)
+            right = np.where(is_leaf, _LEAF, tree.children_right + offset)
+            # Leaves still need a valid feature index for the vectorised gather
+            feature = np.where(is_leaf, 0, tree.feature)
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+
+            features.append(feature.astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(left.astype(np.intp))
+            rights.append(right.astype(np.intp))
+            values.append(value)
+            roots.append(offset)
+            max_depth = max(max_depth, int(tree.max_depth))
+            offset += n
+
+        input_mean = input_scale = None
+        if scaler is not None:
+            # Only StandardScaler's affine transform is folded; anything else
+            # (RobustScaler, MinMaxScaler, pipelines) must go through sklearn
+            from sklearn.preprocessing import StandardScaler
+            if type(scaler) is not StandardScaler:
+                raise TypeError(f"Unsupported scaler for compilation: {type(scaler).__name__}")
+            n_in = int(getattr(scaler, "n_features_in_", model.n_features_in_))
+            mean = scaler.mean_ if scaler.with_mean else None
+            scale = scaler.scale_ if scaler.with_std else None
+            input_mean = np.zeros(n_in) if mean is None else np.asarray(mean, dtype=np.float64)
+            input_scale = np.ones(n_in) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.vstack(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            n_features=int(model.n_features_in_),
+            input_mean=input_mean,
+            input_scale=input_scale,
+        )
+
+    def transform(self, X: Any) -> np.ndarray:
+        """Apply the folded-in scaler (identity if none)"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.input_mean is not None:
+            X = (X - self.input_mean) / self.input_scale
+        return X
+
+    def predict_proba(self, X: Any, scaled: bool = False) -> np.ndarray:
+        """
+        Class probabilities, shape (n_rows, n_classes).
+
+        X holds raw features (the folded scaler is applied) unless scaled=True,
+        in which case it is taken to be already transformed.
+        """
+        if scaled:
+            X = np.asarray(X, dtype=np.float64)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+        else:
+            X = self.transform(X)
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, compiled forest expects {self.n_features}")
+
+        # Leaves point both children at themselves, so every row simply takes
+        # max_depth steps: node = children[2 * node + (x > threshold)]
+        feature, threshold, children = self.feature, self.threshold, self.children
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            go_right = flat[row_base + feature[node]] > threshold[node]
+            node = children[2 * node + go_right]
+        return self.value[node].mean(axis=1)
+
+    def predict(self, X: Any, scaled: bool = False) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X, scaled=scaled), axis=1)]
+
+
+def compile_model(model: Any, scaler: Any = None) -> Optional[CompiledForest]:
+    """Compile if enabled and supported; None means use the sklearn model"""
+    if not COMPILED_FOREST_ENABLED:
+        return None
+    try:
+        compiled = CompiledForest.from_sklearn(model, scaler)
+        logger.info(f"Compiled forest: {compiled.n_trees} trees, {compiled.n_nodes} nodes, depth {compiled.max_depth}")
+        return compiled
+    except Exception as e:
+        logger.info(f"Compiled inference unavailable for {type(model).__name__}: {e}")
+        return None
@@ -5,12 +5,14 @@ import re
 import logging
 from typing import Dict, List, Optional, Any
 from app.ai.ui_models import ContentContract
+from app.core import tracing
 
 logger = logging.getLogger(__name__)
 
 # Default course for QA harness
 DEFAULT_CONTRACT_COURSE = "MA Music Performance"
 
+@tracing.traced("contract.rewrite")
 def rewrite_answer(answer: str, contract: ContentContract, sources: Optional[List[Dict[str, Any]]] = None) -> str:
     """
     Apply deterministic rewrites to ensure contract compliance.
@@ -1152,6 +1154,7 @@ def _truncate_to_length(text: str, max_chars: int) -> str:
         return truncated + "..."
 
 
+@tracing.traced("contract.validate")
 def validate_contract_compliance(answer: str, contract: ContentContract) -> List[str]:
     """
     Validate if answer meets contract requirements.
@@ -1195,6 +1198,7 @@ def _has_source_references(text: str) -> bool:
     return bool(re.search(r"\bas (indicated|outlined|stated|per|according to)\b", text, re.IGNORECASE))
 
 
+@tracing.traced("contract.retry")
 async def guarded_retry_with_constraints(
     unmet_rules: List[str], 
     previous_answer: str, 
@@ -5,6 +5,7 @@ Contract enforcement module for applying content contracts to AI responses.
 from typing import Optional, Dict, Any
 import hashlib
 import functools
+from app.core import tracing
 from app.ai.content_rewriter import rewrite_answer
 from app.ai.ui_models import ContentContract
 
@@ -12,6 +13,7 @@ from app.ai.ui_models import ContentContract
 _contract_cache = {}
 
 
+@tracing.traced("contract.enforce")
 def enforce_contract(response_text: str, contract: Optional[ContentContract], context: Optional[Dict[str, Any]] = None) -> str:
     """
     Apply content contract to response text if contract is provided.
@@ -32,6 +34,7 @@ def enforce_contract(response_text: str, contract: Optional[ContentContract], co
     cache_key = _create_cache_key(response_text, contract)
     
     # Check cache first
+    tracing.set_attribute("cache.hit", cache_key in _contract_cache)
     if cache_key in _contract_cache:
         return _contract_cache[cache_key]
     
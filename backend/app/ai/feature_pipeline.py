@@ -0,0 +1,368 @@
+"""
+Declarative feature pipeline shared by training and serving
+
+Lead features used to be engineered three times: engineer_features on the
+training DataFrame, prepare_features_for_prediction (an if/elif chain per
+feature per lead) for the legacy endpoints, and feature_safety._engineer_feature
+for hardened batch scoring. The three had drifted apart - percentiles were
+ranks in training but score/100 at serving, category codes came from
+LabelEncoder in training but from hard-coded maps at serving, day of week was
+Sunday=0 (Postgres) in training but Monday=0 (pandas) at serving, and
+score_engagement_interaction used a different formula - so models were served
+features they were never trained on.
+
+Every feature is now declared once in FEATURE_SPECS as a vectorised column
+op over NumPy arrays. FeaturePipeline.fit_transform learns the data-dependent
+state on the training frame (percentile reference distributions, category
+vocabularies, missing-value fills); the fitted pipeline is stored with the
+model artifact and transforms one lead or a whole batch with the same code.
+Artifacts trained before the pipeline existed get FeaturePipeline() unfitted,
+which falls back to the old serving behaviour (score/100 style percentiles,
+fixed category codes, fixed defaults).
+
+timing_report() times every feature's column op for a given frame.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+PERCENTILE_MAX_REFERENCE = int(os.getenv("ML_FEATURE_PERCENTILE_POINTS", "4096"))
+APPLICATION_SEASON_MONTHS = (9, 10, 11, 12, 1, 2)
+
+# Numeric inputs that training data cleans to 0 when missing (training_data.clean_training_frame)
+ZERO_DEFAULT_INPUTS = ("lead_score", "engagement_score", "touchpoint_count", "conversion_probability")
+CATEGORICAL_INPUTS = ("lifecycle_state", "status", "source", "campus_preference", "engagement_level")
+DATETIME_INPUTS = ("created_at",)
+
+ALL_GROUPS = ("raw", "temporal", "score", "categorical", "interaction", "polynomial")
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    One feature: compute(*input_columns) -> column, or a fitted transform.
+
+    Specs without compute or fitted state are read straight from the source
+    frame. A computed spec whose inputs are absent from the source falls back
+    to a source column of the same name (e.g. created_month from SQL).
+    """
+    name: str
+    group: str
+    inputs: Tuple[str, ...] = ()
+    compute: Optional[Callable[..., Any]] = None
+    fitted: Optional[str] = None  # "percentile" or "vocabulary"
+    legacy: Any = None  # unfitted fallback: divisor (percentile) or ordered codes (vocabulary)
+    default: float = 0.0  # fill value for models without fitted fills
+    output: bool = True  # False for intermediate (string) columns
+
+
+def _month(created_at: pd.DatetimeIndex) -> np.ndarray:
+    return created_at.month.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _day_of_week(created_at: pd.DatetimeIndex) -> np.ndarray:
+    # Postgres EXTRACT(DOW) convention (Sunday = 0), which training data has always used
+    return ((created_at.dayofweek + 1) % 7).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _hour(created_at: pd.DatetimeIndex) -> np.ndarray:
+    return created_at.hour.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _academic_week(created_at: pd.DatetimeIndex) -> np.ndarray:
+    return created_at.isocalendar().week.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _application_season(month: np.ndarray) -> np.ndarray:
+    return np.isin(month, APPLICATION_SEASON_MONTHS).astype(np.float64)
+
+
+def _engagement_level(engagement: np.ndarray) -> np.ndarray:
+    return np.where(engagement >= 80, "high", np.where(engagement >= 50, "medium", "low")).astype(object)
+
+
+FEATURE_SPECS: List[FeatureSpec] = [
+    # Raw inputs used as features
+    FeatureSpec("lead_score", "raw"),
+    FeatureSpec("engagement_score", "raw"),
+    FeatureSpec("conversion_probability", "raw"),
+    FeatureSpec("touchpoint_count", "raw"),
+    FeatureSpec("days_since_creation", "raw"),
+    FeatureSpec("created_month", "raw", ("created_at",), _month, default=1.0),
+    FeatureSpec("created_day_of_week", "raw", ("created_at",), _day_of_week),
+    FeatureSpec("created_hour", "raw", ("created_at",), _hour, default=12.0),
+    # Temporal
+    FeatureSpec("academic_week", "temporal", ("created_at",), _academic_week, default=1.0),
+    FeatureSpec("is_application_season", "temporal", ("created_month",), _application_season),
+    # Score-based
+    FeatureSpec("score_squared", "score", ("lead_score",), lambda s: s ** 2),
+    FeatureSpec("score_log", "score", ("lead_score",), np.log1p),
+    FeatureSpec("score_percentile", "score", ("lead_score",), fitted="percentile", legacy=100.0),
+    FeatureSpec("engagement_squared", "score", ("engagement_score",), lambda e: e ** 2),
+    FeatureSpec("engagement_percentile", "score", ("engagement_score",), fitted="percentile", legacy=100.0),
+    FeatureSpec("touchpoint_log", "score", ("touchpoint_count",), np.log1p),
+    FeatureSpec("touchpoint_percentile", "score", ("touchpoint_count",), fitted="percentile", legacy=10.0),
+    # Categorical
+    FeatureSpec("engagement_level", "categorical", ("engagement_score",), _engagement_level, output=False),
+    FeatureSpec("lifecycle_state_encoded", "categorical", ("lifecycle_state",), fitted="vocabulary",
+                legacy=("lead", "applicant", "student")),
+    FeatureSpec("source_encoded", "categorical", ("source",), fitted="vocabulary",
+                legacy=("website", "referral", "social", "email")),
+    FeatureSpec("campus_preference_encoded", "categorical", ("campus_preference",), fitted="vocabulary",
+                legacy=("london", "manchester", "birmingham")),
+    FeatureSpec("engagement_level_encoded", "categorical", ("engagement_level",), fitted="vocabulary",
+                legacy=("low", "medium", "high")),
+    FeatureSpec("status_encoded", "categorical", ("status",), fitted="vocabulary",
+                legacy=("new", "contacted", "qualified", "converted")),
+    # Interactions
+    FeatureSpec("score_engagement_interaction", "interaction", ("lead_score", "engagement_level_encoded"),
+                lambda s, e: s * e),
+    FeatureSpec("score_time_interaction", "interaction", ("lead_score", "days_since_creation"), lambda s, d: s * d),
+    FeatureSpec("score_engagement_score_interaction", "interaction", ("lead_score", "engagement_score"),
+                lambda s, e: s * e),
+    FeatureSpec("score_touchpoint_interaction", "interaction", ("lead_score", "touchpoint_count"),
+                lambda s, t: s * t),
+    # Polynomial
+    FeatureSpec("score_cubed", "polynomial", ("lead_score",), lambda s: s ** 3),
+    FeatureSpec("days_squared", "polynomial", ("days_since_creation",), lambda d: d ** 2),
+]
+
+SPECS_BY_NAME: Dict[str, FeatureSpec] = {spec.name: spec for spec in FEATURE_SPECS}
+
+
+def feature_groups(config: Any) -> Tuple[str, ...]:
+    """Groups enabled by a FeatureEngineeringConfig"""
+    groups = ["raw", "score", "categorical"]
+    if getattr(config, "create_lag_features", True):
+        groups.append("temporal")
+    if getattr(config, "create_interaction_features", True):
+        groups.append("interaction")
+    if getattr(config, "create_polynomial_features", True):
+        groups.append("polynomial")
+    return tuple(groups)
+
+
+# ───────────── fitted transforms ─────────────
+
+def _fit_percentile(x: np.ndarray) -> Optional[Dict[str, Any]]:
+    x = x[~np.isnan(x)]
+    if not len(x):
+        return None
+    values, counts = np.unique(x, return_counts=True)
+    if len(values) > PERCENTILE_MAX_REFERENCE:
+        return {"quantiles": np.quantile(x, np.linspace(0.0, 1.0, PERCENTILE_MAX_REFERENCE))}
+    return {"values": values, "counts": counts, "n": len(x)}
+
+
+def _percentile(x: np.ndarray, ref: Mapping[str, Any]) -> np.ndarray:
+    """Percentile of x in the training distribution; equals Series.rank(pct=True) on the training rows"""
+    if "quantiles" in ref:
+        q = ref["quantiles"]
+        out = np.interp(x, q, np.linspace(0.0, 1.0, len(q)))
+    else:
+        values, counts, n = ref["values"], ref["counts"], ref["n"]
+        before = np.concatenate(([0], np.cumsum(counts)))
+        i = np.searchsorted(values, x, side="left")
+        j = np.minimum(i, len(values) - 1)
+        hit = values[j] == x
+        out = (before[i] + np.where(hit, (counts[j] + 1) / 2.0, 0.0)) / n
+    out = np.asarray(out, dtype=np.float64)
+    out[np.isnan(x)] = np.nan
+    return out
+
+
+def _encode(values: np.ndarray, classes: Sequence[str]) -> np.ndarray:
+    """Codes in vocabulary order; unseen values get the code of 'unknown' (or 0)"""
+    classes = list(classes)
+    codes = pd.Categorical(values, categories=classes).codes.astype(np.float64)
+    unseen = classes.index("unknown") if "unknown" in classes else 0
+    return np.where(codes < 0, float(unseen), codes)
+
+
+# ───────────── pipeline ─────────────
+
+@dataclass
+class FeaturePipeline:
+    """Fitted feature state; travels with the model artifact ('feature_pipeline')"""
+    features: List[str] = field(default_factory=list)
+    percentiles: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    vocabularies: Dict[str, List[str]] = field(default_factory=dict)
+    fill_values: Dict[str, float] = field(default_factory=dict)
+    fitted: bool = False
+    # Seconds per feature for the fit_transform call (diagnostics only)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    # ── fitting ──
+
+    def fit_transform(self, df: pd.DataFrame, groups: Iterable[str] = ALL_GROUPS,
+                      handle_missing: str = "impute") -> pd.DataFrame:
+        """Learn percentiles, vocabularies and fills on df and return its feature frame (unfilled for "drop")"""
+        groups = set(groups)
+        self.features = [spec.name for spec in FEATURE_SPECS
+                         if spec.output and spec.group in groups and _available(spec.name, df.columns)]
+        self.percentiles, self.vocabularies, self.fill_values = {}, {}, {}
+        self.timings = {}
+
+        columns = _Columns(self, df, timings=self.timings, fitting=True)
+        raw = pd.DataFrame({name: columns.get(name) for name in self.features}, index=df.index)
+
+        if handle_missing == "zero":
+            self.fill_values = {name: 0.0 for name in self.features}
+        else:
+            # "drop" drops training rows, but serving still needs a value per feature
+            medians = raw.median()
+            self.fill_values = {name: float(medians[name]) if pd.notna(medians[name]) else 0.0
+                                for name in self.features}
+        self.fitted = True
+        if handle_missing == "drop":
+            return raw
+        return raw.fillna(self.fill_values)
+
+    # ── transforming ──
+
+    def transform(self, df: pd.DataFrame, features: Optional[Sequence[str]] = None, fill: bool = True,
+                  timings: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+        """Feature frame for any rows of raw lead columns; unknown feature names pass through as numbers"""
+        features = list(features if features is not None else self.features)
+        columns = _Columns(self, df, timings=timings)
+        out = pd.DataFrame({name: columns.get(name) for name in features}, index=df.index)
+        return self.fill(out) if fill else out
+
+    def transform_records(self, records: Sequence[Mapping[str, Any]], features: Optional[Sequence[str]] = None,
+                          fill: bool = True) -> np.ndarray:
+        """(n_records, n_features) float matrix for lead dicts / DB rows"""
+        df = pd.DataFrame.from_records([dict(r) for r in records])
+        return self.transform(df, features, fill=fill).to_numpy(dtype=np.float64)
+
+    def fill(self, features: pd.DataFrame) -> pd.DataFrame:
+        """Replace missing values with the fitted fills (spec defaults for unfitted pipelines)"""
+        values = {name: self.fill_values.get(name, SPECS_BY_NAME[name].default if name in SPECS_BY_NAME else 0.0)
+                  for name in features.columns}
+        return features.fillna(values)
+
+    def timing_report(self, df: pd.DataFrame, features: Optional[Sequence[str]] = None,
+                      repeat: int = 3) -> List[Dict[str, Any]]:
+        """Per-feature cost of transforming df (best of `repeat`), slowest first"""
+        best: Dict[str, float] = {}
+        for _ in range(max(1, repeat)):
+            timings: Dict[str, float] = {}
+            self.transform(df, features, timings=timings)
+            for name, seconds in timings.items():
+                best[name] = min(seconds, best.get(name, seconds))
+        n = max(len(df), 1)
+        report = [{
+            "feature": name,
+            "group": SPECS_BY_NAME[name].group if name in SPECS_BY_NAME else "passthrough",
+            "ms": round(seconds * 1000, 4),
+            "us_per_row": round(seconds * 1e6 / n, 4),
+        } for name, seconds in best.items()]
+        return sorted(report, key=lambda row: row["ms"], reverse=True)
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact fit-time description for the performance dict"""
+        total = sum(self.timings.values())
+        slowest = sorted(self.timings.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        return {
+            "feature_count": len(self.features),
+            "engineering_ms": round(total * 1000, 2),
+            "slowest_features_ms": {name: round(seconds * 1000, 3) for name, seconds in slowest},
+        }
+
+
+def resolve_pipeline(value: Any) -> FeaturePipeline:
+    """The pipeline stored with a model, or the unfitted legacy pipeline for older artifacts"""
+    if isinstance(value, FeaturePipeline):
+        return value
+    return FeaturePipeline()
+
+
+def _available(name: str, columns: Iterable[str]) -> bool:
+    columns = set(columns)
+    if name in columns:
+        return True
+    spec = SPECS_BY_NAME.get(name)
+    if spec is None or not spec.inputs:
+        return False
+    return all(_available(i, columns) for i in spec.inputs)
+
+
+class _Columns:
+    """Lazily resolved, memoised columns for one transform call"""
+
+    def __init__(self, pipeline: FeaturePipeline, df: pd.DataFrame,
+                 timings: Optional[Dict[str, float]] = None, fitting: bool = False):
+        self.pipeline = pipeline
+        self.df = df
+        self.n = len(df)
+        self.timings = timings
+        self.fitting = fitting
+        self.cache: Dict[str, Any] = {}
+
+    def get(self, name: str) -> Any:
+        if name not in self.cache:
+            self.cache[name] = self._resolve(name)
+        return self.cache[name]
+
+    def _resolve(self, name: str) -> Any:
+        spec = SPECS_BY_NAME.get(name)
+        if spec is None or not spec.inputs:
+            return self._source(name)
+        if spec.compute is not None and not all(_available(i, self.df.columns) for i in spec.inputs) \
+                and name in self.df.columns:
+            return self._source(name)
+
+        inputs = [self.get(i) for i in spec.inputs]
+        start = time.perf_counter()
+        if spec.fitted == "percentile":
+            value = self._percentile(spec, inputs[0])
+        elif spec.fitted == "vocabulary":
+            value = self._vocabulary(spec, inputs[0])
+        else:
+            value = spec.compute(*inputs)
+        if self.timings is not None:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+        return value
+
+    def _percentile(self, spec: FeatureSpec, x: np.ndarray) -> np.ndarray:
+        if self.fitting:
+            ref = _fit_percentile(x)
+            if ref is not None:
+                self.pipeline.percentiles[spec.name] = ref
+        ref = self.pipeline.percentiles.get(spec.name)
+        if ref is not None:
+            return _percentile(x, ref)
+        if self.pipeline.fitted:
+            return np.full(self.n, np.nan)
+        return x / spec.legacy
+
+    def _vocabulary(self, spec: FeatureSpec, values: np.ndarray) -> np.ndarray:
+        if self.fitting:
+            self.pipeline.vocabularies[spec.name] = sorted(set(values.tolist()))
+        classes = self.pipeline.vocabularies.get(spec.name)
+        return _encode(values, classes if classes is not None else spec.legacy)
+
+    def _source(self, name: str) -> Any:
+        present = name in self.df.columns
+        column = self.df[name] if present else None
+        if name in DATETIME_INPUTS:
+            if column is None:
+                return pd.DatetimeIndex([pd.NaT] * self.n, tz="UTC")
+            return pd.DatetimeIndex(pd.to_datetime(column, utc=True, errors="coerce"))
+        if name in CATEGORICAL_INPUTS:
+            if column is None:
+                return np.full(self.n, "unknown", dtype=object)
+            return column.astype(object).where(column.notna(), "unknown").astype(str).to_numpy(dtype=object)
+        if column is None:
+            values = np.full(self.n, np.nan)
+        else:
+            values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        if name in ZERO_DEFAULT_INPUTS:
+            values = np.where(np.isnan(values), 0.0, values)
+        return values
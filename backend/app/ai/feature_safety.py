@@ -176,6 +176,35 @@ class FeatureSafetyGuard:
         
         return safe_features, overall_coverage
     
+    def safe_feature_matrix(self, features: np.ndarray,
+                            observed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorised safe_feature_vector for a (n_rows, n_features) matrix.
+        
+        Args:
+            features: Feature matrix (missing values already filled where possible)
+            observed: Matrix before filling, used for coverage (defaults to features)
+            
+        Returns:
+            Tuple of (safe matrix, coverage ratio per row)
+        """
+        features = np.array(features, dtype=np.float64)
+        observed = features if observed is None else np.asarray(observed, dtype=np.float64)
+        
+        present = np.isfinite(observed) & (observed != self.default_numeric)
+        coverage = present.mean(axis=1) if observed.shape[1] else np.zeros(len(observed))
+        
+        if self.handle_nan == "zero":
+            features[np.isnan(features)] = 0.0
+        else:
+            features[np.isnan(features)] = self.default_numeric
+        if self.handle_inf == "clamp":
+            features = np.where(np.isinf(features), np.clip(features, -1000.0, 1000.0), features)
+        else:
+            features[np.isinf(features)] = 0.0 if self.handle_inf == "zero" else self.default_numeric
+        
+        return features, coverage
+    
     def validate_feature_vector(self, features: List[float], feature_names: List[str]) -> Dict[str, Any]:
         """
         Validate a feature vector and return diagnostic information.
@@ -340,120 +369,45 @@ def get_feature_guard() -> FeatureSafetyGuard:
 
 
 def safe_prepare_features(lead_data: Dict[str, Any], 
-                         feature_names: List[str]) -> Tuple[List[float], float]:
+                         feature_names: List[str],
+                         pipeline: Optional[Any] = None) -> Tuple[List[float], float]:
     """
     Safely prepare features for prediction using the global feature guard.
     
     Args:
         lead_data: Lead data dictionary
         feature_names: List of expected feature names
+        pipeline: Fitted FeaturePipeline stored with the model (legacy defaults if None)
         
     Returns:
         Tuple of (safe_features, coverage_ratio)
     """
-    guard = get_feature_guard()
-    
-    # Extract and engineer features in order
-    features = []
-    for feature_name in feature_names:
-        value = _engineer_feature(lead_data, feature_name)
-        features.append(value)
-    
-    return guard.safe_feature_vector(features, feature_names)
+    matrix, coverage = safe_prepare_feature_matrix([lead_data], feature_names, pipeline)
+    return matrix[0].tolist(), float(coverage[0])
 
 
-def _engineer_feature(lead_data: Dict[str, Any], feature_name: str) -> Any:
+def safe_prepare_feature_matrix(rows: List[Dict[str, Any]],
+                                feature_names: List[str],
+                                pipeline: Optional[Any] = None) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Engineer a single feature from lead data.
+    Prepare features for a batch of leads in one vectorised pass.
+    
+    Features come from the same declarative pipeline used in training
+    (app.ai.feature_pipeline). Coverage is measured before missing values
+    are filled, matching safe_feature_vector's per-value coverage.
     
     Args:
-        lead_data: Lead data dictionary
-        feature_name: Name of the feature to engineer
+        rows: Lead data dictionaries / database rows
+        feature_names: List of expected feature names
+        pipeline: Fitted FeaturePipeline stored with the model (legacy defaults if None)
         
     Returns:
-        Engineered feature value
+        Tuple of (safe feature matrix, coverage ratio per row)
     """
-    import numpy as np
-    import pandas as pd
-    from datetime import datetime
+    from app.ai.feature_pipeline import resolve_pipeline
     
-    try:
-        if feature_name == 'lead_score':
-            return lead_data.get('lead_score', 0)
-        elif feature_name == 'engagement_score':
-            return lead_data.get('engagement_score', 0)
-        elif feature_name == 'conversion_probability':
-            return lead_data.get('conversion_probability', 0.0)
-        elif feature_name == 'touchpoint_count':
-            return lead_data.get('touchpoint_count', 0)
-        elif feature_name == 'days_since_creation':
-            return lead_data.get('days_since_creation', 0.0)
-        elif feature_name == 'is_application_season':
-            created_at = lead_data.get('created_at')
-            if created_at:
-                month = pd.to_datetime(created_at).month
-                return 1 if month in [9, 10, 11, 12, 1, 2] else 0
-            return 0
-        elif feature_name == 'score_squared':
-            score = lead_data.get('lead_score', 0)
-            return score ** 2
-        elif feature_name == 'score_log':
-            score = lead_data.get('lead_score', 0)
-            return np.log1p(score)
-        elif feature_name == 'score_percentile':
-            # For prediction, use normalized score
-            score = lead_data.get('lead_score', 0)
-            return score / 100.0
-        elif feature_name == 'engagement_squared':
-            engagement = lead_data.get('engagement_score', 0)
-            return engagement ** 2
-        elif feature_name == 'engagement_percentile':
-            engagement = lead_data.get('engagement_score', 0)
-            return engagement / 100.0
-        elif feature_name == 'touchpoint_log':
-            touchpoints = lead_data.get('touchpoint_count', 0)
-            return np.log1p(touchpoints)
-        elif feature_name == 'touchpoint_percentile':
-            touchpoints = lead_data.get('touchpoint_count', 0)
-            return touchpoints / 10.0  # Normalize assuming max ~10 touchpoints
-        elif feature_name == 'lifecycle_state_encoded':
-            lifecycle = lead_data.get('lifecycle_state', 'unknown')
-            if lifecycle == 'lead': return 0
-            elif lifecycle == 'applicant': return 1
-            elif lifecycle == 'student': return 2
-            else: return 0
-        elif feature_name == 'engagement_level_encoded':
-            engagement = lead_data.get('engagement_score', 0)
-            if engagement >= 80: return 2  # high
-            elif engagement >= 50: return 1  # medium
-            else: return 0  # low
-        elif feature_name == 'status_encoded':
-            status = lead_data.get('status', 'unknown')
-            if status == 'new': return 0
-            elif status == 'contacted': return 1
-            elif status == 'qualified': return 2
-            elif status == 'converted': return 3
-            else: return 0
-        elif feature_name == 'score_engagement_interaction':
-            score = lead_data.get('lead_score', 0)
-            engagement = lead_data.get('engagement_score', 0)
-            return score * (engagement / 100.0)
-        elif feature_name == 'score_time_interaction':
-            score = lead_data.get('lead_score', 0)
-            days = lead_data.get('days_since_creation', 0)
-            return score * days
-        elif feature_name == 'score_engagement_score_interaction':
-            score = lead_data.get('lead_score', 0)
-            engagement = lead_data.get('engagement_score', 0)
-            return score * engagement
-        elif feature_name == 'score_touchpoint_interaction':
-            score = lead_data.get('lead_score', 0)
-            touchpoints = lead_data.get('touchpoint_count', 0)
-            return score * touchpoints
-        else:
-            # For any other features, try to get from lead_data or use defaults
-            return lead_data.get(feature_name, 0.0)
-            
-    except Exception as e:
-        logger.warning(f"Feature engineering failed for {feature_name}: {e}")
-        return 0.0
+    pipeline = resolve_pipeline(pipeline)
+    df = pd.DataFrame.from_records([dict(row) for row in rows])
+    raw = pipeline.transform(df, feature_names, fill=False)
+    return get_feature_guard().safe_feature_matrix(pipeline.fill(raw).to_numpy(dtype=np.float64),
+                                                   raw.to_numpy(dtype=np.float64))
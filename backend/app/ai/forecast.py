@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import datetime as dt
+import os
 from typing import List, Dict, Any, Optional
 
+import numpy as np
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 
 # Reuse scoring helpers from triage for consistency
 from app.ai.triage import (
+    COURSE_POINTS,
+    ENGAGEMENT_POINTS,
+    SOURCE_POINTS,
     days_since,
     recency_points,
     engagement_points,
@@ -19,6 +24,10 @@ from app.ai.triage import (
 
 router = APIRouter(prefix="/ai/forecast", tags=["AI Forecasting"])
 
+# persist=true queues rows for the batched telemetry writer; set false to write inline
+FORECAST_PERSIST_ASYNC = os.getenv("FORECAST_PERSIST_ASYNC", "true").lower() == "true"
+FORECAST_TABLE = "forecast_predictions"  # db/migrations/0036_forecast_predictions.sql
+
 # ------------------------------
 # Config (in-memory for now)
 # ------------------------------
@@ -189,82 +198,233 @@ def _drivers_and_risks(f: Dict[str, float]) -> (List[str], List[str]):
     return drivers, risks
 
 
-@router.post("/leads", response_model=ForecastResponse)
-async def forecast_leads(req: ForecastRequest) -> ForecastResponse:
-    items: List[ForecastItem] = []
-    for lead in req.leads:
-        f = _compute_rule_features(lead)
-        p = _probability_from_features(f)
-        # Confidence increases with information richness and alignment
-        info_richness = sum([
-            1 if lead.has_email else 0,
-            1 if lead.has_phone else 0,
-            1 if lead.gdpr_opt_in else 0,
-            1 if bool(lead.course_declared) else 0,
-        ]) / 4.0
-        confidence = 0.55 + 0.35 * info_richness
-        confidence = float(max(0.5, min(0.95, confidence)))
-
-        eta = _eta_days_from_features(f) if p >= CONFIG.min_probability_for_eta else None
-        drivers, risks = _drivers_and_risks(f)
-
-        explanation = {
-            "features": f,
-            "weights": CONFIG.weights,
-            "bias": CONFIG.bias,
-            "eta_base_days": CONFIG.eta_base_days,
-            "eta_engagement_shortening_max": CONFIG.eta_engagement_shortening_max,
-            "min_probability_for_eta": CONFIG.min_probability_for_eta,
-        }
+def _explanation(f: Dict[str, float]) -> Dict[str, Any]:
+    return {
+        "features": f,
+        "weights": CONFIG.weights,
+        "bias": CONFIG.bias,
+        "eta_base_days": CONFIG.eta_base_days,
+        "eta_engagement_shortening_max": CONFIG.eta_engagement_shortening_max,
+        "min_probability_for_eta": CONFIG.min_probability_for_eta,
+    }
+
+
+def forecast_lead(lead: ForecastLead) -> ForecastItem:
+    """Scalar forecast for one lead (reference for forecast_batch)"""
+    f = _compute_rule_features(lead)
+    p = _probability_from_features(f)
+    # Confidence increases with information richness and alignment
+    info_richness = sum([
+        1 if lead.has_email else 0,
+        1 if lead.has_phone else 0,
+        1 if lead.gdpr_opt_in else 0,
+        1 if bool(lead.course_declared) else 0,
+    ]) / 4.0
+    confidence = 0.55 + 0.35 * info_richness
+    confidence = float(max(0.5, min(0.95, confidence)))
+
+    eta = _eta_days_from_features(f) if p >= CONFIG.min_probability_for_eta else None
+    drivers, risks = _drivers_and_risks(f)
+
+    return ForecastItem(
+        leadId=lead.id,
+        probability=round(p, 3),
+        eta_days=eta,
+        confidence=round(confidence, 2),
+        drivers=drivers,
+        risks=risks,
+        explanation=_explanation(f),
+        config_version=CONFIG_VERSION,
+    )
+
+
+# ------------------------------
+# Batch scoring
+# ------------------------------
+
+FEATURE_COLUMNS = [
+    "days_since_last_activity",
+    "recency_points",
+    "engagement_points",
+    "source_points",
+    "contactability_points",
+    "course_fit_points",
+]
+_ENGAGEMENT_KEYS = list(ENGAGEMENT_POINTS)
+_ENGAGEMENT_WEIGHTS = np.array([ENGAGEMENT_POINTS[k] for k in _ENGAGEMENT_KEYS], dtype=np.float64)
+
+# (feature, threshold, message) in the order _drivers_and_risks checks them
+_DRIVER_RULES = [
+    ("engagement_points", ">=", 20, "Strong engagement signals"),
+    ("recency_points", ">=", 15, "Very recent activity"),
+    ("contactability_points", ">=", 14, "Good contactability and consent"),
+    ("source_points", ">=", 12, "High-quality lead source"),
+    ("course_fit_points", ">=", 5, "Good course fit and supply alignment"),
+]
+_RISK_RULES = [
+    ("engagement_points", "<=", 5, "Low or no engagement activity"),
+    ("recency_points", "<=", 3, "Stale activity recency"),
+    ("contactability_points", "<", 14, "Limited contactability or consent missing"),
+    ("source_points", "<=", 2, "Low-quality or unknown source"),
+    ("course_fit_points", "<=", -1, "Course oversubscribed or poor fit"),
+]
+
+
+def _rule_feature_matrix(leads: List[ForecastLead]) -> np.ndarray:
+    """_compute_rule_features for every lead as an (n_leads, 6) array in FEATURE_COLUMNS order"""
+    n = len(leads)
+    raw_days = [days_since(lead.last_activity_at) for lead in leads]
+    known = np.array([d is not None for d in raw_days], dtype=bool)
+    days = np.array([d or 0 for d in raw_days], dtype=np.float64)
+    recency = np.where(known, 30.0 * np.power(0.5, days / 7.0), 5.0)
+
+    counts = np.array([[(lead.engagement or {}).get(k, 0) for k in _ENGAGEMENT_KEYS] for lead in leads],
+                      dtype=np.float64).reshape(n, len(_ENGAGEMENT_KEYS))
+    engagement = np.minimum(np.minimum(counts, 3) @ _ENGAGEMENT_WEIGHTS, 40.0)
+
+    source = np.array([SOURCE_POINTS.get((lead.source or "unknown").lower(), SOURCE_POINTS["unknown"])
+                       for lead in leads], dtype=np.float64)
+
+    flags = np.array([[lead.has_email, lead.has_phone, lead.gdpr_opt_in] for lead in leads], dtype=bool).reshape(n, 3)
+    contact = np.minimum(6.0 * flags[:, 0] + 6.0 * flags[:, 1] + 8.0 * flags[:, 2], 20.0)
+
+    declared = np.array([bool(lead.course_declared) for lead in leads], dtype=bool)
+    level_match = np.array([bool(lead.degree_level and lead.target_degree_level
+                                 and lead.degree_level.upper() == lead.target_degree_level.upper())
+                            for lead in leads], dtype=bool)
+    supply = np.array([lead.course_supply_state or "" for lead in leads], dtype=object)
+    course = (COURSE_POINTS["declared_specific_course"] * declared
+              + COURSE_POINTS["degree_level_match"] * level_match
+              + np.where(supply == "undersupply", COURSE_POINTS["undersupplied_course_bonus"],
+                         np.where(supply == "oversubscribed", COURSE_POINTS["oversubscribed_course_penalty"], 0)))
+
+    # float(d or 9999): unknown and same-day activity both report 9999
+    days_feature = np.where(days > 0, days, 9999.0)
+    return np.column_stack([days_feature, recency, engagement, source, contact, course.astype(np.float64)])
+
+
+def _probabilities(F: np.ndarray) -> np.ndarray:
+    w = CONFIG.weights
+    z = (
+        CONFIG.bias
+        + w["engagement_points"] * F[:, 2]
+        + w["recency_points"] * F[:, 1]
+        + w["source_points"] * F[:, 3]
+        + w["contactability_points"] * F[:, 4]
+        + w["course_fit_points"] * F[:, 5]
+    )
+    return np.clip(1.0 / (1.0 + np.exp(-z)), 0.01, 0.99)
 
-        item = ForecastItem(
+
+def _eta_days(F: np.ndarray) -> np.ndarray:
+    eng_norm = np.minimum(1.0, F[:, 2] / 40.0)
+    rec_pts = np.clip(F[:, 1], 0.01, 30.0)
+    approx_days = np.where(rec_pts >= 29.0, 0.0, np.rint(7.0 * np.log2(30.0 / rec_pts)))
+    eta = CONFIG.eta_base_days - np.trunc(eng_norm * CONFIG.eta_engagement_shortening_max)
+    eta = eta - np.where(approx_days <= 7, 10, np.where(approx_days <= 14, 5, 0))
+    return np.clip(eta, 7, 90).astype(int)
+
+
+def _rule_masks(F: np.ndarray, rules: List[tuple]) -> List[np.ndarray]:
+    ops = {">=": np.greater_equal, "<=": np.less_equal, "<": np.less}
+    return [ops[op](F[:, FEATURE_COLUMNS.index(name)], threshold) for name, op, threshold, _ in rules]
+
+
+def forecast_batch(leads: List[ForecastLead]) -> List[ForecastItem]:
+    """
+    forecast_lead for many leads: the feature matrix is built once and the
+    weights, ETA heuristic and driver/risk rules run as array operations.
+    Returns the same items as the scalar path.
+    """
+    if not leads:
+        return []
+    F = _rule_feature_matrix(leads)
+    probabilities = _probabilities(F)
+    etas = _eta_days(F)
+    eta_known = probabilities >= CONFIG.min_probability_for_eta
+
+    info = np.array([[lead.has_email, lead.has_phone, lead.gdpr_opt_in, bool(lead.course_declared)]
+                     for lead in leads], dtype=bool).sum(axis=1) / 4.0
+    confidences = np.clip(0.55 + 0.35 * info, 0.5, 0.95)
+
+    driver_masks = _rule_masks(F, _DRIVER_RULES)
+    risk_masks = _rule_masks(F, _RISK_RULES)
+    # A risk only applies where the matching driver did not fire (elif)
+    risk_masks = [risk & ~driver for risk, driver in zip(risk_masks, driver_masks)]
+
+    driver_messages = [rule[3] for rule in _DRIVER_RULES]
+    risk_messages = [rule[3] for rule in _RISK_RULES]
+    rows = zip(leads, F.tolist(), probabilities.tolist(), etas.tolist(), eta_known.tolist(), confidences.tolist(),
+               np.column_stack(driver_masks).tolist(), np.column_stack(risk_masks).tolist())
+    items = []
+    for lead, features, p, eta, has_eta, confidence, driver_flags, risk_flags in rows:
+        items.append(ForecastItem(
             leadId=lead.id,
             probability=round(p, 3),
-            eta_days=eta,
+            eta_days=eta if has_eta else None,
             confidence=round(confidence, 2),
-            drivers=drivers,
-            risks=risks,
-            explanation=explanation,
+            drivers=[m for m, on in zip(driver_messages, driver_flags) if on],
+            risks=[m for m, on in zip(risk_messages, risk_flags) if on],
+            explanation=_explanation(dict(zip(FEATURE_COLUMNS, features))),
             config_version=CONFIG_VERSION,
-        )
-        items.append(item)
-
-        # Optional persistence
-        if req.persist:
-            try:
-                from app.db.db import execute
-                # create table if not exists
-                await execute(
-                    """
-                    create table if not exists forecast_predictions (
-                        id bigserial primary key,
-                        lead_id text not null,
-                        probability double precision not null,
-                        eta_days integer null,
-                        confidence double precision not null,
-                        features jsonb not null,
-                        explanation jsonb not null,
-                        created_at timestamptz default now()
-                    )
-                    """
-                )
-                await execute(
-                    """
-                    insert into forecast_predictions
-                    (lead_id, probability, eta_days, confidence, features, explanation)
-                    values ($1, $2, $3, $4, $5::jsonb, $6::jsonb)
-                    """,
-                    lead.id,
-                    float(item.probability),
-                    int(item.eta_days) if item.eta_days is not None else None,
-                    float(item.confidence),
-                    __import__("json").dumps(f),
-                    __import__("json").dumps(explanation),
-                )
-            except Exception as e:
-                # non-fatal
-                print(f"⚠️ forecast persistence failed for lead {lead.id}: {e}")
+        ))
+    return items
+
+
+def _prediction_rows(items: List[ForecastItem]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "lead_id": item.leadId,
+            "probability": float(item.probability),
+            "eta_days": int(item.eta_days) if item.eta_days is not None else None,
+            "confidence": float(item.confidence),
+            "features": item.explanation["features"],
+            "explanation": item.explanation,
+            "config_version": item.config_version,
+        }
+        for item in items
+    ]
 
+
+async def persist_forecasts(items: List[ForecastItem]) -> int:
+    """
+    Record forecast items in forecast_predictions as multi-row INSERTs.
+
+    Queued for the telemetry sink's background writer by default, so the
+    response does not wait for the database; returns how many rows were
+    queued (or written, with FORECAST_PERSIST_ASYNC=false). Failures are
+    non-fatal, as before.
+    """
+    from app.telemetry.sink import TelemetryRow, chunked_inserts, get_telemetry_sink
+
+    rows = _prediction_rows(items)
+    if FORECAST_PERSIST_ASYNC:
+        sink = get_telemetry_sink()
+        queued = sum(1 for row in rows if sink.enqueue(TelemetryRow(FORECAST_TABLE, row)))
+        if queued < len(rows):
+            print(f"⚠️ forecast persistence dropped {len(rows) - queued} of {len(rows)} rows (telemetry queue full)")
+        return queued
+
+    from app.db.db import execute
+
+    written = 0
+    columns = tuple(rows[0]) if rows else ()
+    for chunk, call in chunked_inserts(FORECAST_TABLE, columns, rows):
+        try:
+            await execute(*call)
+            written += len(chunk)
+        except Exception as e:
+            # non-fatal
+            print(f"⚠️ forecast persistence failed for {len(chunk)} leads: {e}")
+    return written
+
+
+@router.post("/leads", response_model=ForecastResponse)
+async def forecast_leads(req: ForecastRequest) -> ForecastResponse:
+    items = forecast_batch(req.leads)
+    # Optional persistence, one bulk write after scoring
+    if req.persist and items:
+        await persist_forecasts(items)
     return ForecastResponse(items=items)
 
 
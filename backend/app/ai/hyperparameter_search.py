@@ -0,0 +1,268 @@
+"""
+Hyperparameter search and cross-validated model selection
+
+Searches every requested model type (random_forest, gradient_boosting,
+logistic_regression, ensemble) with stratified k-fold CV, candidates x folds
+running in parallel across n_jobs cores, and returns the winner refit on the
+full training split together with a leaderboard of every candidate.
+
+Strategies:
+- "random": candidates are sampled up front and evaluated in chunks, so the
+  search can stop early between chunks: when the time budget (max_time_s) is
+  spent (the first chunk always runs), or when `patience` chunks in a row fail to beat the model type's best
+  score by `min_improvement`
+- "halving": successive halving (HalvingRandomSearchCV) - every candidate
+  starts on a small sample and only the best third moves on to more data
+
+Gradient boosting candidates also stop adding trees early
+(n_iter_no_change on a validation split), and the ensemble is searched as a
+soft-voting VotingClassifier so it can be cloned per fold.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, field_validator
+from scipy.stats import loguniform, randint, uniform
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, HalvingRandomSearchCV, ParameterSampler, StratifiedKFold
+
+from app.ai.training_jobs import TrainingCancelled
+
+logger = logging.getLogger(__name__)
+
+
+def _estimator(model_type: str, random_state: int) -> Any:
+    """Base estimator per model type; n_jobs=1 because folds run in parallel"""
+    if model_type == "random_forest":
+        return RandomForestClassifier(random_state=random_state, class_weight="balanced", n_jobs=1)
+    if model_type == "gradient_boosting":
+        return GradientBoostingClassifier(random_state=random_state, n_iter_no_change=10, validation_fraction=0.1)
+    if model_type == "logistic_regression":
+        return LogisticRegression(random_state=random_state, max_iter=2000, class_weight="balanced")
+    if model_type == "ensemble":
+        return VotingClassifier(
+            estimators=[
+                ("rf", RandomForestClassifier(n_estimators=100, random_state=random_state, n_jobs=1)),
+                ("gb", GradientBoostingClassifier(n_estimators=100, random_state=random_state, n_iter_no_change=10)),
+                ("lr", LogisticRegression(random_state=random_state, max_iter=2000)),
+            ],
+            voting="soft",
+        )
+    raise ValueError(f"Unsupported model type: {model_type}")
+
+
+SEARCH_SPACES: Dict[str, Dict[str, Any]] = {
+    "random_forest": {
+        "n_estimators": randint(50, 400),
+        "max_depth": [None, 4, 6, 8, 10, 14, 20],
+        "min_samples_leaf": randint(1, 10),
+        "max_features": ["sqrt", "log2", 0.5, None],
+        "class_weight": ["balanced", "balanced_subsample", None],
+    },
+    "gradient_boosting": {
+        "n_estimators": randint(50, 500),
+        "learning_rate": loguniform(0.01, 0.3),
+        "max_depth": randint(2, 6),
+        "subsample": uniform(0.6, 0.4),
+        "min_samples_leaf": randint(1, 20),
+    },
+    "logistic_regression": {
+        "C": loguniform(1e-3, 1e2),
+        "class_weight": ["balanced", None],
+    },
+    "ensemble": {
+        "rf__max_depth": [None, 6, 10, 14],
+        "gb__learning_rate": loguniform(0.02, 0.3),
+        "lr__C": loguniform(1e-2, 1e1),
+        "weights": [[1, 1, 1], [2, 1, 1], [1, 2, 1], [1, 1, 2]],
+    },
+}
+
+
+class HyperparameterSearchConfig(BaseModel):
+    """Search mode for MLModelConfig; when set, model_type/hyperparameters are ignored"""
+    strategy: str = "random"  # "random" or "halving"
+    model_types: List[str] = list(SEARCH_SPACES)
+    n_iter: int = 20  # candidates per model type
+    scoring: str = "roc_auc"
+    max_time_s: Optional[float] = 600.0
+    patience: int = 2  # random strategy: chunks without improvement before moving on
+    min_improvement: float = 1e-3
+    halving_factor: int = 3
+
+    @field_validator("strategy")
+    @classmethod
+    def validate_strategy(cls, v):
+        if v not in ("random", "halving"):
+            raise ValueError("strategy must be 'random' or 'halving'")
+        return v
+
+    @field_validator("model_types")
+    @classmethod
+    def validate_model_types(cls, v):
+        unknown = [m for m in v if m not in SEARCH_SPACES]
+        if unknown or not v:
+            raise ValueError(f"model_types must be a non-empty subset of {list(SEARCH_SPACES)}")
+        return v
+
+
+@dataclass
+class SearchResult:
+    best_model_type: str
+    best_params: Dict[str, Any]
+    best_score: float
+    best_cv_scores: List[float]
+    estimator: Any
+    leaderboard: List[Dict[str, Any]]
+    elapsed_s: float
+    stopped: Dict[str, str] = field(default_factory=dict)
+
+    def summary(self, strategy: str, scoring: str) -> Dict[str, Any]:
+        """Compact description for the performance dict"""
+        return {
+            "strategy": strategy,
+            "scoring": scoring,
+            "best_model_type": self.best_model_type,
+            "best_params": _jsonable(self.best_params),
+            "best_cv_score": self.best_score,
+            "candidates_evaluated": len(self.leaderboard),
+            "elapsed_s": round(self.elapsed_s, 2),
+            "stopped": self.stopped,
+        }
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _rows(model_type: str, cv_results: Dict[str, Any], n_splits: int) -> List[Dict[str, Any]]:
+    """Leaderboard rows from a (Halving)GridSearchCV cv_results_, final round only for halving"""
+    n = len(cv_results["params"])
+    last_iter = max(cv_results["iter"]) if "iter" in cv_results else None
+    rows = []
+    for i in range(n):
+        if last_iter is not None and cv_results["iter"][i] != last_iter:
+            continue
+        mean = cv_results["mean_test_score"][i]
+        if not np.isfinite(mean):
+            continue
+        rows.append({
+            "model_type": model_type,
+            "params": _jsonable(cv_results["params"][i]),
+            "mean_score": float(mean),
+            "std_score": float(cv_results["std_test_score"][i]),
+            "fold_scores": [float(cv_results[f"split{k}_test_score"][i]) for k in range(n_splits)
+                            if f"split{k}_test_score" in cv_results],
+            "mean_fit_time_s": float(cv_results["mean_fit_time"][i]),
+            "n_resources": int(cv_results["n_resources"][i]) if "n_resources" in cv_results else None,
+        })
+    return rows
+
+
+def run_search(X: Any, y: Any, config: HyperparameterSearchConfig, cv_folds: int = 5,
+               random_state: int = 42, n_jobs: Optional[int] = None,
+               progress: Optional[Callable[[str, float], None]] = None) -> SearchResult:
+    """Search all configured model types and refit the winner on (X, y)"""
+    report = progress or (lambda stage, fraction: None)
+    start = time.monotonic()
+    deadline = start + config.max_time_s if config.max_time_s else math.inf
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+    chunk_size = max(4, n_jobs or 1)
+
+    leaderboard: List[Dict[str, Any]] = []
+    stopped: Dict[str, str] = {}
+    n_types = len(config.model_types)
+
+    for t, model_type in enumerate(config.model_types):
+        report(f"searching_{model_type}", 0.35 + 0.45 * t / n_types)
+        # The budget applies once there is at least one scored candidate to return
+        if leaderboard and time.monotonic() >= deadline:
+            stopped[model_type] = "time budget exhausted before start"
+            continue
+
+        estimator = _estimator(model_type, random_state)
+        space = SEARCH_SPACES[model_type]
+        try:
+            if config.strategy == "halving":
+                search = HalvingRandomSearchCV(
+                    estimator, space, n_candidates=config.n_iter, factor=config.halving_factor,
+                    resource="n_samples", min_resources="exhaust", cv=cv, scoring=config.scoring,
+                    refit=False, n_jobs=n_jobs, random_state=random_state, error_score=np.nan,
+                ).fit(X, y)
+                leaderboard.extend(_rows(model_type, search.cv_results_, cv_folds))
+                continue
+
+            candidates = list(ParameterSampler(space, n_iter=config.n_iter, random_state=random_state))
+            best, stale = -math.inf, 0
+            for c in range(0, len(candidates), chunk_size):
+                chunk = candidates[c:c + chunk_size]
+                search = GridSearchCV(
+                    estimator, [{k: [v] for k, v in cand.items()} for cand in chunk], cv=cv,
+                    scoring=config.scoring, refit=False, n_jobs=n_jobs, error_score=np.nan,
+                ).fit(X, y)
+                rows = _rows(model_type, search.cv_results_, cv_folds)
+                leaderboard.extend(rows)
+
+                chunk_best = max((row["mean_score"] for row in rows), default=-math.inf)
+                if chunk_best > best + config.min_improvement:
+                    best, stale = chunk_best, 0
+                else:
+                    stale += 1
+                done = min(1.0, (c + len(chunk)) / len(candidates))
+                report(f"searching_{model_type}", 0.35 + 0.45 * (t + done) / n_types)
+                if c + chunk_size >= len(candidates):
+                    break
+                if stale >= config.patience:
+                    stopped[model_type] = f"no improvement for {stale} chunks"
+                    break
+                if time.monotonic() >= deadline:
+                    stopped[model_type] = "time budget exhausted"
+                    break
+        except TrainingCancelled:
+            raise
+        except Exception as e:
+            logger.warning(f"Hyperparameter search failed for {model_type}: {e}")
+            stopped[model_type] = f"failed: {e}"
+
+    if not leaderboard:
+        raise ValueError(f"Hyperparameter search produced no valid candidates: {stopped}")
+
+    leaderboard.sort(key=lambda row: row["mean_score"], reverse=True)
+    for rank, row in enumerate(leaderboard, start=1):
+        row["rank"] = rank
+    winner = leaderboard[0]
+
+    report("refitting_best", 0.8)
+    params = {k: (list(v) if isinstance(v, list) else v) for k, v in winner["params"].items()}
+    model = clone(_estimator(winner["model_type"], random_state)).set_params(**params)
+    if hasattr(model, "n_jobs") and not isinstance(model, VotingClassifier):
+        # The winner is fit once, so let it use the cores the folds were using
+        model.set_params(n_jobs=n_jobs)
+    model.fit(X, y)
+
+    return SearchResult(
+        best_model_type=winner["model_type"],
+        best_params=winner["params"],
+        best_score=winner["mean_score"],
+        best_cv_scores=winner["fold_scores"],
+        estimator=model,
+        leaderboard=leaderboard,
+        elapsed_s=time.monotonic() - start,
+        stopped=stopped,
+    )
@@ -0,0 +1,390 @@
+"""
+Local Intent Model for Ask Ivy routing
+
+CPU-only TF-IDF + logistic regression classifier that sits between the regex
+fast path and the LLM fallback in AIRouter.classify. Trained offline from the
+prompt eval cases, the nightly eval prompts and logged ivy_ai_telemetry
+intents (see train_intent_model.py), saved as a versioned joblib artifact in
+backend/models.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PATTERN = "intent_model_*.joblib"
+MODELS_DIR = Path(__file__).parent.parent.parent / "models"
+
+# Below this confidence the router falls back to the LLM classifier
+INTENT_LOCAL_MIN_CONFIDENCE = float(os.getenv("IVY_INTENT_LOCAL_MIN_CONFIDENCE", "0.55"))
+INTENT_LOCAL_ENABLED = os.getenv("IVY_INTENT_LOCAL_ENABLED", "true").lower() == "true"
+
+# Labels used by the eval sets / telemetry that the router knows under another name
+INTENT_ALIASES = {
+    "high_score_leads": "nlq_lead_query",
+    "recent_leads": "nlq_lead_query",
+    "general_query": "general_help",
+    "objection_handling": "guidance",
+    "sales_strategy": "guidance",
+    "call_summary": "lead_profile",
+}
+
+
+@dataclass
+class IntentExample:
+    """Single labelled training utterance"""
+    text: str
+    intent: str
+    source: str
+
+
+@dataclass
+class IntentModel:
+    """Container for a trained local intent classifier"""
+    pipeline: Any
+    labels: List[str]
+    version: str
+    trained_at: str
+    n_examples: int
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    path: Optional[Path] = None
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return (intent, probability) for the best label"""
+        proba = self.pipeline.predict_proba([normalise_text(text)])[0]
+        best = int(proba.argmax())
+        return self.pipeline.classes_[best], float(proba[best])
+
+
+def normalise_text(text: str) -> str:
+    """Lower-case and collapse whitespace so train and serve see the same input"""
+    return re.sub(r"\s+", " ", str(text or "").lower()).strip()
+
+
+def canonical_intent(label: Optional[str], known: Iterable[str]) -> Optional[str]:
+    """Map a raw label onto a router intent, or None if it isn't routable"""
+    if not label:
+        return None
+    label = INTENT_ALIASES.get(label, label)
+    return label if label in set(known) else None
+
+
+# ───────────────────────── Training data ─────────────────────────
+
+def _pattern_phrases(patterns: Dict[str, List[str]]) -> List[IntentExample]:
+    """Turn plain-literal regex patterns (e.g. r"\\bnext best action\\b") into seed phrases"""
+    examples = []
+    for intent, regexes in patterns.items():
+        for rx in regexes:
+            phrase = rx.replace(r"\b", "")
+            if re.search(r"[\\\[\](){}.*+?|^$\"']", phrase) or len(phrase) < 4:
+                continue
+            examples.append(IntentExample(phrase, intent, "patterns"))
+    return examples
+
+
+def load_cases_yaml(path: Path, known: Iterable[str]) -> List[IntentExample]:
+    """Load labelled queries from scripts/prompt_eval/cases.yaml"""
+    try:
+        import yaml
+    except ImportError:
+        logger.warning("PyYAML not installed; skipping %s", path)
+        return []
+    if not path.exists():
+        return []
+    data = yaml.safe_load(path.read_text()) or {}
+    examples = []
+    for case in data.get("test_cases", []):
+        intent = canonical_intent(case.get("expected_intent"), known)
+        if intent and case.get("query"):
+            examples.append(IntentExample(case["query"], intent, "cases_yaml"))
+    return examples
+
+
+def load_eval_prompts(path: Path, known: Iterable[str]) -> List[IntentExample]:
+    """
+    Load prompts from scripts/eval_prompts.json.
+
+    These carry envelope expectations rather than intents, so they are weakly
+    labelled with the regex classifier; prompts the regex can't place are skipped.
+    """
+    if not path.exists():
+        return []
+    from app.ai.router import classify_intent_regex
+
+    examples = []
+    for case in json.loads(path.read_text()):
+        prompt = case.get("prompt")
+        if not prompt:
+            continue
+        intent = case.get("intent")
+        if not intent:
+            intent, _, _ = classify_intent_regex(prompt, case.get("context") or {})
+        intent = canonical_intent(intent, known)
+        if intent:
+            examples.append(IntentExample(prompt, intent, "eval_prompts"))
+    return examples
+
+
+async def load_telemetry_examples(known: Iterable[str], limit: int = 5000) -> List[IntentExample]:
+    """
+    Load logged intents from ivy_ai_telemetry, joined to the normalised text of
+    the same request (text is already PII-redacted at write time).
+    """
+    from app.db.db import fetch
+
+    rows = await fetch(
+        """
+        SELECT n.normalized_text AS text, i.intent AS intent
+        FROM ivy_ai_telemetry i
+        JOIN ivy_ai_telemetry n
+          ON n.request_id = i.request_id AND n.route = 'normalize'
+        WHERE i.route = 'intent'
+          AND i.parser_ok IS TRUE
+          AND i.intent IS NOT NULL
+          AND n.normalized_text IS NOT NULL
+        ORDER BY i.created_at DESC
+        LIMIT %s
+        """,
+        limit,
+    )
+    examples = []
+    for row in rows:
+        intent = canonical_intent(row.get("intent"), known)
+        if intent:
+            examples.append(IntentExample(row["text"], intent, "telemetry"))
+    return examples
+
+
+# ───────────────────────── Training ─────────────────────────
+
+def _build_pipeline():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import FeatureUnion, Pipeline
+
+    features = FeatureUnion([
+        ("word", TfidfVectorizer(analyzer="word", ngram_range=(1, 2), sublinear_tf=True, min_df=1)),
+        # Character n-grams keep the model robust to the typos counsellors actually type
+        ("char", TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True, min_df=1)),
+    ])
+    clf = LogisticRegression(max_iter=2000, C=5.0, class_weight="balanced")
+    return Pipeline([("features", features), ("clf", clf)])
+
+
+def _measure_latency(pipeline, texts: List[str], repeats: int = 3) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeats):
+        for text in texts:
+            t0 = time.perf_counter()
+            pipeline.predict_proba([normalise_text(text)])
+            samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    if not samples:
+        return {}
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def train_intent_model(examples: List[IntentExample], cv_folds: int = 5, seed: int = 42) -> IntentModel:
+    """
+    Fit the classifier and compute an accuracy/latency report.
+
+    Accuracy is stratified k-fold on classes with enough support; latency is
+    single-utterance predict_proba wall time on the training texts.
+    """
+    import numpy as np
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    # Deduplicate on normalised text; when labels conflict the first example seen wins
+    seen: Dict[str, IntentExample] = {}
+    for ex in examples:
+        key = normalise_text(ex.text)
+        if key and key not in seen:
+            seen[key] = ex
+    data = list(seen.values())
+    if len({ex.intent for ex in data}) < 2:
+        raise ValueError("Need at least two intents to train the local intent model")
+
+    texts = [normalise_text(ex.text) for ex in data]
+    labels = [ex.intent for ex in data]
+
+    metrics: Dict[str, Any] = {
+        "n_examples": len(data),
+        "by_source": {src: sum(1 for ex in data if ex.source == src) for src in sorted({ex.source for ex in data})},
+        "by_intent": {lbl: labels.count(lbl) for lbl in sorted(set(labels))},
+    }
+
+    # Cross-validate only over intents with at least cv_folds examples
+    counts = {lbl: labels.count(lbl) for lbl in set(labels)}
+    cv_idx = [i for i, lbl in enumerate(labels) if counts[lbl] >= cv_folds]
+    cv_labels = {labels[i] for i in cv_idx}
+    if len(cv_labels) >= 2:
+        X = [texts[i] for i in cv_idx]
+        y = np.array([labels[i] for i in cv_idx])
+        skf = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=seed)
+        proba = cross_val_predict(_build_pipeline(), X, y, cv=skf, method="predict_proba")
+        classes = np.array(sorted(cv_labels))
+        pred = classes[proba.argmax(axis=1)]
+        conf = proba.max(axis=1)
+        confident = conf >= INTENT_LOCAL_MIN_CONFIDENCE
+        metrics["cv"] = {
+            "folds": cv_folds,
+            "n_examples": len(cv_idx),
+            "accuracy": round(float((pred == y).mean()), 4),
+            "coverage_at_threshold": round(float(confident.mean()), 4),
+            "accuracy_at_threshold": round(float((pred[confident] == y[confident]).mean()), 4) if confident.any() else None,
+            "threshold": INTENT_LOCAL_MIN_CONFIDENCE,
+        }
+    else:
+        metrics["cv"] = {"skipped": "not enough examples per intent"}
+
+    pipeline = _build_pipeline()
+    pipeline.fit(texts, labels)
+    metrics["latency"] = _measure_latency(pipeline, texts[:200])
+
+    now = datetime.utcnow()
+    return IntentModel(
+        pipeline=pipeline,
+        labels=list(pipeline.classes_),
+        version=now.strftime("%Y%m%d_%H%M%S"),
+        trained_at=now.isoformat(),
+        n_examples=len(data),
+        metrics=metrics,
+    )
+
+
+def save_intent_model(model: IntentModel, models_dir: Path = MODELS_DIR) -> Path:
+    """Write the artifact and a sibling JSON report; returns the artifact path"""
+    models_dir.mkdir(exist_ok=True)
+    path = models_dir / f"intent_model_{model.version}.joblib"
+    joblib.dump({
+        "pipeline": model.pipeline,
+        "labels": model.labels,
+        "version": model.version,
+        "trained_at": model.trained_at,
+        "n_examples": model.n_examples,
+        "metrics": model.metrics,
+    }, path)
+    report = {
+        "version": model.version,
+        "trained_at": model.trained_at,
+        "labels": model.labels,
+        **model.metrics,
+    }
+    path.with_suffix(".report.json").write_text(json.dumps(report, indent=2))
+    model.path = path
+    return path
+
+
+# ───────────────────────── Serving ─────────────────────────
+
+_loaded: Optional[IntentModel] = None
+_load_attempted = False
+_load_scheduled = False
+
+
+def load_intent_model(models_dir: Path = MODELS_DIR, force: bool = False) -> Optional[IntentModel]:
+    """Load the newest intent artifact once per process; None if none exists"""
+    global _loaded, _load_attempted
+    if _load_attempted and not force:
+        return _loaded
+    _load_attempted = True
+    try:
+        candidates = sorted(models_dir.glob(ARTIFACT_PATTERN))
+        if not candidates:
+            logger.info("No local intent model found in %s; using LLM fallback only", models_dir)
+            _loaded = None
+            return None
+        path = candidates[-1]  # versions are timestamps, so lexical order is chronological
+        data = joblib.load(path)
+        _loaded = IntentModel(
+            pipeline=data["pipeline"],
+            labels=data["labels"],
+            version=data["version"],
+            trained_at=data["trained_at"],
+            n_examples=data["n_examples"],
+            metrics=data.get("metrics", {}),
+            path=path,
+        )
+        logger.info("Loaded local intent model %s (%d labels)", _loaded.version, len(_loaded.labels))
+    except Exception as e:
+        logger.warning(f"Failed to load local intent model: {e}")
+        _loaded = None
+    return _loaded
+
+
+async def warm_intent_model(models_dir: Path = MODELS_DIR) -> Optional[IntentModel]:
+    """Load the artifact off the event loop (startup warm-up)"""
+    return await asyncio.to_thread(load_intent_model, models_dir)
+
+
+def _schedule_background_load() -> None:
+    """First request before warm-up: load in a worker thread instead of blocking the loop"""
+    global _load_scheduled
+    if _load_scheduled:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No event loop (scripts, sync callers): a synchronous load blocks nothing
+        load_intent_model()
+        return
+    _load_scheduled = True
+    loop.run_in_executor(None, load_intent_model)
+
+
+def set_intent_model(model: Optional[IntentModel]) -> None:
+    """Install a model directly (tests, warm-up after training)"""
+    global _loaded, _load_attempted
+    _loaded = model
+    _load_attempted = True
+
+
+def classify_intent_local(query: str, min_confidence: Optional[float] = None) -> Tuple[Optional[str], float, Dict[str, Any]]:
+    """
+    Classify with the local model.
+
+    Returns (None, confidence, meta) when the model is unavailable or below the
+    confidence threshold, so the caller can fall through to the LLM.
+    """
+    if not INTENT_LOCAL_ENABLED:
+        return None, 0.0, {"via": "local", "disabled": True}
+    if not _load_attempted:
+        _schedule_background_load()
+    model = _loaded
+    if model is None:
+        return None, 0.0, {"via": "local", "unavailable": True, "loading": not _load_attempted}
+
+    threshold = INTENT_LOCAL_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    t0 = time.perf_counter()
+    try:
+        intent, confidence = model.predict(query)
+    except Exception as e:
+        logger.warning(f"Local intent model failed: {e}")
+        return None, 0.0, {"via": "local", "error": str(e)}
+    meta = {
+        "via": "local",
+        "model_version": model.version,
+        "latency_ms": round((time.perf_counter() - t0) * 1000, 3),
+    }
+    if confidence < threshold:
+        return None, confidence, {**meta, "below_threshold": True, "candidate": intent}
+    return intent, confidence, meta
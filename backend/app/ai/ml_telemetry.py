@@ -12,6 +12,7 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime
 import logging
 
+from app.core import tracing
 from app.telemetry import log_ai_event_extended
 from app.ai.model_registry import get_model_info
 
@@ -44,13 +45,14 @@ class MLTelemetry:
         
         Args:
             lead_count: Number of leads being processed
-            request_id: Optional request ID (generated if not provided)
+            request_id: Optional request ID (defaults to the HTTP request's X-Request-ID,
+                generated outside a request)
             
         Returns:
             Request ID for tracking
         """
         if request_id is None:
-            request_id = str(uuid.uuid4())
+            request_id = tracing.current_request_id() or str(uuid.uuid4())
         
         self.request_count += 1
         
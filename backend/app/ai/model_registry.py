@@ -3,19 +3,42 @@ Model Registry for ML Pipeline
 
 Provides robust model loading, caching, and versioning for the ML prediction stack.
 Handles model artifacts with checksums, TTL caching, and proper error handling.
+
+Reloads after the TTL run in a background thread and swap the active model in
+one assignment, so requests keep using the current model while the next one
+loads. Artifacts are loaded with joblib mmap_mode where the file allows it,
+letting workers share the numpy pages, and files whose (inode, size, mtime)
+signature is unchanged are not re-hashed.
 """
 
 from dataclasses import dataclass
 from pathlib import Path
 import joblib
 import hashlib
+import json
+import numpy as np
+import os
+import pandas as pd
+import re
+import tempfile
+import threading
 import time
 import logging
-from typing import Any, Optional, Dict, List
+from typing import Any, Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
 
+from app.ai.compiled_forest import CompiledForest, compile_model
+from app.ai.feature_pipeline import resolve_pipeline
+
 logger = logging.getLogger(__name__)
 
+# Above this many rows sklearn's own (threaded) predict_proba is faster
+COMPILED_MAX_BATCH = int(os.getenv("ML_COMPILED_MAX_BATCH", "1000"))
+# Training saves advanced_ml_<model_type>_<YYYYMMDD_HHMMSS>.joblib for every model type
+ARTIFACT_NAME = re.compile(r"^advanced_ml_(?P<model_type>[a-z_]+?)_(?P<version>\d{8}_\d{6})$")
+# Pointer file in the models dir naming the pinned version for all workers
+ACTIVE_VERSION_FILE = "active_version.json"
+
 
 @dataclass
 class LoadedModel:
@@ -31,6 +54,47 @@ class LoadedModel:
     loaded_at: float
     version: str
     model_type: str = "random_forest"
+    # (inode, size, mtime_ns) of the artifact when it was loaded
+    signature: Optional[Tuple[int, int, int]] = None
+    # Flattened NumPy forest (scaler folded in), built at activation time
+    compiled: Optional[Any] = None
+    # Fitted feature pipeline from training (unfitted legacy pipeline for older artifacts)
+    feature_pipeline: Optional[Any] = None
+    # Probability calibrator fitted at training time (None: legacy sigmoid)
+    calibrator: Optional[Any] = None
+    
+    def predict_proba(self, features: Any) -> np.ndarray:
+        """Class probabilities for unscaled feature rows (n_rows, n_features)"""
+        return score_rows(self, features)
+
+
+def positive_class_index(loaded: Any) -> int:
+    """Column of the positive class (label 1/True) in predict_proba output"""
+    model = getattr(loaded, "compiled", None) or loaded.model
+    classes = getattr(model, "classes_", None)
+    if not isinstance(classes, (np.ndarray, list, tuple)):
+        # No fitted label order to consult: binary models are [0, 1]
+        return 1
+    for i, label in enumerate(classes):
+        if label == 1:
+            return i
+    return len(classes) - 1
+
+
+def score_rows(loaded: Any, features: Any) -> np.ndarray:
+    """
+    Score unscaled feature rows with a loaded model: the compiled forest for
+    batches up to COMPILED_MAX_BATCH, otherwise scaler + sklearn predict_proba
+    (faster for large batches).
+    """
+    rows = np.asarray(features, dtype=np.float64)
+    if rows.ndim == 1:
+        rows = rows.reshape(1, -1)
+    compiled = getattr(loaded, "compiled", None)
+    if isinstance(compiled, CompiledForest) and len(rows) <= COMPILED_MAX_BATCH:
+        return compiled.predict_proba(rows)
+    features_df = pd.DataFrame(rows, columns=loaded.feature_names)
+    return loaded.model.predict_proba(loaded.scaler.transform(features_df))
 
 
 class ModelRegistry:
@@ -45,16 +109,26 @@ class ModelRegistry:
     - Graceful error handling and fallback
     """
     
-    def __init__(self, models_dir: Path, active_pattern: str = "advanced_ml_random_forest_*.joblib", cache_ttl_seconds: int = 3600):
+    def __init__(self, models_dir: Path, active_pattern: str = "advanced_ml_*.joblib", cache_ttl_seconds: int = 3600):
         self.models_dir = models_dir
         self.active_pattern = active_pattern
         self.cache_ttl_seconds = cache_ttl_seconds
         self._cache: Optional[LoadedModel] = None
         self._last_load_time: float = 0
+        self._hash_cache: Dict[Path, Tuple[Tuple[int, int, int], str]] = {}
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.use_mmap = os.getenv("ML_MODEL_MMAP", "true").lower() == "true"
         
         # Ensure models directory exists
         self.models_dir.mkdir(exist_ok=True)
         
+        # Pinned by activate_version() and shared with other workers through
+        # the pointer file; None follows the newest artifact
+        self.pin_path = self.models_dir / ACTIVE_VERSION_FILE
+        self._pinned_version: Optional[str] = self._read_pin()
+        
         logger.info(f"ModelRegistry initialized with dir: {self.models_dir}, pattern: {self.active_pattern}")
     
     def _hash_file(self, file_path: Path) -> str:
@@ -69,6 +143,39 @@ class ModelRegistry:
             logger.error(f"Failed to calculate hash for {file_path}: {e}")
             return ""
     
+    @staticmethod
+    def _signature(file_path: Path) -> Tuple[int, int, int]:
+        stat = file_path.stat()
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    
+    def _hash_file_cached(self, file_path: Path) -> str:
+        """SHA256 of a file, reused while its (inode, size, mtime) signature is unchanged"""
+        try:
+            signature = self._signature(file_path)
+        except OSError as e:
+            logger.error(f"Failed to stat {file_path}: {e}")
+            return ""
+        cached = self._hash_cache.get(file_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        file_hash = self._hash_file(file_path)
+        if file_hash:
+            self._hash_cache[file_path] = (signature, file_hash)
+        return file_hash
+    
+    def _load_artifact(self, file_path: Path) -> Dict[str, Any]:
+        """joblib.load with mmap_mode for uncompressed artifacts; joblib falls back
+        to a normal load (with a warning) for compressed ones"""
+        if self.use_mmap:
+            try:
+                import warnings
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", UserWarning)
+                    return joblib.load(file_path, mmap_mode="r")
+            except Exception as e:
+                logger.debug(f"mmap load failed for {file_path}, loading normally: {e}")
+        return joblib.load(file_path)
+    
     def _find_latest_model(self) -> Optional[Path]:
         """Find the latest model artifact based on modification time"""
         try:
@@ -85,14 +192,68 @@ class ModelRegistry:
             logger.error(f"Error finding latest model: {e}")
             return None
     
+    def _find_model_version(self, version: str) -> Optional[Path]:
+        """Find the artifact for a specific version"""
+        for candidate in self.models_dir.glob(self.active_pattern):
+            if self._extract_version_from_filename(candidate) == version:
+                return candidate
+        return None
+    
+    def _read_pin(self) -> Optional[str]:
+        """Version named by the active-version pointer file, if any"""
+        try:
+            data = json.loads(self.pin_path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable model pin {self.pin_path}: {e}")
+            return None
+        version = data.get("version") if isinstance(data, dict) else None
+        return str(version) if version else None
+    
+    def _write_pin(self, version: Optional[str]) -> None:
+        """Atomically replace (or remove) the active-version pointer file"""
+        if version is None:
+            try:
+                self.pin_path.unlink()
+            except FileNotFoundError:
+                pass
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.models_dir, prefix=".active_version.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": version, "pinned_at": datetime.now().isoformat()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.pin_path)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    
+    def _resolve_model_path(self) -> Optional[Path]:
+        if self._pinned_version is not None:
+            path = self._find_model_version(self._pinned_version)
+            if path is None:
+                logger.warning(f"Pinned model version {self._pinned_version} not found")
+            return path
+        return self._find_latest_model()
+    
+    @staticmethod
+    def _extract_model_type_from_filename(file_path: Path) -> str:
+        """Model type from a filename like "advanced_ml_gradient_boosting_20250827_172908" """
+        match = ARTIFACT_NAME.match(file_path.stem)
+        return match.group("model_type") if match else "random_forest"
+    
     def _extract_version_from_filename(self, file_path: Path) -> str:
         """Extract version string from model filename"""
         try:
             # Extract timestamp from filename like "advanced_ml_random_forest_20250827_172908"
-            stem = file_path.stem
-            if "advanced_ml_random_forest_" in stem:
-                version = stem.replace("advanced_ml_random_forest_", "")
-                return version
+            match = ARTIFACT_NAME.match(file_path.stem)
+            if match:
+                return match.group("version")
             else:
                 # Fallback to modification time
                 mtime = file_path.stat().st_mtime
@@ -119,8 +280,13 @@ class ModelRegistry:
         """
         Load the active model with caching and error handling.
         
+        Only a cold start (or force=True) loads synchronously. Once a model is
+        cached, an expired TTL schedules a background refresh and the current
+        model keeps serving until the new one is swapped in.
+        
         Args:
-            force: Force reload even if cache is valid
+            force: Re-resolve the artifact synchronously even if cache is valid
+                (an unchanged file signature still reuses the loaded model)
             
         Returns:
             LoadedModel: The loaded model with metadata
@@ -129,25 +295,55 @@ class ModelRegistry:
             FileNotFoundError: If no model artifacts are found
             ValueError: If model loading fails
         """
-        # Check cache validity first
-        if not force and self._is_cache_valid():
-            logger.debug("Using cached model")
-            return self._cache
+        cached = self._cache
+        if not force and cached is not None:
+            if not self._is_cache_valid():
+                self.refresh_in_background()
+            else:
+                logger.debug("Using cached model")
+            return cached
         
-        # Find latest model
-        model_path = self._find_latest_model()
+        with self._load_lock:
+            # Another caller may have finished loading while we waited
+            if not force and self._cache is not None:
+                return self._cache
+            return self._reload_locked()
+    
+    def _reload_locked(self) -> LoadedModel:
+        # Pick up a pin (or unpin) made by another worker process
+        self._pinned_version = self._read_pin()
+        model_path = self._resolve_model_path()
         if model_path is None:
             raise FileNotFoundError(f"No model artifacts matching {self.active_pattern} found in {self.models_dir}")
         
+        # Same file as the one being served: just renew the TTL
+        current = self._cache
+        try:
+            signature = self._signature(model_path)
+        except OSError as e:
+            raise ValueError(f"Model loading failed: {e}")
+        if current is not None and current.path == model_path and current.signature == signature:
+            self._last_load_time = time.time()
+            logger.debug(f"Model {current.version} unchanged; TTL renewed")
+            return current
+        
+        loaded_model = self._load_path(model_path)
+        
+        # Atomic swap: readers see either the old or the new model
+        self._cache = loaded_model
+        self._last_load_time = time.time()
+        return loaded_model
+    
+    def _load_path(self, model_path: Path) -> LoadedModel:
         # Calculate file hash for integrity verification
-        file_hash = self._hash_file(model_path)
+        file_hash = self._hash_file_cached(model_path)
         if not file_hash:
             raise ValueError(f"Failed to calculate hash for {model_path}")
         
         try:
             # Load model artifact
             logger.info(f"Loading model from {model_path}")
-            model_data = joblib.load(model_path)
+            model_data = self._load_artifact(model_path)
             
             # Validate model data structure
             required_keys = ['model', 'scaler', 'feature_names', 'performance', 'feature_importance']
@@ -170,13 +366,13 @@ class ModelRegistry:
                 sha256=file_hash,
                 loaded_at=time.time(),
                 version=version,
-                model_type="random_forest"
+                model_type=self._extract_model_type_from_filename(model_path),
+                signature=self._signature(model_path),
+                compiled=compile_model(model_data['model'], model_data['scaler']),
+                feature_pipeline=resolve_pipeline(model_data.get('feature_pipeline')),
+                calibrator=model_data.get('calibrator')
             )
             
-            # Update cache
-            self._cache = loaded_model
-            self._last_load_time = time.time()
-            
             logger.info(f"Successfully loaded model: {version} (SHA256: {file_hash[:8]}...)")
             return loaded_model
             
@@ -184,6 +380,49 @@ class ModelRegistry:
             logger.error(f"Failed to load model from {model_path}: {e}")
             raise ValueError(f"Model loading failed: {str(e)}")
     
+    def refresh_in_background(self) -> bool:
+        """Start a background reload unless one is already running"""
+        with self._refresh_lock:
+            thread = self._refresh_thread
+            if thread is not None and thread.is_alive():
+                return False
+            self._refresh_thread = threading.Thread(target=self._refresh, name="model-registry-refresh", daemon=True)
+            self._refresh_thread.start()
+            return True
+    
+    def _refresh(self) -> None:
+        try:
+            with self._load_lock:
+                self._reload_locked()
+        except Exception as e:
+            # Keep serving the current model; retry after another TTL
+            self._last_load_time = time.time()
+            logger.error(f"Background model refresh failed: {e}")
+
+    
+    def activate_version(self, version: Optional[str]) -> LoadedModel:
+        """
+        Pin and load a specific model version, independent of file mtimes.
+        Passing None unpins and goes back to following the newest artifact.
+        The pin is written to the models dir so every worker serves the same
+        version after its next reload.
+        """
+        with self._load_lock:
+            if version is not None and self._find_model_version(version) is None:
+                raise FileNotFoundError(f"Model version {version} not found in {self.models_dir}")
+            previous = self._read_pin()
+            self._write_pin(version)
+            try:
+                return self._reload_locked()
+            except Exception:
+                self._write_pin(previous)
+                self._pinned_version = previous
+                raise
+    
+    @property
+    def pinned_version(self) -> Optional[str]:
+        return self._pinned_version
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the currently loaded model"""
         if self._cache is None:
@@ -198,7 +437,9 @@ class ModelRegistry:
             "loaded_at": self._cache.loaded_at,
             "loaded_since_seconds": time.time() - self._cache.loaded_at,
             "feature_count": len(self._cache.feature_names),
-            "performance": self._cache.performance
+            "performance": self._cache.performance,
+            "pinned_version": self._pinned_version,
+            "compiled_inference": self._cache.compiled is not None
         }
     
     def list_available_models(self) -> List[Dict[str, Any]]:
@@ -216,7 +457,7 @@ class ModelRegistry:
                         "size_bytes": stat.st_size,
                         "modified_at": stat.st_mtime,
                         "version": self._extract_version_from_filename(model_path),
-                        "sha256": self._hash_file(model_path)
+                        "sha256": self._hash_file_cached(model_path)
                     })
                 except Exception as e:
                     logger.warning(f"Could not get metadata for {model_path}: {e}")
@@ -235,6 +476,7 @@ class ModelRegistry:
         """Clear the model cache, forcing next load to read from disk"""
         self._cache = None
         self._last_load_time = 0
+        self._hash_cache.clear()
         logger.info("Model cache cleared")
     
     def validate_model_integrity(self, model_path: Optional[Path] = None) -> bool:
@@ -297,3 +539,49 @@ def get_model_info() -> Dict[str, Any]:
     """Convenience function to get model information"""
     registry = get_model_registry()
     return registry.get_model_info()
+
+
+def activate_model_version(version: Optional[str]) -> LoadedModel:
+    """Convenience function to pin the active model version"""
+    registry = get_model_registry()
+    return registry.activate_version(version)
+
+
+def pipeline_model_entry(model_file: Path) -> Dict[str, Any]:
+    """
+    An AdvancedMLPipeline `models` entry for an artifact. If the registry is
+    serving the same file, the entry reuses the registry's loaded objects
+    instead of loading a second (and, with both pipelines, third) copy of
+    the forest into the process.
+    """
+    registry = get_model_registry()
+    loaded: Optional[LoadedModel] = None
+    try:
+        if model_file.parent.resolve() == registry.models_dir.resolve():
+            loaded = registry.load_active()
+    except Exception as e:
+        logger.debug(f"Registry model unavailable for {model_file.name}: {e}")
+    if loaded is not None and loaded.path.resolve() == model_file.resolve():
+        return {
+            'model': loaded.model,
+            'scaler': loaded.scaler,
+            'feature_selector': loaded.feature_selector,
+            'feature_names': loaded.feature_names,
+            'feature_pipeline': loaded.feature_pipeline,
+            'calibrator': loaded.calibrator,
+            'performance': loaded.performance,
+            'feature_importance': loaded.feature_importance,
+            'compiled': loaded.compiled,
+        }
+    model_data = registry._load_artifact(model_file)
+    return {
+        'model': model_data['model'],
+        'scaler': model_data['scaler'],
+        'feature_selector': model_data.get('feature_selector'),
+        'feature_names': model_data['feature_names'],
+        'feature_pipeline': resolve_pipeline(model_data.get('feature_pipeline')),
+        'calibrator': model_data.get('calibrator'),
+        'performance': model_data['performance'],
+        'feature_importance': model_data['feature_importance'],
+        'compiled': compile_model(model_data['model'], model_data['scaler']),
+    }
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 import json
 import re
 from app.db.db import fetch, fetchrow, execute
+from app.db.rollups import monthly_leads
 from app.ai.runtime import normalize_user_text, flash_parse_query, narrate
 
 router = APIRouter(prefix="/ai/natural-language", tags=["natural-language"])
@@ -395,18 +396,38 @@ def analyze_trends(results: List[Dict], time_period: str = "30d") -> Dict[str, A
                 monthly_data[month_key] = {
                     'count': 0,
                     'total_score': 0,
-                    'conversions': 0,
-                    'scores': []
+                    'scored': 0,
+                    'conversions': 0
                 }
             
             monthly_data[month_key]['count'] += 1
             if lead.get('lead_score'):
                 monthly_data[month_key]['total_score'] += lead['lead_score']
-                monthly_data[month_key]['scores'].append(lead['lead_score'])
+                monthly_data[month_key]['scored'] += 1
             
             if lead.get('has_application'):
                 monthly_data[month_key]['conversions'] += 1
     
+    return trends_from_monthly(monthly_data)
+
+def analyze_trends_from_rollups(monthly_rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """analyze_trends over every lead, from the monthly rollup (monthly_leads(lifecycle_state='lead'))"""
+    if not monthly_rows:
+        return {"error": "No data available for trend analysis"}
+    monthly_data = {
+        f"{row['month'].year}-{row['month'].month:02d}": {
+            'count': row['leads'],
+            'total_score': float(row['lead_score_sum'] or 0),
+            'scored': row['scored_leads'],
+            'conversions': row['with_application']
+        }
+        for row in monthly_rows
+    }
+    return trends_from_monthly(monthly_data)
+
+def trends_from_monthly(monthly_data: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Growth, score and conversion trends from per-month lead counts"""
+    
     # Calculate trends
     months = sorted(monthly_data.keys())
     if len(months) < 2:
@@ -421,8 +442,8 @@ def analyze_trends(results: List[Dict], time_period: str = "30d") -> Dict[str, A
     score_trends = []
     for month in months:
         data = monthly_data[month]
-        if data['scores']:
-            avg_score = sum(data['scores']) / len(data['scores'])
+        if data['scored']:
+            avg_score = data['total_score'] / data['scored']
             score_trends.append({
                 'month': month,
                 'avg_score': round(avg_score, 1),
@@ -745,10 +766,15 @@ async def process_natural_language_query(request: NaturalLanguageQuery):
 
 # New analytics endpoints
 @router.get("/analytics/trends")
-async def get_trend_analytics(limit: int = 100):
-    """Get trend analysis for all leads"""
+async def get_trend_analytics(limit: Optional[int] = None):
+    """Get trend analysis for all leads (the most recent `limit` leads if given)"""
     try:
-        results = await execute_lead_query("general_search", [], limit)
+        if limit is None:
+            # Same population as the general_search fallback: people still in the 'lead' state
+            monthly = await monthly_leads(lifecycle_state="lead")
+            if monthly is not None:
+                return analyze_trends_from_rollups(monthly)
+        results = await execute_lead_query("general_search", [], limit or 100)
         return analyze_trends(results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze trends: {str(e)}")
@@ -2,7 +2,9 @@
 PII redaction utilities for telemetry
 """
 import re
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+from app.ai.redaction_engine import TELEMETRY_PROFILE
 
 def detect_pii_in_text_legacy(text: str) -> Dict[str, list]:
     """Legacy PII detection - returns simple lists"""
@@ -35,24 +37,12 @@ def detect_pii_in_text_legacy(text: str) -> Dict[str, list]:
     return pii_found
 
 def redact(text: str) -> str:
-    """Redact PII from text for telemetry"""
-    if not text:
-        return text
-    
-    # Email addresses
-    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
-    
-    # Phone numbers (UK format)
-    text = re.sub(r'\b(?:\+44|0)[0-9]{10,11}\b', '[PHONE]', text)
-    
-    # Names (simple heuristic - capitalize words)
-    text = re.sub(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', '[NAME]', text)
-    
-    # Dates of birth
-    text = re.sub(r'\b\d{2}/\d{2}/\d{4}\b', '[DOB]', text)
-    text = re.sub(r'\b\d{4}-\d{2}-\d{2}\b', '[DOB]', text)
-    
-    return text
+    """Redact PII from text for telemetry (emails, UK phones, names, DOB dates)"""
+    return TELEMETRY_PROFILE.redact(text)
+
+def redact_many(texts: List[str], redaction_level: str = "full") -> List[str]:
+    """Bulk version of redact() for lists of prompts/responses"""
+    return TELEMETRY_PROFILE.redact_many(texts, redaction_level)
 
 def redact_dict(data: Dict[str, Any]) -> Dict[str, Any]:
     """Redact PII from dictionary values"""
@@ -101,25 +91,30 @@ def redact_text(s: str, redaction_level: str = "full", context: str = "") -> Dic
             "operation_id": str(uuid.uuid4())
         }
     
-    # Detect PII first
-    matches = detect_pii_in_text(s, context)
-    
-    # Apply redaction based on level
-    redacted_text = s
-    for match in matches:
-        if redaction_level == "full":
-            replacement = f"[{match['pii_type'].upper()}]"
-        elif redaction_level == "partial":
-            if match['pii_type'] == "email":
+    # Spans come from the shared engine; the replacement tokens are this API's own
+    level = getattr(redaction_level, "value", redaction_level)
+    spans = TELEMETRY_PROFILE.scan(s)
+    matches = [_span_to_match(span, context) for span in spans]
+    
+    parts = []
+    pos = 0
+    for span in spans:
+        if level == "full":
+            replacement = f"[{span.pii_type.upper()}]"
+        elif level == "partial":
+            if span.pii_type == "email":
                 replacement = "j***@email.com"
             else:
-                replacement = f"[{match['pii_type'].upper()}]"
-        elif redaction_level == "hashed":
-            replacement = f"[HASHED_{match['pii_type'].upper()}]"
+                replacement = f"[{span.pii_type.upper()}]"
+        elif level == "hashed":
+            replacement = f"[HASHED_{span.pii_type.upper()}]"
         else:  # anonymized
-            replacement = f"[ANONYMIZED_{match['pii_type'].upper()}]"
-        
-        redacted_text = redacted_text.replace(match['value'], replacement)
+            replacement = f"[ANONYMIZED_{span.pii_type.upper()}]"
+        parts.append(s[pos:span.start])
+        parts.append(replacement)
+        pos = span.end
+    parts.append(s[pos:])
+    redacted_text = "".join(parts)
     
     return {
         "original_text": s,
@@ -161,12 +156,10 @@ class PIIType(Enum):
 
 class PIIEngine:
     def __init__(self):
-        self.patterns = {
-            PIIType.EMAIL: [r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'],
-            PIIType.PHONE: [r'\b(?:\+44|0)[0-9]{10,11}\b'],
-            PIIType.NAME: [r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'],
-            PIIType.DATE: [r'\b\d{2}/\d{2}/\d{4}\b', r'\b\d{4}-\d{2}-\d{2}\b']
-        }
+        # Read-only view of the rules the redaction engine actually applies
+        self.patterns = {}
+        for rule in TELEMETRY_PROFILE.rules:
+            self.patterns.setdefault(PIIType(rule.pii_type), []).append(rule.pattern)
         self.redaction_templates = {
             PIIType.EMAIL: {
                 "full": "[EMAIL]",
@@ -242,19 +235,16 @@ def detect_pii_in_text(text: str, context: str = "") -> List[Dict[str, Any]]:
     if not text:
         return []
     
-    matches = []
-    for pii_type, patterns in pii_engine.patterns.items():
-        for pattern in patterns:
-            import re
-            for match in re.finditer(pattern, text):
-                matches.append({
-                    "pii_type": pii_type.value,
-                    "value": match.group(),
-                    "start_pos": match.start(),
-                    "end_pos": match.end(),
-                    "confidence": 0.8,  # Simple confidence scoring
-                    "context": context[:50] if context else "",
-                    "redaction_level": "full"
-                })
-    
-    return matches
\ No newline at end of file
+    return [_span_to_match(span, context) for span in TELEMETRY_PROFILE.scan(text)]
+
+
+def _span_to_match(span, context: str = "", redaction_level: str = "full") -> Dict[str, Any]:
+    return {
+        "pii_type": span.pii_type,
+        "value": span.value,
+        "start_pos": span.start,
+        "end_pos": span.end,
+        "confidence": 0.8,  # Simple confidence scoring
+        "context": context[:50] if context else "",
+        "redaction_level": redaction_level,
+    }
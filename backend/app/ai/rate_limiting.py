@@ -8,14 +8,19 @@ import time
 import hashlib
 import json
 import logging
+import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
-from collections import defaultdict, deque
+from collections import defaultdict
 import asyncio
 import functools
 
+from fastapi import HTTPException
+
+from app.core.rate_limit_store import GCRALimit, RateLimitDecision, get_rate_limit_store
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -84,13 +89,15 @@ class ResourceUsage:
     cached_requests: int
 
 class RateLimiter:
-    """Advanced rate limiting with multiple strategies"""
+    """Advanced rate limiting with multiple strategies
+
+    Backed by the GCRA store in app.core.rate_limit_store: each identifier
+    holds one timestamp per window (minute, hour, burst) instead of a deque
+    of request times, and the store can be shared across workers.
+    """
     
-    def __init__(self):
-        self.user_limits: Dict[str, Dict[str, deque]] = defaultdict(lambda: defaultdict(deque))
-        self.role_limits: Dict[str, Dict[str, deque]] = defaultdict(lambda: defaultdict(deque))
-        self.endpoint_limits: Dict[str, deque] = defaultdict(deque)
-        self.global_limits: Dict[str, deque] = defaultdict(deque)
+    def __init__(self, store=None):
+        self._store = store
         self.blocked_users: Dict[str, datetime] = {}
         self.blocked_roles: Dict[str, datetime] = {}
         
@@ -111,109 +118,98 @@ class RateLimiter:
             "super_admin": RateLimitConfig(1000, 20000, 100, 60, 300)
         }
     
-    def is_rate_limited(self, identifier: str, limit_type: RateLimitType, 
-                       user_role: str = None) -> Tuple[bool, Dict[str, Any]]:
-        """Check if request should be rate limited"""
-        current_time = time.time()
-        
-        # Check if user/role is blocked
-        if limit_type == RateLimitType.USER_BASED and identifier in self.blocked_users:
-            if current_time < self.blocked_users[identifier].timestamp():
-                return True, {
-                    "blocked": True,
-                    "reason": "Rate limit exceeded",
-                    "retry_after": int(self.blocked_users[identifier].timestamp() - current_time)
-                }
-            else:
-                del self.blocked_users[identifier]
-        
-        if limit_type == RateLimitType.ROLE_BASED and user_role and user_role in self.blocked_roles:
-            if current_time < self.blocked_roles[user_role].timestamp():
-                return True, {
-                    "blocked": True,
-                    "reason": "Role rate limit exceeded",
-                    "retry_after": int(self.blocked_roles[user_role].timestamp() - current_time)
-                }
-            else:
-                del self.blocked_roles[user_role]
-        
-        # Get appropriate configuration
+    @property
+    def store(self):
+        return self._store or get_rate_limit_store()
+    
+    def _config_for(self, limit_type: RateLimitType, user_role: str = None) -> RateLimitConfig:
         if limit_type == RateLimitType.ROLE_BASED and user_role:
-            config = self.role_limits_config.get(user_role, self.default_configs[limit_type])
+            return self.role_limits_config.get(user_role, self.default_configs[limit_type])
+        return self.default_configs[limit_type]
+    
+    def _checks(self, identifier: str, limit_type: RateLimitType,
+                user_role: str, config: RateLimitConfig) -> List[Tuple[str, GCRALimit]]:
+        if limit_type == RateLimitType.ROLE_BASED:
+            subject = user_role or identifier
+        elif limit_type == RateLimitType.GLOBAL:
+            subject = "global"
         else:
-            config = self.default_configs[limit_type]
-        
-        # Get request history
+            subject = identifier
+        base = f"opt:{limit_type.value}:{subject}"
+        return [
+            (f"{base}:minute", GCRALimit(config.requests_per_minute, 60)),
+            (f"{base}:hour", GCRALimit(config.requests_per_hour, 3600)),
+            (f"{base}:burst", GCRALimit(config.burst_limit, 10)),
+        ]
+    
+    def _blocked(self, identifier: str, limit_type: RateLimitType,
+                 user_role: str, current_time: float) -> Optional[Dict[str, Any]]:
+        """Short-circuit identifiers still inside their retry window"""
         if limit_type == RateLimitType.USER_BASED:
-            history = self.user_limits[identifier]
-        elif limit_type == RateLimitType.ROLE_BASED:
-            history = self.role_limits[user_role]
-        elif limit_type == RateLimitType.ENDPOINT_BASED:
-            history = self.endpoint_limits
-        else:  # GLOBAL
-            history = self.global_limits
-        
-        # Clean old entries
-        cutoff_time = current_time - config.window_size
-        for key in list(history.keys()):
-            while history[key] and history[key][0] < cutoff_time:
-                history[key].popleft()
-        
-        # Check limits
-        minute_requests = len([t for t in history.get("minute", []) if t > current_time - 60])
-        hour_requests = len([t for t in history.get("hour", []) if t > current_time - 3600])
-        
-        # Check burst limit
-        recent_requests = len([t for t in history.get("minute", []) if t > current_time - 10])
-        
-        limited = False
-        reason = None
-        
-        if minute_requests >= config.requests_per_minute:
-            limited = True
-            reason = "Minute limit exceeded"
-        elif hour_requests >= config.requests_per_hour:
-            limited = True
-            reason = "Hour limit exceeded"
-        elif recent_requests >= config.burst_limit:
-            limited = True
-            reason = "Burst limit exceeded"
-        
-        if limited:
-            # Add to blocked list
+            blocked, key, reason = self.blocked_users, identifier, "Rate limit exceeded"
+        elif limit_type == RateLimitType.ROLE_BASED and user_role:
+            blocked, key, reason = self.blocked_roles, user_role, "Role rate limit exceeded"
+        else:
+            return None
+        until = blocked.get(key)
+        if until is None:
+            return None
+        if current_time < until.timestamp():
+            return {
+                "blocked": True,
+                "reason": reason,
+                "retry_after": max(1, math.ceil(until.timestamp() - current_time))
+            }
+        del blocked[key]
+        return None
+    
+    def _result(self, identifier: str, limit_type: RateLimitType, user_role: str,
+                config: RateLimitConfig, decision: RateLimitDecision,
+                current_time: float) -> Tuple[bool, Dict[str, Any]]:
+        capacities = {"minute": config.requests_per_minute, "hour": config.requests_per_hour,
+                      "burst": config.burst_limit}
+        if not decision.allowed:
+            window = decision.limited_by.rsplit(":", 1)[-1]
+            until = datetime.fromtimestamp(current_time + decision.retry_after)
             if limit_type == RateLimitType.USER_BASED:
-                self.blocked_users[identifier] = datetime.fromtimestamp(current_time + config.cooldown_period)
+                self.blocked_users[identifier] = until
             elif limit_type == RateLimitType.ROLE_BASED and user_role:
-                self.blocked_roles[user_role] = datetime.fromtimestamp(current_time + config.cooldown_period)
-            
+                self.blocked_roles[user_role] = until
             return True, {
                 "blocked": False,
-                "reason": reason,
-                "retry_after": config.cooldown_period,
-                "limits": {
-                    "minute": minute_requests,
-                    "hour": hour_requests,
-                    "burst": recent_requests
-                }
+                "reason": f"{window.capitalize()} limit exceeded",
+                "retry_after": decision.retry_after_seconds,
             }
         
-        # Record request
-        if "minute" not in history:
-            history["minute"] = deque()
-        if "hour" not in history:
-            history["hour"] = deque()
+        limits = {}
+        for key, remaining in (decision.remaining or {}).items():
+            window = key.rsplit(":", 1)[-1]
+            limits[window] = capacities[window] - remaining
+        return False, {"blocked": False, "limits": limits}
+    
+    def is_rate_limited(self, identifier: str, limit_type: RateLimitType, 
+                       user_role: str = None) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request should be rate limited (and record it if not)"""
+        current_time = time.time()
+        blocked = self._blocked(identifier, limit_type, user_role, current_time)
+        if blocked:
+            return True, blocked
         
-        history["minute"].append(current_time)
-        history["hour"].append(current_time)
+        config = self._config_for(limit_type, user_role)
+        decision = self.store.acquire(self._checks(identifier, limit_type, user_role, config), current_time)
+        return self._result(identifier, limit_type, user_role, config, decision, current_time)
+    
+    async def ais_rate_limited(self, identifier: str, limit_type: RateLimitType,
+                               user_role: str = None) -> Tuple[bool, Dict[str, Any]]:
+        """Async variant of is_rate_limited; does not block the event loop on a shared store"""
+        current_time = time.time()
+        blocked = self._blocked(identifier, limit_type, user_role, current_time)
+        if blocked:
+            return True, blocked
         
-        return False, {
-            "blocked": False,
-            "limits": {
-                "minute": minute_requests + 1,
-                "hour": hour_requests + 1,
-                "burst": recent_requests + 1
-            }
-        }
+        config = self._config_for(limit_type, user_role)
+        decision = await self.store.aacquire(self._checks(identifier, limit_type, user_role, config), current_time)
+        return self._result(identifier, limit_type, user_role, config, decision, current_time)
 
 class CacheManager:
     """Intelligent caching system with multiple strategies"""
@@ -489,14 +485,15 @@ def rate_limit(limit_type: RateLimitType, identifier_key: str = "username"):
                 identifier = "global"
             
             # Check rate limit
-            limited, details = rate_limiter.is_rate_limited(identifier, limit_type)
+            limited, details = await rate_limiter.ais_rate_limited(identifier, limit_type)
             
             if limited:
-                return {
-                    "error": "Rate limit exceeded",
-                    "details": details,
-                    "retry_after": details.get("retry_after", 60)
-                }
+                retry_after = details.get("retry_after", 60)
+                raise HTTPException(
+                    status_code=429,
+                    detail={"error": "Rate limit exceeded", "details": details, "retry_after": retry_after},
+                    headers={"Retry-After": str(retry_after)},
+                )
             
             # Execute function
             start_time = time.time()
@@ -532,6 +529,10 @@ def check_rate_limit(identifier: str, limit_type: RateLimitType, user_role: str
     """Check rate limit for an identifier"""
     return rate_limiter.is_rate_limited(identifier, limit_type, user_role)
 
+async def acheck_rate_limit(identifier: str, limit_type: RateLimitType, user_role: str = None) -> Tuple[bool, Dict[str, Any]]:
+    """Check rate limit for an identifier from async code"""
+    return await rate_limiter.ais_rate_limited(identifier, limit_type, user_role)
+
 def get_cache(key: str) -> Optional[Any]:
     """Get value from cache"""
     return cache_manager.get(key)
@@ -0,0 +1,256 @@
+"""
+Compiled PII redaction engine
+
+Every redactor in the app (telemetry, short-term memory, contact scrubbing,
+the /pii endpoints) used to run its own chain of uncompiled re.sub passes.
+A RedactionProfile instead compiles its rules into one alternation of named
+groups per priority, so a text is scanned once per priority (usually two
+passes) and yields typed, non-overlapping spans.
+
+Within a pass the leftmost match wins; rule order only breaks ties between
+matches starting at the same position (rules starting with \b are tried
+before the rest). Lower priorities run first and later passes only scan the
+text between earlier matches, like the old sequential re.sub chains: a name
+pattern can never swallow the start of an email ("Contact John@example.com").
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ───────────────────────── Rules ─────────────────────────
+
+# Shared pattern fragments (kept identical to the historical per-module regexes)
+EMAIL = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b"
+UUID = r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"
+PHONE_UK = r"\b(?:\+44|0)[0-9]{10,11}\b"
+PHONE_NANP = r"\b(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}\b"
+# short_memory (dots allowed) and scrub_contact_info (no dots: keeps IPs, amounts, dotted dates)
+PHONE_LOOSE = r"\b\+?\d[\d\s().-]{6,}\b"
+PHONE_CONTACT = r"\b\+?\d[\d\s\-()]{6,}\b"
+EMAIL_UNBOUNDED = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
+EMAIL_CONTACT = r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b"
+NAME = r"\b[A-Z][a-z]+ [A-Z][a-z]+\b"
+NAME_REVERSED = r"\b[A-Z][a-z]+, [A-Z][a-z]+\b"
+DATE_DMY = r"\b\d{2}/\d{2}/\d{4}\b"
+DATE_ISO = r"\b\d{4}-\d{2}-\d{2}\b"
+
+
+@dataclass(frozen=True)
+class RedactionRule:
+    """One PII pattern; pii_type matches PIIType values in pii_redaction"""
+    pii_type: str
+    pattern: str
+    flags: int = 0
+    # Overrides the "[TYPE]" token at FULL level
+    token: Optional[str] = None
+    # Lower priorities are matched first; later passes only see the gaps between matches
+    priority: int = 0
+
+
+@dataclass(frozen=True)
+class PIISpan:
+    """A typed match found by the combined scan"""
+    pii_type: str
+    start: int
+    end: int
+    value: str
+
+
+def _partial_mask(pii_type: str, value: str) -> str:
+    if pii_type == "email" and "@" in value:
+        local, _, domain = value.partition("@")
+        return f"{local[:1]}***@{domain}"
+    if pii_type == "phone":
+        digits = re.sub(r"\D", "", value)
+        return "*" * max(0, len(digits) - 3) + digits[-3:]
+    if pii_type == "name":
+        return " ".join(part[:1] + "." for part in value.replace(",", "").split())
+    return f"[{pii_type.upper()}]"
+
+
+def _level_value(level: Any) -> str:
+    return getattr(level, "value", level) or "full"
+
+
+class RedactionProfile:
+    """
+    A compiled set of rules.
+
+    levels follow RedactionLevel: "full" → rule token ("[EMAIL]"), "partial" →
+    masked value ("j***@example.com"), "hashed" → stable "[EMAIL:1a2b3c4d]",
+    "anonymized" → "[ANONYMIZED_EMAIL]".
+    """
+
+    def __init__(self, name: str, rules: Sequence[RedactionRule], replacement: Optional[str] = None):
+        self.name = name
+        self.rules = list(rules)
+        # Single replacement for every type (e.g. "" for scrubbing, "[redacted]")
+        self.replacement = replacement
+        self._groups: Dict[str, RedactionRule] = {}
+        tiers: Dict[int, List[Tuple[str, RedactionRule]]] = {}
+        for i, rule in enumerate(self.rules):
+            group = f"r{i}"
+            self._groups[group] = rule
+            tiers.setdefault(rule.priority, []).append((group, rule))
+        self._passes = [self._compile(tiers[p]) for p in sorted(tiers)]
+        # Kept for the common single-priority case (and as the first pass otherwise)
+        self._regex = self._passes[0]
+
+    @staticmethod
+    def _compile(rules: Sequence[Tuple[str, RedactionRule]]) -> "re.Pattern[str]":
+        bounded, unbounded = [], []
+        for group, rule in rules:
+            pattern = rule.pattern
+            # Hoist a leading \b out of the alternation: the engine then rejects
+            # mid-word positions once instead of once per rule
+            target = bounded if pattern.startswith(r"\b") else unbounded
+            if target is bounded:
+                pattern = pattern[2:]
+            if rule.flags & re.IGNORECASE:
+                pattern = f"(?i:{pattern})"
+            target.append(f"(?P<{group}>{pattern})")
+        parts = []
+        if bounded:
+            parts.append(r"\b(?:" + "|".join(bounded) + ")")
+        parts.extend(unbounded)
+        return re.compile("|".join(parts))
+
+    def _matches(self, text: str) -> List[Tuple[int, int, str, re.Match]]:
+        """(start, end, group, match) for every pass, non-overlapping, in document order"""
+        found = [(m.start(), m.end(), m.lastgroup, m) for m in self._passes[0].finditer(text)]
+        for regex in self._passes[1:]:
+            gaps, pos = [], 0
+            for start, end, _, _ in sorted(found):
+                if start > pos:
+                    gaps.append((pos, start))
+                pos = end
+            if pos < len(text):
+                gaps.append((pos, len(text)))
+            for lo, hi in gaps:
+                # Scan each gap as its own string so \b at the edges behaves as it
+                # did next to the "[TYPE]" tokens the sequential passes inserted
+                segment = text[lo:hi]
+                found.extend((lo + m.start(), lo + m.end(), m.lastgroup, m) for m in regex.finditer(segment))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def scan(self, text: str) -> List[PIISpan]:
+        """Return non-overlapping typed spans in document order"""
+        if not text:
+            return []
+        groups = self._groups
+        return [
+            PIISpan(groups[group].pii_type, start, end, m.group())
+            for start, end, group, m in self._matches(text)
+        ]
+
+    def _replacer(self, level: str) -> Callable[[re.Match], str]:
+        groups = self._groups
+        if self.replacement is not None:
+            replacement = self.replacement
+            return lambda m: replacement
+        if level == "full":
+            def full(m):
+                rule = groups[m.lastgroup]
+                return rule.token or f"[{rule.pii_type.upper()}]"
+            return full
+        if level == "partial":
+            return lambda m: _partial_mask(groups[m.lastgroup].pii_type, m.group())
+        if level == "hashed":
+            def hashed(m):
+                digest = hashlib.sha256(m.group().encode("utf-8")).hexdigest()[:8]
+                return f"[{groups[m.lastgroup].pii_type.upper()}:{digest}]"
+            return hashed
+        return lambda m: f"[ANONYMIZED_{groups[m.lastgroup].pii_type.upper()}]"
+
+    def redact(self, text: Optional[str], level: Any = "full") -> Optional[str]:
+        """Redact text (one regex pass per rule priority)"""
+        if not text:
+            return text
+        replace = self._replacer(_level_value(level))
+        if len(self._passes) == 1:
+            return self._regex.sub(replace, text)
+        return self._apply(text, replace)[0]
+
+    def _apply(self, text: str, replace: Callable[[re.Match], str]) -> Tuple[str, List[PIISpan]]:
+        groups = self._groups
+        spans: List[PIISpan] = []
+        out: List[str] = []
+        pos = 0
+        for start, end, group, m in self._matches(text):
+            spans.append(PIISpan(groups[group].pii_type, start, end, m.group()))
+            out.append(text[pos:start])
+            out.append(replace(m))
+            pos = end
+        out.append(text[pos:])
+        return "".join(out), spans
+
+    def redact_with_spans(self, text: str, level: Any = "full") -> Tuple[str, List[PIISpan]]:
+        """Redact and return the spans that were replaced (offsets refer to the input)"""
+        if not text:
+            return text, []
+        return self._apply(text, self._replacer(_level_value(level)))
+
+    def redact_many(self, texts: Iterable[Optional[str]], level: Any = "full") -> List[Optional[str]]:
+        """Bulk redaction; the patterns and replacer are resolved once for the batch"""
+        replace = self._replacer(_level_value(level))
+        if len(self._passes) == 1:
+            sub = self._regex.sub
+            return [sub(replace, t) if t else t for t in texts]
+        return [self._apply(t, replace)[0] if t else t for t in texts]
+
+
+# ───────────────────────── Built-in profiles ─────────────────────────
+
+# app.ai.pii_redaction.redact / PIIEngine (UK phones, DOB dates)
+TELEMETRY_PROFILE = RedactionProfile("telemetry", [
+    RedactionRule("email", EMAIL),
+    RedactionRule("phone", PHONE_UK),
+    RedactionRule("name", NAME, priority=1),
+    RedactionRule("date", DATE_DMY, token="[DOB]", priority=1),
+    RedactionRule("date", DATE_ISO, token="[DOB]", priority=1),
+])
+
+# app.telemetry.redact_pii (ai_events prompt/response redaction); UUIDs go in the
+# first pass so a phone pattern can never take digits out of the middle of one
+AI_EVENTS_PROFILE = RedactionProfile("ai_events", [
+    RedactionRule("email", EMAIL),
+    RedactionRule("uuid", UUID),
+    RedactionRule("phone", PHONE_NANP),
+    RedactionRule("name", NAME, priority=1),
+    RedactionRule("name", NAME_REVERSED, priority=2),
+])
+
+# app.ai.short_memory conversation buffer (emails, then phones, as before)
+MEMORY_PROFILE = RedactionProfile("memory", [
+    RedactionRule("email", EMAIL_UNBOUNDED),
+    RedactionRule("phone", PHONE_LOOSE, priority=1),
+], replacement="[redacted]")
+
+# app.ai.text_sanitiser.scrub_contact_info (contact details removed outright);
+# the historical single regex tried the phone alternative first
+CONTACT_PROFILE = RedactionProfile("contact", [
+    RedactionRule("phone", PHONE_CONTACT),
+    RedactionRule("email", EMAIL_CONTACT, flags=re.IGNORECASE),
+], replacement="")
+
+PROFILES: Dict[str, RedactionProfile] = {
+    p.name: p for p in (TELEMETRY_PROFILE, AI_EVENTS_PROFILE, MEMORY_PROFILE, CONTACT_PROFILE)
+}
+
+
+def get_profile(name: str = "telemetry") -> RedactionProfile:
+    """Look up a built-in profile by name"""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown redaction profile: {name}")
+
+
+def redact_many(texts: Iterable[Optional[str]], profile: str = "telemetry", level: Any = "full") -> List[Optional[str]]:
+    """Redact a list of strings with a built-in profile"""
+    return get_profile(profile).redact_many(texts, level)
@@ -15,6 +15,7 @@ from pydantic import BaseModel
 
 # Import the narrate function
 from app.ai.runtime import narrate
+from app.core import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,7 @@ from app.ai.ivy_conversation_config import build_sampling_args
 from app.ai.privacy_utils import safe_preview
 from app.ai.content_rewriter import rewrite_answer, validate_contract_compliance, guarded_retry_with_constraints
 from app.ai.ui_models import ContentContract
+from app.ai.intent_model import classify_intent_local
 
 def _friendly_status(value: Optional[str]) -> Optional[str]:
     if not value:
@@ -241,6 +243,12 @@ INTENT_PATTERNS = {
     ]
 }
 
+# Compiled once per process (before fork when preloaded, see app.core.preload)
+INTENT_REGEXES = {
+    intent: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for intent, patterns in INTENT_PATTERNS.items()
+}
+
 def classify_intent_regex(query: str, context: Dict[str, Any]) -> Tuple[Optional[str], float, Dict[str, Any]]:
     """Fast regex-based intent classification"""
     query_lower = str(query).lower().strip()
@@ -251,10 +259,10 @@ def classify_intent_regex(query: str, context: Dict[str, Any]) -> Tuple[Optional
         name = str(lead["name"]).lower()
         if name in query_lower:
             # Only boost specific high-value intents when name is mentioned
-            for intent, patterns in INTENT_PATTERNS.items():
+            for intent, patterns in INTENT_REGEXES.items():
                 if intent in ["lead_profile", "nba", "guidance", "conversion_forecast", "attendance_willingness", "risk_check", "cohort_analysis", "anomaly_detection", "call_action", "email_action", "schedule", "policy_info"]:
                     for pattern in patterns:
-                        if re.search(pattern, query_lower, re.IGNORECASE):
+                        if pattern.search(query_lower):
                             return intent, 0.95, {"via": "regex", "name_mentioned": True}
     
     # Check for APEL queries FIRST (highest priority for policy_info)
@@ -271,9 +279,9 @@ def classify_intent_regex(query: str, context: Dict[str, Any]) -> Tuple[Optional
     # Check for action intents FIRST (high priority to avoid conflicts with guidance/nba)
     # Order matters: schedule > email_action > call_action to avoid conflicts
     for intent in ["schedule", "email_action", "call_action"]:
-        if intent in INTENT_PATTERNS:
-            for pattern in INTENT_PATTERNS[intent]:
-                if re.search(pattern, query_lower, re.IGNORECASE):
+        if intent in INTENT_REGEXES:
+            for pattern in INTENT_REGEXES[intent]:
+                if pattern.search(query_lower):
                     # Additional conflict resolution for action intents
                     if intent == "schedule" and re.search(r"\b(call|phone)\b", query_lower):
                         # If schedule pattern matches but "call" is mentioned, it's likely a meeting scheduler request
@@ -284,9 +292,9 @@ def classify_intent_regex(query: str, context: Dict[str, Any]) -> Tuple[Optional
                     return intent, 0.95, {"via": "action_regex"}
     
     # General pattern matching with conflict resolution
-    for intent, patterns in INTENT_PATTERNS.items():
+    for intent, patterns in INTENT_REGEXES.items():
         for pattern in patterns:
-            if re.search(pattern, query_lower, re.IGNORECASE):
+            if pattern.search(query_lower):
                 # Conflict resolution: check for overlapping intents
                 if intent == "schedule":
                     if re.search(r"\b(call|phone)\b", query_lower): 
@@ -332,15 +340,26 @@ class AIRouter:
     def __init__(self):
         self.session_id = str(uuid.uuid4())
     
+    @tracing.traced("router.classify")
     async def classify(self, query: str, context: Dict[str, Any]) -> Tuple[str, float, Dict[str, Any]]:
-        """Classify query intent using regex first, then LLM fallback"""
+        """Classify query intent using regex first, then the local model, then LLM fallback"""
         # 1. Try regex classification first (fast path)
         intent, confidence, meta = classify_intent_regex(query, context)
         if intent:
+            tracing.set_attribute("router.classifier", "regex")
             return intent, confidence, meta
-        
-        # 2. Fall back to LLM classification
-        return await classify_intent_llm(query, context)
+
+        # 2. Local CPU model; only confident predictions skip the LLM round trip
+        intent, confidence, local_meta = classify_intent_local(query)
+        if intent:
+            tracing.set_attribute("router.classifier", "local")
+            return intent, confidence, local_meta
+
+        tracing.set_attribute("router.classifier", "llm")
+
+        # 3. Fall back to LLM classification
+        intent, confidence, meta = await classify_intent_llm(query, context)
+        return intent, confidence, {**meta, "local": local_meta}
     
     async def route(self, query: str, context: Dict[str, Any]) -> RouterResponse:
         """Main routing function - always returns a response"""
@@ -410,7 +429,8 @@ class AIRouter:
                 confidence = max(confidence, regex_confidence)
                 meta = {**meta, **regex_meta, "second_pass": True}
         
-        return await handler(query, context, intent, confidence, meta)
+        with tracing.span("router.handle", **{"router.intent": intent}):
+            return await handler(query, context, intent, confidence, meta)
     
     # ───────────────────────── Handler Functions ─────────────────────────
     
@@ -1234,7 +1254,7 @@ class AIRouter:
                               telemetry={"routed_to": ["fallback_info"]})
             
             # Check if this looks like a guidance query using shared regex patterns
-            elif any(re.search(pattern, query, re.IGNORECASE) for pattern in INTENT_PATTERNS["guidance"]):
+            elif any(pattern.search(query) for pattern in INTENT_REGEXES["guidance"]):
                 # Use the narrator for guidance responses
                 from app.ai.runtime import narrate
                 
@@ -1266,7 +1286,7 @@ class AIRouter:
                               telemetry={"routed_to": ["fallback_guidance"]})
             
             # Check if this looks like an NBA query using shared regex patterns
-            elif any(re.search(pattern, query, re.IGNORECASE) for pattern in INTENT_PATTERNS["nba"]):
+            elif any(pattern.search(query) for pattern in INTENT_REGEXES["nba"]):
                 # Use the narrator for NBA responses
                 from app.ai.runtime import narrate
                 
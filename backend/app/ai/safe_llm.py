@@ -2,6 +2,8 @@ import asyncio, random, logging, os
 from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Union
 
+from app.core import tracing
+
 log = logging.getLogger(__name__)
 
 try:
@@ -67,10 +69,14 @@ class LLMCtx:
             default_model = OPENAI_MODEL if (ACTIVE_MODEL == "openai" and OPENAI_API_KEY) else GEMINI_MODEL
             self.model = _normalize_gemini_model(default_model)
 
+    @tracing.traced("llm", "client")
     async def ainvoke(self, messages: Union[str, List[Tuple[str, str]]], max_retries: int = 2) -> str:
         last = None
         selected_model_for_attempt = None
+        tracing.set_attribute("gen_ai.system", "openai" if (ACTIVE_MODEL == "openai" and OPENAI_API_KEY) else "gemini")
+        tracing.set_attribute("gen_ai.request.model", self.model)
         for attempt in range(max_retries + 1):
+            tracing.set_attribute("llm.attempts", attempt + 1)
             try:
                 if ACTIVE_MODEL == "openai" and OPENAI_API_KEY:
                     from langchain_openai import ChatOpenAI
@@ -216,4 +222,5 @@ class LLMCtx:
                 if attempt < max_retries:
                     await asyncio.sleep(0.2 + 0.25 * attempt + random.random() * 0.2)
         log.error("LLM failed after retries: %r", last)
+        tracing.set_error(f"LLM failed after retries: {last!r}")
         return ""
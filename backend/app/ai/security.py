@@ -18,6 +18,8 @@ from enum import Enum
 from collections import defaultdict, deque
 import ipaddress
 
+from app.ai.audit_store import AuditEventStore
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -520,20 +522,26 @@ class ComplianceMonitor:
 class SecurityAuditTrail:
     """Comprehensive security audit trail system"""
     
-    def __init__(self):
-        self.audit_events: List[SecurityEvent] = []
+    def __init__(self, max_events: int = 10000):
         self.incidents: List[SecurityIncident] = []
         self.policies: List[SecurityPolicy] = []
-        self.max_events = 10000
+        self.max_events = max_events
         self.max_incidents = 1000
+        # Ring buffer with per-user/type/IP indexes (bounded, O(log n) lookups)
+        self.event_store = AuditEventStore(capacity=max_events)
+    
+    @property
+    def audit_events(self) -> List[SecurityEvent]:
+        """Snapshot of retained events, oldest first"""
+        return self.event_store.events()
+    
+    @property
+    def event_count(self) -> int:
+        return len(self.event_store)
     
     def log_event(self, event: SecurityEvent):
         """Log a security event"""
-        self.audit_events.append(event)
-        
-        # Maintain storage limits
-        if len(self.audit_events) > self.max_events:
-            self.audit_events = self.audit_events[-self.max_events:]
+        self.event_store.append(event)
         
         logger.info(f"Security event logged: {event.event_type.value} - {event.description}")
     
@@ -586,14 +594,17 @@ class SecurityAuditTrail:
     def get_events_by_user(self, user_id: str, hours: int = 24) -> List[SecurityEvent]:
         """Get security events for a specific user"""
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        return [event for event in self.audit_events 
-                if event.user_id == user_id and event.timestamp > cutoff_time]
+        return self.event_store.by_user(user_id, cutoff_time)
     
     def get_events_by_type(self, event_type: SecurityEventType, hours: int = 24) -> List[SecurityEvent]:
         """Get security events by type"""
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        return [event for event in self.audit_events 
-                if event.event_type == event_type and event.timestamp > cutoff_time]
+        return self.event_store.by_type(event_type, cutoff_time)
+    
+    def get_events_since(self, hours: int = 24) -> List[SecurityEvent]:
+        """Get all security events in the time window"""
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        return self.event_store.since(cutoff_time)
     
     def get_open_incidents(self) -> List[SecurityIncident]:
         """Get all open security incidents"""
@@ -795,8 +806,7 @@ def get_security_events(user_id: str = None, event_type: SecurityEventType = Non
     elif event_type:
         return audit_trail.get_events_by_type(event_type, hours)
     else:
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        return [event for event in audit_trail.audit_events if event.timestamp > cutoff_time]
+        return audit_trail.get_events_since(hours)
 
 def get_open_incidents() -> List[SecurityIncident]:
     """Get all open security incidents"""
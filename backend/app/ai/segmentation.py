@@ -5,6 +5,7 @@ from typing import Dict, Any, List, Optional, Tuple
 import math
 from collections import defaultdict
 
+import numpy as np
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 
@@ -59,6 +60,14 @@ class SegmentationResponse(BaseModel):
     generated_at: str
 
 
+class SegmentationBatchRequest(BaseModel):
+    leads: List[SegmentationRequest]
+
+
+class SegmentationBatchResponse(BaseModel):
+    items: List[SegmentationResponse]
+
+
 # ------------------------------
 # Persona Definitions (Dynamic)
 # ------------------------------
@@ -237,30 +246,39 @@ def simple_kmeans_clustering(features: Dict[str, float], k: int = 5) -> Tuple[st
 # Cohort Matching
 # ------------------------------
 
+# Simulate cohort data (in production, this would come from database)
+COHORT_DATA = {
+    "tech_enthusiasts": {
+        "name": "Tech Enthusiasts",
+        "characteristics": ["High engagement", "Course alignment", "Source quality"],
+        "performance": 0.78
+    },
+    "career_changers": {
+        "name": "Career Changers",
+        "characteristics": ["Medium engagement", "Course interest", "Needs guidance"],
+        "performance": 0.62
+    },
+    "recent_graduates": {
+        "name": "Recent Graduates",
+        "characteristics": ["Variable engagement", "Course exploration", "Timing sensitive"],
+        "performance": 0.58
+    }
+}
+
+# (feature, label, weight) in the order find_cohort_matches adds them
+COHORT_SIGNALS = [
+    ("engagement_level", "High engagement", 0.3),
+    ("course_alignment", "Course alignment", 0.3),
+    ("source_quality", "Source quality", 0.2),
+    ("data_completeness", "Data completeness", 0.2),
+]
+
+
 def find_cohort_matches(features: Dict[str, float], primary_persona: str) -> List[CohortMatch]:
     """Find similar cohorts and performance comparisons."""
     matches = []
     
-    # Simulate cohort data (in production, this would come from database)
-    cohort_data = {
-        "tech_enthusiasts": {
-            "name": "Tech Enthusiasts",
-            "characteristics": ["High engagement", "Course alignment", "Source quality"],
-            "performance": 0.78
-        },
-        "career_changers": {
-            "name": "Career Changers",
-            "characteristics": ["Medium engagement", "Course interest", "Needs guidance"],
-            "performance": 0.62
-        },
-        "recent_graduates": {
-            "name": "Recent Graduates",
-            "characteristics": ["Variable engagement", "Course exploration", "Timing sensitive"],
-            "performance": 0.58
-        }
-    }
-    
-    for cohort_id, cohort in cohort_data.items():
+    for cohort_id, cohort in COHORT_DATA.items():
         # Calculate similarity based on shared characteristics
         shared_chars = []
         similarity_score = 0.0
@@ -302,31 +320,24 @@ def find_cohort_matches(features: Dict[str, float], primary_persona: str) -> Lis
 # Main Segmentation Logic
 # ------------------------------
 
-@router.post("/analyze", response_model=SegmentationResponse)
-async def analyze_segmentation(req: SegmentationRequest) -> SegmentationResponse:
-    """Analyze lead segmentation and assign personas."""
-    
-    # Extract features for clustering
-    features = extract_clustering_features(req.lead_features)
-    
-    # Perform clustering to find primary persona
-    primary_persona_id, cluster_confidence = simple_kmeans_clustering(features)
-    primary_persona_template = PERSONA_TEMPLATES[primary_persona_id]
-    
-    # Create primary persona
-    primary_persona = Persona(
-        id=primary_persona_id,
-        name=primary_persona_template["name"],
-        description=primary_persona_template["description"],
-        characteristics=primary_persona_template["characteristics"],
-        conversion_rate=primary_persona_template["conversion_rate"],
-        avg_eta_days=primary_persona_template["avg_eta_days"],
+def _primary_persona(persona_id: str, cluster_confidence: float) -> Persona:
+    template = PERSONA_TEMPLATES[persona_id]
+    return Persona(
+        id=persona_id,
+        name=template["name"],
+        description=template["description"],
+        characteristics=template["characteristics"],
+        conversion_rate=template["conversion_rate"],
+        avg_eta_days=template["avg_eta_days"],
         size=150,  # Simulated cohort size
         confidence=round(cluster_confidence, 3),
-        behavioral_signatures=primary_persona_template["behavioral_signatures"]
+        behavioral_signatures=template["behavioral_signatures"]
     )
-    
-    # Find secondary personas (similar but not primary)
+
+
+def _secondary_personas(primary_persona_id: str) -> List[Persona]:
+    """Personas similar to the primary one; depends only on the templates"""
+    primary_persona_template = PERSONA_TEMPLATES[primary_persona_id]
     secondary_personas = []
     for persona_id, template in PERSONA_TEMPLATES.items():
         if persona_id != primary_persona_id:
@@ -349,32 +360,164 @@ async def analyze_segmentation(req: SegmentationRequest) -> SegmentationResponse
                     confidence=round(similarity, 3),
                     behavioral_signatures=template["behavioral_signatures"]
                 ))
+    return secondary_personas
+
+
+def _behavioral_cluster(cluster_confidence: float) -> str:
+    if cluster_confidence > 0.8:
+        return "high_confidence"
+    elif cluster_confidence > 0.6:
+        return "medium_confidence"
+    return "low_confidence"
+
+
+def segment_lead(req: SegmentationRequest) -> SegmentationResponse:
+    """Scalar segmentation for one lead (reference for segment_batch)"""
+    
+    # Extract features for clustering
+    features = extract_clustering_features(req.lead_features)
+    
+    # Perform clustering to find primary persona
+    primary_persona_id, cluster_confidence = simple_kmeans_clustering(features)
     
     # Find cohort matches
     cohort_matches = []
     if req.include_cohort_matching:
         cohort_matches = find_cohort_matches(features, primary_persona_id)
     
-    # Determine behavioral cluster
-    if cluster_confidence > 0.8:
-        behavioral_cluster = "high_confidence"
-    elif cluster_confidence > 0.6:
-        behavioral_cluster = "medium_confidence"
-    else:
-        behavioral_cluster = "low_confidence"
-    
     return SegmentationResponse(
         lead_id=req.lead_id,
-        primary_persona=primary_persona,
-        secondary_personas=secondary_personas,
+        primary_persona=_primary_persona(primary_persona_id, cluster_confidence),
+        secondary_personas=_secondary_personas(primary_persona_id),
         cohort_matches=cohort_matches,
-        behavioral_cluster=behavioral_cluster,
+        behavioral_cluster=_behavioral_cluster(cluster_confidence),
         cluster_confidence=round(cluster_confidence, 3),
         persona_confidence=round(cluster_confidence, 3),
         generated_at=dt.datetime.now(dt.timezone.utc).isoformat()
     )
 
 
+# ------------------------------
+# Batch Segmentation
+# ------------------------------
+
+_CLUSTER_FEATURES = ["engagement_level", "data_completeness", "source_reliability", "course_alignment",
+                     "behavioral_consistency"]
+_PERSONA_IDS = list(PERSONA_TEMPLATES)
+
+
+def _persona_centroids() -> np.ndarray:
+    """(n_personas, 5) centroids in the order simple_kmeans_clustering builds them"""
+    return np.array([
+        [
+            template["behavioral_signatures"].get("engagement_level", 0.5),
+            template["behavioral_signatures"].get("data_completeness", 0.5),
+            template["behavioral_signatures"].get("source_quality", 0.5),
+            template["behavioral_signatures"].get("course_alignment", 0.5),
+            0.5,
+        ]
+        for template in PERSONA_TEMPLATES.values()
+    ])
+
+
+# Built once per process (before fork when preloaded) and shared read-only
+_PERSONA_CENTROIDS = _persona_centroids()
+_PERSONA_CENTROIDS.flags.writeable = False
+
+
+def cluster_batch(feature_rows: List[Dict[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    simple_kmeans_clustering for many leads: distances from every lead to every
+    persona centroid as one (n_leads, n_personas) array. Returns (persona index,
+    confidence) arrays.
+    """
+    X = np.array([[f.get(name, 0.0) for name in _CLUSTER_FEATURES] for f in feature_rows],
+                 dtype=np.float64).reshape(len(feature_rows), len(_CLUSTER_FEATURES))
+    centroids = _PERSONA_CENTROIDS
+    # Accumulate squared differences feature by feature, like the scalar sum
+    squared = np.zeros((len(X), len(centroids)))
+    for j in range(X.shape[1]):
+        squared = squared + (X[:, j:j + 1] - centroids[None, :, j]) ** 2
+    distances = np.sqrt(squared)
+    closest = distances.argmin(axis=1)
+    nearest = distances[np.arange(len(X)), closest]
+    confidence = np.maximum(0.1, 1.0 - nearest / distances.max(axis=1))
+    return closest, confidence
+
+
+def _cohort_similarity(feature_rows: List[Dict[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """find_cohort_matches' shared-signal mask (n_leads, n_signals) and similarity score"""
+    signals = np.array([[f.get(name, 0.0) for name, _, _ in COHORT_SIGNALS] for f in feature_rows],
+                       dtype=np.float64).reshape(len(feature_rows), len(COHORT_SIGNALS)) > 0.7
+    score = np.zeros(len(feature_rows))
+    for j, (_, _, weight) in enumerate(COHORT_SIGNALS):
+        score = score + np.where(signals[:, j], weight, 0.0)
+    return signals, score
+
+
+def segment_batch(requests: List[SegmentationRequest]) -> List[SegmentationResponse]:
+    """
+    segment_lead for many leads: features are extracted per lead, then centroid
+    distances and cohort similarity are array operations over the whole batch
+    and the persona-only parts (secondary personas) are built once per persona.
+    Returns the same responses as the scalar path.
+    """
+    if not requests:
+        return []
+    feature_rows = [extract_clustering_features(req.lead_features) for req in requests]
+    closest, confidences = cluster_batch(feature_rows)
+    signals, similarity = _cohort_similarity(feature_rows)
+
+    secondary: Dict[str, List[Persona]] = {}
+    generated_at = dt.datetime.now(dt.timezone.utc).isoformat()
+    responses = []
+    for req, persona_index, cluster_confidence, shared, score in zip(
+            requests, closest.tolist(), confidences.tolist(), signals.tolist(), similarity.tolist()):
+        persona_id = _PERSONA_IDS[persona_index]
+        if persona_id not in secondary:
+            secondary[persona_id] = _secondary_personas(persona_id)
+
+        cohort_matches = []
+        if req.include_cohort_matching and score > 0.1:
+            shared_chars = [label for (_, label, _), on in zip(COHORT_SIGNALS, shared) if on]
+            persona_performance = PERSONA_TEMPLATES[persona_id]["conversion_rate"]
+            # Every cohort gets the same similarity, so the stable sort keeps COHORT_DATA order
+            cohort_matches = [
+                CohortMatch(
+                    cohort_id=cohort_id,
+                    cohort_name=cohort["name"],
+                    similarity_score=round(score, 3),
+                    shared_characteristics=list(shared_chars),
+                    performance_difference=round(cohort["performance"] - persona_performance, 3)
+                )
+                for cohort_id, cohort in COHORT_DATA.items()
+            ][:3]
+
+        responses.append(SegmentationResponse(
+            lead_id=req.lead_id,
+            primary_persona=_primary_persona(persona_id, cluster_confidence),
+            secondary_personas=secondary[persona_id],
+            cohort_matches=cohort_matches,
+            behavioral_cluster=_behavioral_cluster(cluster_confidence),
+            cluster_confidence=round(cluster_confidence, 3),
+            persona_confidence=round(cluster_confidence, 3),
+            generated_at=generated_at
+        ))
+    return responses
+
+
+@router.post("/analyze", response_model=SegmentationResponse)
+async def analyze_segmentation(req: SegmentationRequest) -> SegmentationResponse:
+    """Analyze lead segmentation and assign personas."""
+    return segment_lead(req)
+
+
+@router.post("/analyze/batch", response_model=SegmentationBatchResponse)
+async def analyze_segmentation_batch(req: SegmentationBatchRequest) -> SegmentationBatchResponse:
+    """Analyze segmentation for many leads in one vectorised pass."""
+    return SegmentationBatchResponse(items=segment_batch(req.leads))
+
+
 @router.get("/personas")
 async def get_personas() -> Dict[str, Any]:
     """Get all available personas and their characteristics."""
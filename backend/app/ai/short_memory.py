@@ -2,10 +2,10 @@ from __future__ import annotations
 
 from collections import deque
 from typing import Deque, Dict, List, Tuple
-import re
 import time
 
 from app.ai.privacy_utils import anonymise_body, safe_preview
+from app.ai.redaction_engine import MEMORY_PROFILE
 
 
 # In-proc rolling buffers keyed by a session-like key
@@ -28,10 +28,8 @@ _LAST_STYLE_ROTATION = 0
 def _sanitize_text(text: str) -> str:
     """Remove emails/phones; preserve [S#] lines via anonymise_body."""
     t = anonymise_body(text or "", enabled=True)
-    # Basic email/phone scrubbing
-    t = re.sub(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", "[redacted]", t)
-    t = re.sub(r"\b\+?\d[\d\s().-]{6,}\b", "[redacted]", t)
-    return t.strip()
+    # Basic email/phone scrubbing (single compiled pass)
+    return MEMORY_PROFILE.redact(t).strip()
 
 
 def _rotate_style_shot():
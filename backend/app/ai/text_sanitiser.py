@@ -5,6 +5,8 @@ Removes headings, meta self-talk, and enforces 1-2 sentence format.
 import re
 from typing import Optional
 
+from app.ai.redaction_engine import CONTACT_PROFILE
+
 # Forbidden heading patterns (case-insensitive)
 FORBIDDEN_HEADINGS = [
     r"\*\*what you know\*\*",
@@ -179,6 +181,4 @@ def scrub_contact_info(text: str, query: str | None = None) -> str:
         return text
         
     # Remove email addresses and phone numbers
-    text = re.sub(r"\b(?:\+?\d[\d\s\-()]{6,}|[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,})\b", "", text, flags=re.IGNORECASE)
-    
-    return text
+    return CONTACT_PROFILE.redact(text)
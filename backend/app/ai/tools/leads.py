@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from pydantic import BaseModel
 from datetime import datetime, timezone
 
 from app.db.db import fetch as pg_fetch
 from app.ai import OPENAI_API_KEY, GEMINI_API_KEY, ACTIVE_MODEL, OPENAI_MODEL, GEMINI_MODEL
+from app.ai.cache import _TTLCache, make_key
 
 def _extract_json_object(text: str) -> Optional[Dict[str, Any]]:
     """Best-effort extraction of a single JSON object from free-form text.
@@ -212,62 +215,83 @@ def _rule_score(lead: LeadLite) -> tuple[float, List[str], str]:
     return score, reasons, next_action
 
 
+# Explanations are requested in bounded chunks run concurrently, so one slow
+# or malformed LLM response only degrades its own chunk to rule-based text.
+EXPLAIN_CHUNK_SIZE = int(os.getenv("LEADS_EXPLAIN_CHUNK_SIZE", "20"))
+EXPLAIN_CONCURRENCY = int(os.getenv("LEADS_EXPLAIN_CONCURRENCY", "4"))
+EXPLAIN_CHUNK_TIMEOUT_S = float(os.getenv("LEADS_EXPLAIN_CHUNK_TIMEOUT_S", "25"))
+
+# Per-lead explanations, keyed by (lead_id, feature fingerprint, model version)
+_EXPLANATION_CACHE = _TTLCache(
+    ttl_s=int(os.getenv("LEADS_EXPLAIN_CACHE_TTL_S", "21600")),
+    max_items=int(os.getenv("LEADS_EXPLAIN_CACHE_MAX", "20000")),
+)
+
+
+async def _ml_scores(items: List[LeadLite]) -> Dict[str, Any]:
+    """Run the hardened ML pipeline and index its predictions by lead id"""
+    from app.ai.advanced_ml_hardened import ml_pipeline
+
+    lead_ids = [item.id for item in items]
+    print(f"🤖 Getting ML predictions for {len(lead_ids)} leads...")
+
+    ml_response = await ml_pipeline.predict_batch_hardened(lead_ids)
+    print(f"✅ ML predictions complete. Model: {ml_response.model_version}")
+    return {
+        "model_version": ml_response.model_version,
+        "scores": {pred.lead_id: pred.probability for pred in ml_response.predictions},
+        "confidence": {pred.lead_id: pred.confidence for pred in ml_response.predictions},
+        "calibrated": {pred.lead_id: pred.calibrated_probability for pred in ml_response.predictions},
+    }
+
+
+def _insight_fields(item: LeadLite, primary_score: float, ai_insight: Dict[str, Any]) -> Dict[str, Any]:
+    """Explanation fields of a triage row; escalation is enforced when calibrated >= 0.7"""
+    should_escalate = (primary_score >= 70.0)
+    return {
+        "reasons": ai_insight.get("reasons", []),
+        "next_action": (
+            ai_insight.get("next_action", "follow_up")
+            if not should_escalate else "schedule_interview_urgent"
+        ),
+        "insight": ai_insight.get("insight", ""),
+        "suggested_content": ai_insight.get("suggested_content", ""),
+        "action_rationale": ai_insight.get("action_rationale", _generate_action_rationale(item, primary_score / 100.0)),
+        "escalate_to_interview": should_escalate or bool(ai_insight.get("escalate_to_interview", False)),
+        "feature_coverage": ai_insight.get("feature_coverage", 0.0)
+    }
+
+
+def _combine_row(item: LeadLite, ml: Dict[str, Any], ai_insight: Dict[str, Any]) -> Dict[str, Any]:
+    ml_score = ml["scores"].get(item.id, 0.0) * 100  # Convert to 0-100 scale
+    ml_conf = ml["confidence"].get(item.id, 0.0)
+    ml_cal = ml["calibrated"].get(item.id, 0.0) * 100
+
+    # Use calibrated probability as primary score
+    primary_score = ml_cal if ml_cal > 0 else ml_score
+
+    return {
+        "id": item.id,
+        "score": round(primary_score, 1),  # ML score is primary
+        "ml_confidence": round(ml_conf, 2),
+        "ml_probability": round(ml_score / 100, 3),
+        "ml_calibrated": round(ml_cal / 100, 3),
+        **_insight_fields(item, primary_score, ai_insight),
+    }
+
+
 async def leads_triage(items: List[LeadLite]) -> List[Dict[str, Any]]:
     """
     ML-first triage using the hardened ML pipeline as primary scoring engine.
     LLM provides explanations and next actions, not scores.
     """
     try:
-        # 1. Get ML predictions using the hardened pipeline
-        from app.ai.advanced_ml_hardened import ml_pipeline
-        
-        lead_ids = [item.id for item in items]
-        print(f"🤖 Getting ML predictions for {len(lead_ids)} leads...")
-        
-        ml_response = await ml_pipeline.predict_batch_hardened(lead_ids)
-        
-        # 2. Create base scores from ML predictions
-        ml_scores = {pred.lead_id: pred.probability for pred in ml_response.predictions}
-        ml_confidence = {pred.lead_id: pred.confidence for pred in ml_response.predictions}
-        ml_calibrated = {pred.lead_id: pred.calibrated_probability for pred in ml_response.predictions}
-        
-        print(f"✅ ML predictions complete. Model: {ml_response.model_version}")
-        
-        # 3. Use LLM for explanations and next actions only
-        ai_insights = await get_ai_explanations(items, ml_scores)
-        
-        # 4. Combine ML scores with AI insights
-        combined = []
-        for item in items:
-            ml_score = ml_scores.get(item.id, 0.0) * 100  # Convert to 0-100 scale
-            ml_conf = ml_confidence.get(item.id, 0.0)
-            ml_cal = ml_calibrated.get(item.id, 0.0) * 100
-            ai_insight = ai_insights.get(item.id, {})
-            
-            # Use calibrated probability as primary score
-            primary_score = ml_cal if ml_cal > 0 else ml_score
-            
-            # Enforce escalation when calibrated >= 0.7
-            should_escalate = (primary_score >= 70.0)
-
-            combined.append({
-                    "id": item.id,
-                    "score": round(primary_score, 1),  # ML score is primary
-                    "ml_confidence": round(ml_conf, 2),
-                    "ml_probability": round(ml_score / 100, 3),
-                    "ml_calibrated": round(ml_cal / 100, 3),
-                    "reasons": ai_insight.get("reasons", []),
-                    "next_action": (
-                        ai_insight.get("next_action", "follow_up")
-                        if not should_escalate else "schedule_interview_urgent"
-                    ),
-                    "insight": ai_insight.get("insight", ""),
-                    "suggested_content": ai_insight.get("suggested_content", ""),
-                    "action_rationale": ai_insight.get("action_rationale", _generate_action_rationale(item, ml_cal / 100.0)),
-                    "escalate_to_interview": should_escalate or bool(ai_insight.get("escalate_to_interview", False)),
-                    "feature_coverage": ai_insight.get("feature_coverage", 0.0)
-                })
-        
+        ml = await _ml_scores(items)
+
+        # LLM for explanations and next actions only
+        ai_insights = await get_ai_explanations(items, ml["scores"], ml["model_version"])
+
+        combined = [_combine_row(item, ml, ai_insights.get(item.id, {})) for item in items]
         return sorted(combined, key=lambda x: x['score'], reverse=True)
         
     except Exception as e:
@@ -275,153 +299,258 @@ async def leads_triage(items: List[LeadLite]) -> List[Dict[str, Any]]:
         return await leads_triage_rules_fallback(items)
 
 
-async def get_ai_explanations(items: List[LeadLite], ml_scores: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+async def leads_triage_stream(items: List[LeadLite]) -> AsyncIterator[Dict[str, Any]]:
     """
-    Get AI explanations for ML scores using LLM.
-    Focuses on explaining WHY the ML model gave this score, not changing it.
+    Incremental triage: yields {"type": "scores", "items": [...]} with ML-ranked
+    rows (no LLM explanations yet) as soon as predictions are ready, then one
+    {"type": "explanations", "items": {lead_id: fields}} patch per explanation
+    chunk as it completes. Falls back to a single rules-based "scores" event.
     """
-    if ACTIVE_MODEL == "none":
-        # Return basic explanations without LLM
-        explanations = {}
-        for item in items:
-            score = ml_scores.get(item.id, 0.0)
-            explanations[item.id] = {
-                "reasons": _generate_basic_reasons(item, score),
-                "next_action": _suggest_basic_action(item, score)[0],
-                "suggested_content": _suggest_basic_action(item, score)[1],
-                "insight": f"ML score: {score:.1%}",
-                "action_rationale": _generate_action_rationale(item, score),
-                "escalate_to_interview": True if (score >= 0.7) else False,
-                "feature_coverage": 1.0
-            }
-        return explanations
+    try:
+        ml = await _ml_scores(items)
+    except Exception as e:
+        print(f"⚠️ ML-first triage failed: {e}, falling back to rules")
+        yield {"type": "scores", "source": "rules", "items": await leads_triage_rules_fallback(items)}
+        return
+
+    rows = sorted((_combine_row(item, ml, {}) for item in items), key=lambda x: x["score"], reverse=True)
+    yield {"type": "scores", "source": "ml", "model_version": ml["model_version"], "items": rows}
+
+    by_id = {item.id: item for item in items}
+    primary = {row["id"]: row["score"] for row in rows}
+    async for explanations in iter_ai_explanations(items, ml["scores"], ml["model_version"]):
+        patch = {
+            lead_id: _insight_fields(by_id[lead_id], primary[lead_id], insight)
+            for lead_id, insight in explanations.items() if lead_id in by_id
+        }
+        if patch:
+            yield {"type": "explanations", "items": patch}
+
+
+def _basic_explanation(item: LeadLite, score: float) -> Dict[str, Any]:
+    """Rule-based explanation used without an LLM or when a chunk fails"""
+    next_action, suggested_content = _suggest_basic_action(item, score)
+    return {
+        "reasons": _generate_basic_reasons(item, score),
+        "next_action": next_action,
+        "suggested_content": suggested_content,
+        "insight": f"ML score: {score:.1%}",
+        "action_rationale": _generate_action_rationale(item, score),
+        "escalate_to_interview": True if (score >= 0.7) else False,
+        "feature_coverage": 1.0
+    }
+
+
+def _explanation_features(item: LeadLite, ml_score: float) -> Dict[str, Any]:
+    """Enriched per-lead features sent to the LLM"""
+    return {
+        "id": item.id,
+        "name": item.name,
+        "lead_score": item.lead_score or 0,
+        "engagement_score": item.engagement_score or 0,
+        "conversion_probability": item.conversion_probability or 0,
+        "touchpoint_count": item.touchpoint_count or 0,
+        "days_since_creation": item.days_since_creation or 0,
+        "course": item.course or "unknown",
+        "campus": item.campus or "unknown",
+        "engagement_level": item.engagement_level or "low",
+        "status": item.status or "new",
+        "last_activity_at": item.last_activity_at.isoformat() if item.last_activity_at else None,
+        "ml_score": ml_score,
+        "ml_percentage": f"{ml_score:.1%}"
+    }
+
+
+def _explanation_cache_key(features: Dict[str, Any], model_version: Optional[str]) -> str:
+    # days_since_creation is recomputed from NOW() on every query; whole days
+    # and a rounded score keep the fingerprint stable between triage calls
+    fingerprint = {
+        **features,
+        "days_since_creation": int(features["days_since_creation"]),
+        "ml_score": round(features["ml_score"], 2),
+        "ml_percentage": None,
+    }
+    return make_key(f"leads_explain:{features['id']}:{model_version}:{ACTIVE_MODEL}", fingerprint)
+
+
+def _get_explainer_llm():
+    if ACTIVE_MODEL == "openai" and OPENAI_API_KEY:
+        from langchain_openai import ChatOpenAI
+        print(f"🤖 Using OpenAI for explanations: {OPENAI_MODEL}")
+        return ChatOpenAI(model=OPENAI_MODEL, temperature=0.3, api_key=OPENAI_API_KEY)
+    if ACTIVE_MODEL == "gemini" and GEMINI_API_KEY:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        print(f"🤖 Using Gemini for explanations: {GEMINI_MODEL}")
+        return ChatGoogleGenerativeAI(
+            model=GEMINI_MODEL,
+            temperature=0.3,
+            google_api_key=GEMINI_API_KEY
+        )
+    raise Exception(f"No valid AI model available. Active: {ACTIVE_MODEL}")
+
+
+def _load_triage_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+    from pathlib import Path
+
+    schema = Path(__file__).resolve().parents[1] / "schema" / "LEADS_SCHEMA.md"
+    triage_prompt_path = Path(__file__).resolve().parents[1] / "prompts" / "leads_triage.md"
+
+    if not schema.exists() or not triage_prompt_path.exists():
+        print("⚠️  Prompt files not found, using basic explanations")
+        raise Exception("Prompt files missing")
+
+    schema_text = schema.read_text(encoding="utf-8")
+    prompt = ChatPromptTemplate.from_template(triage_prompt_path.read_text(encoding="utf-8"))
+    return prompt, schema_text
+
+
+def _parse_explanations(text: str) -> Dict[str, Dict[str, Any]]:
+    """Parse an LLM response into {lead_id: explanation}"""
+    import json
+
+    # Clean the response text - remove any markdown formatting
+    cleaned_text = text.strip()
+    if cleaned_text.startswith("```json"):
+        cleaned_text = cleaned_text[7:]
+    if cleaned_text.endswith("```"):
+        cleaned_text = cleaned_text[:-3]
+    cleaned_text = cleaned_text.strip()
 
     try:
-        if ACTIVE_MODEL == "openai" and OPENAI_API_KEY:
-            from langchain_openai import ChatOpenAI
-            llm = ChatOpenAI(model=OPENAI_MODEL, temperature=0.3, api_key=OPENAI_API_KEY)
-            print(f"🤖 Using OpenAI for explanations: {OPENAI_MODEL}")
-        elif ACTIVE_MODEL == "gemini" and GEMINI_API_KEY:
-            from langchain_google_genai import ChatGoogleGenerativeAI
-            llm = ChatGoogleGenerativeAI(
-                model=GEMINI_MODEL,
-                temperature=0.3,
-                google_api_key=GEMINI_API_KEY
-            )
-            print(f"🤖 Using Gemini for explanations: {GEMINI_MODEL}")
+        raw_parsed = json.loads(cleaned_text)
+    except Exception:
+        raw_parsed = None
+
+    # Normalize to a list of items with ids
+    def to_items(obj: Any) -> List[Dict[str, Any]]:
+        if isinstance(obj, list):
+            return [x for x in obj if isinstance(x, dict)]
+        if isinstance(obj, dict):
+            # Common wrappers
+            for key in ["items", "results", "explanations", "data"]:
+                if key in obj and isinstance(obj[key], list):
+                    return [x for x in obj[key] if isinstance(x, dict)]
+            # Single object case
+            return [obj]
+        return []
+
+    items_list = to_items(raw_parsed)
+    if not items_list:
+        # Last resort: attempt best-effort extraction of a JSON object and retry
+        extracted = _extract_json_object(cleaned_text)
+        items_list = to_items(extracted) if extracted else []
+
+    explanations: Dict[str, Dict[str, Any]] = {}
+    for itm in items_list:
+        lead_id = itm.get("id") or itm.get("lead_id") or itm.get("uid")
+        if not lead_id:
+            continue
+        explanations[str(lead_id)] = {
+            "reasons": itm.get("reasons", []),
+            "next_action": itm.get("next_action", "follow_up"),
+            "insight": itm.get("insight", ""),
+            "suggested_content": itm.get("suggested_content", ""),
+            "action_rationale": itm.get("action_rationale", ""),
+            "escalate_to_interview": bool(itm.get("escalate_to_interview", False)),
+            "feature_coverage": 1.0  # Assume full coverage for now
+        }
+    if not explanations:
+        print(f"🔍 Raw response: {text[:500]}")
+        raise ValueError("No valid explanation items with ids found")
+    return explanations
+
+
+async def iter_ai_explanations(items: List[LeadLite], ml_scores: Dict[str, float],
+                               model_version: Optional[str] = None) -> AsyncIterator[Dict[str, Dict[str, Any]]]:
+    """
+    Yield {lead_id: explanation} batches as they become available: cached
+    explanations first, then each LLM chunk as it completes. Every lead is
+    covered exactly once; failed chunks yield basic explanations.
+    """
+    if not items:
+        return
+    if ACTIVE_MODEL == "none":
+        # Return basic explanations without LLM
+        yield {item.id: _basic_explanation(item, ml_scores.get(item.id, 0.0)) for item in items}
+        return
+
+    cached: Dict[str, Dict[str, Any]] = {}
+    pending: List[Tuple[LeadLite, Dict[str, Any], str]] = []
+    for item in items:
+        features = _explanation_features(item, ml_scores.get(item.id, 0.0))
+        key = _explanation_cache_key(features, model_version)
+        hit = _EXPLANATION_CACHE.get(key)
+        if hit is not None:
+            cached[item.id] = hit
         else:
-            raise Exception(f"No valid AI model available. Active: {ACTIVE_MODEL}")
+            pending.append((item, features, key))
+    if cached:
+        print(f"✅ Explanation cache hits: {len(cached)}/{len(items)}")
+        yield cached
+    if not pending:
+        return
 
-        from langchain_core.prompts import ChatPromptTemplate
-        from pathlib import Path
-        import json
-        
-        schema = Path(__file__).resolve().parents[1] / "schema" / "LEADS_SCHEMA.md"
-        triage_prompt_path = Path(__file__).resolve().parents[1] / "prompts" / "leads_triage.md"
-        
-        if not schema.exists() or not triage_prompt_path.exists():
-            print("⚠️  Prompt files not found, using basic explanations")
-            raise Exception("Prompt files missing")
-            
-        schema_text = schema.read_text(encoding="utf-8")
-        prompt_text = triage_prompt_path.read_text(encoding="utf-8")
-        prompt = ChatPromptTemplate.from_template(prompt_text)
+    def basic_for(chunk) -> Dict[str, Dict[str, Any]]:
+        return {item.id: _basic_explanation(item, ml_scores.get(item.id, 0.0)) for item, _, _ in chunk}
 
-        # Prepare enriched features for AI
-        features = []
-        for item in items:
-            ml_score = ml_scores.get(item.id, 0.0)
-            features.append({
-                "id": item.id,
-                "name": item.name,
-                "lead_score": item.lead_score or 0,
-                "engagement_score": item.engagement_score or 0,
-                "conversion_probability": item.conversion_probability or 0,
-                "touchpoint_count": item.touchpoint_count or 0,
-                "days_since_creation": item.days_since_creation or 0,
-                "course": item.course or "unknown",
-                "campus": item.campus or "unknown",
-                "engagement_level": item.engagement_level or "low",
-                "status": item.status or "new",
-                "last_activity_at": item.last_activity_at.isoformat() if item.last_activity_at else None,
-                "ml_score": ml_score,
-                "ml_percentage": f"{ml_score:.1%}"
-            })
-        
-        messages = prompt.format_messages(schema=schema_text, leads=json.dumps(features))
-        resp = await llm.ainvoke(messages)
-        text = resp.content if hasattr(resp, "content") else str(resp)
-        
-        try:
-            # Clean the response text - remove any markdown formatting
-            cleaned_text = text.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:]
-            if cleaned_text.endswith("```"):
-                cleaned_text = cleaned_text[:-3]
-            cleaned_text = cleaned_text.strip()
-            
-            print(f"🔍 LLM Response (first 200 chars): {cleaned_text[:200]}")
-            
-            raw_parsed = json.loads(cleaned_text)
-
-            # Normalize to a list of items with ids
-            def to_items(obj: Any) -> List[Dict[str, Any]]:
-                if isinstance(obj, list):
-                    return [x for x in obj if isinstance(x, dict)]
-                if isinstance(obj, dict):
-                    # Common wrappers
-                    for key in ["items", "results", "explanations", "data"]:
-                        if key in obj and isinstance(obj[key], list):
-                            return [x for x in obj[key] if isinstance(x, dict)]
-                    # Single object case
-                    return [obj]
-                return []
-
-            items_list = to_items(raw_parsed)
-            if not items_list:
-                # Last resort: attempt best-effort extraction of a JSON object and retry
-                extracted = _extract_json_object(cleaned_text)
-                items_list = to_items(extracted) if extracted else []
-
-            explanations: Dict[str, Dict[str, Any]] = {}
-            for itm in items_list:
-                lead_id = itm.get("id") or itm.get("lead_id") or itm.get("uid")
-                if not lead_id:
-                    continue
-                explanations[str(lead_id)] = {
-                    "reasons": itm.get("reasons", []),
-                    "next_action": itm.get("next_action", "follow_up"),
-                    "insight": itm.get("insight", ""),
-                    "suggested_content": itm.get("suggested_content", ""),
-                    "action_rationale": itm.get("action_rationale", ""),
-                    "escalate_to_interview": bool(itm.get("escalate_to_interview", False)),
-                    "feature_coverage": 1.0  # Assume full coverage for now
-                }
-            if explanations:
-                return explanations
-            raise ValueError("No valid explanation items with ids found")
-        except Exception as e:
-            print(f"⚠️  JSON parsing failed: {e}")
-            print(f"🔍 Raw response: {text[:500]}")
-            raise e
-            
+    try:
+        llm = _get_explainer_llm()
+        prompt, schema_text = _load_triage_prompt()
     except Exception as e:
         print(f"⚠️  AI explanations failed: {e}, using basic explanations")
-        # Fallback to basic explanations
-        explanations = {}
-        for item in items:
-            score = ml_scores.get(item.id, 0.0)
-            explanations[item.id] = {
-                "reasons": _generate_basic_reasons(item, score),
-                "next_action": _suggest_basic_action(item, score)[0],
-                "suggested_content": _suggest_basic_action(item, score)[1],
-                "insight": f"ML score: {score:.1%}",
-                "action_rationale": _generate_action_rationale(item, score),
-                "escalate_to_interview": True if (score >= 0.7) else False,
-                "feature_coverage": 1.0
-            }
-        return explanations
+        yield basic_for(pending)
+        return
+
+    import json
+
+    semaphore = asyncio.Semaphore(max(1, EXPLAIN_CONCURRENCY))
+    size = max(1, EXPLAIN_CHUNK_SIZE)
+    chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+
+    async def explain_chunk(chunk) -> Dict[str, Dict[str, Any]]:
+        async with semaphore:
+            try:
+                messages = prompt.format_messages(
+                    schema=schema_text, leads=json.dumps([features for _, features, _ in chunk])
+                )
+                resp = await asyncio.wait_for(llm.ainvoke(messages), timeout=EXPLAIN_CHUNK_TIMEOUT_S)
+                text = resp.content if hasattr(resp, "content") else str(resp)
+                parsed = _parse_explanations(text)
+            except Exception as e:
+                print(f"⚠️  Explanation chunk of {len(chunk)} failed: {e!r}, using basic explanations")
+                return basic_for(chunk)
+
+            out: Dict[str, Dict[str, Any]] = {}
+            for item, _, key in chunk:
+                explanation = parsed.get(item.id)
+                if explanation is None:
+                    out[item.id] = _basic_explanation(item, ml_scores.get(item.id, 0.0))
+                else:
+                    # Only LLM output is cached so fallbacks get retried next time
+                    _EXPLANATION_CACHE.set(key, explanation)
+                    out[item.id] = explanation
+            return out
+
+    tasks = [asyncio.create_task(explain_chunk(chunk)) for chunk in chunks]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def get_ai_explanations(items: List[LeadLite], ml_scores: Dict[str, float],
+                              model_version: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Get AI explanations for ML scores using LLM.
+    Focuses on explaining WHY the ML model gave this score, not changing it.
+    """
+    explanations: Dict[str, Dict[str, Any]] = {}
+    async for batch in iter_ai_explanations(items, ml_scores, model_version):
+        explanations.update(batch)
+    return explanations
 
 
 def _generate_basic_reasons(item: LeadLite, ml_score: float) -> List[str]:
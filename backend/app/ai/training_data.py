@@ -0,0 +1,216 @@
+"""
+Streaming training-data loader for the advanced ML pipeline
+
+load_training_data used to fetch() up to `limit` rows as dicts and build a
+DataFrame from them, holding every row three times (tuples, dicts, frame)
+with object columns. This loader instead streams a binary COPY on a dedicated
+connection (app.db.db.copy_rows) and converts it chunk by chunk into typed
+columns: float64/int8 arrays for numbers, pandas categoricals for the
+low-cardinality text columns. Contact PII (names, email, phone) is never
+selected - the models do not use it.
+
+An optional Parquet snapshot (requires pyarrow) lets repeated training runs
+skip Postgres entirely:
+- snapshot="off": always query (default)
+- snapshot="auto": reuse a snapshot younger than ML_TRAINING_SNAPSHOT_MAX_AGE_S
+  for the same query, otherwise query and write one
+- snapshot="refresh": query and overwrite the snapshot
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path(os.getenv(
+    "ML_TRAINING_SNAPSHOT_DIR", str(Path(__file__).parent.parent.parent / "models" / "training_snapshots")
+))
+SNAPSHOT_MAX_AGE_S = float(os.getenv("ML_TRAINING_SNAPSHOT_MAX_AGE_S", "86400"))
+CHUNK_ROWS = int(os.getenv("ML_TRAINING_CHUNK_ROWS", "50000"))
+
+SNAPSHOT_MODES = ("off", "auto", "refresh")
+
+# (column, SQL expression, Postgres type for binary COPY, pandas kind)
+TRAINING_COLUMNS: List[Tuple[str, str, str, str]] = [
+    ("id", "p.id::text", "text", "string"),
+    ("lead_score", "p.lead_score::float8", "float8", "float"),
+    ("lifecycle_state", "p.lifecycle_state::text", "text", "category"),
+    ("created_at", "p.created_at::timestamptz", "timestamptz", "datetime"),
+    ("engagement_score", "p.engagement_score::float8", "float8", "float"),
+    ("conversion_probability", "p.conversion_probability::float8", "float8", "float"),
+    ("touchpoint_count", "p.touchpoint_count::float8", "float8", "float"),
+    ("status", "p.status::text", "text", "category"),
+    ("days_since_creation", "(EXTRACT(EPOCH FROM (NOW() - p.created_at)) / 86400.0)::float8", "float8", "float"),
+    ("has_application", "(CASE WHEN a.id IS NOT NULL THEN 1 ELSE 0 END)::int4", "int4", "int"),
+    ("application_source", "COALESCE(a.source, 'unknown')::text", "text", "category"),
+    ("programme_name", "COALESCE(pr.name, 'unknown')::text", "text", "category"),
+    ("campus_name", "COALESCE(c.name, 'unknown')::text", "text", "category"),
+    ("engagement_level", """(CASE
+                    WHEN p.engagement_score >= 80 THEN 'high'
+                    WHEN p.engagement_score >= 50 THEN 'medium'
+                    ELSE 'low'
+                END)::text""", "text", "category"),
+    ("created_month", "EXTRACT(MONTH FROM p.created_at)::float8", "float8", "float"),
+    ("created_day_of_week", "EXTRACT(DOW FROM p.created_at)::float8", "float8", "float"),
+    ("created_hour", "EXTRACT(HOUR FROM p.created_at)::float8", "float8", "float"),
+]
+
+
+def training_query(limit: Optional[int] = None) -> str:
+    """SELECT for COPY; limit is inlined (COPY takes no parameters) after int()"""
+    select = ",\n        ".join(f"{expr} AS {name}" for name, expr, _, _ in TRAINING_COLUMNS)
+    sql = f"""
+    SELECT
+        {select}
+    FROM people p
+    LEFT JOIN applications a ON p.id = a.person_id
+    LEFT JOIN programmes pr ON a.programme_id = pr.id
+    LEFT JOIN campuses c ON pr.campus_id = c.id
+    WHERE p.lifecycle_state = 'lead'
+    ORDER BY p.created_at DESC"""
+    if limit is not None:
+        sql += f"\n    LIMIT {int(limit)}"
+    return sql
+
+
+def rows_to_frame(rows: Sequence[Tuple[Any, ...]]) -> pd.DataFrame:
+    """One chunk of COPY rows -> typed DataFrame"""
+    columns = list(zip(*rows)) if rows else [()] * len(TRAINING_COLUMNS)
+    data: Dict[str, Any] = {}
+    for (name, _, _, kind), values in zip(TRAINING_COLUMNS, columns):
+        if kind == "float":
+            data[name] = np.array(values, dtype=np.float64)
+        elif kind == "int":
+            data[name] = np.array([0 if v is None else v for v in values], dtype=np.int8)
+        elif kind == "datetime":
+            data[name] = pd.to_datetime(pd.Series(values, dtype=object), utc=True)
+        elif kind == "category":
+            data[name] = pd.Categorical(values)
+        else:
+            data[name] = pd.array(values, dtype="string")
+    return pd.DataFrame(data)
+
+
+def concat_frames(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate chunks, unioning categories so categoricals stay categorical"""
+    frames = list(frames)
+    if not frames:
+        return rows_to_frame([])
+    if len(frames) == 1:
+        return frames[0]
+    data: Dict[str, Any] = {}
+    for name, _, _, kind in TRAINING_COLUMNS:
+        parts = [f[name] for f in frames]
+        if kind == "category":
+            data[name] = union_categoricals([p.values for p in parts])
+        else:
+            data[name] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(data)
+
+
+def clean_training_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Defaults previously applied after fetch(): missing scores/counts are 0"""
+    for name in ("lead_score", "engagement_score", "touchpoint_count", "conversion_probability"):
+        df[name] = df[name].fillna(0.0)
+    df["has_application"] = df["has_application"].astype(int)
+    return df
+
+
+async def stream_frames(rows: AsyncIterator[Tuple[Any, ...]], chunk_rows: int = CHUNK_ROWS) -> AsyncIterator[pd.DataFrame]:
+    """Group streamed rows into typed DataFrame chunks"""
+    chunk: List[Tuple[Any, ...]] = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield rows_to_frame(chunk)
+            chunk = []
+    if chunk:
+        yield rows_to_frame(chunk)
+
+
+async def _query_frame(limit: Optional[int], chunk_rows: int) -> pd.DataFrame:
+    from app.db.db import copy_rows
+
+    sql = f"COPY ({training_query(limit)}) TO STDOUT (FORMAT BINARY)"
+    types = [pg_type for _, _, pg_type, _ in TRAINING_COLUMNS]
+    frames = [frame async for frame in stream_frames(copy_rows(sql, types), chunk_rows)]
+    return concat_frames(frames)
+
+
+# ───────────── Parquet snapshots ─────────────
+
+def snapshot_path(limit: Optional[int], directory: Path = SNAPSHOT_DIR) -> Path:
+    """One snapshot per distinct query (columns + limit)"""
+    key = hashlib.sha256(training_query(limit).encode("utf-8")).hexdigest()[:16]
+    return Path(directory) / f"training_leads_{key}.parquet"
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("pyarrow not installed; training data snapshots disabled")
+        return False
+
+
+def read_snapshot(path: Path, max_age_s: float = SNAPSHOT_MAX_AGE_S) -> Optional[pd.DataFrame]:
+    if not path.exists() or time.time() - path.stat().st_mtime > max_age_s:
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable training snapshot {path}: {e}")
+        return None
+
+
+def write_snapshot(df: pd.DataFrame, path: Path) -> Path:
+    """Write to a temp file next to the target and rename into place"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+
+async def load_training_frame(limit: Optional[int] = None, snapshot: str = "off",
+                              chunk_rows: int = CHUNK_ROWS, snapshot_dir: Path = SNAPSHOT_DIR) -> pd.DataFrame:
+    """Training leads as a typed DataFrame; limit=None loads every lead"""
+    if snapshot not in SNAPSHOT_MODES:
+        raise ValueError(f"snapshot must be one of {SNAPSHOT_MODES}")
+    use_snapshot = snapshot != "off" and _parquet_available()
+    path = snapshot_path(limit, snapshot_dir)
+
+    if use_snapshot and snapshot == "auto":
+        df = read_snapshot(path)
+        if df is not None:
+            print(f"📦 Loaded {len(df)} training rows from snapshot {path.name}")
+            return df
+
+    start = time.time()
+    df = clean_training_frame(await _query_frame(limit, chunk_rows))
+    print(f"📊 Streamed {len(df)} training rows in {time.time() - start:.1f}s "
+          f"({df.memory_usage(deep=True).sum() / 1e6:.1f} MB)")
+    if df.empty:
+        raise ValueError("No training data available")
+
+    if use_snapshot:
+        try:
+            write_snapshot(df, path)
+        except Exception as e:
+            logger.warning(f"Failed to write training snapshot {path}: {e}")
+    return df
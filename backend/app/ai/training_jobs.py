@@ -0,0 +1,452 @@
+"""
+Background training jobs for the advanced ML pipeline
+
+/ai/advanced-ml/train used to run feature engineering, SelectKBest and the
+forest/boosting fit inside the async endpoint, blocking the whole uvicorn
+worker until training finished. Training now runs as a job:
+
+- the endpoint loads training data (async DB I/O) and returns a job id
+- fitting runs in a separate process pool (spawned workers, so the server's
+  threads and connections are never forked) with n_jobs parallel fitting
+- progress and cancellation flow through a small Manager-backed dict
+- artifacts are written to a temp file in backend/models and os.replace()d
+  into place, so the model registry never sees a half-written .joblib
+
+Cancellation is cooperative: a queued job is dropped immediately, a running
+job stops at the next stage boundary (a single sklearn fit cannot be
+interrupted mid-way).
+
+Job state is shared between API worker processes on the same host through
+backend/models/training_jobs/<job_id>.json, written atomically by the process
+that owns the job (on every transition and every JOB_SYNC_INTERVAL while
+training). Any worker can answer a status query; a cancel sent to another
+worker drops a <job_id>.cancel marker that the owner picks up on its next
+sync. A job whose owning process has exited is reported as failed.
+
+Configuration (env):
+- ML_TRAIN_WORKERS: concurrent training processes (default 1)
+- ML_TRAIN_N_JOBS: n_jobs for each fit/cross-validation (default: cores - 1
+  shared across workers)
+- ML_TRAIN_JOB_HISTORY: finished jobs kept for status queries (default 50)
+- ML_TRAIN_JOB_SYNC_S: seconds between job-file updates while training (default 1)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = Path(__file__).parent.parent.parent / "models"
+TRAIN_WORKERS = max(1, int(os.getenv("ML_TRAIN_WORKERS", "1")))
+TRAIN_JOB_HISTORY = int(os.getenv("ML_TRAIN_JOB_HISTORY", "50"))
+JOB_SYNC_INTERVAL = float(os.getenv("ML_TRAIN_JOB_SYNC_S", "1"))
+JOBS_DIRNAME = "training_jobs"
+_JOB_ID = re.compile(r"[0-9a-f]{12}")
+
+# Identifier / free-text columns never used as model inputs
+NON_FEATURE_COLUMNS = [
+    'id', 'has_application', 'created_at', 'first_name', 'last_name', 'email', 'phone',
+    'application_source', 'programme_name', 'campus_name', 'lifecycle_state', 'engagement_level', 'status'
+]
+
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+
+def default_n_jobs(workers: int = TRAIN_WORKERS) -> int:
+    """Cores left for the API process, split across training workers"""
+    configured = os.getenv("ML_TRAIN_N_JOBS")
+    if configured:
+        return int(configured)
+    return max(1, ((os.cpu_count() or 2) - 1) // max(1, workers))
+
+
+class TrainingCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled"""
+
+
+@dataclass
+class TrainingJob:
+    job_id: str
+    model_type: str
+    status: str = "queued"  # queued, loading_data, running, cancelling, succeeded, failed, cancelled
+    stage: str = "queued"
+    progress: float = 0.0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    future: Any = field(default=None, repr=False)
+    # Process that runs the job; None while it is only known from its job file
+    owner_pid: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "model_type": self.model_type,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrainingJob":
+        names = {"job_id", "model_type", "status", "stage", "progress", "created_at",
+                 "started_at", "finished_at", "result", "error"}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# ───────────── worker side ─────────────
+
+def _init_worker() -> None:
+    # The pipeline modules load the latest model at import; workers never serve
+    os.environ["ML_LOAD_MODEL_ON_IMPORT"] = "false"
+
+
+def save_artifact_atomic(model_data: Any, path: Path, tag: str = "") -> Path:
+    """Write to a hidden temp file in the same directory, then rename into place (.json as JSON, else joblib)"""
+    import joblib
+
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{tag or uuid.uuid4().hex[:8]}.tmp")
+    try:
+        if path.suffix == ".json":
+            tmp.write_text(json.dumps(model_data, indent=2, default=str))
+        else:
+            joblib.dump(model_data, tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+
+def _release_parallel_workers() -> None:
+    # cross_val_score(n_jobs=...) leaves joblib's reusable worker processes idling
+    # for minutes; the pool worker would wait on them when it exits
+    try:
+        from joblib.externals.loky import get_reusable_executor
+        get_reusable_executor().shutdown(wait=True, kill_workers=True)
+    except Exception as e:
+        logger.warning(f"Could not stop joblib workers: {e}")
+
+
+def run_training(job_id: str, pipeline_module: str, df: Any, request: Dict[str, Any], models_dir: str,
+                 n_jobs: int, state: Any, cancels: Any) -> Dict[str, Any]:
+    """Train one model in a worker process; mirrors the old inline /train endpoint"""
+    try:
+        return _train(job_id, pipeline_module, df, request, models_dir, n_jobs, state, cancels)
+    finally:
+        _release_parallel_workers()
+
+
+def _train(job_id, pipeline_module, df, request, models_dir, n_jobs, state, cancels) -> Dict[str, Any]:
+    import numpy as np
+
+    module = importlib.import_module(pipeline_module)
+    req = module.ModelTrainingRequest(**request)
+
+    def report(stage: str, progress: float) -> None:
+        if cancels.get(job_id):
+            raise TrainingCancelled(f"Job {job_id} cancelled during {stage}")
+        state[job_id] = (stage, progress)
+
+    pipeline = module.AdvancedMLPipeline()
+
+    report("engineering_features", 0.1)
+    df_engineered = pipeline.engineer_features(df, req.feature_config)
+    feature_columns = [c for c in df_engineered.columns if c not in NON_FEATURE_COLUMNS]
+    X = df_engineered[feature_columns].select_dtypes(include=[np.number])
+    y = df_engineered['has_application']
+
+    if req.config.feature_selection:
+        report("selecting_features", 0.25)
+        try:
+            X = pipeline.select_features(X, y)
+        except Exception as e:
+            print(f"⚠️  Feature selection skipped due to error: {e}")
+
+    report("fitting", 0.35)
+    model_id, performance = pipeline.train_model(X, y, req.config, n_jobs=n_jobs, progress=report)
+    model_data = dict(pipeline.models[model_id])
+    leaderboard = model_data.pop("leaderboard", None)
+
+    artifact_path = leaderboard_path = None
+    if req.save_model:
+        report("saving", 0.95)
+        model_name = req.model_name or f"advanced_ml_{model_id}"
+        artifact_path = str(save_artifact_atomic(model_data, Path(models_dir) / f"{model_name}.joblib", job_id))
+        if leaderboard is not None:
+            # Written alongside the model; the registry only globs *.joblib
+            leaderboard_path = str(save_artifact_atomic(
+                {"model_id": model_id, "search": performance.get("search"), "leaderboard": leaderboard},
+                Path(models_dir) / f"{model_name}.leaderboard.json", job_id,
+            ))
+
+    state[job_id] = ("done", 1.0)
+    return {
+        "model_id": model_id,
+        "performance": performance,
+        "feature_count": len(pipeline.feature_names),
+        "training_samples": len(df),
+        "model_saved": req.save_model,
+        "artifact_path": artifact_path,
+        "leaderboard_path": leaderboard_path,
+        "model_data": model_data,
+    }
+
+
+# ───────────── API process side ─────────────
+
+class TrainingJobRunner:
+    """Owns the process pool for one API process; job state is shared via jobs_dir"""
+
+    def __init__(self, max_workers: int = TRAIN_WORKERS, models_dir: Path = MODELS_DIR,
+                 n_jobs: Optional[int] = None, history: int = TRAIN_JOB_HISTORY, mp_context: str = "spawn",
+                 jobs_dir: Optional[Path] = None):
+        self.max_workers = max_workers
+        self.models_dir = Path(models_dir)
+        self.jobs_dir = Path(jobs_dir) if jobs_dir is not None else self.models_dir / JOBS_DIRNAME
+        self.n_jobs = n_jobs if n_jobs is not None else default_n_jobs(max_workers)
+        self.history = history
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._state = None
+        self._cancels = None
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._tasks: set = set()
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._manager = self._ctx.Manager()
+            self._state = self._manager.dict()
+            self._cancels = self._manager.dict()
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._ctx,
+                                             initializer=_init_worker)
+        return self._pool
+
+    # ── job table ──
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _cancel_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.cancel"
+
+    def _persist(self, job: TrainingJob) -> None:
+        """Publish the job to other API processes (owner process only)"""
+        try:
+            self.jobs_dir.mkdir(parents=True, exist_ok=True)
+            save_artifact_atomic({**job.to_dict(), "owner_pid": os.getpid()}, self._job_path(job.job_id))
+        except Exception as e:
+            logger.warning(f"Could not persist training job {job.job_id}: {e}")
+
+    def _load(self, job_id: str) -> Optional[TrainingJob]:
+        """A job owned by another process, read from its job file"""
+        if not _JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            data = json.loads(self._job_path(job_id).read_text())
+        except (OSError, ValueError):
+            return None
+        job = TrainingJob.from_dict(data)
+        job.owner_pid = data.get("owner_pid")
+        if not job.done and not _pid_alive(job.owner_pid):
+            job.status = job.stage = "failed"
+            job.error = f"Training worker {job.owner_pid} exited before the job finished"
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return self._load(job_id)
+        if not job.done and self._state is not None:
+            reported = self._state.get(job_id)
+            if reported:
+                job.stage, job.progress = reported
+        return job
+
+    def list_jobs(self) -> List[TrainingJob]:
+        """Jobs of every API process, newest first"""
+        jobs = {job_id: self.get(job_id) for job_id in self._jobs}
+        if self.jobs_dir.is_dir():
+            for path in self.jobs_dir.glob("*.json"):
+                if path.stem not in jobs:
+                    job = self._load(path.stem)
+                    if job is not None:
+                        jobs[path.stem] = job
+        return sorted(jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def _remember(self, job: TrainingJob) -> None:
+        job.owner_pid = os.getpid()
+        self._jobs[job.job_id] = job
+        self._persist(job)
+        finished = [j for j in self._jobs.values() if j.done]
+        for old in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[old.job_id]
+            self._job_path(old.job_id).unlink(missing_ok=True)
+
+    def _sync(self, job: TrainingJob) -> None:
+        """Pick up cancels from other processes and publish progress"""
+        if not job.done and job.status != "cancelling" and self._cancel_path(job.job_id).exists():
+            self.cancel(job.job_id)
+        self.get(job.job_id)
+        self._persist(job)
+
+    def _finish(self, job: TrainingJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.stage = status
+        job.error = error
+        job.finished_at = time.time()
+        if status == "succeeded":
+            job.progress = 1.0
+        if self._state is not None:
+            self._state.pop(job.job_id, None)
+            self._cancels.pop(job.job_id, None)
+        self._cancel_path(job.job_id).unlink(missing_ok=True)
+        self._remember(job)
+
+    # ── lifecycle ──
+
+    async def start(self, request: Dict[str, Any], load_data: Callable[[], Awaitable[Any]],
+                    pipeline_module: str, on_success: Optional[Callable[[Dict[str, Any]], None]] = None) -> TrainingJob:
+        """Register a job and run it in the background; returns immediately"""
+        job = TrainingJob(job_id=uuid.uuid4().hex[:12], model_type=request["config"]["model_type"])
+        self._remember(job)
+        task = asyncio.create_task(self._run(job, request, load_data, pipeline_module, on_success))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job, request, load_data, pipeline_module, on_success) -> None:
+        try:
+            job.status = job.stage = "loading_data"
+            self._persist(job)
+            df = await load_data()
+            if job.status == "cancelling" or self._cancel_path(job.job_id).exists():
+                raise TrainingCancelled(job.job_id)
+
+            pool = self._ensure_pool()
+            job.status, job.stage, job.started_at = "running", "queued", time.time()
+            job.future = pool.submit(
+                run_training, job.job_id, pipeline_module, df, request, str(self.models_dir),
+                self.n_jobs, self._state, self._cancels,
+            )
+            self._persist(job)
+            result = await self._await_result(job)
+
+            model_data = result.pop("model_data")
+            if on_success is not None:
+                await asyncio.to_thread(on_success, {**result, "model_data": model_data})
+            job.result = result
+            self._finish(job, "succeeded")
+            print(f"✅ Training job {job.job_id} finished: {result['model_id']}")
+        except (TrainingCancelled, CancelledError, asyncio.CancelledError):
+            self._finish(job, "cancelled")
+            print(f"🛑 Training job {job.job_id} cancelled")
+        except Exception as e:
+            self._finish(job, "failed", str(e))
+            logger.error(f"Training job {job.job_id} failed: {e}")
+
+    async def _await_result(self, job: TrainingJob) -> Dict[str, Any]:
+        future = asyncio.wrap_future(job.future)
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=JOB_SYNC_INTERVAL)
+            if done:
+                return future.result()
+            self._sync(job)
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        """Cancel a job; None if unknown. Running jobs stop at the next stage boundary."""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        if job_id not in self._jobs:
+            # Owned by another API process: it sees the marker on its next sync
+            self.jobs_dir.mkdir(parents=True, exist_ok=True)
+            self._cancel_path(job_id).touch()
+            job.status = "cancelling"
+            return job
+        if job.future is not None and job.future.cancel():
+            return job  # never started; _run records the cancellation
+        if self._cancels is not None:
+            self._cancels[job_id] = True
+        job.status = "cancelling"
+        self._persist(job)
+        return job
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[TrainingJob]:
+        """Await a job without blocking the event loop"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and not job.done:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(0.2)
+            job = self.get(job_id)
+        return job
+
+    def shutdown(self) -> None:
+        for job in self._jobs.values():
+            if not job.done:
+                self.cancel(job.job_id)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+_runner: Optional[TrainingJobRunner] = None
+
+
+def get_training_runner() -> TrainingJobRunner:
+    """Get or create the process-wide training job runner"""
+    global _runner
+    if _runner is None:
+        _runner = TrainingJobRunner()
+    return _runner
+
+
+def shutdown_training_runner() -> None:
+    global _runner
+    if _runner is not None:
+        _runner.shutdown()
+        _runner = None
@@ -0,0 +1,84 @@
+"""
+Training job endpoints shared by the advanced ML routers
+
+advanced_ml and advanced_ml_hardened expose the same /train and /train/jobs
+endpoints; each calls add_training_routes() with its own request model,
+pipeline instance and module name (the module the worker imports to train).
+"""
+
+from typing import Any, Dict, Type
+
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel
+
+from app.ai.model_registry import get_model_registry
+from app.ai.training_jobs import TRAIN_JOB_HISTORY, get_training_runner
+
+
+def register_trained_model(pipeline: Any, result: Dict[str, Any]) -> None:
+    """Make a finished training job's model visible to this process"""
+    pipeline.models[result["model_id"]] = result["model_data"]
+    pipeline.feature_names = result["model_data"]["feature_names"]
+    if result.get("artifact_path"):
+        # Pick up the new artifact now instead of after the registry TTL
+        get_model_registry().refresh_in_background()
+
+
+def job_or_404(job_id: str):
+    job = get_training_runner().get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Training job not found: {job_id} (only the last {TRAIN_JOB_HISTORY} finished jobs are kept)",
+        )
+    return job
+
+
+def add_training_routes(router: APIRouter, request_model: Type[BaseModel], pipeline: Any, pipeline_module: str) -> None:
+    """Register /train and /train/jobs endpoints on router"""
+
+    def on_success(result: Dict[str, Any]) -> None:
+        register_trained_model(pipeline, result)
+
+    @router.post("/train", status_code=202)
+    async def train_advanced_model(request: request_model, response: Response, wait: bool = False, timeout_s: float = 600):
+        """
+        Start a training job in the background process pool.
+
+        Returns the job (202) immediately; poll /train/jobs/{job_id}. With wait=true the
+        request awaits the job (the event loop stays free) and returns the training result.
+        """
+        print(f"🚀 Starting ML training job: {request.config.model_type}")
+        runner = get_training_runner()
+        job = await runner.start(
+            request.model_dump(),
+            lambda: pipeline.load_training_data(request.training_data_limit, request.snapshot),
+            pipeline_module,
+            on_success=on_success,
+        )
+        if not wait:
+            return job.to_dict()
+
+        job = await runner.wait(job.job_id, timeout_s)
+        if job.status == "failed":
+            raise HTTPException(status_code=500, detail=f"Training failed: {job.error}")
+        if job.status != "succeeded":
+            return job.to_dict()
+        response.status_code = 200
+        return {"job_id": job.job_id, **job.result}
+
+    @router.get("/train/jobs")
+    async def list_training_jobs():
+        """Recent and active training jobs of every worker, newest first"""
+        return {"jobs": [job.to_dict() for job in get_training_runner().list_jobs()]}
+
+    @router.get("/train/jobs/{job_id}")
+    async def get_training_job(job_id: str):
+        """Status and progress of a training job (result once it has succeeded)"""
+        return job_or_404(job_id).to_dict()
+
+    @router.post("/train/jobs/{job_id}/cancel")
+    async def cancel_training_job(job_id: str):
+        """Cancel a queued job, or stop a running one at its next stage"""
+        job_or_404(job_id)
+        return get_training_runner().cancel(job_id).to_dict()
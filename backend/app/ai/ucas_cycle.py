@@ -4,6 +4,7 @@ UK Higher Education admissions cycle dates and scoring adjustments
 """
 
 from datetime import datetime, date
+from functools import lru_cache
 from typing import Dict, Tuple, Optional
 from enum import Enum
 
@@ -58,8 +59,14 @@ class UcasCycleCalendar:
             cycle_year: The entry year (e.g., 2025 for 2025 entry)
 
         Returns:
-            Dictionary of key dates for the cycle
+            Dictionary of key dates for the cycle (a copy: the dates are
+            computed once per cycle year and preloaded before fork)
         """
+        return dict(UcasCycleCalendar._key_dates(cycle_year))
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _key_dates(cycle_year: int) -> Dict[str, date]:
         prev_year = cycle_year - 1
 
         # A-level results day: 3rd Thursday of August
@@ -7,11 +7,15 @@ from dotenv import load_dotenv, find_dotenv
 import os
 import logging
 
+_bootstrapped = False
+
 def bootstrap_env():
     """
     Bootstrap environment variables with robust .env loading.
     Uses find_dotenv to handle various working directory scenarios.
     """
+    global _bootstrapped
+    _bootstrapped = True
     log = logging.getLogger("env")
     
     try:
@@ -53,3 +57,11 @@ def bootstrap_env():
     except Exception as e:
         log.exception("Failed to load .env: %s", e)
         # Don't raise here - let the application start and fail gracefully later
+
+
+def ensure_env():
+    """Quietly load the nearest .env unless bootstrap_env() already ran in this process"""
+    global _bootstrapped
+    if not _bootstrapped:
+        _bootstrapped = True
+        load_dotenv(find_dotenv())
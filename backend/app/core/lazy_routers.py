@@ -0,0 +1,157 @@
+"""
+Lazily mounted routers
+
+Some optional routers import pandas, scikit-learn or an LLM SDK at module
+level. Importing them in app.main adds seconds to every cold start and worker
+recycle, before the first request can be served. include_optional_router()
+can mount such a router lazily: a placeholder route claims the router's path
+prefix without importing its module. The module is imported in a worker
+thread on the first request under that prefix, or earlier by
+warm_lazy_routers(), which the startup event runs in the background.
+
+The router's routes then replace the placeholder at the same position in the
+routing table. Route matching is therefore the same as with an eager
+include_router. If the import fails, the placeholder is dropped and the
+prefix returns 404, which is what happened when the eager include failed.
+Set LAZY_ROUTERS_ENABLED=false to include every router at import time.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Any, List, Optional
+
+import anyio
+from fastapi import FastAPI
+from starlette.routing import BaseRoute, Match, NoMatchFound
+from starlette.types import Receive, Scope, Send
+
+LAZY_ROUTERS_ENABLED = os.getenv("LAZY_ROUTERS_ENABLED", "true").lower() == "true"
+
+log = logging.getLogger("lazy_routers")
+
+
+class LazyRouter(BaseRoute):
+    """Placeholder for a router whose module has not been imported yet"""
+
+    def __init__(self, app: FastAPI, path: str, module: str, label: str, **include_kwargs: Any):
+        self.fastapi_app = app
+        self.path = path.rstrip("/")
+        self.module = module
+        self.label = label
+        self.include_kwargs = include_kwargs
+        self.loaded = False
+        self.load_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    def matches(self, scope: Scope):
+        if self.loaded or scope["type"] not in ("http", "websocket"):
+            return Match.NONE, {}
+        path = scope["path"]
+        if path == self.path or path.startswith(self.path + "/"):
+            return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.load()
+        # Dispatch again: the router's routes now sit where this placeholder was
+        await scope["router"](scope, receive, send)
+
+    async def load(self) -> None:
+        async with self._lock:
+            if self.loaded:
+                return
+            started = time.perf_counter()
+            try:
+                module = await anyio.to_thread.run_sync(importlib.import_module, self.module)
+            except Exception as e:
+                self._mount(None, e, started)
+            else:
+                self._mount(module, None, started)
+
+    def load_now(self) -> None:
+        """Import and include in this thread: only before the app serves (pre-fork preload)"""
+        if self.loaded:
+            return
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(self.module)
+        except Exception as e:
+            self._mount(None, e, started)
+        else:
+            self._mount(module, None, started)
+
+    def _mount(self, module, error: Optional[Exception], started: float) -> None:
+        added: List[BaseRoute] = []
+        if error is None:
+            try:
+                added = self._include(module.router)
+            except Exception as e:
+                error = e
+        if error is not None:
+            self.error = str(error)
+            print(f"❌ Failed to load {self.label} router: {error}")
+        self._replace(added)
+        self.loaded = True
+        self.load_ms = (time.perf_counter() - started) * 1000
+        if self.error is None:
+            print(f"✅ {self.label} router loaded lazily ({self.load_ms:.0f} ms)")
+
+    def _include(self, router) -> List[BaseRoute]:
+        """include_router, then take its routes back off the end of the table"""
+        routes = self.fastapi_app.router.routes
+        before = len(routes)
+        self.fastapi_app.include_router(router, **self.include_kwargs)
+        added = routes[before:]
+        del routes[before:]
+        outside = [r.path for r in added if not getattr(r, "path", "").startswith(self.path)]
+        if outside:
+            log.warning("%s routes outside %s are only reachable once it has loaded: %s",
+                        self.label, self.path, outside)
+        return added
+
+    def _replace(self, added: List[BaseRoute]) -> None:
+        routes = self.fastapi_app.router.routes
+        index = routes.index(self)
+        routes[index:index + 1] = added
+        # Regenerate /openapi.json with the new routes
+        self.fastapi_app.openapi_schema = None
+
+
+def include_optional_router(app: FastAPI, module: str, label: str, lazy_path: Optional[str] = None,
+                            **include_kwargs: Any) -> None:
+    """
+    Include `module.router`. If the import fails, log it and start without it.
+    When `lazy_path` is given (the path prefix every route of the router
+    lives under), the import is deferred until first use or warm-up.
+    """
+    if lazy_path and LAZY_ROUTERS_ENABLED:
+        app.router.routes.append(LazyRouter(app, lazy_path, module, label, **include_kwargs))
+        return
+    try:
+        app.include_router(importlib.import_module(module).router, **include_kwargs)
+        print(f"✅ {label} router loaded successfully")
+    except Exception as e:
+        print(f"❌ Failed to load {label} router: {e}")
+
+
+def pending_lazy_routers(app: FastAPI) -> List[LazyRouter]:
+    return [route for route in app.router.routes if isinstance(route, LazyRouter)]
+
+
+async def warm_lazy_routers(app: FastAPI) -> None:
+    """Import every lazily mounted router that no request has loaded yet"""
+    for route in pending_lazy_routers(app):
+        await route.load()
+
+
+def load_lazy_routers_now(app: FastAPI) -> None:
+    """Synchronous warm_lazy_routers for a process that is not serving yet"""
+    for route in pending_lazy_routers(app):
+        route.load_now()
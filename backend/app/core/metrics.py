@@ -0,0 +1,187 @@
+"""
+Prometheus metrics
+
+GET /metrics serves these in the Prometheus text format.
+
+Histograms:
+- http_request_duration_seconds{method, route, status}: every request, from
+  MetricsMiddleware. Labelled by route template (/people/{id}), never the
+  raw path.
+- db_query_duration_seconds{call, operation}
+- llm_request_duration_seconds{provider, model, outcome}
+- embedding_duration_seconds{model, cache}
+- pipeline_stage_duration_seconds{stage}: retrieval, MMR, contract
+  enforcement, telemetry writes and router stages.
+
+Counters and gauges:
+- cache_requests_total{cache, result}: hit ratio is
+  rate(result="hit") / rate(all).
+- http_requests_in_progress.
+- db_pool_in_use{pool} and db_pool_size{pool}: in_use / size is pool
+  saturation. The legacy module shares one connection per process, so a
+  value above 1 means queries are queued on it.
+- telemetry_queue_depth and telemetry_rows_dropped_total.
+
+The dependency histograms are fed by a span listener on app.core.tracing.
+The code is instrumented once, and metrics cover every call whether or not
+the request is traced or sampled.
+
+Multi-process: set PROMETHEUS_MULTIPROC_DIR before the app is imported
+(gunicorn.conf.py does). prometheus_client then keeps each process's values
+in mmap'd files in that directory. /metrics merges them, so whichever worker
+answers the scrape reports the whole server. Counters of recycled workers
+are kept. Live gauges of dead workers are dropped by mark_process_dead()
+(gunicorn's child_exit hook). Without the variable the registry is
+per-process: fine for a single uvicorn process, wrong with
+`uvicorn --workers N`.
+
+prometheus-client is in requirements.txt but imported optionally. Without
+it, or with METRICS_ENABLED=false, /metrics is not mounted and recording is
+a no-op.
+"""
+
+import glob
+import os
+import time
+from typing import Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import tracing
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                                   generate_latest, multiprocess)
+except ImportError:  # optional: /metrics disabled
+    CollectorRegistry = None
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true" and CollectorRegistry is not None
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+EMBEDDING_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+if METRICS_ENABLED:
+    HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route template",
+                             ["method", "route", "status"], buckets=REQUEST_BUCKETS)
+    HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served",
+                             multiprocess_mode="livesum")
+    DB_LATENCY = Histogram("db_query_duration_seconds", "Database call latency",
+                           ["call", "operation"], buckets=DB_BUCKETS)
+    DB_POOL_IN_USE = Gauge("db_pool_in_use", "Database calls holding a pooled connection",
+                           ["pool"], multiprocess_mode="livesum")
+    DB_POOL_SIZE = Gauge("db_pool_size", "Connections in the pool", ["pool"], multiprocess_mode="livesum")
+    LLM_LATENCY = Histogram("llm_request_duration_seconds", "LLM call latency including retries",
+                            ["provider", "model", "outcome"], buckets=LLM_BUCKETS)
+    EMBEDDING_LATENCY = Histogram("embedding_duration_seconds", "Embedding latency",
+                                  ["model", "cache"], buckets=EMBEDDING_BUCKETS)
+    STAGE_LATENCY = Histogram("pipeline_stage_duration_seconds", "Latency of AI pipeline stages",
+                              ["stage"], buckets=STAGE_BUCKETS)
+    CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+    TELEMETRY_QUEUE_DEPTH = Gauge("telemetry_queue_depth", "Telemetry rows waiting to be written",
+                                  multiprocess_mode="livesum")
+    TELEMETRY_DROPPED = Counter("telemetry_rows_dropped_total", "Telemetry rows dropped (queue full or no loop)")
+
+
+def _observe_span(span: tracing.Span) -> None:
+    if span.kind == "server":
+        return  # requests are timed by MetricsMiddleware, sampled or not
+    seconds = (span.end_ns - span.start_ns) / 1e9
+    attributes = span.attributes
+    if "cache.hit" in attributes:
+        CACHE_REQUESTS.labels(span.name, "hit" if attributes["cache.hit"] else "miss").inc()
+    if span.name.startswith("db."):
+        DB_LATENCY.labels(span.name[3:], attributes.get("db.operation", "")).observe(seconds)
+    elif span.name == "llm":
+        outcome = "error" if span.status == tracing.STATUS_ERROR else "ok"
+        LLM_LATENCY.labels(attributes.get("gen_ai.system", ""), attributes.get("gen_ai.request.model", ""),
+                           outcome).observe(seconds)
+    elif span.name == "embedding":
+        EMBEDDING_LATENCY.labels(attributes.get("gen_ai.request.model", ""),
+                                 "hit" if attributes.get("cache.hit") else "miss").observe(seconds)
+    else:
+        STAGE_LATENCY.labels(span.name).observe(seconds)
+
+
+if METRICS_ENABLED:
+    tracing.add_span_listener(_observe_span)
+
+
+def pool_acquired(pool: str) -> None:
+    if METRICS_ENABLED:
+        DB_POOL_IN_USE.labels(pool).inc()
+
+
+def pool_released(pool: str) -> None:
+    if METRICS_ENABLED:
+        DB_POOL_IN_USE.labels(pool).dec()
+
+
+def set_pool_size(pool: str, size: int) -> None:
+    if METRICS_ENABLED:
+        DB_POOL_SIZE.labels(pool).set(size)
+
+
+def set_telemetry_queue_depth(depth: int) -> None:
+    if METRICS_ENABLED:
+        TELEMETRY_QUEUE_DEPTH.set(depth)
+
+
+def telemetry_row_dropped() -> None:
+    if METRICS_ENABLED:
+        TELEMETRY_DROPPED.inc()
+
+
+class MetricsMiddleware:
+    """Times every HTTP request into http_request_duration_seconds"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            # Unmatched paths (404s, scanners) share one label instead of one series each
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.labels(scope["method"], template, str(status)).observe(time.perf_counter() - started)
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition body and content type; merged across processes in multi-process mode"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def prepare_multiprocess_dir(path: str) -> None:
+    """Create the shared metrics directory and clear files left by a previous server"""
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a dead worker's live gauges (its counters and histograms are kept)"""
+    if METRICS_ENABLED and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
@@ -0,0 +1,160 @@
+"""
+Pre-fork preloading for multi-worker serving
+
+gunicorn.conf.py runs preload() in the master process after app.main has
+been imported (preload_app) and before any worker is forked. Workers then
+start with these already in memory:
+- the lazily mounted AI routers and the libraries they import (pandas,
+  scikit-learn);
+- the registry's active model. The legacy AdvancedMLPipeline instances
+  share its objects through pipeline_model_entry();
+- the local intent classifier;
+- static data: compiled intent regexes, persona centroids, UCAS key dates.
+
+Workers inherit these pages copy-on-write. A page stays shared until
+something writes to it. Two things would write to it:
+- Numpy buffers: preload clears their writeable flag, so a stray in-place
+  update raises instead of silently un-sharing the page.
+- Python objects: refcount updates and the cyclic GC also write. gc.freeze()
+  moves everything allocated so far out of the collector's reach, so
+  collections in the workers do not touch those pages.
+
+Refcount writes still un-share the pages holding object headers. Large
+array data is separate and stays shared. memory_usage() reports RSS and
+PSS; PSS splits shared pages between the processes using them, so it is the
+number to compare when sizing workers.
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+PRELOAD_READ_ONLY_ARRAYS = os.getenv("PRELOAD_READ_ONLY_ARRAYS", "true").lower() == "true"
+
+
+def make_read_only(obj: Any, _seen: Optional[set] = None, _depth: int = 0) -> int:
+    """
+    Clear the writeable flag on the numpy arrays reachable from obj through
+    attributes, lists, tuples and dicts, a few levels deep. Returns how many
+    arrays were frozen.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen or _depth > 4:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        if obj.flags.writeable and obj.dtype != object:
+            obj.flags.writeable = False
+            return 1
+        return 0
+    if isinstance(obj, dict):
+        children = list(obj.values())
+    elif isinstance(obj, (list, tuple)):
+        children = list(obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        children = list(vars(obj).values())
+    else:
+        return 0
+    return sum(make_read_only(child, seen, _depth + 1) for child in children)
+
+
+def memory_usage(pid: str = "self") -> Dict[str, float]:
+    """RSS, PSS, shared and private memory of a process in MiB (Linux /proc)"""
+    fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+              "Private_Clean": "private", "Private_Dirty": "private"}
+    usage: Dict[str, float] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    name = fields[key]
+                    usage[name] = usage.get(name, 0.0) + int(value.split()[0]) / 1024
+    except OSError:
+        if pid != "self":
+            return usage
+        # No smaps_rollup (older kernels, macOS): peak RSS of this process only
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["rss"] = maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return usage
+
+
+def format_usage(usage: Dict[str, float]) -> str:
+    parts = [f"RSS {usage['rss']:.0f} MiB"]
+    if "pss" in usage:
+        parts.append(f"PSS {usage['pss']:.0f} MiB, shared {usage['shared']:.0f} MiB, private {usage['private']:.0f} MiB")
+    return parts[0] + (f" ({parts[1]})" if len(parts) > 1 else "")
+
+
+def _preload_models() -> None:
+    from app.ai.model_registry import load_active_model
+    model = load_active_model()
+    print(f"   model {model.version} (SHA256: {model.sha256[:8]}...)")
+
+
+def _preload_intent_model() -> None:
+    from app.ai.intent_model import load_intent_model
+    load_intent_model()
+
+
+def _preload_static_data() -> None:
+    from datetime import datetime
+
+    import app.ai.router  # noqa: F401  compiles INTENT_REGEXES
+    import app.ai.segmentation  # noqa: F401  builds _PERSONA_CENTROIDS
+    from app.ai.ucas_cycle import UcasCycleCalendar
+    cycle_year = UcasCycleCalendar.get_cycle_year(datetime.now())
+    for year in (cycle_year - 1, cycle_year, cycle_year + 1):
+        UcasCycleCalendar.get_key_dates(year)
+
+
+def _freeze_loaded_arrays() -> None:
+    from app.ai import intent_model
+    from app.ai.model_registry import get_model_registry
+    targets = [get_model_registry()._cache, intent_model._loaded]
+    for name in ("app.ai.advanced_ml", "app.ai.advanced_ml_hardened"):
+        module = sys.modules.get(name)
+        if module is not None:
+            targets.append(module.ml_pipeline.models)
+    print(f"   {make_read_only(targets)} arrays made read-only")
+
+
+def preload(app) -> Dict[str, float]:
+    """Load models and static data into this (master) process; milliseconds per step"""
+    from app.core.lazy_routers import load_lazy_routers_now
+
+    steps: Dict[str, Callable[[], None]] = {
+        "lazy AI routers": lambda: load_lazy_routers_now(app),
+        "ML model": _preload_models,
+        "local intent model": _preload_intent_model,
+        "static data": _preload_static_data,
+    }
+    if PRELOAD_READ_ONLY_ARRAYS:
+        steps["read-only arrays"] = _freeze_loaded_arrays
+
+    timings: Dict[str, float] = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            step()
+            timings[name] = (time.perf_counter() - started) * 1000
+            print(f"✅ Preloaded {name} ({timings[name]:.0f} ms)")
+        except Exception as e:
+            print(f"⚠️  Preloading {name} failed: {e}")
+
+    # Threads do not survive fork; one started here would be missing in every worker
+    extra = [t.name for t in threading.enumerate() if t is not threading.main_thread()]
+    if extra:
+        print(f"⚠️  Threads running before fork (not inherited by workers): {extra}")
+
+    gc.collect()
+    gc.freeze()
+    print(f"🧊 {gc.get_freeze_count()} objects frozen for copy-on-write sharing; "
+          f"master {format_usage(memory_usage())}")
+    return timings
@@ -0,0 +1,219 @@
+"""
+GCRA rate limiting with pluggable shared state.
+
+Each (key, limit) pair is stored as a single "theoretical arrival time" (TAT)
+float, so memory is O(1) per key regardless of request volume, and a check is
+O(1). Several limits (e.g. user minute + user burst + org minute) are checked
+and updated atomically: a request only consumes capacity if every limit
+allows it.
+
+Backends:
+- InMemoryGCRAStore: per-process dict guarded by a lock (tests, single worker)
+- RedisGCRAStore: Lua script over the Redis protocol, shared by all workers
+  and timed by the Redis server clock; selected when RATE_LIMIT_REDIS_URL (or REDIS_URL) is set and the optional
+  `redis` package is installed
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class GCRALimit:
+    """`rate` requests per `period` seconds, allowing bursts of up to `burst`"""
+    rate: int
+    period: float
+    burst: Optional[int] = None
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period / max(1, self.rate)
+
+    @property
+    def tolerance(self) -> float:
+        burst = self.burst if self.burst is not None else self.rate
+        return self.emission_interval * (max(1, burst) - 1)
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of an acquire() call"""
+    allowed: bool
+    retry_after: float = 0.0
+    # Key of the limit that rejected the request (None when allowed)
+    limited_by: Optional[str] = None
+    # Requests still available right now, per key
+    remaining: Optional[Dict[str, int]] = None
+
+    @property
+    def retry_after_seconds(self) -> int:
+        """Whole seconds for a Retry-After header (never 0 when limited)"""
+        return max(1, math.ceil(self.retry_after)) if not self.allowed else 0
+
+
+def _evaluate(tats: Sequence[Optional[float]], limits: Sequence[GCRALimit], now: float) -> Tuple[bool, float, int, List[float], List[int]]:
+    """Pure GCRA step shared by the in-memory store (and mirrored in the Lua script)"""
+    new_tats: List[float] = []
+    remaining: List[int] = []
+    worst_wait, worst_idx = 0.0, -1
+    for i, (tat, limit) in enumerate(zip(tats, limits)):
+        t = limit.emission_interval
+        tat = max(tat if tat is not None else now, now)
+        new_tat = tat + t
+        allow_at = new_tat - limit.tolerance - t
+        if allow_at > now:
+            wait = allow_at - now
+            if wait > worst_wait:
+                worst_wait, worst_idx = wait, i
+        new_tats.append(new_tat)
+        remaining.append(max(0, math.floor((limit.tolerance + t - (new_tat - now)) / t + 1e-9)))
+    return worst_idx < 0, worst_wait, worst_idx, new_tats, remaining
+
+
+class InMemoryGCRAStore:
+    """Process-local store; one float per key"""
+
+    def __init__(self, sweep_every: int = 10000):
+        self._tats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._ops = 0
+        self._sweep_every = sweep_every
+
+    def acquire(self, checks: Sequence[Tuple[str, GCRALimit]], now: Optional[float] = None) -> RateLimitDecision:
+        now = time.time() if now is None else now
+        keys = [k for k, _ in checks]
+        limits = [lim for _, lim in checks]
+        with self._lock:
+            allowed, wait, idx, new_tats, remaining = _evaluate([self._tats.get(k) for k in keys], limits, now)
+            if allowed:
+                for k, tat in zip(keys, new_tats):
+                    self._tats[k] = tat
+            self._ops += 1
+            if self._ops % self._sweep_every == 0:
+                self._sweep(now)
+        return RateLimitDecision(
+            allowed=allowed,
+            retry_after=wait,
+            limited_by=None if allowed else keys[idx],
+            remaining=dict(zip(keys, remaining)) if allowed else None,
+        )
+
+    async def aacquire(self, checks: Sequence[Tuple[str, GCRALimit]], now: Optional[float] = None) -> RateLimitDecision:
+        return self.acquire(checks, now)
+
+    def _sweep(self, now: float) -> None:
+        # A TAT in the past means the key is back to full capacity: drop it
+        for k in [k for k, tat in self._tats.items() if tat <= now]:
+            del self._tats[k]
+
+    def key_count(self) -> int:
+        return len(self._tats)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tats.clear()
+
+
+# KEYS = limit keys; ARGV = (emission_interval, tolerance) per key. The clock is
+# the Redis server's TIME, so skew between API workers never moves a TAT.
+# Returns {allowed, wait_ms, limited_index(1-based, 0 if allowed)}.
+_GCRA_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local n = #KEYS
+local new_tats = {}
+local worst_wait, worst_idx = 0, 0
+for i = 1, n do
+  local t = tonumber(ARGV[2 * i - 1])
+  local tol = tonumber(ARGV[2 * i])
+  local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+  if tat < now then tat = now end
+  local new_tat = tat + t
+  local wait = new_tat - tol - t - now
+  if wait > worst_wait then worst_wait, worst_idx = wait, i end
+  new_tats[i] = new_tat
+end
+if worst_idx > 0 then
+  return {0, math.ceil(worst_wait * 1000), worst_idx}
+end
+for i = 1, n do
+  local ttl = math.ceil((new_tats[i] - now) * 1000)
+  redis.call('SET', KEYS[i], tostring(new_tats[i]), 'PX', ttl)
+end
+return {1, 0, 0}
+"""
+
+
+class RedisGCRAStore:
+    """Shared store over the Redis protocol; each check is a single atomic script call"""
+
+    def __init__(self, url: str, prefix: str = "rl:"):
+        import redis  # optional dependency
+        import redis.asyncio as aioredis
+
+        self.url = url
+        self.prefix = prefix
+        self._sync = redis.Redis.from_url(url)
+        self._async = aioredis.from_url(url)
+        self._sync_script = self._sync.register_script(_GCRA_LUA)
+        self._async_script = self._async.register_script(_GCRA_LUA)
+
+    def _args(self, checks):
+        keys = [self.prefix + k for k, _ in checks]
+        argv: List[float] = []
+        for _, lim in checks:
+            argv.extend([lim.emission_interval, lim.tolerance])
+        return keys, argv
+
+    @staticmethod
+    def _decision(checks, result) -> RateLimitDecision:
+        allowed, wait_ms, idx = (int(x) for x in result)
+        return RateLimitDecision(
+            allowed=bool(allowed),
+            retry_after=wait_ms / 1000.0,
+            limited_by=None if allowed else checks[idx - 1][0],
+        )
+
+    def acquire(self, checks: Sequence[Tuple[str, GCRALimit]], now: Optional[float] = None) -> RateLimitDecision:
+        """`now` is ignored: the script reads the Redis server clock"""
+        keys, argv = self._args(checks)
+        return self._decision(checks, self._sync_script(keys=keys, args=argv))
+
+    async def aacquire(self, checks: Sequence[Tuple[str, GCRALimit]], now: Optional[float] = None) -> RateLimitDecision:
+        keys, argv = self._args(checks)
+        return self._decision(checks, await self._async_script(keys=keys, args=argv))
+
+
+_store = None
+
+
+def get_rate_limit_store():
+    """Shared store if configured, otherwise the in-memory store"""
+    global _store
+    if _store is None:
+        url = os.getenv("RATE_LIMIT_REDIS_URL") or os.getenv("REDIS_URL")
+        if url:
+            try:
+                _store = RedisGCRAStore(url)
+                logger.info("Rate limiting using shared Redis store")
+            except Exception as e:
+                logger.warning(f"Redis rate limit store unavailable ({e}); falling back to in-memory")
+        if _store is None:
+            _store = InMemoryGCRAStore()
+    return _store
+
+
+def set_rate_limit_store(store) -> None:
+    """Swap the global store (tests)"""
+    global _store
+    _store = store
@@ -0,0 +1,48 @@
+"""
+JSON serialisation for API responses
+
+FastJSONResponse is the app's default response class. It renders with orjson,
+which encodes the types in our DB rows natively: UUID, datetime, date, and
+numpy arrays and scalars. Decimal is encoded as FastAPI's jsonable_encoder
+would (int if integral, else float). Anything else orjson does not know
+(pydantic models, sets, ...) is handed to jsonable_encoder.
+
+Compared with Starlette's JSONResponse, NaN/Infinity become null instead of
+failing the request. Without orjson installed, rendering falls back to the
+stdlib encoder.
+"""
+
+import json
+from decimal import Decimal
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json fallback
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    return jsonable_encoder(obj)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,454 @@
+"""
+Request tracing
+
+Lightweight spans with the OpenTelemetry data model: 128-bit trace id,
+64-bit span ids, kind, status, attributes, and start/end in Unix nanoseconds.
+RequestIDMiddleware opens one root span per request. Its trace id is the
+X-Request-ID when that is a UUID (a hash of it otherwise), or the trace id
+of an incoming W3C `traceparent` header. The DB, embedding, LLM, retrieval,
+MMR, contract and telemetry functions are wrapped with @traced, so every
+span is attributed to the request that caused it. Outside a request
+(scripts, background jobs) span() and @traced do nothing.
+
+When the root span ends, the whole trace is queued. A daemon thread hands
+it to the exporters named in TRACING_EXPORTERS:
+- log: one summary line per request, time per span name (default);
+- json: the trace as one OTLP/JSON line, written to TRACING_JSON_PATH or
+  logged;
+- otlp: an OTLP/HTTP JSON POST to TRACING_OTLP_ENDPOINT. That can be a
+  real collector, or `python -m monitoring.otlp_standin` for local testing.
+
+The export queue is bounded. When it is full, traces are dropped and
+counted in get_tracing_stats().
+
+Span listeners (add_span_listener) see every span as it ends. That
+includes spans outside a sampled request, which are timed but not recorded
+in any trace. This lets app.core.metrics build latency histograms that do
+not depend on tracing being enabled or sampled.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("tracing")
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+TRACING_EXPORTERS = [e.strip() for e in os.getenv("TRACING_EXPORTERS", "log").split(",") if e.strip()]
+TRACING_JSON_PATH = os.getenv("TRACING_JSON_PATH", "")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "bridge-crm-api")
+TRACING_QUEUE_MAX = int(os.getenv("TRACING_QUEUE_MAX", "1000"))
+# Spans per trace; a runaway loop of DB calls should not grow a trace without bound
+TRACING_MAX_SPANS = int(os.getenv("TRACING_MAX_SPANS", "500"))
+
+# OTLP enums
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Trace:
+    """Spans of one request, exported together when the root span ends"""
+
+    def __init__(self, trace_id: str, request_id: Optional[str], recording: bool = True):
+        self.trace_id = trace_id
+        self.request_id = request_id
+        # False for spans timed only for the listeners: nothing is kept or exported
+        self.recording = recording
+        self.spans: List["Span"] = []
+        self.dropped_spans = 0
+        self.finished = False
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_span_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message", "events")
+
+    def __init__(self, trace: Trace, name: str, kind: str = "internal", parent_span_id: str = "",
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.events: List[Dict[str, Any]] = []
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"[:500]
+        self.events.append({"name": "exception", "time_ns": time.time_ns(),
+                            "attributes": {"exception.type": type(error).__name__,
+                                           "exception.message": str(error)[:500]}})
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        for listener in _span_listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                logger.debug("Span listener %r failed: %s", listener, e)
+        trace = self.trace
+        if trace.finished or not trace.recording:
+            return
+        if len(trace.spans) < TRACING_MAX_SPANS:
+            trace.spans.append(self)
+        else:
+            trace.dropped_spans += 1
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_span_listeners: List[Callable[[Span], None]] = []
+
+
+def add_span_listener(listener: Callable[[Span], None]) -> None:
+    """Call listener(span) whenever a span ends, whether or not it is part of a trace"""
+    if listener not in _span_listeners:
+        _span_listeners.append(listener)
+
+
+def trace_id_for(request_id: str) -> str:
+    """32-hex trace id for a request id: the UUID itself, else a hash of it"""
+    try:
+        return uuid.UUID(request_id).hex
+    except (ValueError, AttributeError, TypeError):
+        return hashlib.sha256(str(request_id).encode()).hexdigest()[:32]
+
+
+def current_span() -> Optional[Span]:
+    span_ = _current_span.get()
+    return span_ if span_ is not None and not span_.trace.finished else None
+
+
+def current_request_id() -> Optional[str]:
+    span_ = current_span()
+    return span_.trace.request_id if span_ is not None else None
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Set an attribute on the active span, if any"""
+    span_ = current_span()
+    if span_ is not None:
+        span_.set_attribute(key, value)
+
+
+def set_error(message: str) -> None:
+    """Mark the active span failed without an exception (e.g. a fallback answer)"""
+    span_ = current_span()
+    if span_ is not None:
+        span_.status = STATUS_ERROR
+        span_.status_message = message[:500]
+
+
+def start_request_trace(request_id: str, name: str, traceparent: Optional[str] = None,
+                        attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+    """Root span for a request, or None when tracing is off or the request is not sampled"""
+    if not TRACING_ENABLED or (TRACING_SAMPLE_RATE < 1.0 and random.random() >= TRACING_SAMPLE_RATE):
+        return None
+    parent = ""
+    trace_id = trace_id_for(request_id)
+    match = _TRACEPARENT.match((traceparent or "").strip().lower())
+    if match:
+        trace_id, parent = match.group(1), match.group(2)
+    return Span(Trace(trace_id, request_id), name, "server", parent,
+                {"request.id": request_id, **(attributes or {})})
+
+
+def activate(span_: Optional[Span]):
+    """Make span_ the parent of spans opened in this context; returns a reset token"""
+    return _current_span.set(span_)
+
+
+def deactivate(token) -> None:
+    _current_span.reset(token)
+
+
+def end_request_trace(root: Span) -> None:
+    root.end()
+    trace = root.trace
+    trace.finished = True
+    get_exporter().submit(trace)
+
+
+def start_span(name: str, kind: str = "internal", **attributes: Any) -> Optional[Span]:
+    """A child of the active span that is not made current (for async generators)"""
+    parent = current_span()
+    if parent is None:
+        if not _span_listeners:
+            return None
+        # Untraced: time it for the listeners only
+        return Span(Trace("", None, recording=False), name, kind, "", attributes)
+    return Span(parent.trace, name, kind, parent.span_id, attributes)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the active span for the duration of the block; no-op outside a trace
+    unless a span listener is registered"""
+    span_ = start_span(name, kind, **attributes)
+    if span_ is None:
+        yield None
+        return
+    token = _current_span.set(span_)
+    try:
+        yield span_
+    except BaseException as e:
+        if not isinstance(e, (asyncio.CancelledError, GeneratorExit)):
+            span_.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span_.end()
+
+
+def traced(name: str, kind: str = "internal", **attributes: Any) -> Callable:
+    """Decorator: run each call of a sync or async function inside span(name)"""
+    def decorator(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None and not _span_listeners:
+                    return await fn(*args, **kwargs)
+                with span(name, kind, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None and not _span_listeners:
+                return fn(*args, **kwargs)
+            with span(name, kind, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def db_attributes(sql: Any) -> Dict[str, Any]:
+    """OTel database attributes for a statement (text only, never the bound values)"""
+    statement = str(sql).strip()
+    return {"db.system": "postgresql", "db.operation": statement.split(None, 1)[0].upper() if statement else "",
+            "db.statement": statement[:500]}
+
+
+# ───────────────────────── Export ─────────────────────────
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_attribute_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _attribute_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def to_otlp(traces: List[Trace]) -> Dict[str, Any]:
+    """ExportTraceServiceRequest in OTLP/JSON encoding"""
+    spans = []
+    for trace in traces:
+        for span_ in trace.spans:
+            spans.append({
+                "traceId": trace.trace_id,
+                "spanId": span_.span_id,
+                "parentSpanId": span_.parent_span_id,
+                "name": span_.name,
+                "kind": SPAN_KINDS.get(span_.kind, 1),
+                "startTimeUnixNano": str(span_.start_ns),
+                "endTimeUnixNano": str(span_.end_ns or span_.start_ns),
+                "attributes": _attributes(span_.attributes),
+                "events": [{"name": e["name"], "timeUnixNano": str(e["time_ns"]),
+                            "attributes": _attributes(e["attributes"])} for e in span_.events],
+                "status": {"code": span_.status, "message": span_.status_message},
+            })
+    return {"resourceSpans": [{
+        "resource": {"attributes": _attributes({"service.name": TRACING_SERVICE_NAME, "process.pid": os.getpid()})},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+    }]}
+
+
+def summarize(trace: Trace) -> str:
+    """One line: root span, then time and count per child span name"""
+    root = next((s for s in trace.spans if not s.parent_span_id or s.kind == "server"), None)
+    by_name: Dict[str, List[float]] = {}
+    for span_ in trace.spans:
+        if span_ is not root:
+            by_name.setdefault(span_.name, []).append(span_.duration_ms)
+    stages = ", ".join(f"{name} {sum(ms):.1f}ms" + (f" x{len(ms)}" if len(ms) > 1 else "")
+                       for name, ms in sorted(by_name.items(), key=lambda kv: -sum(kv[1])))
+    head = f"{root.name} {root.attributes.get('http.status_code', '')} {root.duration_ms:.1f}ms" if root else "?"
+    return f"trace {trace.trace_id} request {trace.request_id}: {head} | {stages or 'no child spans'}"
+
+
+class LogExporter:
+    def export(self, traces: List[Trace]) -> None:
+        for trace in traces:
+            logger.info(summarize(trace))
+
+
+class JSONExporter:
+    def __init__(self, path: str = TRACING_JSON_PATH):
+        self.path = path
+
+    def export(self, traces: List[Trace]) -> None:
+        lines = [json.dumps(to_otlp([trace]), separators=(",", ":")) for trace in traces]
+        if not self.path:
+            for line in lines:
+                logger.info(line)
+            return
+        with open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class OTLPHttpExporter:
+    def __init__(self, endpoint: str = TRACING_OTLP_ENDPOINT, timeout_s: float = 2.0):
+        self.endpoint = endpoint
+        self.timeout_s = timeout_s
+
+    def export(self, traces: List[Trace]) -> None:
+        body = json.dumps(to_otlp(traces), separators=(",", ":")).encode()
+        request = urllib.request.Request(self.endpoint, data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout_s) as response:
+            response.read()
+
+
+class InMemoryExporter:
+    """Keeps exported traces (tests)"""
+
+    def __init__(self):
+        self.traces: List[Trace] = []
+
+    def export(self, traces: List[Trace]) -> None:
+        self.traces.extend(traces)
+
+
+EXPORTERS = {"log": LogExporter, "json": JSONExporter, "otlp": OTLPHttpExporter}
+
+
+class TraceExporter:
+    """Bounded queue drained by a daemon thread, so exporting never blocks a request"""
+
+    def __init__(self, exporters: List[Any]):
+        self.exporters = exporters
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=TRACING_QUEUE_MAX)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, trace: Trace) -> None:
+        if not self.exporters:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self) -> None:
+        # Threads do not survive fork: a preloaded worker starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 50:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for exporter in self.exporters:
+                try:
+                    exporter.export(batch)
+                except Exception as e:
+                    self.failed += 1
+                    logger.debug("Trace export via %s failed: %s", type(exporter).__name__, e)
+            self.exported += len(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout_s: float = 5.0) -> bool:
+        """Wait until every submitted trace has been exported"""
+        deadline = time.monotonic() + timeout_s
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+
+_exporter: Optional[TraceExporter] = None
+
+
+def get_exporter() -> TraceExporter:
+    global _exporter
+    if _exporter is None:
+        exporters = []
+        for name in TRACING_EXPORTERS:
+            if name in EXPORTERS:
+                exporters.append(EXPORTERS[name]())
+            else:
+                logger.warning("Unknown trace exporter %r (known: %s)", name, ", ".join(EXPORTERS))
+        _exporter = TraceExporter(exporters)
+    return _exporter
+
+
+def set_exporters(exporters: List[Any]) -> TraceExporter:
+    """Replace the configured exporters (tests, scripts)"""
+    global _exporter
+    _exporter = TraceExporter(exporters)
+    return _exporter
+
+
+def get_tracing_stats() -> Dict[str, Any]:
+    exporter = get_exporter()
+    return {
+        "enabled": TRACING_ENABLED,
+        "sample_rate": TRACING_SAMPLE_RATE,
+        "exporters": [type(e).__name__ for e in exporter.exporters],
+        "exported": exporter.exported,
+        "dropped": exporter.dropped,
+        "export_failures": exporter.failed,
+        "queued": exporter._queue.qsize(),
+    }
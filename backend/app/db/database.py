@@ -12,6 +12,8 @@ from sqlalchemy import text
 import psycopg
 from psycopg.rows import dict_row
 
+from app.core import tracing
+
 log = logging.getLogger("db")
 
 # Global engine instance
@@ -97,10 +99,11 @@ async def fetch(sql: str, *args):
     """Execute a SELECT query and return all rows as dictionaries."""
     dsn = get_sync_dsn()
     try:
-        async with await psycopg.AsyncConnection.connect(dsn) as conn:
-            async with conn.cursor(row_factory=dict_row) as cur:
-                await cur.execute(sql, args)
-                return await cur.fetchall()
+        with tracing.span("db.fetch", "client", **tracing.db_attributes(sql)):
+            async with await psycopg.AsyncConnection.connect(dsn) as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute(sql, args)
+                    return await cur.fetchall()
     except Exception as e:
         log.error("Database fetch error: %s", e)
         raise
@@ -114,10 +117,11 @@ async def execute(sql: str, *args):
     """Execute a non-SELECT query (INSERT, UPDATE, DELETE)."""
     dsn = get_sync_dsn()
     try:
-        async with await psycopg.AsyncConnection.connect(dsn) as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(sql, args)
-                await conn.commit()
+        with tracing.span("db.execute", "client", **tracing.db_attributes(sql)):
+            async with await psycopg.AsyncConnection.connect(dsn) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(sql, args)
+                    await conn.commit()
     except Exception as e:
         log.error("Database execute error: %s", e)
         raise
@@ -12,6 +12,8 @@ import json
 from typing import Optional
 from contextlib import asynccontextmanager
 
+from app.core import metrics, tracing
+
 log = logging.getLogger("db.legacy")
 
 def _build_dsn_from_parts() -> str:
@@ -76,14 +78,19 @@ async def _get_connection():
         if _connection_pool is None:
             dsn = _get_dsn()
             _connection_pool = await psycopg.AsyncConnection.connect(dsn)
+            metrics.set_pool_size("legacy", 1)
             log.info("Created new database connection for legacy module")
     
+    metrics.pool_acquired("legacy")
     try:
         yield _connection_pool
     except Exception:
         # Reset connection on error
         _connection_pool = None
+        metrics.set_pool_size("legacy", 0)
         raise
+    finally:
+        metrics.pool_released("legacy")
 
 def _get_dsn():
     """Get DSN using the new database module."""
@@ -118,10 +125,14 @@ async def fetch(sql: str, *args):
             else:
                 sanitized_args.append(arg)
         
-        async with _get_connection() as conn:
-            async with conn.cursor(row_factory=dict_row) as cur:
-                await cur.execute(sql, sanitized_args)
-                return await cur.fetchall()
+        with tracing.span("db.fetch", "client", **tracing.db_attributes(sql)) as span:
+            async with _get_connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute(sql, sanitized_args)
+                    rows = await cur.fetchall()
+            if span is not None:
+                span.set_attribute("db.rows", len(rows))
+            return rows
     except Exception as e:
         log.error("Database fetch error in legacy module: %s", e)
         log.error("SQL: %s", sql)
@@ -151,10 +162,11 @@ async def execute(sql: str, *args):
             else:
                 sanitized_args.append(arg)
         
-        async with _get_connection() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(sql, sanitized_args)
-                await conn.commit()
+        with tracing.span("db.execute", "client", **tracing.db_attributes(sql)):
+            async with _get_connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(sql, sanitized_args)
+                    await conn.commit()
     except Exception as e:
         log.error("Database execute error in legacy module: %s", e)
         log.error("SQL: %s", sql)
@@ -179,12 +191,13 @@ async def execute_returning(sql: str, *args):
             else:
                 sanitized_args.append(arg)
         
-        async with _get_connection() as conn:
-            async with conn.cursor(row_factory=dict_row) as cur:
-                await cur.execute(sql, sanitized_args)
-                result = await cur.fetchall()
-                await conn.commit()
-                return result
+        with tracing.span("db.execute_returning", "client", **tracing.db_attributes(sql)):
+            async with _get_connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute(sql, sanitized_args)
+                    result = await cur.fetchall()
+                    await conn.commit()
+                    return result
     except Exception as e:
         log.error("Database execute_returning error in legacy module: %s", e)
         log.error("SQL: %s", sql)
@@ -193,3 +206,33 @@ async def execute_returning(sql: str, *args):
         raise
 
 
+
+async def copy_rows(sql, types):
+    """
+    Stream rows from a COPY ... TO STDOUT (FORMAT BINARY) statement.
+    
+    Runs on a dedicated connection so a long export never holds the shared
+    one; types are the Postgres type names of the result columns, in order.
+    """
+    # Not made current: the consumer runs between yields, outside this span
+    span = tracing.start_span("db.copy", "client", **tracing.db_attributes(sql))
+    rows = 0
+    conn = await psycopg.AsyncConnection.connect(_get_dsn())
+    try:
+        async with conn.cursor() as cur:
+            async with cur.copy(sql) as copy:
+                copy.set_types(types)
+                async for row in copy.rows():
+                    rows += 1
+                    yield row
+    except Exception as e:
+        log.error("Database copy error in legacy module: %s", e)
+        log.error("SQL: %s", sql)
+        if span is not None:
+            span.record_exception(e)
+        raise
+    finally:
+        await conn.close()
+        if span is not None:
+            span.set_attribute("db.rows", rows)
+            span.end()
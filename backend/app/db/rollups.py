@@ -0,0 +1,274 @@
+"""
+Daily analytics rollups
+
+Dashboard, forecasting and trend endpoints read pre-aggregated daily facts
+(analytics_daily_leads / _applications / _outcomes, db/migrations/0037)
+instead of re-scanning people, applications and offers on every page load.
+
+The facts are maintained by refresh_analytics_rollups() in Postgres:
+- incremental refreshes recompute only the days touched since the last
+  watermark (re-reading ANALYTICS_ROLLUP_OVERLAP_S seconds before it, so
+  rows committed late by long transactions are not missed);
+- a rebuild recomputes everything (also drops rows deleted at the source).
+
+RollupScheduler runs the incremental refresh every ANALYTICS_ROLLUP_INTERVAL_S
+seconds in each worker; an advisory lock in the function makes concurrent
+runs from several workers a no-op. Rebuild from the command line with:
+
+    python -m app.db.rollups --rebuild
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.db.db import execute_returning, fetch
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_ENABLED = os.getenv("ANALYTICS_ROLLUPS_ENABLED", "true").lower() == "true"
+ROLLUP_INTERVAL_S = int(os.getenv("ANALYTICS_ROLLUP_INTERVAL_S", "900"))
+ROLLUP_OVERLAP_S = int(os.getenv("ANALYTICS_ROLLUP_OVERLAP_S", "300"))
+ROLLUP_RECENT_DAYS = int(os.getenv("ANALYTICS_ROLLUP_RECENT_DAYS", "35"))
+# How long readers trust a "rollups are populated" answer before asking again
+ROLLUP_STATE_TTL_S = 60
+STATE_NAME = "daily_facts"
+
+_state_checked_at = 0.0
+_state_ready = False
+
+
+async def get_rollup_state() -> Optional[Dict[str, Any]]:
+    rows = await fetch("SELECT * FROM analytics_rollup_state WHERE name = %s", STATE_NAME)
+    return dict(rows[0]) if rows else None
+
+
+async def rollups_ready() -> bool:
+    """True once the rollups have been built; endpoints fall back to raw queries otherwise"""
+    global _state_checked_at, _state_ready
+    if not ROLLUPS_ENABLED:
+        return False
+    if time.monotonic() - _state_checked_at < ROLLUP_STATE_TTL_S:
+        return _state_ready
+    try:
+        state = await get_rollup_state()
+        _state_ready = bool(state and state.get("watermark"))
+    except Exception as e:
+        logger.debug("Rollup state unavailable: %s", e)
+        _state_ready = False
+    _state_checked_at = time.monotonic()
+    return _state_ready
+
+
+async def refresh_rollups(rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Bring the rollups up to date: incremental from the stored watermark, or a
+    full rebuild (also the first run, when there is no watermark yet).
+    Returns {"mode", "watermark", "days_refreshed", "ms"}; mode is "skipped"
+    when another worker is already refreshing.
+    """
+    global _state_checked_at
+    t0 = time.perf_counter()
+    since: Optional[datetime] = None
+    if not rebuild:
+        state = await get_rollup_state()
+        if state and state.get("watermark"):
+            since = state["watermark"] - timedelta(seconds=ROLLUP_OVERLAP_S)
+
+    rows = await execute_returning(
+        "SELECT * FROM refresh_analytics_rollups(%s, %s)", since, ROLLUP_RECENT_DAYS
+    )
+    _state_checked_at = 0.0
+    result = {
+        "mode": "skipped" if not rows else ("rebuild" if since is None else "incremental"),
+        "watermark": rows[0]["watermark"].isoformat() if rows else None,
+        "days_refreshed": rows[0]["days_refreshed"] if rows else 0,
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+    logger.info("Analytics rollup refresh: %s", result)
+    return result
+
+
+class RollupScheduler:
+    """Background task refreshing the rollups every interval_s seconds"""
+
+    def __init__(self, interval_s: int = ROLLUP_INTERVAL_S):
+        self.interval_s = interval_s
+        self._task: Optional[asyncio.Task] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="analytics-rollups")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.last_result = await refresh_rollups()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("Analytics rollup refresh failed: %s", e)
+            await asyncio.sleep(self.interval_s)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ROLLUPS_ENABLED,
+            "interval_s": self.interval_s,
+            "running": self._task is not None and not self._task.done(),
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+_scheduler: Optional[RollupScheduler] = None
+
+
+def get_rollup_scheduler() -> RollupScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RollupScheduler()
+    return _scheduler
+
+
+# ───────────── readers ─────────────
+
+# Same definitions as vw_dashboard_metrics (0018), over the daily facts
+DASHBOARD_ROLLUP_SQL = """
+WITH leads AS (
+    SELECT
+        COALESCE(SUM(leads), 0) AS total_leads,
+        COALESCE(SUM(hot_leads), 0) AS hot_leads,
+        COALESCE(SUM(leads) FILTER (WHERE lifecycle_state = 'enquiry' AND day >= CURRENT_DATE - 30), 0) AS recent,
+        COALESCE(SUM(leads) FILTER (WHERE lifecycle_state = 'enquiry' AND day < CURRENT_DATE - 30), 0) AS older
+    FROM analytics_daily_leads
+    WHERE lifecycle_state IN ('enquiry', 'pre_applicant')
+),
+apps AS (
+    SELECT
+        COALESCE(SUM(applications), 0) AS total_applications,
+        COALESCE(SUM(applications) FILTER (WHERE stage = 'submitted' AND day >= CURRENT_DATE - 30), 0) AS recent,
+        COALESCE(SUM(applications) FILTER (WHERE stage = 'submitted' AND day < CURRENT_DATE - 30), 0) AS older,
+        COALESCE(SUM(applications) FILTER (WHERE stage = 'submitted' AND day >= CURRENT_DATE - 7), 0) AS this_week
+    FROM analytics_daily_applications
+),
+offers AS (
+    SELECT
+        COALESCE(SUM(total), 0) AS total_offers,
+        COALESCE(SUM(total) FILTER (WHERE status = 'accepted'), 0) AS accepted,
+        COALESCE(SUM(total) FILTER (WHERE status = 'issued' AND day >= CURRENT_DATE - 30), 0) AS recent,
+        COALESCE(SUM(total) FILTER (WHERE status = 'issued' AND day < CURRENT_DATE - 30), 0) AS older
+    FROM analytics_daily_outcomes WHERE kind = 'offer'
+),
+enrolled AS (
+    SELECT
+        COALESCE(SUM(total), 0) AS total_enrolled,
+        COALESCE(SUM(total) FILTER (WHERE day >= CURRENT_DATE - 30), 0) AS recent,
+        COALESCE(SUM(total) FILTER (WHERE day < CURRENT_DATE - 30), 0) AS older
+    FROM analytics_daily_outcomes WHERE kind = 'enrolment'
+)
+SELECT
+    leads.total_leads, apps.total_applications, offers.total_offers, enrolled.total_enrolled, leads.hot_leads,
+    ROUND(leads.total_leads * 0.15) AS applications_predicted,
+    ROUND(offers.accepted * 0.85) AS enrollment_predicted,
+    3650000 AS revenue_projected,
+    CASE WHEN leads.recent > 0 AND leads.older > 0
+         THEN ROUND(leads.recent::DECIMAL / leads.older * 100 - 100, 1) ELSE 0 END AS leads_change,
+    CASE WHEN apps.recent > 0 AND apps.older > 0
+         THEN ROUND(apps.recent::DECIMAL / apps.older * 100 - 100, 1) ELSE 0 END AS applications_change,
+    CASE WHEN offers.recent > 0 AND offers.older > 0
+         THEN ROUND(offers.recent::DECIMAL / offers.older * 100 - 100, 1) ELSE 0 END AS offers_change,
+    CASE WHEN enrolled.recent > 0 AND enrolled.older > 0
+         THEN ROUND(enrolled.recent::DECIMAL / enrolled.older * 100 - 100, 1) ELSE 0 END AS enrolled_change,
+    apps.this_week AS applications_this_week
+FROM leads, apps, offers, enrolled
+"""
+
+# Point-in-time counts that cannot be rolled up by day
+DASHBOARD_LIVE_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM people p WHERE p.lifecycle_state = 'enquiry' AND p.lead_score >= 85 AND NOT EXISTS (
+        SELECT 1 FROM activities a WHERE a.person_id = p.id AND a.created_at >= CURRENT_DATE - INTERVAL '3 days'
+    )) AS high_value_leads_uncontacted,
+    (SELECT COUNT(*) FROM interviews i JOIN applications a ON i.application_id = a.id
+     WHERE a.stage = 'interview_scheduled' AND i.scheduled_start < CURRENT_DATE + INTERVAL '7 days') AS upcoming_interviews,
+    (SELECT COUNT(*) FROM offers WHERE status = 'accepted' AND expires_at < CURRENT_DATE + INTERVAL '14 days')
+        AS enrollment_deadlines_approaching
+"""
+
+
+async def dashboard_metrics() -> Optional[Dict[str, Any]]:
+    """
+    vw_dashboard_metrics-shaped row from the rollups plus the live counts,
+    or None if the rollups are not built yet.
+    """
+    if not await rollups_ready():
+        return None
+    facts = await fetch(DASHBOARD_ROLLUP_SQL)
+    live = await fetch(DASHBOARD_LIVE_SQL)
+    return {**dict(facts[0]), **dict(live[0])}
+
+
+# vw_analytics_monthly_leads (0037) restricted to one lifecycle state
+MONTHLY_LEADS_BY_STATE_SQL = """
+SELECT
+    date_trunc('month', day)::date AS month,
+    SUM(leads)::integer AS leads,
+    COALESCE(SUM(leads) FILTER (WHERE lifecycle_state IN ('enrolled', 'student')), 0)::integer AS enrolled,
+    SUM(with_application)::integer AS with_application,
+    SUM(scored_leads)::integer AS scored_leads,
+    SUM(lead_score_sum) AS lead_score_sum
+FROM analytics_daily_leads
+WHERE lifecycle_state = %s
+GROUP BY 1
+"""
+
+
+async def monthly_leads(months: Optional[int] = None,
+                        lifecycle_state: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Monthly lead facts, newest month first (the last `months` months if
+    given; people in `lifecycle_state` only if given, every state
+    otherwise), or None if the rollups are not built yet.
+    """
+    if not await rollups_ready():
+        return None
+    args: List[Any] = []
+    if lifecycle_state is None:
+        sql = "SELECT * FROM vw_analytics_monthly_leads "
+    else:
+        sql = f"SELECT * FROM ({MONTHLY_LEADS_BY_STATE_SQL}) monthly "
+        args.append(lifecycle_state)
+    if months:
+        sql += "WHERE month >= date_trunc('month', CURRENT_DATE) - make_interval(months => %s) "
+        args.append(months - 1)
+    sql += "ORDER BY month DESC"
+    return [dict(r) for r in await fetch(sql, *args)]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Refresh the daily analytics rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every day instead of since the watermark")
+    args = parser.parse_args(argv)
+    print(asyncio.run(refresh_rollups(rebuild=args.rebuild)))
+
+
+if __name__ == "__main__":
+    main()
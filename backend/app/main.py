@@ -10,7 +10,9 @@ logging.basicConfig(
 from app.bootstrap_env import bootstrap_env
 bootstrap_env()
 
-from fastapi import FastAPI
+import asyncio
+import anyio
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
@@ -18,16 +20,28 @@ import os
 from app.core.settings import get_settings
 settings = get_settings()
 
-app = FastAPI(title="Bridge CRM API", version="0.1")
+# orjson-rendered JSON for every route that does not pick its own response class
+from app.core.serialization import FastJSONResponse
+app = FastAPI(title="Bridge CRM API", version="0.1", default_response_class=FastJSONResponse)
 
 # Add request ID middleware
 from app.middleware.request_id import RequestIDMiddleware
 app.add_middleware(RequestIDMiddleware)
 
+# Compress large responses (brotli/gzip, negotiated per request)
+from app.middleware.compression import CompressionMiddleware
+app.add_middleware(CompressionMiddleware)
+
+# Prometheus latency histograms per route; exposed on /metrics below
+from app.core import metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Add rate limiting middleware
 from app.middleware.rate_limit import rate_limiter
 app.middleware("http")(rate_limiter)
 
+STARTUP_WARMUP_ENABLED = os.getenv("STARTUP_WARMUP_ENABLED", "true").lower() == "true"
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
@@ -36,7 +50,8 @@ async def startup_event():
     
     # Log AI configuration for debugging
     try:
-        from app.ai import IVY_ORGANIC_ENABLED, AI_PARSER_ENABLED, AI_NARRATOR_ENABLED, OPENAI_API_KEY, GEMINI_API_KEY
+        from app.ai import IVY_ORGANIC_ENABLED, AI_PARSER_ENABLED, AI_NARRATOR_ENABLED, OPENAI_API_KEY, GEMINI_API_KEY, log_ai_configuration
+        log_ai_configuration()
         ai_config = {
             "AI_MODEL_PROVIDER": os.getenv("AI_MODEL_PROVIDER", "unknown"),
             "IVY_ORGANIC_ENABLED": IVY_ORGANIC_ENABLED,
@@ -49,19 +64,17 @@ async def startup_event():
     except Exception as e:
         print(f"⚠️  AI config logging failed: {e}")
     
-    # Pre-warm ML model for faster first requests
+    # Load the local intent model in a worker thread so the first classify() never blocks the loop
     try:
-        from app.ai.model_registry import load_active_model
-        print("🔄 Pre-warming ML model...")
-        model = load_active_model()
-        print(f"✅ ML model pre-warmed: {model.version} (SHA256: {model.sha256[:8]}...)")
+        from app.ai.intent_model import warm_intent_model
+        intent_model = await warm_intent_model()
+        if intent_model is not None:
+            print(f"✅ Local intent model loaded: {intent_model.version}")
     except Exception as e:
-        print(f"⚠️  ML model pre-warming failed: {e}")
-        print("ℹ️  First ML request may be slower due to cold start")
+        print(f"⚠️  Local intent model warm-up failed: {e}")
     
     # Warm up narrate() cache for common modes
     try:
-        import asyncio
         from app.ai.runtime import narrate, narrate_triage_bullets
         
         # Warm up cache with minimal calls
@@ -77,8 +90,60 @@ async def startup_event():
     except Exception as e:
         print(f"⚠️  AI cache warmup failed: {e}")
     
+    # Keep the daily analytics rollups current (dashboard, forecasting, trends)
+    try:
+        from app.db.rollups import ROLLUPS_ENABLED, get_rollup_scheduler
+        if ROLLUPS_ENABLED:
+            get_rollup_scheduler().start()
+            print("🔄 Analytics rollup refresh scheduled")
+    except Exception as e:
+        print(f"⚠️  Analytics rollup scheduler failed to start: {e}")
+    
+    # Import the lazily mounted AI routers and the ML model after startup, so
+    # the worker accepts requests without waiting for pandas/scikit-learn
+    if STARTUP_WARMUP_ENABLED:
+        app.state.warmup_task = asyncio.create_task(background_warmup())
+        print("🔄 AI router and ML model warm-up started in background")
+    
     print("✅ Application initialized")
 
+async def background_warmup():
+    """Load what the first AI requests would otherwise wait for"""
+    from app.core.lazy_routers import warm_lazy_routers
+    await warm_lazy_routers(app)
+    
+    # Pre-warm ML model for faster first requests
+    try:
+        from app.ai.model_registry import load_active_model
+        print("🔄 Pre-warming ML model...")
+        model = await anyio.to_thread.run_sync(load_active_model)
+        print(f"✅ ML model pre-warmed: {model.version} (SHA256: {model.sha256[:8]}...)")
+    except Exception as e:
+        print(f"⚠️  ML model pre-warming failed: {e}")
+        print("ℹ️  First ML request may be slower due to cold start")
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain queued telemetry and stop background jobs before the worker exits"""
+    try:
+        from app.telemetry.sink import get_telemetry_sink
+        await get_telemetry_sink().stop()
+    except Exception as e:
+        print(f"⚠️  Telemetry flush on shutdown failed: {e}")
+    try:
+        from app.db.rollups import get_rollup_scheduler
+        await get_rollup_scheduler().stop()
+    except Exception as e:
+        print(f"⚠️  Analytics rollup scheduler shutdown failed: {e}")
+    try:
+        from app.ai.training_jobs import shutdown_training_runner
+        shutdown_training_runner()
+    except Exception as e:
+        print(f"⚠️  Training job shutdown failed: {e}")
+    from app.core.tracing import get_exporter
+    await anyio.to_thread.run_sync(get_exporter().flush)
+
 # CORS for your Vite dev server
 allow_origins = settings.cors_origins_list
 
@@ -98,6 +163,15 @@ async def root():
         "routes": ["/healthz", "/people/"],
     }
 
+if metrics.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        """Prometheus exposition, merged across workers in multi-process mode"""
+        body, content_type = await anyio.to_thread.run_sync(metrics.render)
+        return Response(body, media_type=content_type)
+else:
+    print("⚠️  /metrics disabled (prometheus-client not installed or METRICS_ENABLED=false)")
+
 @app.get("/healthz")
 async def healthz():
     """
@@ -148,251 +222,69 @@ app.include_router(properties_router, tags=["properties"])
 from app.routers.health import router as health_router
 app.include_router(health_router, tags=["health"])
 
-# AI routers
-try:
-	from app.routers.ai_leads import router as ai_leads_router
-	app.include_router(ai_leads_router)
-except Exception:
-    # Allow app to start if optional AI deps missing
-    pass
-
-# Adaptive triage router (ML-optimised lead scoring)
-try:
-    from app.ai.triage import router as triage_router
-    app.include_router(triage_router)
-except Exception as e:
-    print(f"❌ Failed to load triage router: {e}")
-    # Allow app to start if optional AI deps missing
-    pass
-
-# Forecasting router (Phase 2.1)
-try:
-    from app.ai.forecast import router as forecast_router
-    app.include_router(forecast_router)
-except Exception as e:
-    print(f"❌ Failed to load forecast router: {e}")
-    pass
-
-# Source Analytics router (Phase 2.2)
-try:
-    from app.ai.source_analytics import router as source_analytics_router
-    app.include_router(source_analytics_router)
-except Exception as e:
-    print(f"❌ Failed to load source analytics router: {e}")
-    pass
-
-# Anomaly Detection router (Phase 2.3)
-try:
-    from app.ai.anomaly_detection import router as anomaly_detection_router
-    app.include_router(anomaly_detection_router)
-except Exception as e:
-    print(f"❌ Failed to load anomaly detection router: {e}")
-    pass
-
-# ML Models router (Phase 2.4)
-try:
-    from app.ai.ml_models import router as ml_models_router
-    app.include_router(ml_models_router)
-except Exception as e:
-    print(f"❌ Failed to load ML models router: {e}")
-    pass
-
-# Segmentation router (Phase 3.1)
-try:
-    from app.ai.segmentation import router as segmentation_router
-    app.include_router(segmentation_router)
-except Exception as e:
-    print(f"❌ Failed to load segmentation router: {e}")
-    pass
-
-# Cohort Scoring router (Phase 3.2)
-try:
-    from app.ai.cohort_scoring import router as cohort_scoring_router
-    app.include_router(cohort_scoring_router)
-except Exception as e:
-    print(f"❌ Failed to load cohort scoring router: {e}")
-    pass
-
-# Cohort Performance router (Phase 3.4)
-try:
-    from app.ai.cohort_performance import router as cohort_performance_router
-    app.include_router(cohort_performance_router)
-except Exception as e:
-    print(f"❌ Failed to load cohort performance router: {e}")
-    pass
-
-# Natural Language Queries router (Phase 4.1)
-try:
-    from app.ai.natural_language import router as natural_language_router
-    app.include_router(natural_language_router)
-except Exception as e:
-    print(f"❌ Failed to load natural language router: {e}")
-    pass
-
-# RAG Streaming router (Performance Optimization)
-try:
-    from app.routers.rag_streaming import router as rag_streaming_router
-    app.include_router(rag_streaming_router)
-    print("✅ RAG Streaming router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load RAG streaming router: {e}")
-    pass
-
-# People Optimized router (Contact Loading Performance)
-try:
-    from app.routers.people_optimized import router as people_optimized_router
-    app.include_router(people_optimized_router, prefix="/people", tags=["people-optimized"])
-    print("✅ People Optimized router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load People Optimized router: {e}")
-    pass
-
-# Applications Optimized router (Application Page Performance)
-try:
-    from app.routers.applications_optimized import router as applications_optimized_router
-    app.include_router(applications_optimized_router, prefix="/applications", tags=["applications-optimized"])
-    print("✅ Applications Optimized router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load Applications Optimized router: {e}")
-    pass
-
-# Advanced ML router (Phase 4.2) - Hardened Version (mounted first)
-try:
-    from app.ai.advanced_ml_hardened import router as advanced_ml_hardened_router
-    app.include_router(advanced_ml_hardened_router, tags=["advanced-ml (hardened)"])
-    print("✅ Advanced ML (hardened) router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load advanced ML (hardened) router: {e}")
-    pass
-
-# Advanced ML router (Phase 4.2) - Legacy (for backward compatibility)
-# Can be disabled in production with AI_ENABLE_LEGACY_ADVANCED_ML=false
-if os.getenv("AI_ENABLE_LEGACY_ADVANCED_ML", "true").lower() == "true":
-    try:
-        from app.ai.advanced_ml import router as advanced_ml_legacy_router
-        app.include_router(advanced_ml_legacy_router, prefix="/ai/advanced-ml-legacy", tags=["advanced-ml (legacy)"])
-        print("✅ Advanced ML (legacy) router loaded successfully")
-    except Exception as e:
-        print(f"❌ Failed to load advanced ML (legacy) router: {e}")
-        pass
-else:
+# Optional routers. A router whose import fails is logged and skipped so the
+# app still starts without optional AI dependencies. Routers given a lazy
+# path import pandas/scikit-learn/LLM SDKs at module level: they are mounted
+# lazily and imported on first use or by the background warm-up (see
+# app.core.lazy_routers).
+from app.core.lazy_routers import include_optional_router
+
+LEGACY_ADVANCED_ML_ENABLED = os.getenv("AI_ENABLE_LEGACY_ADVANCED_ML", "true").lower() == "true"
+
+# (module, label, lazy path, include_router kwargs) in registration order
+OPTIONAL_ROUTERS = [
+    ("app.routers.ai_leads", "AI leads", None, {}),
+    # Adaptive triage (ML-optimised lead scoring)
+    ("app.ai.triage", "triage", "/ai/triage", {}),
+    # Phase 2: forecasting, source analytics, anomaly detection, ML models
+    ("app.ai.forecast", "forecast", "/ai/forecast", {}),
+    ("app.ai.source_analytics", "source analytics", None, {}),
+    ("app.ai.anomaly_detection", "anomaly detection", None, {}),
+    ("app.ai.ml_models", "ML models", None, {}),
+    # Phase 3: segmentation and cohorts
+    ("app.ai.segmentation", "segmentation", None, {}),
+    ("app.ai.cohort_scoring", "cohort scoring", None, {}),
+    ("app.ai.cohort_performance", "cohort performance", None, {}),
+    # Phase 4.1: natural language queries
+    ("app.ai.natural_language", "natural language", None, {}),
+    # Performance: RAG streaming, contact loading, application page
+    ("app.routers.rag_streaming", "RAG streaming", None, {}),
+    ("app.routers.people_optimized", "People Optimized", None, {"prefix": "/people", "tags": ["people-optimized"]}),
+    ("app.routers.applications_optimized", "Applications Optimized", None,
+     {"prefix": "/applications", "tags": ["applications-optimized"]}),
+    # Phase 4.2: advanced ML, hardened version mounted first. The legacy
+    # version can be disabled in production with AI_ENABLE_LEGACY_ADVANCED_ML=false
+    ("app.ai.advanced_ml_hardened", "advanced ML (hardened)", "/ai/advanced-ml",
+     {"tags": ["advanced-ml (hardened)"]}),
+    *([("app.ai.advanced_ml", "advanced ML (legacy)", "/ai/advanced-ml-legacy",
+        {"prefix": "/ai/advanced-ml-legacy", "tags": ["advanced-ml (legacy)"]})]
+      if LEGACY_ADVANCED_ML_ENABLED else []),
+    # Application progression prediction
+    ("app.ai.application_ml", "application intelligence ML", None, {}),
+    # Phase 4.2: Gemini chat. Phase 4.4: dashboard predictive analytics
+    ("app.routers.ai_chat", "AI chat", "/api/ai", {}),
+    ("app.routers.predictive_analytics", "predictive analytics", "/api/predictive-analytics", {}),
+    # Phase 5: PII redaction, user management/RBAC, rate limiting, security
+    ("app.routers.pii_redaction", "PII Redaction", None, {}),
+    ("app.routers.user_management", "User Management", None, {}),
+    ("app.routers.optimization", "Optimization", None, {}),
+    ("app.routers.security", "Security", None, {}),
+    # Phase 6: Ask Ivy RAG, application AI analysis, DB-grounded pipeline summaries
+    ("app.routers.rag", "RAG", None, {}),
+    ("app.routers.applications_ai", "Applications AI", None, {}),
+    ("app.routers.applications_insights", "Applications Insights", None, {}),
+    # Multi-step orchestration for Ask Ivy
+    ("app.routers.ai_router", "AI Router", "/ai/router", {}),
+    # Call management and meeting booking
+    ("app.routers.calls", "calls", None, {}),
+    ("app.routers.meetings", "meetings", None, {}),
+]
+
+for module, label, lazy_path, include_kwargs in OPTIONAL_ROUTERS:
+    include_optional_router(app, module, label, lazy_path, **include_kwargs)
+if not LEGACY_ADVANCED_ML_ENABLED:
     print("ℹ️  Advanced ML (legacy) router disabled via environment variable")
 
-# Application Intelligence ML router (Application Progression Prediction)
-try:
-    from app.ai.application_ml import router as application_ml_router
-    app.include_router(application_ml_router)
-    print("✅ Application Intelligence ML router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load application intelligence ML router: {e}")
-    pass
-
-# AI Chat router (Phase 4.2 - Gemini Integration)
-try:
-    from app.routers.ai_chat import router as ai_chat_router
-    app.include_router(ai_chat_router)
-except Exception as e:
-    print(f"❌ Failed to load AI chat router: {e}")
-    pass
-
-# Predictive Analytics router (Phase 4.4 - Dashboard Data Integration)
-try:
-    from app.routers.predictive_analytics import router as predictive_analytics_router
-    app.include_router(predictive_analytics_router)
-except Exception as e:
-    print(f"❌ Failed to load predictive analytics router: {e}")
-    pass
-
-# PII Redaction router (Phase 5.1 - Enhanced PII Redaction & GDPR Compliance)
-try:
-    from app.routers.pii_redaction import router as pii_redaction_router
-    app.include_router(pii_redaction_router)
-    print("✅ PII Redaction router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load PII redaction router: {e}")
-    pass
-
-# User Management router (Phase 5.2 - Advanced User Management & RBAC)
-try:
-    from app.routers.user_management import router as user_management_router
-    app.include_router(user_management_router)
-    print("✅ User Management router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load user management router: {e}")
-    pass
-
-# Optimization router (Phase 5.3 - API Rate Limiting & Optimization)
-try:
-    from app.routers.optimization import router as optimization_router
-    app.include_router(optimization_router)
-    print("✅ Optimization router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load optimization router: {e}")
-    pass
-
-# Security router (Phase 5.4 - Advanced Security & Compliance)
-try:
-    from app.routers.security import router as security_router
-    app.include_router(security_router)
-    print("✅ Security router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load security router: {e}")
-    pass
-
-# RAG router (Phase 6.1 - Ask Ivy Intelligence)
-try:
-    from app.routers.rag import router as rag_router
-    app.include_router(rag_router)
-    print("✅ RAG router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load RAG router: {e}")
-    pass
-
-# Applications AI router (Phase 6.2 - Application-specific AI Analysis)
-try:
-    from app.routers.applications_ai import router as applications_ai_router
-    app.include_router(applications_ai_router)
-    print("✅ Applications AI router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load Applications AI router: {e}")
-    pass
-
-# Applications Insights router (DB-grounded pipeline summaries)
-try:
-    from app.routers.applications_insights import router as applications_insights_router
-    app.include_router(applications_insights_router)
-    print("✅ Applications Insights router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load Applications Insights router: {e}")
-    pass
-
-# AI Router (Multi-step orchestration for Ask Ivy)
-try:
-    from app.routers.ai_router import router as ai_router_router
-    app.include_router(ai_router_router)
-    print("✅ AI Router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load AI Router: {e}")
-    pass
-
-# Calls router (Call Management & Tracking)
-try:
-    from app.routers.calls import router as calls_router
-    app.include_router(calls_router)
-    print("✅ Calls router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load calls router: {e}")
-    pass
-
-# Meetings router (Meeting Booking & Scheduling)
-try:
-    from app.routers.meetings import router as meetings_router
-    app.include_router(meetings_router)
-    print("✅ Meetings router loaded successfully")
-except Exception as e:
-    print(f"❌ Failed to load meetings router: {e}")
-    pass
-
 @app.get("/healthz/db")
 async def healthz_db():
     """
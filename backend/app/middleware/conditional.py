@@ -0,0 +1,97 @@
+"""
+Conditional GET for polled read endpoints
+
+The frontend polls the board, leads and dashboard endpoints. A route opts in
+with a ConditionalGet dependency that asks a cheap version function (a
+data_versions counter, max(updated_at), the rollup watermark...) for the
+current data version and derives a weak ETag from it:
+
+    @router.get("/board", dependencies=[Depends(ConditionalGet("board", board_version, "private, no-cache"))])
+
+If the request's If-None-Match matches, the dependency answers 304 before
+the endpoint runs, so the heavy query and serialisation are skipped.
+Otherwise the ETag and Cache-Control headers are added to the normal response.
+
+The ETag also covers the query string, and optionally a time bucket
+(max_stale_s) so that changes a version function cannot see (a refresh run
+outside the API, a late-committing transaction) are picked up within
+max_stale_s seconds.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from app.db.db import execute_returning
+
+logger = logging.getLogger(__name__)
+
+CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "true").lower() == "true"
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2) against an If-None-Match header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ConditionalGet:
+    """
+    FastAPI dependency adding ETag/Cache-Control to a GET route and
+    answering 304 Not Modified when the client's copy is current.
+    If the version function fails the request is served normally, without
+    an ETag.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        version: Callable[[], Awaitable[Any]],
+        cache_control: str,
+        max_stale_s: Optional[int] = None,
+    ):
+        self.name = name
+        self.version = version
+        self.cache_control = cache_control
+        self.max_stale_s = max_stale_s
+
+    async def __call__(self, request: Request, response: Response) -> None:
+        response.headers["Cache-Control"] = self.cache_control
+        if not CONDITIONAL_GET_ENABLED:
+            return
+        try:
+            version = await self.version()
+        except Exception as e:
+            logger.warning("Data version for %s unavailable, serving without ETag: %s", self.name, e)
+            return
+
+        bucket = int(time.time() // self.max_stale_s) if self.max_stale_s else None
+        etag = weak_etag(self.name, version, request.url.query, bucket)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": self.cache_control})
+        response.headers["ETag"] = etag
+
+
+async def bump_data_version(name: str) -> int:
+    """Invalidate ETags built from the data_versions row `name`; call after the write is committed"""
+    rows = await execute_returning("SELECT bump_data_version(%s) AS version", name)
+    return rows[0]["version"]
@@ -2,27 +2,69 @@
 Request ID Middleware
 
 Adds a unique request ID to all requests for correlation across logs and responses.
+The same ID keys the request's trace (app.core.tracing): the root span opened here
+is the parent of every DB, LLM, embedding and retrieval span the request causes.
 """
 
 import uuid
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.core import tracing
+
 
 class RequestIDMiddleware(BaseHTTPMiddleware):
     """Middleware to add request ID to all requests"""
-    
+
     async def dispatch(self, request: Request, call_next):
         # Generate or extract request ID
         request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
-        
+
         # Add to request state for use in handlers
         request.state.request_id = request_id
-        
-        # Process request
-        response = await call_next(request)
-        
+
+        root = tracing.start_request_trace(
+            request_id, f"{request.method} {request.url.path}",
+            traceparent=request.headers.get("traceparent"),
+            attributes={"http.method": request.method, "http.target": request.url.path},
+        )
+        if root is None:
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = request_id
+            return response
+
+        # Process request; the app runs in a task that inherits the active span
+        token = tracing.activate(root)
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            root.record_exception(e)
+            tracing.end_request_trace(root)
+            raise
+        finally:
+            tracing.deactivate(token)
+
+        route = request.scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            root.name = f"{request.method} {route.path}"
+            root.set_attribute("http.route", route.path)
+        root.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            root.status = tracing.STATUS_ERROR
+
+        # Streaming bodies are produced after dispatch returns; end the trace with the body
+        body_iterator = response.body_iterator
+
+        async def traced_body():
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            finally:
+                tracing.end_request_trace(root)
+
+        response.body_iterator = traced_body()
+
         # Add request ID to response headers
         response.headers["X-Request-ID"] = request_id
-        
+
         return response
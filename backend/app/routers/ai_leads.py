@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
-from typing import Any, Dict
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List
+import json
 import time
 
 from app.ai import AI_LEADS_ENABLED
-from app.ai.tools.leads import sql_query_leads, compose_outreach as compose_outreach_tool, LeadLite, _rule_score
+from app.ai.tools.leads import sql_query_leads, compose_outreach as compose_outreach_tool, LeadLite, _rule_score, leads_triage_stream
 from app.ai.tools.score_explanations import calculate_score_breakdown, score_breakdown_to_dict
 from app.telemetry import log_ai_event, log_ai_event_extended
 from app.schemas.ai_ml import PredictBatchRequest
@@ -51,20 +54,7 @@ async def triage(payload: Dict[str, Any]):
             # Sort by score desc
             scored.sort(key=lambda x: x["score"], reverse=True)
         
-        # Extract top reasons from the scored leads
-        all_reasons = []
-        for item in scored:
-            all_reasons.extend(item["reasons"])
-        
-        # Get most common reasons
-        from collections import Counter
-        reason_counts = Counter(all_reasons)
-        top_reasons = [reason for reason, count in reason_counts.most_common(3)]
-        
-        summary = {
-            "cohort_size": len(leads),
-            "top_reasons": top_reasons if top_reasons else ["High lead scores", "Recent activity", "Strong engagement"]
-        }
+        summary = _triage_summary(scored, len(leads))
         
         ms = int((time.time() - t0) * 1000)
         await log_ai_event("leads.triage", {"rows": len(scored), "latency_ms": ms})
@@ -80,6 +70,70 @@ async def triage(payload: Dict[str, Any]):
         }
 
 
+def _triage_summary(scored: List[Dict[str, Any]], cohort_size: int) -> Dict[str, Any]:
+    # Extract top reasons from the scored leads
+    all_reasons = []
+    for item in scored:
+        all_reasons.extend(item.get("reasons") or [])
+    
+    # Get most common reasons
+    reason_counts = Counter(all_reasons)
+    top_reasons = [reason for reason, count in reason_counts.most_common(3)]
+    
+    return {
+        "cohort_size": cohort_size,
+        "top_reasons": top_reasons if top_reasons else ["High lead scores", "Recent activity", "Strong engagement"]
+    }
+
+
+@router.post("/triage/stream")
+async def triage_stream(payload: Dict[str, Any], request: Request):
+    """
+    Streaming variant of /triage for large cohorts.
+    
+    Emits one event per line: "scores" (ML-ranked rows, no explanations yet),
+    then an "explanations" patch ({lead_id: fields}) as each LLM chunk lands,
+    then "summary" with the top reasons. NDJSON by default; server-sent events
+    when payload.format == "sse" or the client accepts text/event-stream.
+    """
+    if not AI_LEADS_ENABLED:
+        raise HTTPException(status_code=404, detail="AI leads is disabled")
+    filters = payload.get("filters", {})
+    lead_ids = payload.get("lead_ids", [])
+    use_sse = payload.get("format") == "sse" or "text/event-stream" in request.headers.get("accept", "")
+    
+    def encode(event: Dict[str, Any]) -> str:
+        line = json.dumps(event, default=str)
+        return f"data: {line}\n\n" if use_sse else line + "\n"
+    
+    async def events() -> AsyncIterator[str]:
+        t0 = time.time()
+        try:
+            leads = await sql_query_leads(filters, lead_ids=lead_ids or None)
+            rows: Dict[str, Dict[str, Any]] = {}
+            async for event in leads_triage_stream(leads):
+                if event["type"] == "scores":
+                    rows = {row["id"]: row for row in event["items"]}
+                    event["latency_ms"] = int((time.time() - t0) * 1000)
+                else:
+                    for lead_id, fields in event["items"].items():
+                        rows.get(lead_id, {}).update(fields)
+                yield encode(event)
+            
+            ms = int((time.time() - t0) * 1000)
+            yield encode({"type": "summary", "summary": _triage_summary(list(rows.values()), len(leads)), "latency_ms": ms})
+            await log_ai_event("leads.triage", {"rows": len(rows), "latency_ms": ms, "streaming": True})
+        except Exception as e:
+            print(f"AI triage stream error: {e}")
+            yield encode({"type": "error", "message": "Triage failed", "latency_ms": int((time.time() - t0) * 1000)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/explain-score")
 async def explain_score(payload: Dict[str, Any]):
     """
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Query, HTTPException, Path, Body
+from fastapi import APIRouter, Query, HTTPException, Path, Body, Depends
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 from app.db.db import fetch, execute, fetchrow
+from app.middleware.conditional import ConditionalGet, bump_data_version, weak_etag
 from app.schemas.applications import ApplicationCard, StageMoveIn, StageMoveOut
 from datetime import datetime
 
@@ -29,8 +30,51 @@ ALLOWED_STAGES = {
     "offer_declined": "Offer Declined"
 }
 
-@router.get("/board", response_model=List[ApplicationCard])
-@router.get("/board/", response_model=List[ApplicationCard])
+BOARD_VERSION = "vw_board_applications"
+
+
+async def board_version():
+    """
+    Our refreshes bump data_versions; a plain REFRESH run outside the API
+    (migrations, scripts) swaps the view's relfilenode
+    """
+    rows = await fetch(
+        """
+        select (select version from data_versions where name = %s) as version,
+               (select relfilenode from pg_class where oid = 'vw_board_applications'::regclass) as relfilenode
+        """,
+        BOARD_VERSION,
+    )
+    return rows[0]["version"], rows[0]["relfilenode"]
+
+
+async def refresh_board() -> None:
+    """Refresh vw_board_applications and invalidate board ETags"""
+    try:
+        await execute("refresh materialized view concurrently vw_board_applications;")
+    except Exception:
+        # Fallback if concurrently not allowed
+        await execute("refresh materialized view vw_board_applications;")
+    try:
+        await bump_data_version(BOARD_VERSION)
+    except Exception as e:
+        # Board ETags then expire on their max_stale_s bucket instead
+        print(f"⚠️ Could not bump {BOARD_VERSION} data version: {e}")
+
+
+STAGES_VERSION = weak_etag(sorted(ALLOWED_STAGES.items()))
+
+
+async def _stages_version():
+    return STAGES_VERSION
+
+
+# Polled by the board; the ETag only changes when the view is refreshed
+board_conditional = ConditionalGet("applications.board", board_version, "private, no-cache", max_stale_s=300)
+stages_conditional = ConditionalGet("applications.stages", _stages_version, "public, max-age=3600")
+
+@router.get("/board", response_model=List[ApplicationCard], dependencies=[Depends(board_conditional)])
+@router.get("/board/", response_model=List[ApplicationCard], dependencies=[Depends(board_conditional)])
 async def board(
     stage: Optional[str] = Query(None),
     assignee: Optional[UUID] = Query(None),
@@ -88,14 +132,10 @@ async def board(
 
 @router.post("/board/_refresh", status_code=204)
 async def refresh_board_mv():
-    try:
-        await execute("refresh materialized view concurrently vw_board_applications;")
-    except Exception:
-        # Fallback if concurrently not allowed
-        await execute("refresh materialized view vw_board_applications;")
+    await refresh_board()
     return None
 
-@router.get("/stages")
+@router.get("/stages", dependencies=[Depends(stages_conditional)])
 async def list_stages():
     """Get all available stages with their display labels"""
     return [{"id": stage_id, "label": stage_label} for stage_id, stage_label in ALLOWED_STAGES.items()]
@@ -144,10 +184,7 @@ async def move_stage(
     )
 
     # Refresh MV best-effort
-    try:
-        await execute("refresh materialized view concurrently vw_board_applications;")
-    except Exception:
-        await execute("refresh materialized view vw_board_applications;")
+    await refresh_board()
 
     return {"application_id": application_id, "from_stage": from_stage, "to_stage": to_stage}
 
@@ -168,10 +205,7 @@ async def update_priority(
     )
     
     # Refresh MV
-    try:
-        await execute("refresh materialized view concurrently vw_board_applications;")
-    except Exception:
-        await execute("refresh materialized view vw_board_applications;")
+    await refresh_board()
     
     return {"ok": True}
 
@@ -232,10 +266,7 @@ async def bulk_move_stage(payload: Dict[str, Any] = Body(...)):
             failed.append({"id": app_id, "error": str(e)})
     
     # Refresh MV
-    try:
-        await execute("refresh materialized view concurrently vw_board_applications;")
-    except Exception:
-        await execute("refresh materialized view vw_board_applications;")
+    await refresh_board()
     
     return {
         "total_processed": len(application_ids),
@@ -281,10 +312,7 @@ async def bulk_update_priority(payload: Dict[str, Any] = Body(...)):
             failed.append({"id": app_id, "error": str(e)})
     
     # Refresh MV
-    try:
-        await execute("refresh materialized view concurrently vw_board_applications;")
-    except Exception:
-        await execute("refresh materialized view vw_board_applications;")
+    await refresh_board()
     
     return {
         "total_processed": len(application_ids),
@@ -5,22 +5,39 @@ Provides DB-grounded pipeline summaries and contextual answers for the
 admissions Applications board. This avoids using RAG for numeric truth and
 instead computes facts from the database, then uses the AI runtime to compose
 a concise, UK HE-specific narrative.
+
+The pipeline summary is aggregated in SQL (GROUP BY stage/programme,
+jsonb_array_elements for blockers, percentile_cont for the progression
+distribution), so it covers every matching application. The original
+row-loading Python summary is kept as the fallback. Summaries are cached for
+APPLICATIONS_INSIGHTS_CACHE_TTL_S seconds per filter set.
 """
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 import json
 import logging
+import os
+
+import numpy as np
 
 from app.db.db import fetch
+from app.ai.cache import _TTLCache, make_key
 from app.ai.runtime import narrate
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/applications/insights", tags=["applications-insights"])
 
+SQL_SUMMARY_ENABLED = os.getenv("APPLICATIONS_INSIGHTS_SQL_SUMMARY", "true").lower() == "true"
+_SUMMARY_CACHE = _TTLCache(
+    ttl_s=int(os.getenv("APPLICATIONS_INSIGHTS_CACHE_TTL_S", "30")),
+    max_items=int(os.getenv("APPLICATIONS_INSIGHTS_CACHE_MAX", "256")),
+)
+PERCENTILES = (0.25, 0.5, 0.75)
+
 
 class InsightsFilters(BaseModel):
     stage: Optional[str] = None
@@ -40,6 +57,7 @@ class PipelineSummary(BaseModel):
     programHistogram: List[Dict[str, Any]] = Field(default_factory=list)
     topBlockers: List[Dict[str, Any]] = Field(default_factory=list)
     topAtRisk: List[Dict[str, Any]] = Field(default_factory=list)
+    progressionPercentiles: Dict[str, float] = Field(default_factory=dict)  # p25/p50/p75
 
 
 class AskRequest(BaseModel):
@@ -55,6 +73,32 @@ class AskResponse(BaseModel):
     query_type: str = "applications_insights"
 
 
+def _where_clause(filters: Optional[InsightsFilters]) -> Tuple[str, List[Any]]:
+    """WHERE clause (with trailing space, or empty) and params for the board filters"""
+    where = []
+    params: List[Any] = []
+
+    if filters and filters.stage and filters.stage != "all":
+        where.append("stage = %s")
+        params.append(filters.stage)
+    if filters and filters.priority and filters.priority != "all":
+        where.append("priority = %s")
+        params.append(filters.priority)
+    if filters and filters.urgency and filters.urgency != "all":
+        where.append("urgency = %s")
+        params.append(filters.urgency)
+    if filters and filters.program and filters.program != "all":
+        where.append("programme_name = %s")
+        params.append(filters.program)
+    if filters and filters.application_ids:
+        where.append("application_id = ANY(%s::uuid[])")
+        params.append(filters.application_ids)
+
+    if not where:
+        return "", params
+    return "WHERE " + " AND ".join(where) + " ", params
+
+
 async def _load_dataset(filters: Optional[InsightsFilters]) -> List[Dict[str, Any]]:
     """Load the current applications dataset from the materialised view.
 
@@ -62,33 +106,14 @@ async def _load_dataset(filters: Optional[InsightsFilters]) -> List[Dict[str, An
     and exposes ML fields. Fall back to an empty list on failure.
     """
     try:
-        where = []
-        params: List[Any] = []
-
-        if filters and filters.stage and filters.stage != "all":
-            where.append("stage = %s")
-            params.append(filters.stage)
-        if filters and filters.priority and filters.priority != "all":
-            where.append("priority = %s")
-            params.append(filters.priority)
-        if filters and filters.urgency and filters.urgency != "all":
-            where.append("urgency = %s")
-            params.append(filters.urgency)
-        if filters and filters.program and filters.program != "all":
-            where.append("programme_name = %s")
-            params.append(filters.program)
-        if filters and filters.application_ids:
-            where.append("application_id = ANY(%s::uuid[])")
-            params.append(filters.application_ids)
-
+        where, params = _where_clause(filters)
         sql = (
             "SELECT application_id, stage, programme_name, progression_probability, "
-            "       enrollment_probability, progression_blockers, recommended_actions, "
-            "       first_name, last_name, last_activity_at "
+            "       conversion_probability, enrollment_probability, progression_blockers, "
+            "       recommended_actions, first_name, last_name, last_activity_at "
             "FROM vw_board_applications "
         )
-        if where:
-            sql += "WHERE " + " AND ".join(where) + " "
+        sql += where
         sql += "ORDER BY created_at DESC LIMIT 1000"
 
         rows = await fetch(sql, *params)
@@ -176,15 +201,7 @@ def _summarise(dataset: List[Dict[str, Any]]) -> PipelineSummary:
         dataset,
         key=lambda r: float(r.get("progression_probability") or r.get("conversion_probability") or 0)
     )[:10]
-    topAtRisk = [
-        {
-            "application_id": str(r.get("application_id")),
-            "name": f"{(r.get('first_name') or '').strip()} {(r.get('last_name') or '').strip()}".strip() or "Unknown",
-            "probability": float(r.get("progression_probability") or r.get("conversion_probability") or 0),
-            "stage": r.get("stage")
-        }
-        for r in at_risk_sorted
-    ]
+    topAtRisk = [_at_risk_entry(r) for r in at_risk_sorted]
 
     return PipelineSummary(
         total=total,
@@ -196,9 +213,130 @@ def _summarise(dataset: List[Dict[str, Any]]) -> PipelineSummary:
         programHistogram=programHistogram,
         topBlockers=topBlockers,
         topAtRisk=topAtRisk,
+        progressionPercentiles=_percentiles(np.percentile(probs, [q * 100 for q in PERCENTILES])),
     )
 
 
+def _at_risk_entry(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "application_id": str(r.get("application_id")),
+        "name": f"{(r.get('first_name') or '').strip()} {(r.get('last_name') or '').strip()}".strip() or "Unknown",
+        "probability": float(r.get("progression_probability") or r.get("conversion_probability") or 0),
+        "stage": r.get("stage")
+    }
+
+
+def _percentiles(values: Optional[List[Any]]) -> Dict[str, float]:
+    if values is None or len(values) == 0:
+        return {}
+    return {f"p{int(q * 100)}": round(float(v), 3) for q, v in zip(PERCENTILES, values)}
+
+
+# Same semantics as _summarise: probability falls back to conversion_probability,
+# missing stage/programme labels count as "unknown", blockers without an item are
+# skipped, ties keep the newest application first.
+_SUMMARY_SQL = """
+WITH base AS (
+    SELECT application_id, created_at, stage, first_name, last_name,
+           progression_probability, conversion_probability,
+           COALESCE(progression_probability, conversion_probability, 0) AS p,
+           COALESCE(enrollment_probability, 0) AS enroll,
+           btrim(COALESCE(NULLIF(stage, ''), 'unknown'), E' \\t\\n\\r\\f\\v') AS stage_label,
+           btrim(COALESCE(NULLIF(programme_name, ''), 'unknown'), E' \\t\\n\\r\\f\\v') AS programme_label,
+           CASE WHEN jsonb_typeof(progression_blockers) = 'array'
+                THEN progression_blockers ELSE '[]'::jsonb END AS blockers
+    FROM vw_board_applications
+    {where}
+),
+stages AS (
+    SELECT stage_label, COUNT(*) AS n, MAX(created_at) AS latest FROM base GROUP BY stage_label
+),
+programmes AS (
+    SELECT programme_label, COUNT(*) AS n, MAX(created_at) AS latest FROM base GROUP BY programme_label
+    ORDER BY n DESC, latest DESC NULLS LAST LIMIT 10
+),
+blockers AS (
+    SELECT e ->> 'item' AS item, COUNT(*) AS n, MAX(b.created_at) AS latest
+    FROM base b CROSS JOIN LATERAL jsonb_array_elements(b.blockers) AS e
+    WHERE jsonb_typeof(e) = 'object' AND COALESCE(e ->> 'item', '') <> ''
+    GROUP BY 1
+    ORDER BY n DESC, latest DESC NULLS LAST LIMIT 5
+),
+at_risk AS (
+    SELECT application_id, first_name, last_name, stage, progression_probability, conversion_probability
+    FROM base
+    ORDER BY COALESCE(NULLIF(progression_probability, 0), NULLIF(conversion_probability, 0), 0),
+             created_at DESC NULLS LAST
+    LIMIT 10
+)
+SELECT
+    COUNT(*) AS total,
+    COALESCE(SUM(p), 0) AS p_sum,
+    COUNT(*) FILTER (WHERE p <= 0.35) AS high_risk,
+    COUNT(*) FILTER (WHERE p >= 0.7) AS high_confidence,
+    COALESCE(SUM(enroll), 0) AS enroll_sum,
+    percentile_cont(ARRAY[{percentiles}]::float8[]) WITHIN GROUP (ORDER BY p::float8) AS percentiles,
+    (SELECT COALESCE(jsonb_agg(jsonb_build_object('stage', stage_label, 'count', n)
+                               ORDER BY n DESC, latest DESC NULLS LAST), '[]'::jsonb) FROM stages) AS stage_histogram,
+    (SELECT COALESCE(jsonb_agg(jsonb_build_object('programme', programme_label, 'count', n)
+                               ORDER BY n DESC, latest DESC NULLS LAST), '[]'::jsonb) FROM programmes) AS programme_histogram,
+    (SELECT COALESCE(jsonb_agg(jsonb_build_object('item', item, 'count', n)
+                               ORDER BY n DESC, latest DESC NULLS LAST), '[]'::jsonb) FROM blockers) AS top_blockers,
+    (SELECT COALESCE(jsonb_agg(to_jsonb(at_risk)), '[]'::jsonb) FROM at_risk) AS top_at_risk
+FROM base
+"""
+
+
+def _as_json(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, str) else value
+
+
+async def _summarise_sql(filters: Optional[InsightsFilters]) -> PipelineSummary:
+    """Pipeline summary aggregated in Postgres over every matching application"""
+    where, params = _where_clause(filters)
+    sql = _SUMMARY_SQL.format(where=where, percentiles=", ".join(str(q) for q in PERCENTILES))
+    rows = await fetch(sql, *params)
+    row = rows[0] if rows else {}
+    total = int(row.get("total") or 0)
+    if not total:
+        return _summarise([])
+
+    return PipelineSummary(
+        total=total,
+        avgProgression=int(round((float(row["p_sum"]) / total) * 100)),
+        highRisk=int(row["high_risk"]),
+        highConfidence=int(row["high_confidence"]),
+        enrollmentEstimate=round(float(row["enroll_sum"]), 2),
+        stageHistogram=_as_json(row["stage_histogram"]),
+        programHistogram=_as_json(row["programme_histogram"]),
+        topBlockers=_as_json(row["top_blockers"]),
+        topAtRisk=[_at_risk_entry(r) for r in _as_json(row["top_at_risk"])],
+        progressionPercentiles=_percentiles(row.get("percentiles")),
+    )
+
+
+async def load_summary(filters: Optional[InsightsFilters]) -> PipelineSummary:
+    """
+    Cached pipeline summary for a filter set: SQL aggregation, or the Python
+    summary over the first 1,000 rows if the SQL engine is off or fails.
+    """
+    key = make_key("applications_insights", filters.model_dump() if filters else None)
+    cached = _SUMMARY_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    summary = None
+    if SQL_SUMMARY_ENABLED:
+        try:
+            summary = await _summarise_sql(filters)
+        except Exception as e:
+            logger.warning(f"SQL pipeline summary failed, using Python summary: {e}")
+    if summary is None:
+        summary = _summarise(await _load_dataset(filters))
+    _SUMMARY_CACHE.set(key, summary)
+    return summary
+
+
 def detect_query_intent(query: str) -> str:
     """
     Detect the intent of the query to provide contextually relevant answers.
@@ -431,8 +569,7 @@ def build_uk_he_fallback(summary: PipelineSummary, intent: str) -> str:
 
 @router.post("/summary", response_model=PipelineSummary)
 async def summary_ep(filters: InsightsFilters):
-    dataset = await _load_dataset(filters)
-    return _summarise(dataset)
+    return await load_summary(filters)
 
 
 @router.post("/ask", response_model=AskResponse)
@@ -440,8 +577,7 @@ async def ask_ep(req: AskRequest):
     try:
         logger.info(f"Applications insights query: {req.query}")
 
-        dataset = await _load_dataset(req.filters)
-        summary = _summarise(dataset)
+        summary = await load_summary(req.filters)
 
         # Detect query intent for UK HE context
         intent = detect_query_intent(req.query)
@@ -1,20 +1,40 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Dict, Any, Optional
 from app.db.db import fetch
+from app.db.rollups import dashboard_metrics, get_rollup_state
+from app.middleware.conditional import ConditionalGet
 
 router = APIRouter()
 
-@router.get("/metrics")
+async def _load_metrics() -> Optional[Dict[str, Any]]:
+    """Dashboard metrics from the daily rollups, or the vw_dashboard_metrics view until they are built"""
+    try:
+        metrics = await dashboard_metrics()
+        if metrics is not None:
+            return metrics
+    except Exception as e:
+        print(f"⚠️ Dashboard rollup read failed, using vw_dashboard_metrics: {e}")
+    result = await fetch("SELECT * FROM vw_dashboard_metrics LIMIT 1")
+    return result[0] if result else None
+
+async def metrics_version():
+    """The rollups change when the scheduler runs; the live counts are covered by the 60 s bucket"""
+    state = await get_rollup_state()
+    return state["last_run_at"] if state else None
+
+
+metrics_conditional = ConditionalGet("dashboard.metrics", metrics_version, "private, max-age=30", max_stale_s=60)
+
+@router.get("/metrics", dependencies=[Depends(metrics_conditional)])
 async def get_dashboard_metrics() -> Dict[str, Any]:
     """
     Get aggregated dashboard metrics for the CRM Overview page.
     Returns counts, trends, and predictions based on real data.
     """
     try:
-        # Get dashboard metrics from the view
-        result = await fetch("SELECT * FROM vw_dashboard_metrics LIMIT 1")
+        metrics = await _load_metrics()
         
-        if not result:
+        if not metrics:
             # Return default values if no data
             return {
                 "overview": {
@@ -41,8 +61,6 @@ async def get_dashboard_metrics() -> Dict[str, Any]:
                 }
             }
         
-        metrics = result[0]
-        
         return {
             "overview": {
                 "totalLeads": metrics["total_leads"] or 0,
@@ -77,13 +95,11 @@ async def get_ai_insights() -> Dict[str, Any]:
     Get AI-generated insights based on real data patterns.
     """
     try:
-        # Get insights data from the metrics view
-        result = await fetch("SELECT * FROM vw_dashboard_metrics LIMIT 1")
+        metrics = await _load_metrics()
         
-        if not result:
+        if not metrics:
             return {"insights": []}
         
-        metrics = result[0]
         insights = []
         
         # Generate insights based on data patterns
@@ -91,3 +91,28 @@ async def router_health() -> Dict[str, Any]:
             "error": str(e),
             "timestamp": datetime.utcnow().isoformat()
         }
+
+@router.get("/telemetry")
+async def telemetry_health() -> Dict[str, Any]:
+    """Background telemetry writer queue depth, drops and flush stats"""
+    from app.telemetry.sink import get_telemetry_sink
+    return {
+        "status": "healthy",
+        "sink": get_telemetry_sink().get_stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/rollups")
+async def rollups_health() -> Dict[str, Any]:
+    """Analytics rollup watermark and the last scheduled refresh"""
+    from app.db.rollups import get_rollup_scheduler, get_rollup_state
+    try:
+        state = await get_rollup_state()
+    except Exception as e:
+        state = {"error": str(e)}
+    return {
+        "status": "healthy" if state and state.get("watermark") else "degraded",
+        "state": state,
+        "scheduler": get_rollup_scheduler().get_stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
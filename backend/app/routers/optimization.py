@@ -14,7 +14,7 @@ import time
 
 # Import our optimization system
 from ..ai.rate_limiting import (
-    check_rate_limit, get_cache, set_cache, get_performance_stats,
+    acheck_rate_limit, get_cache, set_cache, get_performance_stats,
     get_slow_endpoints, get_cache_stats, get_resource_usage,
     RateLimitType, CacheStrategy, rate_limiter, cache_manager,
     performance_monitor, resource_monitor
@@ -114,7 +114,7 @@ async def check_rate_limit_endpoint(request: RateLimitCheckRequest):
             )
         
         # Check rate limit
-        limited, details = check_rate_limit(request.identifier, limit_type, request.user_role)
+        limited, details = await acheck_rate_limit(request.identifier, limit_type, request.user_role)
         
         response = {
             "limited": limited,
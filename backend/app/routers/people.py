@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Depends
 import logging
 from typing import List, Optional
 from app.db.db import fetch, execute
 from app.schemas.people import PersonOut, PeoplePage, PersonUpdate, LeadUpdate, LeadNote, PropertyUpdate, assert_no_system_fields
-from app.cache import cached
+from app.middleware.conditional import ConditionalGet
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -147,8 +147,27 @@ async def get_person_enriched(person_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"/people/{{person_id}}/enriched DB error: {e}")
 
-@router.get("/leads", response_model=List[dict])
-@cached(ttl=60)  # Cache for 1 minute
+async def leads_version():
+    """
+    vw_leads_management is a live view over people and their latest application.
+    updated_at is set by trigger; the counts catch deletes.
+    """
+    rows = await fetch(
+        """
+        select (select max(updated_at) from people) as people_at,
+               (select count(*) from people) as people_n,
+               (select max(updated_at) from applications) as apps_at,
+               (select count(*) from applications) as apps_n
+        """
+    )
+    return tuple(rows[0].values())
+
+
+# updated_at is the writing transaction's start time, so a long transaction can
+# commit behind max(updated_at); the 60 s bucket bounds how long that goes unseen
+leads_conditional = ConditionalGet("people.leads", leads_version, "private, no-cache", max_stale_s=60)
+
+@router.get("/leads", response_model=List[dict], dependencies=[Depends(leads_conditional)])
 async def list_leads(
     q: Optional[str] = Query(None, description="name or email search"),
     limit: int = Query(50, ge=1, le=200)
@@ -3,6 +3,7 @@ from typing import List, Dict, Any, Optional
 import asyncio
 from datetime import datetime, timedelta
 from app.db.db import fetch, fetchrow
+from app.db.rollups import monthly_leads
 from app.ai.advanced_ml import AdvancedMLPipeline
 
 router = APIRouter(prefix="/api/predictive-analytics", tags=["predictive-analytics"])
@@ -41,8 +42,20 @@ async def get_forecasting_overview(
         LIMIT 24
         """
         
-        # For now, use a fixed 12-month interval to avoid placeholder issues
-        results = await fetch(sql)
+        # Monthly facts from the daily rollups; raw people scan until they are built
+        results = None
+        try:
+            monthly = await monthly_leads(12)
+            if monthly is not None:
+                results = [
+                    {"month": r["month"], "applications": r["leads"], "enrollments": r["enrolled"]}
+                    for r in monthly
+                ]
+        except Exception as e:
+            print(f"⚠️ Rollup read failed, scanning people: {e}")
+        if results is None:
+            # For now, use a fixed 12-month interval to avoid placeholder issues
+            results = await fetch(sql)
         
         # Calculate trends and predictions
         if results:
@@ -13,6 +13,7 @@ import asyncio
 import logging
 
 from app.db.db import fetch, fetchrow, execute
+from app.core import tracing
 from app.ai.natural_language import interpret_natural_language_query, execute_lead_query
 from app.ai.runtime import narrate
 from app.ai.actions import normalise_actions
@@ -247,6 +248,7 @@ def dedupe_passages(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     
     return out
 
+@tracing.traced("rag.mmr")
 def mmr_select(query_vec: List[float], candidates: List[Dict[str,Any]], k: int = 5, lambda_=0.7) -> List[Dict[str,Any]]:
     """Maximal Marginal Relevance selection with light category diversity and dedupe by title/id."""
     # First dedupe by passage content
@@ -1135,13 +1137,16 @@ def _generate_fallback_suggestions(request: SuggestionsQuery, intent: str) -> Di
     }
 
 # Real embedding service using Gemini API
+@tracing.traced("embedding", "client")
 async def get_embedding(text: str, model: str = "text-embedding-004") -> List[float]:
     """Generate real embedding using Gemini API"""
     try:
         from app.ai import GEMINI_API_KEY
+        tracing.set_attribute("gen_ai.request.model", model)
         # Cache check
         ck = make_key("emb", {"t": text, "m": model})
         cached = CACHE.get(ck)
+        tracing.set_attribute("cache.hit", cached is not None)
         if cached is not None:
             return cached
         
@@ -1464,6 +1469,7 @@ def expand_query_for_agent_usage(query_text: str) -> str:
     
     return query_text
 
+@tracing.traced("rag.retrieval")
 async def hybrid_search(
     query_text: str,
     query_embedding: Optional[List[float]] = None,
@@ -1485,6 +1491,7 @@ async def hybrid_search(
             "thr": round(similarity_threshold, 3)
         })
         cached = CACHE.get(cache_key)
+        tracing.set_attribute("cache.hit", cached is not None)
         if cached is not None:
             logger.info("Hybrid search cache hit")
             return cached, True
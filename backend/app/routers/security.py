@@ -221,8 +221,8 @@ async def get_threat_detection_status_endpoint():
         anomaly_thresholds_count = len(threat_detection.anomaly_thresholds)
         
         # Count total threats detected (simplified)
-        threats_detected = len([event for event in audit_trail.audit_events 
-                              if event.threat_level in [ThreatLevel.HIGH, ThreatLevel.CRITICAL]])
+        level_counts = audit_trail.event_store.threat_level_counts
+        threats_detected = level_counts[ThreatLevel.HIGH] + level_counts[ThreatLevel.CRITICAL]
         
         return {
             "threats_detected": threats_detected,
@@ -504,7 +504,7 @@ async def get_security_health_endpoint():
         # Determine component health
         threat_detection_health = "healthy" if len(threat_detection.blocked_ips) < 100 else "warning"
         compliance_health = "healthy" if compliance_score >= 90 else "warning"
-        audit_health = "healthy" if len(audit_trail.audit_events) < 9000 else "warning"
+        audit_health = "healthy" if audit_trail.event_count < 9000 else "warning"
         incident_health = "healthy" if active_incidents < 10 else "warning"
         
         # Determine overall status
@@ -518,7 +518,7 @@ async def get_security_health_endpoint():
             recommendations.append("Review and resolve open security incidents")
         if len(threat_detection.blocked_ips) > 50:
             recommendations.append("Review blocked IP addresses for false positives")
-        if len(audit_trail.audit_events) > 8000:
+        if audit_trail.event_count > 8000:
             recommendations.append("Consider archiving old audit events")
         
         return {
@@ -548,22 +548,22 @@ async def get_security_statistics_endpoint():
         logger.info("Security system statistics request")
         
         # Calculate statistics
-        total_events = len(audit_trail.audit_events)
+        total_events = audit_trail.event_count
         total_incidents = len(audit_trail.incidents)
         open_incidents = len(get_open_incidents())
         resolved_incidents = len([inc for inc in audit_trail.incidents if inc.status.value == "resolved"])
         
         # Event type breakdown
-        event_type_counts = {}
-        for event in audit_trail.audit_events:
-            event_type = event.event_type.value
-            event_type_counts[event_type] = event_type_counts.get(event_type, 0) + 1
+        event_type_counts = {
+            event_type.value: count
+            for event_type, count in audit_trail.event_store.type_counts.items() if count
+        }
         
         # Threat level breakdown
-        threat_level_counts = {}
-        for event in audit_trail.audit_events:
-            threat_level = event.threat_level.value
-            threat_level_counts[threat_level] = threat_level_counts.get(threat_level, 0) + 1
+        threat_level_counts = {
+            threat_level.value: count
+            for threat_level, count in audit_trail.event_store.threat_level_counts.items() if count
+        }
         
         # Compliance statistics
         compliance_result = check_compliance()
@@ -121,6 +121,8 @@ class ModelInfoResponse(BaseModel):
     loaded_since_seconds: Optional[float] = Field(None, description="Seconds since model was loaded")
     feature_count: Optional[int] = Field(None, description="Number of features in the model")
     performance: Optional[Dict[str, Any]] = Field(None, description="Model performance metrics")
+    pinned_version: Optional[str] = Field(None, description="Version pinned via the activate API (None follows the newest artifact)")
+    compiled_inference: Optional[bool] = Field(None, description="Whether the compiled NumPy forest serves predictions")
     
     class Config:
         json_encoders = {
@@ -128,6 +130,11 @@ class ModelInfoResponse(BaseModel):
         }
 
 
+class ActivateModelRequest(BaseModel):
+    """Request schema for pinning the active model version"""
+    version: Optional[str] = Field(None, description="Model version to activate; null to follow the newest artifact")
+
+
 class ModelListResponse(BaseModel):
     """Response schema for listing available models"""
     models: List[Dict[str, Any]] = Field(..., description="List of available model artifacts")
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict
+
+from app.ai.redaction_engine import AI_EVENTS_PROFILE
+from app.telemetry.sink import write_telemetry
+
+
+AI_TELEMETRY_ENABLED = os.getenv("AI_TELEMETRY_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+
+
+def redact_pii(text: str | None) -> str | None:
+    """
+    Redact PII from text before storing in telemetry.
+    Redacts names, emails, phones, and other sensitive data.
+    """
+    return AI_EVENTS_PROFILE.redact(text)
+
+
+def redact_pii_many(texts: list[str | None]) -> list[str | None]:
+    """Bulk redact_pii() for several prompts/responses at once"""
+    return AI_EVENTS_PROFILE.redact_many(texts)
+
+
+async def log_ai_event(action: str, meta: Dict[str, Any] | None = None, started_at_ms: int | None = None):
+    """Legacy function for backward compatibility"""
+    if not AI_TELEMETRY_ENABLED:
+        return
+    try:
+        payload = meta or {}
+        await write_telemetry("ai_events", {"action": action, "meta": payload})
+    except Exception:
+        # best-effort; don't raise
+        pass
+
+
+async def log_ai_event_extended(
+    action: str, 
+    meta: Dict[str, Any] | None = None, 
+    raw_prompt: str | None = None,
+    raw_response: str | None = None,
+    confidence: float | None = None,
+    reason_codes: list[str] | None = None,
+    started_at_ms: int | None = None
+):
+    """
+    Enhanced AI event logging with PII redaction and detailed tracking.
+    Stores both raw and redacted versions for transparency.
+    """
+    if not AI_TELEMETRY_ENABLED:
+        return
+    
+    try:
+        # Prepare the enhanced payload
+        enhanced_meta = meta or {}
+        if confidence is not None:
+            enhanced_meta["confidence"] = confidence
+        if reason_codes:
+            enhanced_meta["reason_codes"] = reason_codes
+        if started_at_ms:
+            enhanced_meta["started_at_ms"] = started_at_ms
+        
+        redacted_prompt, redacted_response = redact_pii_many([raw_prompt, raw_response])
+
+        # Enhanced columns first; the writer retries with (action, meta) if they don't exist
+        await write_telemetry(
+            "ai_events",
+            {
+                "action": action,
+                "meta": enhanced_meta,
+                "raw_prompt": raw_prompt,
+                "redacted_prompt": redacted_prompt or None,
+                "raw_response": raw_response,
+                "redacted_response": redacted_response or None,
+                "confidence": confidence,
+                "reason_codes": reason_codes,
+            },
+            fallback_columns=("action", "meta"),
+        )
+            
+    except Exception:
+        # best-effort; don't raise
+        pass
+
+
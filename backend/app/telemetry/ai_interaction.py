@@ -7,60 +7,56 @@ import time
 import uuid
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from app.db.db import execute
+from app.telemetry.sink import write_telemetry
 from app.ai.pii_redaction import redact
 
 async def log_normalise(request_id: str, raw: str, normalised: str, edits_count: int, latency: float, ok: bool):
     """Log text normalization results"""
     try:
-        await execute("""
-            INSERT INTO ivy_ai_telemetry 
-            (request_id, route, raw_text, normalized_text, parser_ok, latency_ms, created_at)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-        """, request_id, "normalize", redact(raw), redact(normalised), ok, int(latency * 1000), datetime.utcnow())
+        await write_telemetry("ivy_ai_telemetry", {
+            "request_id": request_id, "route": "normalize", "raw_text": redact(raw),
+            "normalized_text": redact(normalised), "parser_ok": ok,
+            "latency_ms": int(latency * 1000), "created_at": datetime.utcnow(),
+        })
     except Exception:
         pass  # Don't fail on telemetry
 
 async def log_intent(request_id: str, intent_type: str, confidence: float, used_person_ctx: bool):
     """Log intent classification results"""
     try:
-        await execute("""
-            INSERT INTO ivy_ai_telemetry 
-            (request_id, route, intent, parser_ok, created_at)
-            VALUES ($1, $2, $3, $4, $5)
-        """, request_id, "intent", intent_type, confidence > 0.7, datetime.utcnow())
+        await write_telemetry("ivy_ai_telemetry", {
+            "request_id": request_id, "route": "intent", "intent": intent_type,
+            "parser_ok": confidence > 0.7, "created_at": datetime.utcnow(),
+        })
     except Exception:
         pass
 
 async def log_retrieval(request_id: str, k: int, top_scores: List[float], mean_score: float, gap_flag: bool):
     """Log retrieval quality metrics"""
     try:
-        await execute("""
-            INSERT INTO ivy_ai_telemetry 
-            (request_id, route, result_count, parser_ok, created_at)
-            VALUES ($1, $2, $3, $4, $5)
-        """, request_id, "retrieval", k, not gap_flag, datetime.utcnow())
+        await write_telemetry("ivy_ai_telemetry", {
+            "request_id": request_id, "route": "retrieval", "result_count": k,
+            "parser_ok": not gap_flag, "created_at": datetime.utcnow(),
+        })
     except Exception:
         pass
 
 async def log_narration(request_id: str, tokens_out: int, sections_present: List[str], length_chars: int):
     """Log narration generation metrics"""
     try:
-        await execute("""
-            INSERT INTO ivy_ai_telemetry 
-            (request_id, route, result_count, parser_ok, created_at)
-            VALUES ($1, $2, $3, $4, $5)
-        """, request_id, "narration", length_chars, len(sections_present) > 0, datetime.utcnow())
+        await write_telemetry("ivy_ai_telemetry", {
+            "request_id": request_id, "route": "narration", "result_count": length_chars,
+            "parser_ok": len(sections_present) > 0, "created_at": datetime.utcnow(),
+        })
     except Exception:
         pass
 
 async def log_modal(request_id: str, name: str, opened: bool, actions_clicked: int):
     """Log modal interactions"""
     try:
-        await execute("""
-            INSERT INTO ivy_ai_telemetry 
-            (request_id, route, parser_ok, result_count, created_at)
-            VALUES ($1, $2, $3, $4, $5)
-        """, request_id, f"modal_{name}", opened, actions_clicked, datetime.utcnow())
+        await write_telemetry("ivy_ai_telemetry", {
+            "request_id": request_id, "route": f"modal_{name}", "parser_ok": opened,
+            "result_count": actions_clicked, "created_at": datetime.utcnow(),
+        })
     except Exception:
         pass
@@ -0,0 +1,267 @@
+"""
+Background telemetry sink
+
+Telemetry writes (ai_events, ivy_ai_telemetry, forecast_predictions) are
+queued in memory and flushed by a single worker task as multi-row INSERTs, every
+TELEMETRY_BATCH_SIZE rows or TELEMETRY_FLUSH_MS milliseconds, whichever
+comes first. The request path only pays for a put_nowait().
+
+The queue is bounded; when it is full the configured drop policy applies
+("drop_newest" rejects the incoming row, "drop_oldest" evicts the oldest
+queued row) and the drop is counted in get_stats().
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core import metrics, tracing
+from app.db.db import execute
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_ASYNC_ENABLED = os.getenv("AI_TELEMETRY_ASYNC", "true").lower() in ("1", "true", "yes", "on")
+TELEMETRY_QUEUE_MAX = int(os.getenv("TELEMETRY_QUEUE_MAX", "10000"))
+TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "200"))
+TELEMETRY_FLUSH_MS = int(os.getenv("TELEMETRY_FLUSH_MS", "500"))
+TELEMETRY_DROP_POLICY = os.getenv("TELEMETRY_DROP_POLICY", "drop_newest")
+
+# Postgres caps bind parameters at 65535 per statement
+_MAX_PARAMS = 60000
+
+
+@dataclass
+class TelemetryRow:
+    """One row destined for a telemetry table"""
+    table: str
+    values: Dict[str, Any]
+    # Columns to retry with if the full insert fails (e.g. enhanced ai_events
+    # columns missing on an older schema)
+    fallback_columns: Optional[Tuple[str, ...]] = None
+
+
+def build_multirow_insert(table: str, columns: Sequence[str], rows: List[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    """Build a single INSERT ... VALUES (...), (...) statement and its flat args"""
+    placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ", ".join([placeholder] * len(rows))
+    args: List[Any] = []
+    for row in rows:
+        args.extend(row.get(col) for col in columns)
+    return sql, args
+
+
+def chunked_inserts(
+    table: str, columns: Sequence[str], rows: List[Dict[str, Any]]
+) -> Iterator[Tuple[List[Dict[str, Any]], List[Any]]]:
+    """(rows, [sql, *args]) per multi-row INSERT, chunked under the bind parameter cap"""
+    per_stmt = max(1, _MAX_PARAMS // max(1, len(columns)))
+    for i in range(0, len(rows), per_stmt):
+        chunk = rows[i:i + per_stmt]
+        sql, args = build_multirow_insert(table, columns, chunk)
+        yield chunk, [sql, *args]
+
+
+class TelemetrySink:
+    """Bounded in-memory queue drained by a batching writer task"""
+
+    def __init__(
+        self,
+        max_queue: int = TELEMETRY_QUEUE_MAX,
+        batch_size: int = TELEMETRY_BATCH_SIZE,
+        flush_ms: int = TELEMETRY_FLUSH_MS,
+        drop_policy: str = TELEMETRY_DROP_POLICY,
+        writer=None,
+    ):
+        if drop_policy not in ("drop_newest", "drop_oldest"):
+            raise ValueError(f"Unknown telemetry drop policy: {drop_policy}")
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.drop_policy = drop_policy
+        self._writer = writer or execute
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "flushes": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    # ───────────── lifecycle ─────────────
+
+    def _ensure_started(self) -> bool:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # New event loop (tests, worker restart) gets a fresh queue and worker
+            if self._loop is not loop:
+                self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._loop = loop
+            self._stopping = False
+            # Fresh context: the writer must not inherit the trace of the request that started it
+            self._worker = loop.create_task(self._run(), name="telemetry-sink", context=contextvars.Context())
+        return True
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Flush everything queued and stop the worker (call on shutdown)"""
+        if self._worker is None or self._queue is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Telemetry sink shutdown timed out with %d rows queued", self._queue.qsize())
+        self._worker.cancel()
+        try:
+            await self._worker
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._worker = None
+
+    async def flush(self, timeout: float = 5.0) -> None:
+        """Wait until everything enqueued so far has been written"""
+        if self._queue is not None and self._worker is not None:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+
+    # ───────────── producer side ─────────────
+
+    def _count_drop(self) -> None:
+        self.stats["dropped"] += 1
+        metrics.telemetry_row_dropped()
+
+    def enqueue(self, row: TelemetryRow) -> bool:
+        """Queue a row without blocking; returns False if it was dropped"""
+        if not self._ensure_started():
+            self._count_drop()
+            return False
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            if self.drop_policy == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self._queue.put_nowait(row)
+                except (asyncio.QueueEmpty, asyncio.QueueFull):
+                    self._count_drop()
+                    return False
+                self._count_drop()
+                self.stats["enqueued"] += 1
+                return True
+            self._count_drop()
+            return False
+        self.stats["enqueued"] += 1
+        metrics.set_telemetry_queue_depth(self._queue.qsize())
+        return True
+
+    # ───────────── consumer side ─────────────
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.flush_ms / 1000.0
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (self._stopping and queue.empty()):
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write_batch(batch)
+            except Exception as e:
+                logger.warning("Telemetry flush failed: %s", e)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+                metrics.set_telemetry_queue_depth(queue.qsize())
+
+    async def _write_batch(self, batch: List[TelemetryRow]) -> None:
+        t0 = time.perf_counter()
+        groups: Dict[Tuple[str, Tuple[str, ...], Optional[Tuple[str, ...]]], List[Dict[str, Any]]] = {}
+        for row in batch:
+            key = (row.table, tuple(row.values.keys()), row.fallback_columns)
+            groups.setdefault(key, []).append(row.values)
+
+        for (table, columns, fallback), rows in groups.items():
+            for chunk, call in chunked_inserts(table, columns, rows):
+                try:
+                    await self._writer(*call)
+                    self.stats["written"] += len(chunk)
+                except Exception as e:
+                    if not fallback:
+                        self.stats["failed"] += len(chunk)
+                        logger.debug("Telemetry insert into %s failed: %s", table, e)
+                        continue
+                    try:
+                        await self._writer(*self._as_call(table, fallback, chunk))
+                        self.stats["written"] += len(chunk)
+                    except Exception as e2:
+                        self.stats["failed"] += len(chunk)
+                        logger.debug("Telemetry fallback insert into %s failed: %s", table, e2)
+
+        self.stats["flushes"] += 1
+        self.stats["last_flush_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+    @staticmethod
+    def _as_call(table: str, columns: Sequence[str], rows: List[Dict[str, Any]]) -> List[Any]:
+        sql, args = build_multirow_insert(table, columns, rows)
+        return [sql, *args]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_ms": self.flush_ms,
+            "drop_policy": self.drop_policy,
+            "running": self._worker is not None and not self._worker.done(),
+        }
+
+
+# Global sink instance
+_sink: Optional[TelemetrySink] = None
+
+
+def get_telemetry_sink() -> TelemetrySink:
+    """Get the global telemetry sink"""
+    global _sink
+    if _sink is None:
+        _sink = TelemetrySink()
+    return _sink
+
+
+async def write_telemetry(table: str, values: Dict[str, Any], fallback_columns: Optional[Tuple[str, ...]] = None) -> None:
+    """
+    Record a telemetry row. Queued for the background writer unless
+    AI_TELEMETRY_ASYNC is off, in which case it is written inline.
+    """
+    row = TelemetryRow(table, values, fallback_columns)
+    with tracing.span("telemetry.write", **{"telemetry.table": table, "telemetry.async": TELEMETRY_ASYNC_ENABLED}):
+        if TELEMETRY_ASYNC_ENABLED:
+            get_telemetry_sink().enqueue(row)
+            return
+        columns = tuple(values.keys())
+        try:
+            await execute(*TelemetrySink._as_call(table, columns, [values]))
+        except Exception:
+            if fallback_columns:
+                await execute(*TelemetrySink._as_call(table, fallback_columns, [values]))
+            else:
+                raise
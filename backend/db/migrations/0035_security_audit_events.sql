@@ -0,0 +1,31 @@
+-- Migration: Persistent security audit events
+-- Written in batches by the telemetry sink when SECURITY_AUDIT_PERSIST=true;
+-- the in-process ring buffer only keeps the most recent events
+
+CREATE TABLE IF NOT EXISTS security_audit_events (
+    event_id TEXT PRIMARY KEY,
+    event_type TEXT NOT NULL,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    user_id TEXT,
+    ip_address TEXT,
+    threat_level TEXT NOT NULL,
+    description TEXT,
+    details JSONB DEFAULT '{}'::jsonb,
+    source TEXT,
+    target_resource TEXT,
+    success BOOLEAN,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Mirrors the in-memory indexes: per-user, per-type and per-IP time windows
+CREATE INDEX IF NOT EXISTS idx_security_audit_events_time
+ON security_audit_events(occurred_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_security_audit_events_user_time
+ON security_audit_events(user_id, occurred_at DESC) WHERE user_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_security_audit_events_type_time
+ON security_audit_events(event_type, occurred_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_security_audit_events_ip_time
+ON security_audit_events(ip_address, occurred_at DESC) WHERE ip_address IS NOT NULL;
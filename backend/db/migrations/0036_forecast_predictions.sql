@@ -0,0 +1,22 @@
+-- Migration: Forecast predictions table
+-- Previously created on demand inside POST /ai/forecast/leads (once per lead);
+-- rows are now written in batches by the telemetry sink when persist=true
+
+CREATE TABLE IF NOT EXISTS forecast_predictions (
+    id BIGSERIAL PRIMARY KEY,
+    lead_id TEXT NOT NULL,
+    probability DOUBLE PRECISION NOT NULL,
+    eta_days INTEGER NULL,
+    confidence DOUBLE PRECISION NOT NULL,
+    features JSONB NOT NULL,
+    explanation JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Config version of the weights that produced the row; added separately so tables
+-- created by the old inline DDL pick it up too
+ALTER TABLE forecast_predictions ADD COLUMN IF NOT EXISTS config_version INTEGER;
+
+-- Latest predictions per lead
+CREATE INDEX IF NOT EXISTS idx_forecast_predictions_lead_time
+ON forecast_predictions(lead_id, created_at DESC);
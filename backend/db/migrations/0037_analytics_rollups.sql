@@ -0,0 +1,156 @@
+-- Migration: Daily analytics rollups
+-- Pre-aggregated daily facts for the dashboard, forecasting and trend endpoints,
+-- maintained by app.db.rollups (scheduled refresh + `python -m app.db.rollups --rebuild`).
+-- Days are UTC calendar days of the source row's timestamp.
+
+-- Leads by the day the person was created
+CREATE TABLE IF NOT EXISTS analytics_daily_leads (
+    day DATE NOT NULL,
+    source TEXT NOT NULL,
+    lifecycle_state TEXT NOT NULL,
+    leads INTEGER NOT NULL,
+    hot_leads INTEGER NOT NULL,          -- lead_score >= 80
+    scored_leads INTEGER NOT NULL,       -- lead_score present and non-zero
+    lead_score_sum NUMERIC NOT NULL,
+    with_application INTEGER NOT NULL,   -- people with at least one application
+    PRIMARY KEY (day, source, lifecycle_state)
+);
+
+-- Applications by the day they were created
+CREATE TABLE IF NOT EXISTS analytics_daily_applications (
+    day DATE NOT NULL,
+    programme TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    applications INTEGER NOT NULL,
+    PRIMARY KEY (day, programme, stage)
+);
+
+-- Offers by issue day and enrolments by confirmation day
+CREATE TABLE IF NOT EXISTS analytics_daily_outcomes (
+    day DATE NOT NULL,
+    kind TEXT NOT NULL,                  -- 'offer' or 'enrolment'
+    status TEXT NOT NULL,                -- offer status; 'confirmed' for enrolments
+    total INTEGER NOT NULL,
+    PRIMARY KEY (day, kind, status)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+    name TEXT PRIMARY KEY,
+    watermark TIMESTAMPTZ,
+    last_run_at TIMESTAMPTZ,
+    last_rebuild_at TIMESTAMPTZ,
+    days_refreshed INTEGER DEFAULT 0
+);
+
+CREATE OR REPLACE VIEW vw_analytics_monthly_leads AS
+SELECT
+    date_trunc('month', day)::date AS month,
+    SUM(leads)::integer AS leads,
+    COALESCE(SUM(leads) FILTER (WHERE lifecycle_state IN ('enrolled', 'student')), 0)::integer AS enrolled,
+    SUM(with_application)::integer AS with_application,
+    SUM(scored_leads)::integer AS scored_leads,
+    SUM(lead_score_sum) AS lead_score_sum
+FROM analytics_daily_leads
+GROUP BY 1;
+
+-- Recompute the rollups. p_since NULL rebuilds everything; otherwise only the
+-- days touched by people/applications updated after p_since are recomputed,
+-- plus the last p_recent_days of offers and enrolments (they have no
+-- updated_at, and their status changes after the issue day). Rows deleted
+-- from the source tables are only dropped from the rollups by a rebuild.
+-- Returns the new watermark, or no row if another refresh holds the lock.
+CREATE OR REPLACE FUNCTION refresh_analytics_rollups(p_since TIMESTAMPTZ, p_recent_days INTEGER DEFAULT 35)
+RETURNS TABLE (watermark TIMESTAMPTZ, days_refreshed INTEGER)
+LANGUAGE plpgsql AS $$
+#variable_conflict use_column
+DECLARE
+    v_started TIMESTAMPTZ := now();
+    v_lead_days DATE[];
+    v_app_days DATE[];
+    v_outcome_from DATE;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('analytics_rollups')) THEN
+        RETURN;
+    END IF;
+
+    IF p_since IS NULL THEN
+        DELETE FROM analytics_daily_leads;
+        DELETE FROM analytics_daily_applications;
+        DELETE FROM analytics_daily_outcomes;
+        v_outcome_from := NULL;
+    ELSE
+        SELECT COALESCE(array_agg(DISTINCT d), '{}') INTO v_lead_days FROM (
+            SELECT (p.created_at AT TIME ZONE 'UTC')::date AS d FROM people p WHERE p.updated_at > p_since
+            UNION
+            SELECT (p.created_at AT TIME ZONE 'UTC')::date
+            FROM applications a JOIN people p ON p.id = a.person_id
+            WHERE a.updated_at > p_since
+        ) touched;
+        SELECT COALESCE(array_agg(DISTINCT (a.created_at AT TIME ZONE 'UTC')::date), '{}') INTO v_app_days
+        FROM applications a WHERE a.updated_at > p_since;
+        v_outcome_from := LEAST((p_since AT TIME ZONE 'UTC')::date, (v_started AT TIME ZONE 'UTC')::date - p_recent_days);
+
+        DELETE FROM analytics_daily_leads WHERE day = ANY(v_lead_days);
+        DELETE FROM analytics_daily_applications WHERE day = ANY(v_app_days);
+        DELETE FROM analytics_daily_outcomes WHERE day >= v_outcome_from;
+    END IF;
+
+    INSERT INTO analytics_daily_leads
+    SELECT
+        (p.created_at AT TIME ZONE 'UTC')::date,
+        COALESCE(p.source, 'Unknown'),
+        p.lifecycle_state,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE p.lead_score >= 80),
+        COUNT(*) FILTER (WHERE COALESCE(p.lead_score, 0) <> 0),
+        COALESCE(SUM(p.lead_score) FILTER (WHERE COALESCE(p.lead_score, 0) <> 0), 0),
+        COUNT(*) FILTER (WHERE apps.person_id IS NOT NULL)
+    FROM people p
+    LEFT JOIN (SELECT DISTINCT person_id FROM applications) apps ON apps.person_id = p.id
+    WHERE p_since IS NULL OR (p.created_at AT TIME ZONE 'UTC')::date = ANY(v_lead_days)
+    GROUP BY 1, 2, 3;
+
+    INSERT INTO analytics_daily_applications
+    SELECT
+        (a.created_at AT TIME ZONE 'UTC')::date,
+        COALESCE(pr.name, 'Unknown'),
+        a.stage,
+        COUNT(*)
+    FROM applications a
+    LEFT JOIN programmes pr ON pr.id = a.programme_id
+    WHERE p_since IS NULL OR (a.created_at AT TIME ZONE 'UTC')::date = ANY(v_app_days)
+    GROUP BY 1, 2, 3;
+
+    INSERT INTO analytics_daily_outcomes
+    SELECT (o.issued_at AT TIME ZONE 'UTC')::date, 'offer', o.status, COUNT(*)
+    FROM offers o
+    WHERE v_outcome_from IS NULL OR (o.issued_at AT TIME ZONE 'UTC')::date >= v_outcome_from
+    GROUP BY 1, 2, 3
+    UNION ALL
+    SELECT (e.confirmed_at AT TIME ZONE 'UTC')::date, 'enrolment', 'confirmed', COUNT(*)
+    FROM enrolments e
+    WHERE v_outcome_from IS NULL OR (e.confirmed_at AT TIME ZONE 'UTC')::date >= v_outcome_from
+    GROUP BY 1, 2, 3;
+
+    days_refreshed := COALESCE(array_length(v_lead_days, 1), 0) + COALESCE(array_length(v_app_days, 1), 0);
+    IF p_since IS NULL THEN
+        SELECT COUNT(DISTINCT day) INTO days_refreshed FROM analytics_daily_leads;
+    END IF;
+    watermark := v_started;
+
+    INSERT INTO analytics_rollup_state AS s (name, watermark, last_run_at, last_rebuild_at, days_refreshed)
+    VALUES ('daily_facts', v_started, clock_timestamp(), CASE WHEN p_since IS NULL THEN clock_timestamp() END,
+            days_refreshed)
+    ON CONFLICT (name) DO UPDATE SET
+        watermark = EXCLUDED.watermark,
+        last_run_at = EXCLUDED.last_run_at,
+        last_rebuild_at = COALESCE(EXCLUDED.last_rebuild_at, s.last_rebuild_at),
+        days_refreshed = EXCLUDED.days_refreshed;
+
+    RETURN NEXT;
+END;
+$$;
+
+-- Source-side indexes for the incremental "updated since watermark" scans
+CREATE INDEX IF NOT EXISTS idx_people_updated_at ON people(updated_at);
+CREATE INDEX IF NOT EXISTS idx_applications_updated_at ON applications(updated_at);
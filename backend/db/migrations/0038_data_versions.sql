@@ -0,0 +1,19 @@
+-- Migration: Data versions for conditional GETs
+-- One counter per dataset, bumped after writes that the polled read endpoints
+-- serve (e.g. every refresh of vw_board_applications). The API builds weak
+-- ETags from these so unchanged polls are answered 304 without the query.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION bump_data_version(p_name TEXT)
+RETURNS BIGINT
+LANGUAGE sql AS $$
+    INSERT INTO data_versions AS d (name, version, changed_at)
+    VALUES (p_name, 1, clock_timestamp())
+    ON CONFLICT (name) DO UPDATE SET version = d.version + 1, changed_at = EXCLUDED.changed_at
+    RETURNING version;
+$$;
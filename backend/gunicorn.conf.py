@@ -0,0 +1,65 @@
+"""
+Preloaded multi-worker serving: one gunicorn master, uvicorn workers
+
+    cd backend && gunicorn -c gunicorn.conf.py app.main:app
+
+The master imports app.main (preload_app), then loads the models and static
+data (app.core.preload.preload). Only then does it fork the workers, which
+share those pages copy-on-write. Each worker logs its RSS/PSS once booted.
+Run `python -m monitoring.worker_memory` for a snapshot of every worker.
+Environment:
+- WEB_CONCURRENCY: workers (default: CPU count)
+- BIND: listen address (default 0.0.0.0:8000)
+- GUNICORN_TIMEOUT: worker timeout, seconds (default 120)
+- GUNICORN_MAX_REQUESTS: recycle a worker after this many requests
+  (default 0, never). A recycled worker is forked again from the preloaded
+  master, so it starts warm.
+- PRELOAD_READ_ONLY_ARRAYS=false keeps the loaded numpy arrays writeable.
+- PROMETHEUS_MULTIPROC_DIR: where workers keep their metric values, so that
+  /metrics reports every worker (default /tmp/bridge-crm-metrics, cleared
+  when the master starts). See app.core.metrics.
+
+Code changes need a full restart: HUP only re-forks from the preloaded
+master. For local development keep using `uvicorn app.main:app --reload`.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+pidfile = os.getenv("GUNICORN_PIDFILE", "/tmp/bridge-crm-gunicorn.pid")
+# Heartbeat files on tmpfs: a worker touching a disk file can stall under IO load
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# Must be set before the app (and prometheus_client) is imported by the master
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/bridge-crm-metrics")
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    """Master start (not on HUP): drop metric files of a previous server"""
+    from app.core.metrics import prepare_multiprocess_dir
+    prepare_multiprocess_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+def when_ready(server):
+    """Master, app imported, no workers yet: preload what the workers will share"""
+    from app.core.preload import preload
+    preload(server.app.wsgi())
+
+
+def post_worker_init(worker):
+    from app.core.preload import format_usage, memory_usage
+    print(f"🧠 Worker {worker.pid} booted: {format_usage(memory_usage())}")
+
+
+def child_exit(server, worker):
+    from app.core.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compiled Forest Benchmark - NumPy flattened forest vs sklearn predict_proba
+
+Uses the newest advanced_ml_random_forest_*.joblib in models/ (or a synthetic
+forest with --synthetic). Runs offline. Usage from backend/:
+    python -m monitoring.compiled_forest_benchmark [--rows 1,10,100,500,1000] [--synthetic]
+"""
+
+import argparse
+import statistics
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.ai.compiled_forest import CompiledForest
+
+
+def load_model(synthetic: bool):
+    if synthetic:
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(5000, 20))
+        y = (X[:, 0] + X[:, 1] > 0).astype(int)
+        scaler = StandardScaler().fit(X)
+        model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=0).fit(scaler.transform(X), y)
+        return model, scaler, [f"f{i}" for i in range(20)], "synthetic"
+
+    import joblib
+
+    models_dir = Path(__file__).resolve().parents[1] / "models"
+    latest = max(models_dir.glob("advanced_ml_random_forest_*.joblib"), key=lambda p: p.stat().st_mtime)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        data = joblib.load(latest)
+    return data["model"], data["scaler"], data["feature_names"], latest.name
+
+
+def timed(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled forest inference")
+    parser.add_argument("--rows", default="1,10,100,500,1000")
+    parser.add_argument("--synthetic", action="store_true")
+    args = parser.parse_args()
+
+    model, scaler, names, label = load_model(args.synthetic)
+    compiled = CompiledForest.from_sklearn(model, scaler)
+    rng = np.random.default_rng(1)
+
+    print(f"🌲 {label}: {compiled.n_trees} trees, {compiled.n_nodes} nodes, depth {compiled.max_depth}")
+    print("=" * 60)
+    for n in [int(r) for r in args.rows.split(",")]:
+        X = rng.normal(size=(n, len(names))) * scaler.scale_ + scaler.mean_
+        df = pd.DataFrame(X, columns=names)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            expected = model.predict_proba(scaler.transform(df))
+            sk_ms = timed(lambda: model.predict_proba(scaler.transform(df)), 20)
+        assert np.allclose(compiled.predict_proba(X), expected), "parity check failed"
+        np_ms = timed(lambda: compiled.predict_proba(X), 200 if n <= 100 else 20)
+        print(f"rows={n:5d}  sklearn {sk_ms:8.3f} ms   compiled {np_ms:8.3f} ms   ({sk_ms / np_ms:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
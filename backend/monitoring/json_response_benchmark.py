@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+JSON Response Benchmark - /applications/board payload through the response path
+
+Builds synthetic board rows (UUIDs, timestamps, Decimals, JSONB blockers and
+actions). Each row goes through the same steps as the board endpoint:
+response_model validation and serialisation, then rendering by Starlette's
+JSONResponse (stdlib json) or FastJSONResponse (orjson). Also prints the
+payload size with gzip and, if installed, brotli. Runs offline. Usage from
+backend/:
+    python -m monitoring.json_response_benchmark [--rows 100,500] [--repeats 30]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.core.serialization import FastJSONResponse
+from app.middleware.compression import brotli, compress
+
+STAGES = ["enquiry", "application_submitted", "review_in_progress", "conditional_offer_no_response", "enrolled"]
+
+
+def board_rows(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "application_id": uuid.UUID(int=rng.getrandbits(128)),
+            "stage": rng.choice(STAGES),
+            "status": "open",
+            "source": rng.choice(["organic", "referral", "ucas", None]),
+            "sub_source": None,
+            "assignee_user_id": uuid.UUID(int=rng.getrandbits(128)) if rng.random() < 0.7 else None,
+            "created_at": now - timedelta(minutes=rng.randint(0, 500_000)),
+            "priority": rng.choice(["critical", "high", "medium", "low"]),
+            "urgency": rng.choice(["high", "medium", "low"]),
+            "urgency_reason": "Offer expires soon" if rng.random() < 0.3 else None,
+            "person_id": uuid.UUID(int=rng.getrandbits(128)),
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "email": f"student{i}@example.ac.uk",
+            "phone": "+447700900123",
+            "lead_score": rng.randint(0, 100),
+            "conversion_probability": Decimal(f"{rng.random():.4f}"),
+            "progression_probability": Decimal(f"{rng.random():.4f}"),
+            "enrollment_probability": Decimal(f"{rng.random():.4f}"),
+            "next_stage_eta_days": rng.randint(1, 60),
+            "enrollment_eta_days": rng.randint(30, 200),
+            "progression_blockers": [
+                {"item": rng.choice(["Missing reference", "Portfolio outstanding", "Fee status query"]),
+                 "severity": rng.choice(["high", "medium"]), "category": "documents"}
+                for _ in range(rng.randint(0, 4))
+            ],
+            "recommended_actions": [
+                {"action": "Call applicant", "priority": "high", "impact": "Removes blocker", "timeline": "48h"}
+                for _ in range(rng.randint(0, 3))
+            ],
+            "programme_name": rng.choice(["BA Music Production", "MSc Data Science", "BSc Computer Science"]),
+            "programme_code": "PRG" + str(rng.randint(100, 999)),
+            "campus_name": rng.choice(["London", "Brighton", "Online"]),
+            "cycle_label": "2025/26",
+            "days_in_pipeline": rng.randint(0, 300),
+            "sla_overdue": rng.random() < 0.2,
+            "has_offer": rng.random() < 0.4,
+            "has_active_interview": rng.random() < 0.2,
+            "last_activity_at": now - timedelta(hours=rng.randint(0, 2000)),
+            "offer_type": None,
+        })
+    return rows
+
+
+def response_adapter():
+    """List[ApplicationCard] when its optional deps (email-validator) are installed"""
+    try:
+        from app.schemas.applications import ApplicationCard
+        return TypeAdapter(List[ApplicationCard]), "List[ApplicationCard]"
+    except ImportError:
+        return TypeAdapter(List[Dict[str, Any]]), "List[dict] (email-validator missing)"
+
+
+def timed(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark board response serialisation and compression")
+    parser.add_argument("--rows", default="100,500")
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    adapter, model_name = response_adapter()
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    print(f"📦 board payload, response model {model_name}")
+    print("=" * 78)
+    for n in [int(r) for r in args.rows.split(",")]:
+        rows = board_rows(n)
+        validated = adapter.validate_python(rows)
+        content = adapter.dump_python(validated, mode="json")
+
+        std_body = JSONResponse(content).body
+        fast_body = FastJSONResponse(content).body
+        assert json.loads(std_body) == json.loads(fast_body), "parity check failed"
+
+        model_ms = timed(lambda: adapter.dump_python(adapter.validate_python(rows), mode="json"), args.repeats)
+        std_ms = timed(lambda: JSONResponse(content), args.repeats)
+        fast_ms = timed(lambda: FastJSONResponse(content), args.repeats)
+        print(f"rows={n:4d}  validate+dump {model_ms:7.2f} ms   render: stdlib {std_ms:6.2f} ms   "
+              f"orjson {fast_ms:6.2f} ms   ({std_ms / fast_ms:4.1f}x)")
+
+        sizes = [f"identity {len(fast_body) / 1024:7.1f} KiB"]
+        for encoding in encodings:
+            compressed = compress(fast_body, encoding)
+            ms = timed(lambda: compress(fast_body, encoding), max(5, args.repeats // 3))
+            sizes.append(f"{encoding} {len(compressed) / 1024:6.1f} KiB ({ms:5.2f} ms)")
+        print("           " + "   ".join(sizes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+OTLP Stand-in - a local collector for the API's request traces
+
+Accepts OTLP/HTTP JSON on POST /v1/traces, the same requests a real
+OpenTelemetry collector receives. Prints each trace as an indented span tree
+with durations and attributes. Run it, then start the API with
+TRACING_EXPORTERS=otlp (or log,otlp). Usage from backend/:
+    python -m monitoring.otlp_standin [--port 4318] [--save traces.jsonl]
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+_save_path: Optional[str] = None
+
+
+def _value(value: Dict[str, Any]) -> Any:
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "arrayValue" in value:
+        return [_value(v) for v in value["arrayValue"].get("values", [])]
+    return None
+
+
+def spans_by_trace(payload: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                traces[span["traceId"]].append(span)
+    return traces
+
+
+def render_trace(trace_id: str, spans: List[Dict[str, Any]]) -> List[str]:
+    ids = {s["spanId"] for s in spans}
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        # A root continuing a remote parent (traceparent) has a parent we never see
+        parent = span.get("parentSpanId") if span.get("parentSpanId") in ids else ""
+        children[parent].append(span)
+    lines = [f"🔎 trace {trace_id}"]
+
+    def walk(parent: str, depth: int) -> None:
+        for span in sorted(children.get(parent, []), key=lambda s: int(s["startTimeUnixNano"])):
+            ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+            attrs = {a["key"]: _value(a["value"]) for a in span.get("attributes", [])}
+            shown = ", ".join(f"{k}={v}" for k, v in attrs.items() if k not in ("db.statement", "request.id"))
+            error = " ❌" if span.get("status", {}).get("code") == 2 else ""
+            lines.append(f"{'  ' * (depth + 1)}{span['name']:{max(1, 40 - 2 * depth)}s} {ms:9.1f} ms{error}  {shown}")
+            walk(span["spanId"], depth + 1)
+
+    walk("", 0)
+    return lines
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != "/v1/traces":
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.send_error(400, "expected OTLP/JSON")
+            return
+        for trace_id, spans in spans_by_trace(payload).items():
+            print("\n".join(render_trace(trace_id, spans)), flush=True)
+        if _save_path:
+            with open(_save_path, "a") as f:
+                f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    global _save_path
+    parser = argparse.ArgumentParser(description="Local OTLP/HTTP JSON trace receiver")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--save", help="append each received payload to this JSONL file")
+    args = parser.parse_args()
+    _save_path = args.save
+
+    print(f"📡 OTLP stand-in listening on http://{args.host}:{args.port}/v1/traces")
+    print("=" * 78)
+    ThreadingHTTPServer((args.host, args.port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
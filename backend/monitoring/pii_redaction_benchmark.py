@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+PII Redaction Benchmark - compiled single-pass engine vs the old re.sub chains
+
+Runs offline (no server/DB). Usage from backend/:
+    python -m monitoring.pii_redaction_benchmark [--kb 8] [--docs 200]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from app.ai.redaction_engine import AI_EVENTS_PROFILE, TELEMETRY_PROFILE
+
+
+def legacy_redact(text: str) -> str:
+    """Pre-engine app.ai.pii_redaction.redact (four uncompiled passes)"""
+    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
+    text = re.sub(r'\b(?:\+44|0)[0-9]{10,11}\b', '[PHONE]', text)
+    text = re.sub(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', '[NAME]', text)
+    text = re.sub(r'\b\d{2}/\d{2}/\d{4}\b', '[DOB]', text)
+    text = re.sub(r'\b\d{4}-\d{2}-\d{2}\b', '[DOB]', text)
+    return text
+
+
+def legacy_redact_pii(text: str) -> str:
+    """Pre-engine app.telemetry.redact_pii"""
+    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
+    text = re.sub(r'\b(?:\+?1[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})\b', '[PHONE]', text)
+    text = re.sub(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', '[NAME]', text)
+    text = re.sub(r'\b[A-Z][a-z]+, [A-Z][a-z]+\b', '[NAME]', text)
+    text = re.sub(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', '[UUID]', text)
+    return text
+
+
+SENTENCES = [
+    "Thanks for getting in touch about the MSc Data Science programme.",
+    "Priya Shah emailed priya.shah@example.com on 2025-09-14 asking about entry requirements.",
+    "Please call 07911123456 to confirm the interview slot.",
+    "The applicant's date of birth is 15/03/2000 and their reference is 3f2b1c4d-aaaa-4bbb-8ccc-1234567890ab.",
+    "Most applicants need a 2:1 in a related subject, or equivalent professional experience.",
+    "Oliver Brown, the admissions tutor, suggested a portfolio review before the offer.",
+    "We recommend booking a campus visit ahead of the January deadline.",
+]
+
+
+def make_doc(kb: int, rng: random.Random) -> str:
+    parts, size = [], 0
+    while size < kb * 1024:
+        s = rng.choice(SENTENCES)
+        parts.append(s)
+        size += len(s) + 1
+    return " ".join(parts)
+
+
+def bench(fn, docs, repeats: int = 3):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(docs)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PII redaction")
+    parser.add_argument("--kb", type=int, default=8, help="Size of each synthetic LLM response in KB")
+    parser.add_argument("--docs", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    docs = [make_doc(args.kb, rng) for _ in range(args.docs)]
+    total_kb = sum(len(d) for d in docs) / 1024
+
+    print(f"🔍 PII redaction benchmark: {args.docs} docs × ~{args.kb}KB ({total_kb:.0f}KB total)")
+    print("=" * 60)
+    cases = [
+        ("telemetry  legacy multi-pass", lambda ds: [legacy_redact(d) for d in ds]),
+        ("telemetry  engine per-string ", lambda ds: [TELEMETRY_PROFILE.redact(d) for d in ds]),
+        ("telemetry  engine bulk       ", lambda ds: TELEMETRY_PROFILE.redact_many(ds)),
+        ("ai_events  legacy multi-pass", lambda ds: [legacy_redact_pii(d) for d in ds]),
+        ("ai_events  engine bulk       ", lambda ds: AI_EVENTS_PROFILE.redact_many(ds)),
+    ]
+    for label, fn in cases:
+        ms = bench(fn, docs)
+        print(f"{label}: {ms:8.1f} ms  ({total_kb / (ms / 1000) / 1024:6.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Worker Memory - RSS/PSS of a running gunicorn master and its workers
+
+RSS counts every page a process maps, so it double-counts the pages that
+preloaded workers share with the master. PSS splits each shared page across
+the processes using it, and the PSS total is what the box actually spends.
+Linux only (/proc). Usage from backend/:
+    python -m monitoring.worker_memory [--pid MASTER_PID | --pidfile /tmp/bridge-crm-gunicorn.pid]
+"""
+
+import argparse
+import os
+import sys
+from typing import List
+
+from app.core.preload import memory_usage
+
+
+def children(pid: int) -> List[int]:
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 (after the parenthesised command name) is the parent pid
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            found.append(int(entry))
+    return sorted(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory of the gunicorn server")
+    parser.add_argument("--pid", type=int)
+    parser.add_argument("--pidfile", default=os.getenv("GUNICORN_PIDFILE", "/tmp/bridge-crm-gunicorn.pid"))
+    args = parser.parse_args()
+
+    master = args.pid
+    if master is None:
+        try:
+            with open(args.pidfile) as f:
+                master = int(f.read().strip())
+        except (OSError, ValueError) as e:
+            sys.exit(f"❌ No master pid (--pid) and pidfile {args.pidfile} unreadable: {e}")
+
+    print(f"🧠 gunicorn master {master}")
+    print("=" * 78)
+    print(f"{'process':16s} {'RSS MiB':>9s} {'PSS MiB':>9s} {'shared MiB':>11s} {'private MiB':>12s}")
+    totals = {"rss": 0.0, "pss": 0.0}
+    for label, pid in [("master", master)] + [(f"worker {p}", p) for p in children(master)]:
+        usage = memory_usage(str(pid))
+        if "pss" not in usage:
+            sys.exit("❌ /proc/<pid>/smaps_rollup unavailable (Linux 4.14+ required)")
+        totals["rss"] += usage["rss"]
+        totals["pss"] += usage["pss"]
+        print(f"{label:16s} {usage['rss']:9.1f} {usage['pss']:9.1f} {usage['shared']:11.1f} {usage['private']:12.1f}")
+    print(f"{'total':16s} {totals['rss']:9.1f} {totals['pss']:9.1f}   "
+          f"(RSS sum overstates by {totals['rss'] - totals['pss']:.0f} MiB of shared pages)")
+
+
+if __name__ == "__main__":
+    main()
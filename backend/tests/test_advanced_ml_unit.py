@@ -324,7 +324,7 @@ class TestModelRegistry:
         with tempfile.TemporaryDirectory() as temp_dir:
             registry = ModelRegistry(Path(temp_dir))
             assert registry.models_dir == Path(temp_dir)
-            assert registry.active_pattern == "advanced_ml_random_forest_*.joblib"
+            assert registry.active_pattern == "advanced_ml_*.joblib"
             assert registry.cache_ttl_seconds == 3600
     
     def test_hash_file(self):
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import ai_leads
+from app.ai.tools.leads import LeadLite
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fake_query(filters, lead_ids=None):
+        return [LeadLite(id="a", name="A"), LeadLite(id="b", name="B")]
+
+    async def fake_stream(leads):
+        yield {"type": "scores", "source": "ml", "items": [
+            {"id": "b", "score": 80.0, "reasons": []},
+            {"id": "a", "score": 40.0, "reasons": []},
+        ]}
+        yield {"type": "explanations", "items": {"b": {"reasons": ["Recent lead"], "next_action": "call"}}}
+        yield {"type": "explanations", "items": {"a": {"reasons": ["Recent lead", "Good lead score"]}}}
+
+    async def fake_log(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(ai_leads, "AI_LEADS_ENABLED", True)
+    monkeypatch.setattr(ai_leads, "sql_query_leads", fake_query)
+    monkeypatch.setattr(ai_leads, "leads_triage_stream", fake_stream)
+    monkeypatch.setattr(ai_leads, "log_ai_event", fake_log)
+    app = FastAPI()
+    app.include_router(ai_leads.router)
+    return TestClient(app)
+
+
+def test_triage_stream_ndjson_orders_scores_patches_summary(client):
+    resp = client.post("/ai/leads/triage/stream", json={"filters": {}})
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in resp.text.splitlines() if line]
+
+    assert [e["type"] for e in events] == ["scores", "explanations", "explanations", "summary"]
+    assert [r["id"] for r in events[0]["items"]] == ["b", "a"]
+    assert events[-1]["summary"] == {"cohort_size": 2, "top_reasons": ["Recent lead", "Good lead score"]}
+
+
+def test_triage_stream_sse_format(client):
+    resp = client.post("/ai/leads/triage/stream", json={"format": "sse"})
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    frames = [f for f in resp.text.split("\n\n") if f]
+    assert all(f.startswith("data: ") for f in frames)
+    assert json.loads(frames[0][6:])["type"] == "scores"
@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.db import rollups
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(rollups, "_state_checked_at", 0.0)
+    monkeypatch.setattr(rollups, "ROLLUPS_ENABLED", True)
+
+
+def _fake_db(monkeypatch, state):
+    calls = []
+
+    async def fetch(sql, *args):
+        calls.append(("fetch", sql, args))
+        if "analytics_rollup_state" in sql:
+            return [state] if state else []
+        if "analytics_daily_leads" in sql:
+            return [{"total_leads": 10, "hot_leads": 2}]
+        return [{"upcoming_interviews": 3}]
+
+    async def execute_returning(sql, *args):
+        calls.append(("refresh", sql, args))
+        return [{"watermark": datetime(2026, 10, 18, 12, tzinfo=timezone.utc), "days_refreshed": 4}]
+
+    monkeypatch.setattr(rollups, "fetch", fetch)
+    monkeypatch.setattr(rollups, "execute_returning", execute_returning)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_incremental_from_watermark_minus_overlap(monkeypatch):
+    watermark = datetime(2026, 10, 18, 11, tzinfo=timezone.utc)
+    calls = _fake_db(monkeypatch, {"name": "daily_facts", "watermark": watermark})
+
+    result = await rollups.refresh_rollups()
+    assert result["mode"] == "incremental" and result["days_refreshed"] == 4
+    assert calls[-1][2] == (watermark - timedelta(seconds=rollups.ROLLUP_OVERLAP_S), rollups.ROLLUP_RECENT_DAYS)
+
+    result = await rollups.refresh_rollups(rebuild=True)
+    assert result["mode"] == "rebuild" and calls[-1][2][0] is None
+
+
+@pytest.mark.asyncio
+async def test_first_refresh_rebuilds_and_readers_wait_for_it(monkeypatch):
+    calls = _fake_db(monkeypatch, None)
+    assert await rollups.dashboard_metrics() is None
+    assert await rollups.monthly_leads() is None
+
+    assert (await rollups.refresh_rollups())["mode"] == "rebuild"
+    assert calls[-1][2][0] is None
+
+
+@pytest.mark.asyncio
+async def test_dashboard_metrics_merge_rollup_facts_and_live_counts(monkeypatch):
+    calls = _fake_db(monkeypatch, {"name": "daily_facts", "watermark": datetime.now(timezone.utc)})
+
+    metrics = await rollups.dashboard_metrics()
+    assert metrics == {"total_leads": 10, "hot_leads": 2, "upcoming_interviews": 3}
+    await rollups.dashboard_metrics()
+    # Readiness is cached: one state lookup for both reads
+    assert sum("analytics_rollup_state" in sql for _, sql, _ in calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_rollup_trends_match_row_level_trends(monkeypatch):
+    from app.ai import natural_language
+    from app.ai.natural_language import analyze_trends, get_trend_analytics
+
+    people = []
+    for month, scores, converted in [(1, [70, 0, 91], 1), (2, [55, 60], 2), (3, [None, 88, 40, 77], 0)]:
+        for i, score in enumerate(scores):
+            people.append({"created_at": datetime(2026, month, 5 + i, tzinfo=timezone.utc), "lead_score": score,
+                           "has_application": i < converted, "lifecycle_state": "lead"})
+        # Applicants and students are in the daily facts but not in the row-level trend population
+        people.append({"created_at": datetime(2026, month, 20, tzinfo=timezone.utc), "lead_score": 99,
+                       "has_application": True, "lifecycle_state": "applicant"})
+        people.append({"created_at": datetime(2026, month, 21, tzinfo=timezone.utc), "lead_score": 95,
+                       "has_application": True, "lifecycle_state": "enrolled"})
+
+    def monthly_rows(lifecycle_state):
+        monthly = []
+        for month in (3, 2, 1):
+            rows = [p for p in people if p["created_at"].month == month and p["lifecycle_state"] == lifecycle_state]
+            scored = [p["lead_score"] for p in rows if p["lead_score"]]
+            monthly.append({"month": date(2026, month, 1), "leads": len(rows), "scored_leads": len(scored),
+                            "lead_score_sum": Decimal(sum(scored)),
+                            "with_application": sum(p["has_application"] for p in rows)})
+        return monthly
+
+    async def monthly_leads(months=None, lifecycle_state=None):
+        assert lifecycle_state == "lead"
+        return monthly_rows(lifecycle_state)
+
+    monkeypatch.setattr(natural_language, "monthly_leads", monthly_leads)
+    # What general_search returns: people in the 'lead' state only
+    leads = [p for p in people if p["lifecycle_state"] == "lead"]
+    assert await get_trend_analytics() == analyze_trends(leads)
+
+
+@pytest.mark.asyncio
+async def test_monthly_leads_filters_lifecycle_state(monkeypatch):
+    calls = _fake_db(monkeypatch, {"name": "daily_facts", "watermark": datetime.now(timezone.utc)})
+    await rollups.monthly_leads(6, lifecycle_state="lead")
+    _, sql, args = calls[-1]
+    assert "lifecycle_state = %s" in sql and args == ("lead", 5)
+    assert sql.index("GROUP BY") < sql.index("ORDER BY month DESC")
+
+    await rollups.monthly_leads()
+    _, sql, args = calls[-1]
+    assert "vw_analytics_monthly_leads" in sql and args == ()
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+import pytest
+
+from app.routers import applications_insights as insights
+from app.routers.applications_insights import InsightsFilters, _summarise, _where_clause, load_summary
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(insights, "_SUMMARY_CACHE", insights._TTLCache(ttl_s=60))
+    monkeypatch.setattr(insights, "SQL_SUMMARY_ENABLED", True)
+
+
+def _dataset():
+    return [
+        {"application_id": "a1", "stage": "offer", "programme_name": "Law", "progression_probability": Decimal("0.80"),
+         "enrollment_probability": Decimal("0.50"), "first_name": "Ada", "last_name": "L",
+         "progression_blockers": [{"item": "Missing CAS"}, {"item": ""}]},
+        {"application_id": "a2", "stage": None, "programme_name": "Law", "progression_probability": None,
+         "conversion_probability": 0.2, "enrollment_probability": None, "first_name": None, "last_name": None,
+         "progression_blockers": '[{"item": "Missing CAS"}, {"item": "Consent"}]'},
+        {"application_id": "a3", "stage": "offer ", "programme_name": "Music", "progression_probability": 0.5,
+         "enrollment_probability": 0.25, "progression_blockers": None},
+    ]
+
+
+def test_where_clause_skips_all_and_keeps_param_order():
+    where, params = _where_clause(InsightsFilters(stage="offer", priority="all", program="Law", application_ids=["x"]))
+    assert where == "WHERE stage = %s AND programme_name = %s AND application_id = ANY(%s::uuid[]) "
+    assert params == ["offer", "Law", ["x"]]
+    assert _where_clause(None) == ("", [])
+
+
+def test_python_summary_reports_percentiles():
+    summary = _summarise(_dataset())
+    assert (summary.total, summary.avgProgression, summary.highRisk, summary.highConfidence) == (3, 50, 1, 1)
+    assert summary.stageHistogram == [{"stage": "offer", "count": 2}, {"stage": "unknown", "count": 1}]
+    assert summary.topBlockers == [{"item": "Missing CAS", "count": 2}, {"item": "Consent", "count": 1}]
+    assert summary.progressionPercentiles == {"p25": 0.35, "p50": 0.5, "p75": 0.65}
+
+
+@pytest.mark.asyncio
+async def test_sql_summary_is_mapped_and_cached_per_filter_set(monkeypatch):
+    calls = []
+
+    async def fetch(sql, *params):
+        calls.append((sql, params))
+        return [{
+            "total": 2500, "p_sum": Decimal("1300.00"), "high_risk": 700, "high_confidence": 600,
+            "enroll_sum": Decimal("912.345"), "percentiles": [0.3, 0.52, 0.75],
+            "stage_histogram": [{"stage": "offer", "count": 2000}, {"stage": "unknown", "count": 500}],
+            "programme_histogram": '[{"programme": "Law", "count": 2500}]',
+            "top_blockers": [{"item": "Missing CAS", "count": 40}],
+            "top_at_risk": [{"application_id": "a9", "first_name": " Ada ", "last_name": None, "stage": "offer",
+                             "progression_probability": 0, "conversion_probability": 0.05}],
+        }]
+
+    monkeypatch.setattr(insights, "fetch", fetch)
+    summary = await load_summary(InsightsFilters(stage="offer"))
+
+    assert summary.total == 2500  # not capped at the 1,000 rows the Python path loads
+    assert (summary.avgProgression, summary.enrollmentEstimate) == (52, 912.35)
+    assert summary.programHistogram == [{"programme": "Law", "count": 2500}]
+    assert summary.topAtRisk == [{"application_id": "a9", "name": "Ada", "probability": 0.05, "stage": "offer"}]
+    assert summary.progressionPercentiles == {"p25": 0.3, "p50": 0.52, "p75": 0.75}
+    assert "jsonb_array_elements" in calls[0][0] and calls[0][1] == ("offer",)
+
+    assert await load_summary(InsightsFilters(stage="offer")) is summary
+    await load_summary(InsightsFilters(stage="review"))
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_python_summary_when_sql_fails(monkeypatch):
+    async def fetch(sql, *params):
+        if "WITH base" in sql:
+            raise RuntimeError("function percentile_cont does not exist")
+        assert "LIMIT 1000" in sql
+        return _dataset()
+
+    monkeypatch.setattr(insights, "fetch", fetch)
+    summary = await load_summary(None)
+    assert summary == _summarise(_dataset())
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.ai.audit_store import AuditEventStore
+from app.ai.security import SecurityAuditTrail, SecurityEvent, SecurityEventType, ThreatLevel
+
+
+def make_event(i, user="u1", ip="203.0.113.5", event_type=SecurityEventType.LOGIN_FAILED,
+               level=ThreatLevel.LOW, at=None):
+    return SecurityEvent(
+        event_id=f"EVT_{i}",
+        event_type=event_type,
+        timestamp=at or datetime.utcnow(),
+        user_id=user,
+        ip_address=ip,
+        user_agent=None,
+        session_id=None,
+        threat_level=level,
+        description="test",
+        details={},
+        source="test",
+        target_resource=None,
+        success=False,
+    )
+
+
+def test_ring_buffer_evicts_oldest_and_keeps_indexes_consistent():
+    store = AuditEventStore(capacity=5, persist=False)
+    for i in range(12):
+        store.append(make_event(i, user=f"u{i % 2}"))
+
+    assert len(store) == 5
+    assert [e.event_id for e in store] == [f"EVT_{i}" for i in range(7, 12)]
+    cutoff = datetime.utcnow() - timedelta(hours=1)
+    assert [e.event_id for e in store.by_user("u0", cutoff)] == ["EVT_8", "EVT_10"]
+    assert store.type_counts[SecurityEventType.LOGIN_FAILED] == 5
+
+
+def test_time_window_queries_use_bisect_cutoff():
+    store = AuditEventStore(capacity=100, persist=False)
+    now = datetime.utcnow()
+    for i, hours_ago in enumerate([30, 20, 5, 1]):
+        store.append(make_event(i, at=now - timedelta(hours=hours_ago)))
+    store.append(make_event(9, user="other", event_type=SecurityEventType.PII_ACCESS))
+
+    window = now - timedelta(hours=24)
+    assert [e.event_id for e in store.by_user("u1", window)] == ["EVT_1", "EVT_2", "EVT_3"]
+    assert [e.event_id for e in store.by_type(SecurityEventType.PII_ACCESS, window)] == ["EVT_9"]
+    assert store.count_by_ip("203.0.113.5", window, SecurityEventType.LOGIN_FAILED) == 3
+    assert len(store.since(now - timedelta(hours=2))) == 2
+    assert store.by_user("missing", window) == []
+
+
+def test_audit_trail_keeps_public_api():
+    trail = SecurityAuditTrail(max_events=3)
+    for i in range(4):
+        trail.log_event(make_event(i, level=ThreatLevel.HIGH))
+
+    assert trail.event_count == 3
+    assert [e.event_id for e in trail.audit_events] == ["EVT_1", "EVT_2", "EVT_3"]
+    assert len(trail.get_events_by_type(SecurityEventType.LOGIN_FAILED)) == 3
+    assert trail.event_store.threat_level_counts[ThreatLevel.HIGH] == 3
+
+
+@pytest.mark.asyncio
+async def test_persistence_queues_rows_for_telemetry_sink(monkeypatch):
+    from app.telemetry import sink as sink_module
+
+    rows = []
+    monkeypatch.setattr(sink_module.TelemetrySink, "enqueue", lambda self, row: rows.append(row) or True)
+    store = AuditEventStore(capacity=10, persist=True)
+    store.append(make_event(1))
+
+    assert rows[0].table == "security_audit_events"
+    assert rows[0].values["event_type"] == "login_failed"
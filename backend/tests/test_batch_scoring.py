@@ -0,0 +1,138 @@
+import datetime as dt
+import random
+
+import pytest
+
+from app.ai.anomaly_detection import AnomalyRequest, build_anomaly_response, detect_anomalies, detect_anomalies_batch
+from app.ai.forecast import ForecastLead, forecast_batch, forecast_lead
+from app.ai.segmentation import SegmentationRequest, segment_batch, segment_lead
+
+SOURCES = ["organic", "referral", "paid_social", "paid_search", "event", "unknown", None, "Other"]
+COURSES = ["Computer Science", "Business", "Data Science", "music", None, ""]
+EMAILS = ["ana@gmail.com", "x@test.com", "bob@mailinator.com", "no-at-sign", "", None]
+
+
+def _iso(rng, now):
+    choice = rng.random()
+    if choice < 0.15:
+        return None
+    if choice < 0.2:
+        return "not a date"
+    return (now - dt.timedelta(minutes=rng.randint(0, 60 * 24 * 120))).isoformat().replace("+00:00", "Z")
+
+
+def _engagement(rng):
+    names = ["email_opens", "email_clicks", "events_attended", "portal_logins", "web_visits"]
+    return {name: rng.choice([0, 0, 1, 3, 7, 15, 40]) for name in names if rng.random() < 0.85}
+
+
+def _strip(payload, keys):
+    if isinstance(payload, dict):
+        return {k: _strip(v, keys) for k, v in payload.items() if k not in keys}
+    if isinstance(payload, list):
+        return [_strip(v, keys) for v in payload]
+    return payload
+
+
+@pytest.fixture
+def rng():
+    return random.Random(40)
+
+
+def test_forecast_batch_matches_scalar(rng):
+    now = dt.datetime.now(dt.timezone.utc)
+    leads = [
+        ForecastLead(
+            id=f"lead_{i}",
+            last_activity_at=_iso(rng, now),
+            source=rng.choice(SOURCES),
+            has_email=rng.random() < 0.7,
+            has_phone=rng.random() < 0.5,
+            gdpr_opt_in=rng.random() < 0.5,
+            course_declared=rng.choice(COURSES),
+            degree_level=rng.choice(["bachelor", "master", None]),
+            target_degree_level=rng.choice(["bachelor", "master", None]),
+            course_supply_state=rng.choice(["open", "limited", "closed", None]),
+            engagement=_engagement(rng),
+        )
+        for i in range(400)
+    ]
+
+    batch = [item.model_dump() for item in forecast_batch(leads)]
+    scalar = [forecast_lead(lead).model_dump() for lead in leads]
+
+    assert batch == scalar
+    assert forecast_batch([]) == []
+
+
+def test_segmentation_batch_matches_scalar(rng):
+    requests = [
+        SegmentationRequest(
+            lead_id=f"lead_{i}",
+            lead_features={
+                "email": rng.choice(EMAILS),
+                "phone": rng.choice(["+447700900123", "123", None]),
+                "source": rng.choice(SOURCES),
+                "course_declared": rng.choice(COURSES),
+                "engagement_data": _engagement(rng),
+            },
+            include_cohort_matching=rng.random() < 0.8,
+        )
+        for i in range(300)
+    ]
+
+    batch = [r.model_dump(exclude={"generated_at"}) for r in segment_batch(requests)]
+    scalar = [segment_lead(r).model_dump(exclude={"generated_at"}) for r in requests]
+
+    assert batch == scalar
+    assert {r["primary_persona"]["id"] for r in batch} and any(r["cohort_matches"] for r in batch)
+
+
+def test_anomaly_batch_matches_scalar(rng):
+    now = dt.datetime.now(dt.timezone.utc)
+    requests = []
+    for i in range(300):
+        engagement = _engagement(rng)
+        if i % 50 == 0:
+            engagement = {"email_opens": 30, "web_visits": 30}
+        requests.append(AnomalyRequest(
+            lead_id=f"lead_{i}",
+            engagement_data=engagement,
+            lead_data={
+                "id": f"lead_{i}",
+                "email": rng.choice(EMAILS),
+                "phone": rng.choice(["+447700900123", None]),
+                "course_declared": rng.choice(COURSES),
+                "has_email": rng.choice([True, False, None]),
+                "has_phone": rng.choice([True, False]),
+                "last_activity_at": _iso(rng, now) if i % 3 else now.isoformat(),
+            },
+            source_data={"source": rng.choice(["unknown", "paid_social", "organic"])},
+        ))
+
+    # Timestamps and evidence timings are measured at call time, so they are left out
+    volatile = {"detected_at", "generated_at", "time_since_last_activity_seconds"}
+    batch = [
+        build_anomaly_response(r.lead_id, anomalies).model_dump()
+        for r, anomalies in zip(requests, detect_anomalies_batch(requests))
+    ]
+    scalar = [
+        build_anomaly_response(r.lead_id, detect_anomalies(r.lead_id, r.engagement_data, r.lead_data, r.source_data))
+        .model_dump()
+        for r in requests
+    ]
+
+    assert _strip(batch, volatile) == _strip(scalar, volatile)
+    types = {a["anomaly_type"] for r in batch for a in r["anomalies"]}
+    assert {"bot_like_behavior", "timing_behavior", "engagement_pattern"} <= types
+
+
+def test_anomaly_batch_falls_back_for_non_numeric_counts():
+    good = AnomalyRequest(lead_id="a", engagement_data={"email_opens": 3}, lead_data={"id": "a"}, source_data={})
+    odd = AnomalyRequest(lead_id="b", engagement_data={"email_opens": "3"}, lead_data={"id": "b"}, source_data={})
+
+    assert [a.anomaly_type.value for a in detect_anomalies_batch([good])[0]] == \
+        [a.anomaly_type.value for a in detect_anomalies("a", good.engagement_data, good.lead_data, {})]
+    # The scalar rules cannot compare a string count; the batch raises the same error
+    with pytest.raises(TypeError):
+        detect_anomalies_batch([good, odd])
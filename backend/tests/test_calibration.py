@@ -0,0 +1,90 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ai.calibration import (
+    ProbabilityCalibrator, calibrate_batch_probabilities, calibrate_for_serving, calibrate_probability,
+    expected_calibration_error, fit_calibration, fit_calibrator, reliability_curve,
+)
+
+
+def _overconfident(n=4000, seed=0):
+    rng = np.random.default_rng(seed)
+    true_p = rng.random(n)
+    labels = (rng.random(n) < true_p).astype(int)
+    # Raw scores pushed towards 0/1: the true rate is much flatter
+    raw = 1 / (1 + np.exp(-4 * (true_p - 0.5) * 2))
+    return raw, labels
+
+
+@pytest.mark.parametrize("method,kwargs", [
+    ("sigmoid", {}),
+    ("sigmoid", {"steepness": 5.0, "centre": 0.3}),
+    ("linear", {"min_prob": 0.1, "max_prob": 0.9}),
+    ("none", {}),
+])
+def test_batch_calibration_matches_scalar_path(method, kwargs):
+    raw = [0.0, 0.2, 0.5, 0.77, 1.0, 1.4, -0.3, float("nan"), float("inf"), "bad", None]
+    expected = [calibrate_probability(p, method, **kwargs) for p in raw]
+    np.testing.assert_allclose(calibrate_batch_probabilities(raw, method, **kwargs), expected, rtol=0, atol=1e-15)
+
+
+def test_serving_without_calibrator_keeps_legacy_bounded_sigmoid():
+    raw = np.array([0.0, 0.3, 0.5, 0.9, 1.0])
+    legacy = [max(0.05, min(0.95, 1 / (1 + np.exp(-2 * (p - 0.5))))) for p in raw]
+    np.testing.assert_allclose(calibrate_for_serving(raw), legacy)
+
+
+def test_reliability_curve_and_ece():
+    probs = np.array([0.05, 0.05, 0.95, 0.95, 0.55, 0.55])
+    labels = np.array([0, 0, 1, 1, 1, 0])
+    curve = reliability_curve(probs, labels, n_bins=10)
+    assert [b["count"] for b in curve] == [2, 2, 2]
+    assert curve[1]["observed_rate"] == 0.5
+    assert expected_calibration_error(probs, labels) == pytest.approx((2 * 0.05 + 2 * 0.05 + 2 * 0.05) / 6)
+
+
+@pytest.mark.parametrize("method", ["isotonic", "platt"])
+def test_fitted_calibrator_reduces_ece(method):
+    raw, labels = _overconfident()
+    calibrator, report = fit_calibration(raw, labels, method)
+
+    assert report["method"] == method and report["calibrator"]["method"] == method
+    assert report["calibrated"]["ece"] < report["raw"]["ece"] / 2
+    assert report["calibrated"]["brier"] < report["raw"]["brier"]
+    calibrated = calibrate_for_serving(raw, calibrator)
+    assert expected_calibration_error(calibrated, labels) < 0.03
+    # Monotone, in range, and unchanged by a pickle round trip
+    order = np.argsort(raw)
+    assert np.all(np.diff(calibrated[order]) >= -1e-12)
+    assert calibrated.min() >= 0 and calibrated.max() <= 1
+    np.testing.assert_array_equal(pickle.loads(pickle.dumps(calibrator)).transform(raw), calibrated)
+
+
+def test_too_little_data_keeps_legacy_sigmoid():
+    assert fit_calibrator([0.2, 0.8], [0, 1]) is None
+    assert fit_calibrator(np.linspace(0, 1, 50), np.ones(50)) is None
+    calibrator, report = fit_calibration(np.linspace(0, 1, 50), np.ones(50))
+    assert calibrator is None and report["method"] == "sigmoid" and "legacy" in report
+    with pytest.raises(ValueError):
+        fit_calibrator([0.5] * 30, [0, 1] * 15, method="beta")
+
+
+def test_training_saves_calibrator_in_the_artifact():
+    from app.ai.advanced_ml_hardened import AdvancedMLPipeline, MLModelConfig
+
+    rng = np.random.default_rng(3)
+    X = pd.DataFrame(rng.normal(size=(600, 4)), columns=["a", "b", "c", "d"])
+    y = pd.Series(((X["a"] + X["b"] + rng.normal(scale=1.5, size=600)) > 0).astype(int))
+    pipeline = AdvancedMLPipeline()
+    pipeline.feature_names = list(X.columns)
+    config = MLModelConfig(model_type="random_forest", features=[], hyperparameters={"n_estimators": 30},
+                           cross_validation_folds=3, calibration="platt")
+
+    model_id, performance = pipeline.train_model(X, y, config)
+    calibrator = pipeline.models[model_id]["calibrator"]
+    assert isinstance(calibrator, ProbabilityCalibrator) and calibrator.method == "platt"
+    assert set(performance["calibration"]) >= {"raw", "calibrated", "calibrator", "samples"}
+    assert performance["calibration"]["samples"] == 120
@@ -0,0 +1,131 @@
+import datetime as dt
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.ai import cohort_performance as cohorts
+from app.ai.cohort_performance import (
+    CohortPerformanceRequest, analyze_cohort_performance, build_cohort_metrics, build_lifecycle_analysis,
+    build_roi_analysis, build_trend_analysis, get_trend_analysis, load_cohort_snapshot,
+)
+
+THIS_MONTH = dt.datetime.utcnow().date().replace(day=1)
+LAST_MONTH = (THIS_MONTH - dt.timedelta(days=1)).replace(day=1)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(cohorts, "_SNAPSHOT_CACHE", cohorts._TTLCache(ttl_s=60))
+    monkeypatch.setattr(cohorts, "MOCK_DATA_ENABLED", False)
+
+
+def _row(cohort_id, month, leads, converted, offered=0, enrolled=0, in_range=True, recent=0, prior=0):
+    return {
+        "cohort_id": cohort_id, "month": month, "in_range": in_range, "leads": leads, "converted": converted,
+        "offered": offered, "enrolled": enrolled, "lead_score_sum": Decimal(leads * 70),
+        "days_to_conversion_sum": Decimal(converted * 12), "days_in_application_sum": Decimal(converted * 5),
+        "recent_leads": recent, "prior_leads": prior,
+    }
+
+
+def _rows():
+    return [
+        _row("Referral", LAST_MONTH, 6, 3, offered=2, enrolled=1, prior=6),
+        _row("Referral", THIS_MONTH, 4, 1, recent=4),
+        # Scanned only for growth: outside the range, counted in prior_leads alone
+        _row("Referral", LAST_MONTH, 5, 5, in_range=False, prior=5),
+        _row("Organic", THIS_MONTH, 20, 4, offered=1, recent=20),
+        _row("Event", THIS_MONTH, 3, 3, recent=3),
+    ]
+
+
+@pytest.fixture
+def fetch_calls(monkeypatch):
+    calls = []
+
+    async def fetch(sql, *params):
+        calls.append((sql, params))
+        return _rows()
+
+    monkeypatch.setattr(cohorts, "fetch", fetch)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_one_query_per_range_serves_every_view(fetch_calls):
+    snapshot = await load_cohort_snapshot("30d")
+    await load_cohort_snapshot("30d")
+    assert len(fetch_calls) == 1
+    sql, params = fetch_calls[0]
+    assert "EXISTS" not in sql and sql.count("FROM people") == 1
+    since, _, scan_from, _ = params
+    assert scan_from < since  # growth needs 60 days even for a 30-day range
+
+    # Event is below COHORT_MIN_LEADS
+    assert set(snapshot["cohorts"]) == {"Referral", "Organic"}
+    referral = next(m for m in build_cohort_metrics(snapshot) if m.cohort_id == "Referral")
+    assert (referral.total_leads, referral.converted_leads, referral.conversion_rate) == (10, 4, 0.4)
+    assert referral.avg_lead_score == 70 and referral.avg_time_to_conversion == 12
+    assert referral.growth_trend == "decreasing" and referral.roi == pytest.approx(0.4 * 3.5)
+
+    overall, *per_cohort = build_lifecycle_analysis(snapshot)
+    assert overall.cohort_id == "overall" and [s.lead_count for s in overall.stages] == [30, 8, 3, 1]
+    assert overall.conversion_funnel["application"] == pytest.approx(8 / 30)
+    assert {l.cohort_id for l in per_cohort} == {"Referral", "Organic"}
+
+    roi = build_roi_analysis(snapshot)
+    assert roi[0].segment == "Referral" and roi[0].total_spend == 10 * cohorts.COST_PER_LEAD
+
+    # Trend months count every scanned row, including those before the range
+    trend = next(t for t in build_trend_analysis(snapshot) if t.cohort_id == "Referral")
+    assert len(trend.trends) == cohorts.COHORT_TREND_MONTHS
+    assert [p.lead_count for p in trend.trends[-2:]] == [11, 4]
+    assert sum(p.lead_count for p in trend.trends) == 15
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("date_range", ["7d", "30d", "90d"])
+async def test_trend_window_covers_months_before_a_narrow_range(monkeypatch, date_range):
+    window = cohorts._trend_months(dt.datetime.utcnow().date(), cohorts.COHORT_TREND_MONTHS)
+    calls = []
+
+    async def fetch(sql, *params):
+        calls.append(params)
+        since, _, scan_from, _ = params
+        # A steady 20 leads a month over the scanned span; the month holding `since` counts as in range
+        return [_row("Referral", month, 20, 5, in_range=month >= since.date().replace(day=1))
+                for month in window
+                if dt.datetime.combine(month, dt.time(), dt.timezone.utc) >= scan_from]
+
+    monkeypatch.setattr(cohorts, "fetch", fetch)
+    snapshot = await load_cohort_snapshot(date_range)
+    since, _, scan_from, _ = calls[0]
+    assert scan_from <= dt.datetime.combine(window[0], dt.time(), dt.timezone.utc) < since
+
+    trend = build_trend_analysis(snapshot)[0]
+    assert [p.lead_count for p in trend.trends] == [20] * cohorts.COHORT_TREND_MONTHS
+    assert trend.growth_rate == 0 and trend.seasonality_factor == 1.0
+    assert all(p.conversion_rate == 0.25 for p in trend.trends)
+
+
+@pytest.mark.asyncio
+async def test_analyze_filters_by_source_and_recomputes_summary(fetch_calls):
+    data = await analyze_cohort_performance(CohortPerformanceRequest(date_range="90d", source_filter="Organic"))
+    assert [c["cohort_id"] for c in data["cohort_metrics"]] == ["Organic"]
+    assert data["summary"]["total_leads"] == 20 and data["summary"]["total_conversions"] == 4
+    assert data["insights"] and data["date_range"] == "90d"
+
+
+@pytest.mark.asyncio
+async def test_database_errors_are_not_masked_with_mock_data(monkeypatch):
+    async def fetch(sql, *params):
+        raise RuntimeError("connection refused")
+
+    monkeypatch.setattr(cohorts, "fetch", fetch)
+    with pytest.raises(HTTPException) as err:
+        await analyze_cohort_performance(CohortPerformanceRequest())
+    assert err.value.status_code == 503
+    with pytest.raises(HTTPException) as err:
+        await get_trend_analysis(date_range="2w")
+    assert err.value.status_code == 400
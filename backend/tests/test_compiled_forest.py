@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from app.ai.compiled_forest import CompiledForest, compile_model
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(42)
+    X = rng.normal(loc=50, scale=20, size=(600, 8))
+    y = ((X[:, 0] + 0.5 * X[:, 3] - X[:, 5] + rng.normal(scale=10, size=600)) > 45).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("estimator", [
+    RandomForestClassifier(n_estimators=40, max_depth=8, random_state=0),
+    RandomForestClassifier(n_estimators=25, min_samples_leaf=3, random_state=1),
+    ExtraTreesClassifier(n_estimators=30, random_state=2),
+    DecisionTreeClassifier(max_depth=6, random_state=3),
+])
+def test_predict_proba_matches_sklearn(data, estimator):
+    X, y = data
+    scaler = StandardScaler().fit(X)
+    model = estimator.fit(scaler.transform(X), y)
+    compiled = CompiledForest.from_sklearn(model, scaler)
+
+    X_new = np.vstack([X[:50], np.random.default_rng(7).normal(50, 30, size=(200, 8))])
+    expected = model.predict_proba(scaler.transform(X_new))
+    np.testing.assert_allclose(compiled.predict_proba(X_new), expected, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(X_new), model.predict(scaler.transform(X_new)))
+    # Single row and pre-scaled input paths
+    np.testing.assert_allclose(compiled.predict_proba(X_new[0]), expected[:1], atol=1e-12)
+    np.testing.assert_allclose(compiled.predict_proba(scaler.transform(X_new), scaled=True), expected, atol=1e-12)
+
+
+def test_thresholds_compare_in_float32_like_sklearn():
+    # A value that only differs from the split threshold after float32 rounding
+    X = np.array([[0.0], [1.0], [0.1 + 1e-9], [2.0]])
+    model = DecisionTreeClassifier(random_state=0).fit(X, [0, 1, 0, 1])
+    probe = np.array([[np.float64(model.tree_.threshold[0]) + 1e-12]])
+    np.testing.assert_array_equal(CompiledForest.from_sklearn(model).predict_proba(probe), model.predict_proba(probe))
+
+
+def test_loaded_model_uses_compiled_path(data):
+    from app.ai.model_registry import LoadedModel
+
+    X, y = data
+    names = [f"f{i}" for i in range(X.shape[1])]
+    scaler = StandardScaler().fit(pd.DataFrame(X, columns=names))
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaler.transform(pd.DataFrame(X, columns=names)), y)
+    loaded = LoadedModel(model=model, scaler=scaler, feature_selector=None, feature_names=names, performance={},
+                         feature_importance={}, path=None, sha256="", loaded_at=0.0, version="t",
+                         compiled=compile_model(model, scaler))
+
+    assert loaded.compiled is not None
+    expected = model.predict_proba(scaler.transform(pd.DataFrame(X[:5], columns=names)))
+    np.testing.assert_allclose(loaded.predict_proba(X[:5]), expected, atol=1e-12)
+
+
+def test_unsupported_models_fall_back(data):
+    X, y = data
+    assert compile_model(LogisticRegression().fit(X, y)) is None
+
+
+@pytest.mark.parametrize("scaler", [
+    StandardScaler(with_mean=False),
+    StandardScaler(with_std=False),
+    StandardScaler(with_mean=False, with_std=False),
+])
+def test_scaler_flags_are_honoured(data, scaler):
+    X, y = data
+    scaler.fit(X)
+    model = RandomForestClassifier(n_estimators=15, random_state=0).fit(scaler.transform(X), y)
+    compiled = CompiledForest.from_sklearn(model, scaler)
+    np.testing.assert_allclose(compiled.predict_proba(X[:100]), model.predict_proba(scaler.transform(X[:100])), atol=1e-12)
+
+
+def test_other_scalers_fall_back_to_sklearn(data):
+    from sklearn.preprocessing import MinMaxScaler, RobustScaler
+
+    X, y = data
+    for scaler in (RobustScaler().fit(X), MinMaxScaler().fit(X)):
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y)
+        with pytest.raises(TypeError):
+            CompiledForest.from_sklearn(model, scaler)
+        assert compile_model(model, scaler) is None
+
+
+def test_positive_class_follows_classes_order(data):
+    from app.ai.model_registry import LoadedModel, positive_class_index
+
+    X, y = data
+    labels = np.where(y == 1, 1, 2)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, labels)
+    loaded = LoadedModel(model=model, scaler=None, feature_selector=None, feature_names=[], performance={},
+                         feature_importance={}, path=None, sha256="", loaded_at=0.0, version="t",
+                         compiled=compile_model(model))
+    # classes_ == [1, 2]: the positive class is column 0, not column 1
+    assert positive_class_index(loaded) == 0
+    binary = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    loaded.model, loaded.compiled = binary, None
+    assert positive_class_index(loaded) == 1
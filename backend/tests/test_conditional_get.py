@@ -0,0 +1,80 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.conditional import ConditionalGet, etag_matches, weak_etag
+
+
+@pytest.fixture
+def board():
+    state = {"version": 1, "queries": 0, "version_fails": False}
+
+    async def version():
+        if state["version_fails"]:
+            raise RuntimeError("relation data_versions does not exist")
+        return state["version"]
+
+    conditional = ConditionalGet("board", version, "private, no-cache")
+    app = FastAPI()
+
+    @app.get("/board", dependencies=[Depends(conditional)])
+    async def board_endpoint(limit: int = 100):
+        state["queries"] += 1
+        return [{"limit": limit}]
+
+    return TestClient(app), state
+
+
+def test_unchanged_data_is_answered_304_without_running_the_endpoint(board):
+    client, state = board
+    first = client.get("/board?limit=50")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.json() == [{"limit": 50}] and etag.startswith('W/"')
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    again = client.get("/board?limit=50", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag and again.headers["cache-control"] == "private, no-cache"
+    assert state["queries"] == 1
+
+    # Other query parameters or a new data version change the tag
+    assert client.get("/board?limit=20", headers={"If-None-Match": etag}).status_code == 200
+    state["version"] += 1
+    bumped = client.get("/board?limit=50", headers={"If-None-Match": etag})
+    assert bumped.status_code == 200 and bumped.headers["etag"] != etag
+
+
+def test_served_without_etag_when_the_version_is_unavailable(board):
+    client, state = board
+    state["version_fails"] = True
+    response = client.get("/board", headers={"If-None-Match": "*"})
+    assert response.status_code == 200 and "etag" not in response.headers
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+def test_time_bucket_expires_tags(monkeypatch):
+    from app.middleware import conditional as module
+
+    async def version():
+        return 1
+
+    app = FastAPI()
+
+    @app.get("/metrics", dependencies=[Depends(ConditionalGet("metrics", version, "private, max-age=30", max_stale_s=60))])
+    async def metrics():
+        return {}
+
+    client = TestClient(app)
+    monkeypatch.setattr(module.time, "time", lambda: 1_000_000.0)
+    etag = client.get("/metrics").headers["etag"]
+    monkeypatch.setattr(module.time, "time", lambda: 1_000_019.0)
+    assert client.get("/metrics", headers={"If-None-Match": etag}).status_code == 304
+    monkeypatch.setattr(module.time, "time", lambda: 1_000_080.0)
+    assert client.get("/metrics", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_weak_comparison():
+    etag = weak_etag("x", 1)
+    assert etag_matches(f'"abc", {etag[2:]}', etag)
+    assert etag_matches(etag, etag) and etag_matches("*", etag)
+    assert not etag_matches('W/"other"', etag) and not etag_matches(None, etag)
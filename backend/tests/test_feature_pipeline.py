@@ -0,0 +1,129 @@
+import pickle
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ai.feature_pipeline import FEATURE_SPECS, FeaturePipeline, resolve_pipeline
+from app.ai.feature_safety import safe_prepare_feature_matrix, safe_prepare_features
+
+
+def _leads(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    engagement = rng.integers(0, 100, n).astype(float)
+    engagement[::17] = np.nan
+    days = rng.random(n) * 90
+    days[::23] = np.nan
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return pd.DataFrame({
+        "id": [f"lead_{i}" for i in range(n)],
+        "created_at": [start + timedelta(hours=7 * i) for i in range(n)],
+        "lead_score": rng.integers(0, 100, n).astype(float),
+        "engagement_score": engagement,
+        "touchpoint_count": rng.integers(0, 12, n).astype(float),
+        "conversion_probability": rng.random(n),
+        "days_since_creation": days,
+        "lifecycle_state": pd.Categorical(["lead"] * n),
+        "status": pd.Categorical(rng.choice(["new", "contacted", "qualified"], n)),
+    })
+
+
+@pytest.fixture
+def fitted():
+    df = _leads()
+    pipeline = FeaturePipeline()
+    train = pipeline.fit_transform(df)
+    return df, pipeline, train
+
+
+def test_training_batch_and_single_lead_features_match(fitted):
+    df, pipeline, train = fitted
+    records = df.to_dict("records")
+
+    batch = pipeline.transform_records(records, pipeline.features)
+    single = np.vstack([pipeline.transform_records([r], pipeline.features) for r in records[:25]])
+
+    np.testing.assert_allclose(batch, train.to_numpy(dtype=float))
+    np.testing.assert_allclose(single, batch[:25])
+    assert not np.isnan(batch).any()
+
+
+def test_percentiles_reproduce_training_ranks(fitted):
+    df, pipeline, train = fitted
+    expected = df["lead_score"].rank(pct=True)
+    np.testing.assert_allclose(train["score_percentile"], expected)
+    # A lead never seen in training gets its position in the training distribution
+    value = pipeline.transform(pd.DataFrame({"lead_score": [1000.0, -1.0]}), ["score_percentile"])
+    assert value["score_percentile"].tolist() == [1.0, 0.0]
+
+
+def test_categories_follow_training_vocabulary(fitted):
+    _, pipeline, train = fitted
+    assert pipeline.vocabularies["status_encoded"] == ["contacted", "new", "qualified"]
+    assert pipeline.vocabularies["engagement_level_encoded"] == ["high", "low", "medium"]
+    codes = pipeline.transform(pd.DataFrame({"status": ["qualified", "archived", None]}), ["status_encoded"])
+    assert codes["status_encoded"].tolist() == [2.0, 0.0, 0.0]
+    # The interaction uses the same encoded level in training and serving
+    np.testing.assert_allclose(train["score_engagement_interaction"],
+                               train["lead_score"] * train["engagement_level_encoded"])
+
+
+def test_missing_values_use_fitted_fills(fitted):
+    df, pipeline, train = fitted
+    out = pipeline.transform(pd.DataFrame([{"lead_score": 10}]), ["days_since_creation", "created_hour"])
+    assert out["days_since_creation"][0] == pytest.approx(df["days_since_creation"].median())
+    assert out["created_hour"][0] == pipeline.fill_values["created_hour"]
+
+
+def test_day_of_week_uses_postgres_convention():
+    sunday = datetime(2025, 3, 2, 10, tzinfo=timezone.utc)
+    out = FeaturePipeline().transform(pd.DataFrame({"created_at": [sunday]}), ["created_day_of_week", "created_month"])
+    assert out.iloc[0].tolist() == [0.0, 3.0]
+
+
+def test_unfitted_pipeline_keeps_legacy_serving_defaults():
+    pipeline = resolve_pipeline(None)
+    row = {"lead_score": 80, "engagement_score": 90, "touchpoint_count": 5, "status": "converted", "something": "x"}
+    names = ["score_percentile", "touchpoint_percentile", "status_encoded", "engagement_level_encoded",
+             "created_month", "created_hour", "something", "missing"]
+    assert pipeline.transform_records([row], names)[0].tolist() == [0.8, 0.5, 3.0, 2.0, 1.0, 12.0, 0.0, 0.0]
+
+
+def test_feature_groups_and_dropped_rows():
+    from app.ai.advanced_ml_hardened import AdvancedMLPipeline, FeatureEngineeringConfig
+
+    df = _leads()
+    config = FeatureEngineeringConfig(create_polynomial_features=False, handle_missing_values="drop")
+    pipeline = AdvancedMLPipeline()
+    out = pipeline.engineer_features(df, config)
+
+    assert "score_cubed" not in pipeline.feature_pipeline.features
+    assert "score_squared" in out.columns and "source_encoded" not in out.columns
+    # Missing engagement is zero-filled like clean_training_frame; only rows missing days are dropped
+    assert out["engagement_score"].notna().all()
+    assert len(out) == df["days_since_creation"].notna().sum()
+
+
+def test_safe_prepare_features_matches_batch_and_reports_coverage(fitted):
+    df, pipeline, _ = fitted
+    records = df.to_dict("records")[:10]
+    matrix, coverage = safe_prepare_feature_matrix(records, pipeline.features, pipeline)
+    features, ratio = safe_prepare_features(records[3], pipeline.features, pipeline)
+
+    np.testing.assert_allclose(features, matrix[3])
+    assert ratio == coverage[3]
+    _, empty = safe_prepare_feature_matrix([{"id": "x"}], ["lead_score", "score_squared"], pipeline)
+    assert empty.tolist() == [0.0]
+
+
+def test_timing_report_and_pickling(fitted):
+    df, pipeline, _ = fitted
+    report = pipeline.timing_report(df, repeat=2)
+    computed = {spec.name for spec in FEATURE_SPECS if spec.inputs} & set(pipeline.features)
+    assert computed <= {row["feature"] for row in report}
+    assert [row["ms"] for row in report] == sorted((row["ms"] for row in report), reverse=True)
+    assert pipeline.summary()["feature_count"] == len(pipeline.features)
+
+    restored = pickle.loads(pickle.dumps(pipeline))
+    np.testing.assert_allclose(restored.transform(df).to_numpy(), pipeline.transform(df).to_numpy())
@@ -0,0 +1,53 @@
+import pytest
+
+from app.ai import forecast
+from app.ai.forecast import ForecastLead, ForecastRequest, forecast_leads
+from app.telemetry import sink as sink_module
+from app.telemetry.sink import TelemetrySink
+
+
+def _request(n):
+    leads = [ForecastLead(id=f"lead_{i}", source="referral", has_email=True, engagement={"email_opens": i % 5})
+             for i in range(n)]
+    return ForecastRequest(leads=leads, persist=True)
+
+
+@pytest.mark.asyncio
+async def test_persist_queues_one_bulk_insert(monkeypatch):
+    calls = []
+
+    async def writer(sql, *args):
+        calls.append((sql, args))
+
+    sink = TelemetrySink(batch_size=500, flush_ms=20, writer=writer)
+    monkeypatch.setattr(sink_module, "get_telemetry_sink", lambda: sink)
+    monkeypatch.setattr(forecast, "FORECAST_PERSIST_ASYNC", True)
+
+    response = await forecast_leads(_request(120))
+    assert not calls  # scoring returned before anything was written
+    await sink.stop()
+
+    assert len(calls) == 1
+    sql, args = calls[0]
+    assert sql.startswith("INSERT INTO forecast_predictions (lead_id, probability, eta_days, confidence, features, "
+                          "explanation, config_version) VALUES")
+    assert len(args) == 120 * 7
+    assert args[0] == "lead_0" and args[1] == response.items[0].probability
+    assert args[5] == response.items[0].explanation
+
+
+@pytest.mark.asyncio
+async def test_inline_persist_chunks_under_parameter_cap(monkeypatch):
+    statements = []
+
+    async def execute(sql, *args):
+        statements.append(len(args))
+
+    monkeypatch.setattr("app.db.db.execute", execute)
+    monkeypatch.setattr(sink_module, "_MAX_PARAMS", 700)
+    monkeypatch.setattr(forecast, "FORECAST_PERSIST_ASYNC", False)
+
+    await forecast_leads(_request(250))
+
+    # 100 rows of 7 columns per statement
+    assert statements == [700, 700, 350]
@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier
+
+from app.ai.compiled_forest import compile_model
+from app.ai.hyperparameter_search import HyperparameterSearchConfig, run_search
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = make_classification(n_samples=300, n_features=8, n_informative=4, random_state=0)
+    return X, y
+
+
+def test_random_search_ranks_candidates_and_refits_winner(data):
+    X, y = data
+    config = HyperparameterSearchConfig(model_types=["logistic_regression", "random_forest"], n_iter=6, patience=1)
+    result = run_search(X, y, config, cv_folds=3, n_jobs=2)
+
+    scores = [row["mean_score"] for row in result.leaderboard]
+    assert scores == sorted(scores, reverse=True)
+    assert [row["rank"] for row in result.leaderboard] == list(range(1, len(scores) + 1))
+    assert result.best_score == scores[0]
+    assert len(result.best_cv_scores) == 3
+    assert {row["model_type"] for row in result.leaderboard} == {"logistic_regression", "random_forest"}
+    # The returned estimator is already fitted on the full training data
+    assert result.estimator.predict_proba(X[:5]).shape == (5, 2)
+
+
+def test_halving_search_and_ensemble(data):
+    X, y = data
+    config = HyperparameterSearchConfig(strategy="halving", model_types=["ensemble"], n_iter=4)
+    result = run_search(X, y, config, cv_folds=3)
+
+    assert result.best_model_type == "ensemble"
+    assert all(row["n_resources"] for row in result.leaderboard)
+    assert result.estimator.predict_proba(X[:2]).shape == (2, 2)
+
+
+def test_time_budget_skips_remaining_model_types(data):
+    X, y = data
+    config = HyperparameterSearchConfig(model_types=["logistic_regression", "gradient_boosting"], n_iter=4, max_time_s=1e-9)
+    result = run_search(X, y, config, cv_folds=3)
+
+    assert {row["model_type"] for row in result.leaderboard} == {"logistic_regression"}
+    assert "time budget" in result.stopped["gradient_boosting"]
+
+
+def test_config_validation():
+    with pytest.raises(ValueError):
+        HyperparameterSearchConfig(model_types=["svm"])
+    with pytest.raises(ValueError):
+        HyperparameterSearchConfig(strategy="grid")
+
+
+def test_train_model_search_mode_records_leaderboard(data):
+    from app.ai.advanced_ml_hardened import AdvancedMLPipeline, MLModelConfig
+
+    X, y = data
+    X = pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])])
+    pipeline = AdvancedMLPipeline()
+    pipeline.feature_names = list(X.columns)
+    config = MLModelConfig(
+        model_type="random_forest", features=[], cross_validation_folds=3,
+        search=HyperparameterSearchConfig(model_types=["logistic_regression", "gradient_boosting"], n_iter=4),
+    )
+    model_id, performance = pipeline.train_model(X, pd.Series(y), config)
+
+    search = performance["search"]
+    assert model_id.startswith(search["best_model_type"])
+    assert performance["cross_validation_scores"] == pipeline.models[model_id]["leaderboard"][0]["fold_scores"]
+    assert search["candidates_evaluated"] == len(pipeline.models[model_id]["leaderboard"])
+
+
+def test_boosted_models_are_not_compiled(data):
+    X, y = data
+    assert compile_model(GradientBoostingClassifier(n_estimators=5).fit(X, y)) is None
+
+
+def test_registry_serves_non_forest_search_winners(data, tmp_path):
+    import joblib
+
+    from app.ai.advanced_ml_hardened import AdvancedMLPipeline, MLModelConfig
+    from app.ai.model_registry import ModelRegistry
+
+    X, y = data
+    X = pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])])
+    pipeline = AdvancedMLPipeline()
+    pipeline.feature_names = list(X.columns)
+    config = MLModelConfig(
+        model_type="random_forest", features=[], cross_validation_folds=3,
+        search=HyperparameterSearchConfig(model_types=["logistic_regression"], n_iter=2),
+    )
+    model_id, _ = pipeline.train_model(X, pd.Series(y), config)
+    # The name training jobs save a winner under when no model_name is given
+    joblib.dump(pipeline.models[model_id], tmp_path / f"advanced_ml_{model_id}.joblib")
+
+    loaded = ModelRegistry(tmp_path).load_active()
+    assert loaded.model_type == "logistic_regression"
+    assert loaded.version == model_id.removeprefix("logistic_regression_")
+    assert loaded.compiled is None
+    assert loaded.predict_proba(X.to_numpy()[:3]).shape == (3, 2)
@@ -0,0 +1,108 @@
+import pytest
+
+from app.ai.intent_model import (
+    IntentExample, canonical_intent, classify_intent_local,
+    load_intent_model, save_intent_model, set_intent_model, train_intent_model,
+)
+
+
+def _examples():
+    data = {
+        "course_info": [
+            "what are the entry requirements for the course",
+            "tell me about the computer science course",
+            "course modules and content",
+            "what does the music course cover",
+            "course fees and duration",
+        ],
+        "risk_check": [
+            "is this lead at risk",
+            "any red flags with this applicant",
+            "why has this one stalled",
+            "should i be worried about them",
+            "are there concerns with this lead",
+        ],
+        "nlq_lead_query": [
+            "show me the top leads",
+            "best leads this week",
+            "which leads have high scores",
+            "list hot leads from ucas",
+            "whos the best lead we got",
+        ],
+    }
+    return [IntentExample(t, intent, "test") for intent, texts in data.items() for t in texts]
+
+
+def test_canonical_intent_maps_aliases_and_drops_unknown():
+    known = {"nlq_lead_query", "general_help"}
+    assert canonical_intent("high_score_leads", known) == "nlq_lead_query"
+    assert canonical_intent("general_query", known) == "general_help"
+    assert canonical_intent("something_else", known) is None
+
+
+def test_train_predict_and_report(tmp_path):
+    model = train_intent_model(_examples(), cv_folds=5)
+    assert set(model.labels) == {"course_info", "risk_check", "nlq_lead_query"}
+    assert "accuracy" in model.metrics["cv"]
+    assert model.metrics["latency"]["p50_ms"] >= 0
+
+    intent, conf = model.predict("any red flags on this lead?")
+    assert intent == "risk_check"
+    assert 0 < conf <= 1
+
+    path = save_intent_model(model, tmp_path)
+    assert path.exists() and path.with_suffix(".report.json").exists()
+    loaded = load_intent_model(tmp_path, force=True)
+    assert loaded is not None and loaded.version == model.version
+    set_intent_model(None)
+
+
+def test_classify_local_respects_threshold(monkeypatch):
+    model = train_intent_model(_examples(), cv_folds=5)
+    set_intent_model(model)
+    try:
+        intent, conf, meta = classify_intent_local("show me the top leads", min_confidence=0.0)
+        assert intent == "nlq_lead_query" and meta["via"] == "local"
+
+        intent, conf, meta = classify_intent_local("show me the top leads", min_confidence=1.01)
+        assert intent is None and meta["below_threshold"]
+    finally:
+        set_intent_model(None)
+
+
+@pytest.mark.asyncio
+async def test_router_skips_llm_when_local_model_confident(monkeypatch):
+    from app.ai import router as router_module
+
+    async def fail_llm(query, context):
+        raise AssertionError("LLM fallback should not be called")
+
+    monkeypatch.setattr(router_module, "classify_intent_llm", fail_llm)
+    monkeypatch.setattr(router_module, "classify_intent_local",
+                        lambda q: ("course_info", 0.9, {"via": "local"}))
+
+    intent, conf, meta = await router_module.AIRouter().classify("zzz qqq", {})
+    assert intent == "course_info" and meta["via"] == "local"
+
+
+@pytest.mark.asyncio
+async def test_first_classify_loads_model_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+
+    import app.ai.intent_model as intent_module
+
+    loads = []
+    monkeypatch.setattr(intent_module, "_loaded", None)
+    monkeypatch.setattr(intent_module, "_load_attempted", False)
+    monkeypatch.setattr(intent_module, "_load_scheduled", False)
+    monkeypatch.setattr(intent_module, "load_intent_model", lambda *a, **k: loads.append(threading.current_thread()))
+
+    intent, _, meta = classify_intent_local("show me the top leads")
+    assert intent is None and meta["loading"]
+    classify_intent_local("show me the top leads")
+    for _ in range(50):
+        if loads:
+            break
+        await asyncio.sleep(0.01)
+    assert len(loads) == 1 and loads[0] is not threading.main_thread()
@@ -0,0 +1,75 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.serialization import FastJSONResponse, dumps
+from app.middleware.compression import CompressionMiddleware, negotiate_encoding
+
+
+def test_dumps_matches_jsonable_encoder_for_row_types():
+    row = {
+        "id": uuid.UUID(int=7), "at": datetime(2025, 9, 1, 12, 30, 0, 5, tzinfo=timezone.utc),
+        "naive": datetime(2025, 9, 1), "score": Decimal("0.8125"), "count": Decimal("12"),
+        "blockers": [{"item": "Missing CAS"}], "tags": {"a"}, "missing": None,
+    }
+    assert json.loads(dumps(row)) == jsonable_encoder(row)
+    # Types the stdlib path rejects
+    assert json.loads(dumps({"p": np.float64(0.25), "v": np.arange(2), "nan": float("nan")})) == \
+        {"p": 0.25, "v": [0, 1], "nan": None}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/big")
+    async def big():
+        return [{"id": uuid.UUID(int=i), "score": Decimal("0.5")} for i in range(200)]
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for i in range(3):
+                yield f"data: {'x' * 2000}{i}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+def test_large_json_is_gzipped_when_accepted(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < 2000
+    assert response.json()[1] == {"id": str(uuid.UUID(int=1)), "score": 0.5}
+
+    raw = client.get("/big", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in raw.headers and len(raw.content) > 5000
+
+
+def test_small_and_streamed_responses_pass_through(client):
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    stream = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in stream.headers
+    assert stream.text.count("data: ") == 3
+
+
+def test_negotiation():
+    assert negotiate_encoding("gzip, br", ["br", "gzip"]) == "br"
+    assert negotiate_encoding("br;q=0, gzip;q=0.5", ["br", "gzip"]) == "gzip"
+    assert negotiate_encoding("*", ["gzip"]) == "gzip"
+    assert negotiate_encoding("identity", ["gzip"]) is None
+    assert negotiate_encoding(None, ["gzip"]) is None
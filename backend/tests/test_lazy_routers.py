@@ -0,0 +1,88 @@
+import sys
+import textwrap
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.lazy_routers import include_optional_router, pending_lazy_routers, warm_lazy_routers
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    package = tmp_path / "lazy_fixture"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "heavy.py").write_text(textwrap.dedent("""
+        from fastapi import APIRouter
+        router = APIRouter(prefix="/ai/heavy")
+
+        @router.get("/score")
+        async def score():
+            return {"from": "heavy"}
+
+        @router.get("/shadowed")
+        async def shadowed():
+            return {"from": "heavy"}
+    """))
+    (package / "legacy.py").write_text(textwrap.dedent("""
+        from fastapi import APIRouter
+        router = APIRouter(prefix="/ai/heavy-legacy")
+
+        @router.get("/score")
+        async def score():
+            return {"from": "legacy"}
+    """))
+    (package / "broken.py").write_text("import not_installed_sdk\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "lazy_fixture"
+    for name in [m for m in sys.modules if m.startswith("lazy_fixture")]:
+        del sys.modules[name]
+
+
+def build_app(package):
+    app = FastAPI()
+
+    @app.get("/ai/heavy/shadowed")
+    async def registered_first():
+        return {"from": "app"}
+
+    include_optional_router(app, f"{package}.heavy", "heavy", "/ai/heavy")
+    include_optional_router(app, f"{package}.legacy", "legacy", "/ai/heavy-legacy")
+    include_optional_router(app, f"{package}.broken", "broken", "/ai/broken")
+
+    @app.get("/ai/heavy/extra")
+    async def registered_after():
+        return {"from": "app"}
+
+    return app
+
+
+def test_router_is_imported_on_first_request_in_registration_order(modules):
+    app = build_app(modules)
+    assert f"{modules}.heavy" not in sys.modules
+    client = TestClient(app)
+
+    assert client.get("/ai/heavy/score").json() == {"from": "heavy"}
+    assert f"{modules}.heavy" in sys.modules and f"{modules}.legacy" not in sys.modules
+    # Routes registered before and after the lazy router keep their precedence
+    assert client.get("/ai/heavy/shadowed").json() == {"from": "app"}
+    assert client.get("/ai/heavy/extra").json() == {"from": "app"}
+    assert client.get("/ai/heavy/missing").status_code == 404
+
+    assert client.get("/ai/heavy-legacy/score").json() == {"from": "legacy"}
+
+
+def test_failed_import_drops_the_prefix(modules):
+    client = TestClient(build_app(modules))
+    assert client.get("/ai/broken/anything").status_code == 404
+    assert [r.label for r in pending_lazy_routers(client.app)] == ["heavy", "legacy"]
+
+
+@pytest.mark.asyncio
+async def test_warm_up_loads_every_router_and_refreshes_openapi(modules):
+    app = build_app(modules)
+    assert "/ai/heavy/score" not in app.openapi()["paths"]
+    await warm_lazy_routers(app)
+    assert pending_lazy_routers(app) == []
+    assert {"/ai/heavy/score", "/ai/heavy-legacy/score"} <= set(app.openapi()["paths"])
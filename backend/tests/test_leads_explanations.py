@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from app.ai.tools import leads as leads_module
+from app.ai.tools.leads import LeadLite
+
+
+class FakePrompt:
+    def format_messages(self, schema, leads):
+        return leads
+
+
+class FakeLLM:
+    def __init__(self, fail_ids=()):
+        self.calls = 0
+        self.fail_ids = set(fail_ids)
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        batch = json.loads(messages)
+        if any(f["id"] in self.fail_ids for f in batch):
+            return "not json"
+        return json.dumps([{"id": f["id"], "reasons": [f"llm:{f['id']}"], "next_action": "invite_open_day"} for f in batch])
+
+
+def make_leads(n):
+    return [LeadLite(id=f"L{i}", name=f"Lead {i}", days_since_creation=3.4 + i / 1000) for i in range(n)]
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(leads_module, "ACTIVE_MODEL", "openai")
+    monkeypatch.setattr(leads_module, "EXPLAIN_CHUNK_SIZE", 4)
+    monkeypatch.setattr(leads_module, "_get_explainer_llm", lambda: llm)
+    monkeypatch.setattr(leads_module, "_load_triage_prompt", lambda: (FakePrompt(), "schema"))
+    monkeypatch.setattr(leads_module, "_EXPLANATION_CACHE", leads_module._TTLCache(ttl_s=60))
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_explanations_are_chunked_and_cached(fake_llm):
+    items = make_leads(10)
+    scores = {i.id: 0.5 for i in items}
+
+    first = await leads_module.get_ai_explanations(items, scores, "v1")
+    assert fake_llm.calls == 3
+    assert set(first) == {i.id for i in items}
+    assert first["L7"]["reasons"] == ["llm:L7"]
+
+    # Same features and model version: served from cache
+    again = await leads_module.get_ai_explanations(items, scores, "v1")
+    assert fake_llm.calls == 3 and again == first
+
+    # A new model version invalidates the cached explanations
+    await leads_module.get_ai_explanations(items, scores, "v2")
+    assert fake_llm.calls == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_only_degrades_its_own_leads(fake_llm):
+    fake_llm.fail_ids = {"L1"}
+    items = make_leads(8)
+    out = await leads_module.get_ai_explanations(items, {i.id: 0.3 for i in items}, "v1")
+
+    assert out["L1"]["insight"] == "ML score: 30.0%"
+    assert out["L5"]["reasons"] == ["llm:L5"]
+
+
+@pytest.mark.asyncio
+async def test_triage_stream_emits_scores_before_explanations(fake_llm, monkeypatch):
+    items = make_leads(6)
+
+    async def fake_ml(batch):
+        return {
+            "model_version": "v1",
+            "scores": {i.id: 0.1 * n for n, i in enumerate(batch)},
+            "confidence": {i.id: 0.9 for i in batch},
+            "calibrated": {i.id: 0.1 * n for n, i in enumerate(batch)},
+        }
+
+    monkeypatch.setattr(leads_module, "_ml_scores", fake_ml)
+    events = [e async for e in leads_module.leads_triage_stream(items)]
+
+    assert events[0]["type"] == "scores"
+    assert [r["id"] for r in events[0]["items"]][:2] == ["L5", "L4"]
+    assert all(r["reasons"] == [] for r in events[0]["items"])
+    patched = {}
+    for event in events[1:]:
+        assert event["type"] == "explanations"
+        patched.update(event["items"])
+    assert set(patched) == {i.id for i in items}
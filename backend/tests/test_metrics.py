@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics, tracing
+
+pytestmark = pytest.mark.skipif(not metrics.METRICS_ENABLED, reason="METRICS_ENABLED=false")
+
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_route_histogram_uses_template_and_status():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/things/{thing_id}")
+    async def thing(thing_id: int):
+        return {"id": thing_id}
+
+    before = sample("http_request_duration_seconds_count", method="GET", route="/things/{thing_id}", status="200")
+    unmatched = sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+    client = TestClient(app)
+    for i in range(3):
+        assert client.get(f"/things/{i}").status_code == 200
+    assert client.get("/nope").status_code == 404
+
+    assert sample("http_request_duration_seconds_count", method="GET", route="/things/{thing_id}",
+                  status="200") == before + 3
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") == unmatched + 1
+    assert sample("http_request_duration_seconds_bucket", method="GET", route="/things/{thing_id}",
+                  status="200", le="+Inf") == before + 3
+
+
+def test_dependency_spans_feed_histograms_without_a_trace():
+    db = sample("db_query_duration_seconds_count", call="fetch", operation="SELECT")
+    llm = sample("llm_request_duration_seconds_count", provider="gemini", model="m", outcome="error")
+    hits = sample("cache_requests_total", cache="embedding", result="hit")
+    emb = sample("embedding_duration_seconds_count", model="e", cache="hit")
+    stage = sample("pipeline_stage_duration_seconds_count", stage="rag.mmr")
+
+    with tracing.span("db.fetch", "client", **tracing.db_attributes("select 1")):
+        pass
+    with tracing.span("llm", "client", **{"gen_ai.system": "gemini", "gen_ai.request.model": "m"}):
+        tracing.set_error("fallback answer")
+    with tracing.span("embedding", "client", **{"gen_ai.request.model": "e"}):
+        tracing.set_attribute("cache.hit", True)
+    with tracing.span("rag.mmr"):
+        pass
+
+    assert sample("db_query_duration_seconds_count", call="fetch", operation="SELECT") == db + 1
+    assert sample("llm_request_duration_seconds_count", provider="gemini", model="m", outcome="error") == llm + 1
+    assert sample("cache_requests_total", cache="embedding", result="hit") == hits + 1
+    assert sample("embedding_duration_seconds_count", model="e", cache="hit") == emb + 1
+    assert sample("pipeline_stage_duration_seconds_count", stage="rag.mmr") == stage + 1
+
+
+WORKER = textwrap.dedent("""
+    import os
+    from app.core import metrics
+    metrics.HTTP_LATENCY.labels("GET", "/x", "200").observe(0.01)
+    metrics.pool_acquired("legacy")
+    print(os.getpid())
+""")
+
+SCRAPE = "from app.core import metrics; print(metrics.render()[0].decode())"
+
+
+def run(code, env):
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                          timeout=120, check=True).stdout
+
+
+def test_multiprocess_exposition_merges_workers(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path),
+               PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    pids = [int(run(WORKER, env).strip().splitlines()[-1]) for _ in range(2)]
+
+    text = run(SCRAPE, env)
+    assert 'http_request_duration_seconds_count{method="GET",route="/x",status="200"} 2.0' in text
+    assert 'db_pool_in_use{pool="legacy"} 2.0' in text
+
+    # A dead worker's live gauges go; its counters and histograms stay
+    run(f"from app.core import metrics; metrics.mark_process_dead({pids[0]})", env)
+    text = run(SCRAPE, env)
+    assert 'db_pool_in_use{pool="legacy"} 1.0' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/x",status="200"} 2.0' in text
+
+    metrics.prepare_multiprocess_dir(str(tmp_path))
+    assert not list(tmp_path.glob("*.db"))
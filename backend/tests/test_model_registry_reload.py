@@ -0,0 +1,103 @@
+import os
+import time
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from app.ai.model_registry import ModelRegistry
+
+
+def write_artifact(models_dir, version, coef=1.0):
+    X = np.array([[0.0], [1.0], [2.0], [3.0]])
+    model = LogisticRegression().fit(X * coef, [0, 0, 1, 1])
+    path = models_dir / f"advanced_ml_random_forest_{version}.joblib"
+    joblib.dump({
+        "model": model,
+        "scaler": StandardScaler().fit(X),
+        "feature_names": ["f1"],
+        "performance": {"auc": 0.9},
+        "feature_importance": {"f1": 1.0},
+    }, path)
+    return path
+
+
+@pytest.fixture
+def registry(tmp_path):
+    write_artifact(tmp_path, "20250101_000000")
+    return ModelRegistry(tmp_path, cache_ttl_seconds=3600)
+
+
+def test_unchanged_signature_skips_rehash_and_reload(registry, monkeypatch):
+    first = registry.load_active()
+    calls = []
+    monkeypatch.setattr(registry, "_hash_file", lambda p: calls.append(p) or "x")
+
+    again = registry.load_active(force=True)
+    assert again is first
+    assert calls == []
+
+
+def test_expired_ttl_refreshes_in_background_and_swaps(registry, tmp_path):
+    first = registry.load_active()
+    newer = write_artifact(tmp_path, "20250201_000000", coef=2.0)
+    os.utime(newer, (time.time() + 10, time.time() + 10))
+    registry._last_load_time = 0
+
+    # The expired request is served the current model without waiting
+    assert registry.load_active() is first
+    registry._refresh_thread.join(timeout=10)
+    assert registry.load_active().version == "20250201_000000"
+
+
+def test_activate_version_pins_regardless_of_mtime(registry, tmp_path):
+    newer = write_artifact(tmp_path, "20250301_000000")
+    os.utime(newer, (time.time() + 10, time.time() + 10))
+
+    pinned = registry.activate_version("20250101_000000")
+    assert pinned.version == "20250101_000000"
+    assert registry.load_active(force=True).version == "20250101_000000"
+    assert registry.get_model_info()["pinned_version"] == "20250101_000000"
+
+    with pytest.raises(FileNotFoundError):
+        registry.activate_version("19990101_000000")
+    assert registry.pinned_version == "20250101_000000"
+
+    assert registry.activate_version(None).version == "20250301_000000"
+
+
+def test_pin_is_shared_with_other_workers(registry, tmp_path):
+    newer = write_artifact(tmp_path, "20250301_000000")
+    os.utime(newer, (time.time() + 10, time.time() + 10))
+    other = ModelRegistry(tmp_path, cache_ttl_seconds=3600)
+    assert other.load_active().version == "20250301_000000"
+
+    registry.activate_version("20250101_000000")
+    assert (tmp_path / "active_version.json").exists()
+    # Another worker (or a restarted one) follows the pin on its next reload
+    assert other.load_active(force=True).version == "20250101_000000"
+    assert ModelRegistry(tmp_path).pinned_version == "20250101_000000"
+
+    registry.activate_version(None)
+    assert not (tmp_path / "active_version.json").exists()
+    assert other.load_active(force=True).version == "20250301_000000"
+
+
+def test_concurrent_expiry_starts_one_refresh_thread(registry, monkeypatch):
+    import threading
+
+    registry.load_active()
+    release = threading.Event()
+    monkeypatch.setattr(registry, "_refresh", lambda: release.wait(5))
+    registry._last_load_time = 0
+
+    started = []
+    callers = [threading.Thread(target=lambda: started.append(registry.refresh_in_background())) for _ in range(8)]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join()
+    release.set()
+    assert started.count(True) == 1
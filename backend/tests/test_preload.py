@@ -0,0 +1,66 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from app.ai import model_registry
+from app.ai.compiled_forest import compile_model
+from app.ai.model_registry import ModelRegistry, pipeline_model_entry
+from app.ai.ucas_cycle import UcasCycleCalendar
+from app.core.preload import make_read_only, memory_usage
+
+
+def write_artifact(models_dir, version):
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(60, 3)), rng.integers(0, 2, 60)
+    scaler = StandardScaler().fit(X)
+    path = models_dir / f"advanced_ml_random_forest_{version}.joblib"
+    joblib.dump({
+        "model": RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y),
+        "scaler": scaler,
+        "feature_names": ["a", "b", "c"],
+        "performance": {"auc": 0.5},
+        "feature_importance": {"a": 1.0},
+    }, path)
+    return path
+
+
+def test_read_only_arrays_still_score():
+    rng = np.random.default_rng(1)
+    X, y = rng.normal(size=(80, 4)), rng.integers(0, 2, 80)
+    scaler = StandardScaler().fit(X)
+    compiled = compile_model(RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y), scaler)
+    expected = compiled.predict_proba(X[:10])
+
+    assert make_read_only({"compiled": compiled, "scaler": scaler, "labels": np.array(["x"], dtype=object)}) > 0
+    assert not compiled.input_mean.flags.writeable and not scaler.mean_.flags.writeable
+    with pytest.raises(ValueError):
+        scaler.mean_[0] = 1.0
+    np.testing.assert_allclose(compiled.predict_proba(X[:10]), expected)
+
+
+def test_pipeline_entry_shares_the_registry_model(tmp_path, monkeypatch):
+    served = write_artifact(tmp_path, "20250101_000000")
+    registry = ModelRegistry(tmp_path)
+    monkeypatch.setattr(model_registry, "_model_registry", registry)
+
+    entry = pipeline_model_entry(served)
+    loaded = registry.load_active()
+    assert entry["model"] is loaded.model and entry["compiled"] is loaded.compiled
+
+    # Any other artifact is loaded on its own
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    other = pipeline_model_entry(write_artifact(other_dir, "20250102_000000"))
+    assert other["model"] is not loaded.model and other["compiled"] is not None
+
+
+def test_ucas_key_dates_are_cached_but_returned_as_copies():
+    dates = UcasCycleCalendar.get_key_dates(2026)
+    dates["results_day"] = None
+    assert UcasCycleCalendar.get_key_dates(2026)["results_day"].month == 8
+
+
+def test_memory_usage_reports_rss():
+    assert memory_usage()["rss"] > 0
@@ -0,0 +1,136 @@
+import pytest
+
+from app.ai.rate_limiting import RateLimitType, RateLimiter as OptimizationRateLimiter
+from app.core.rate_limit_store import GCRALimit, InMemoryGCRAStore
+
+
+def test_gcra_allows_burst_then_spaces_requests():
+    store = InMemoryGCRAStore()
+    limit = GCRALimit(rate=10, period=10, burst=3)
+    now = 1000.0
+    assert all(store.acquire([("k", limit)], now).allowed for _ in range(3))
+
+    denied = store.acquire([("k", limit)], now)
+    assert not denied.allowed
+    assert denied.limited_by == "k"
+    assert denied.retry_after == pytest.approx(1.0)
+    assert denied.retry_after_seconds == 1
+
+    assert store.acquire([("k", limit)], now + 1.0).allowed
+    assert store.key_count() == 1
+
+
+def test_multi_key_acquire_is_all_or_nothing():
+    store = InMemoryGCRAStore()
+    tight = GCRALimit(rate=1, period=60)
+    loose = GCRALimit(rate=100, period=60)
+    now = 50.0
+    assert store.acquire([("user", tight), ("org", loose)], now).allowed
+
+    denied = store.acquire([("user", tight), ("org", loose)], now)
+    assert not denied.allowed and denied.limited_by == "user"
+    assert denied.retry_after == pytest.approx(60.0)
+    # The rejected request must not consume org capacity
+    assert store.acquire([("org", loose)], now).remaining["org"] == 98
+
+
+def test_sweep_drops_idle_keys():
+    store = InMemoryGCRAStore(sweep_every=2)
+    limit = GCRALimit(rate=60, period=60)
+    store.acquire([("a", limit)], 0.0)
+    store.acquire([("b", limit)], 100.0)
+    assert store.key_count() == 1
+
+
+def test_optimization_limiter_reports_accurate_retry_after():
+    limiter = OptimizationRateLimiter(store=InMemoryGCRAStore())
+    results = [limiter.is_rate_limited("u1", RateLimitType.ROLE_BASED, "student") for _ in range(6)]
+
+    assert [limited for limited, _ in results] == [False] * 5 + [True]
+    details = results[-1][1]
+    assert details["reason"] == "Burst limit exceeded"
+    assert 1 <= details["retry_after"] <= 2
+    assert "student" in limiter.blocked_roles
+
+
+@pytest.mark.asyncio
+async def test_async_check_shares_state_with_sync_path():
+    limiter = OptimizationRateLimiter(store=InMemoryGCRAStore())
+    limiter.default_configs[RateLimitType.USER_BASED].burst_limit = 2
+    assert not limiter.is_rate_limited("u2", RateLimitType.USER_BASED)[0]
+    assert not (await limiter.ais_rate_limited("u2", RateLimitType.USER_BASED))[0]
+    limited, details = await limiter.ais_rate_limited("u2", RateLimitType.USER_BASED)
+    assert limited and details["retry_after"] >= 1
+
+
+def _redis_store(sync_result=None, async_result=None):
+    from unittest.mock import AsyncMock, Mock
+
+    from app.core.rate_limit_store import RedisGCRAStore
+
+    store = RedisGCRAStore.__new__(RedisGCRAStore)
+    store.prefix = "rl:"
+    store._sync_script = Mock(return_value=sync_result)
+    store._async_script = AsyncMock(return_value=async_result)
+    return store
+
+
+def test_redis_store_sends_no_client_clock_and_parses_denials():
+    from app.core.rate_limit_store import _GCRA_LUA
+
+    limit = GCRALimit(rate=10, period=10, burst=3)
+    store = _redis_store(sync_result=[0, 1500, 2])
+    decision = store.acquire([("a", limit), ("b", limit)], now=123.0)
+
+    kwargs = store._sync_script.call_args.kwargs
+    assert kwargs["keys"] == ["rl:a", "rl:b"]
+    assert kwargs["args"] == [1.0, 2.0, 1.0, 2.0]  # (emission interval, tolerance) per key; no timestamp
+    assert "redis.call('TIME')" in _GCRA_LUA
+    assert not decision.allowed and decision.limited_by == "b"
+    assert decision.retry_after == 1.5 and decision.retry_after_seconds == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_store_async_path_allows():
+    store = _redis_store(async_result=[1, 0, 0])
+    decision = await store.aacquire([("a", GCRALimit(rate=5, period=1))])
+    assert decision.allowed and decision.limited_by is None
+    assert store._async_script.await_args.kwargs["args"] == [0.2, 0.8]
+
+
+def test_redis_store_gcra_against_fakeredis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from app.core.rate_limit_store import _GCRA_LUA, RedisGCRAStore
+
+    store = RedisGCRAStore.__new__(RedisGCRAStore)
+    store.prefix = "rl:"
+    store._sync_script = fakeredis.FakeRedis().register_script(_GCRA_LUA)
+    limit = GCRALimit(rate=10, period=10, burst=3)
+    assert all(store.acquire([("k", limit)]).allowed for _ in range(3))
+    denied = store.acquire([("k", limit)])
+    assert not denied.allowed and 0 < denied.retry_after <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_decorator_raises_429_with_retry_after():
+    from fastapi import HTTPException
+
+    from app.ai import rate_limiting
+
+    limiter = OptimizationRateLimiter(store=InMemoryGCRAStore())
+    limiter.default_configs[RateLimitType.ENDPOINT_BASED].burst_limit = 1
+    original = rate_limiting.rate_limiter
+    rate_limiting.rate_limiter = limiter
+    try:
+        @rate_limiting.rate_limit(RateLimitType.ENDPOINT_BASED)
+        async def endpoint():
+            return {"ok": True}
+
+        assert await endpoint() == {"ok": True}
+        with pytest.raises(HTTPException) as exc:
+            await endpoint()
+    finally:
+        rate_limiting.rate_limiter = original
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) >= 1
@@ -0,0 +1,66 @@
+from app.ai.pii_redaction import RedactionLevel, detect_pii_in_text, redact, redact_text
+from app.ai.redaction_engine import AI_EVENTS_PROFILE, CONTACT_PROFILE, MEMORY_PROFILE, TELEMETRY_PROFILE, redact_many
+from app.telemetry import redact_pii
+
+
+TEXT = "Email priya.shah@example.com or call 07911123456. John Smith was born 15/03/2000."
+
+
+def test_telemetry_redact_matches_legacy_tokens():
+    assert redact(TEXT) == "Email [EMAIL] or call [PHONE]. [NAME] was born [DOB]."
+
+
+def test_scan_returns_typed_spans_in_order():
+    spans = TELEMETRY_PROFILE.scan(TEXT)
+    assert [s.pii_type for s in spans] == ["email", "phone", "name", "date"]
+    for span in spans:
+        assert TEXT[span.start:span.end] == span.value
+
+
+def test_redaction_levels():
+    assert TELEMETRY_PROFILE.redact("a.b@example.com", RedactionLevel.PARTIAL) == "a***@example.com"
+    hashed = TELEMETRY_PROFILE.redact("a.b@example.com", "hashed")
+    assert hashed.startswith("[EMAIL:") and hashed == TELEMETRY_PROFILE.redact("a.b@example.com", "hashed")
+    assert TELEMETRY_PROFILE.redact("a.b@example.com", "anonymized") == "[ANONYMIZED_EMAIL]"
+
+
+def test_redact_text_and_detect_share_engine():
+    result = redact_text(TEXT, "full")
+    assert "priya.shah@example.com" not in result["redacted_text"]
+    assert len(result["pii_matches"]) == len(detect_pii_in_text(TEXT)) == 4
+
+
+def test_ai_events_profile_handles_reversed_names_and_uuids():
+    out = redact_pii("Smith, John ref 3f2b1c4d-aaaa-4bbb-8ccc-1234567890ab phone 555-123-4567")
+    assert out == "[NAME] ref [UUID] phone [PHONE]"
+
+
+def test_memory_and_contact_profiles():
+    # Same output as the historical patterns, including the "+" they left behind
+    assert MEMORY_PROFILE.redact("mail a@b.co or +44 7911 123456") == "mail [redacted] or +[redacted]"
+    assert "@" not in CONTACT_PROFILE.redact("reach me at A@B.CO")
+
+
+def test_contact_scrub_keeps_dotted_numbers():
+    text = "Server 192.168.1.10 billed 9.250.00 on 12.5.2024, call 07911 123456"
+    assert CONTACT_PROFILE.redact(text) == "Server 192.168.1.10 billed 9.250.00 on 12.5.2024, call "
+
+
+def test_names_never_split_an_adjacent_email():
+    assert redact("Contact John@example.com") == "Contact [EMAIL]"
+    assert redact("Email John.Smith@Example.com today") == "Email [EMAIL] today"
+    assert redact_pii("Contact John@example.com") == "Contact [EMAIL]"
+    assert redact_pii("Dear Smith, John@example.com") == "[NAME], [EMAIL]"
+    assert [s.pii_type for s in TELEMETRY_PROFILE.scan("Mary Jane wrote John@example.com")] == ["name", "email"]
+
+
+def test_redact_text_keeps_historical_level_tokens():
+    assert redact_text("Mail a.b@example.com", "partial")["redacted_text"] == "Mail j***@email.com"
+    assert redact_text("Mail a.b@example.com on 2000-03-12", "hashed")["redacted_text"] == "Mail [HASHED_EMAIL] on [HASHED_DATE]"
+    assert redact_text("Born 2000-03-12", "full")["redacted_text"] == "Born [DATE]"
+
+
+def test_bulk_api_preserves_none_and_order():
+    out = redact_many(["x@y.com", None, "", "plain"], profile="telemetry")
+    assert out == ["[EMAIL]", None, "", "plain"]
+    assert AI_EVENTS_PROFILE.redact_many([TEXT])[0] == redact_pii(TEXT)
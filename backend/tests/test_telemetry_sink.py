@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.telemetry.sink import TelemetryRow, TelemetrySink, build_multirow_insert
+
+
+def test_build_multirow_insert_flattens_args():
+    sql, args = build_multirow_insert("ai_events", ("action", "meta"), [
+        {"action": "a", "meta": {"x": 1}},
+        {"action": "b", "meta": None},
+    ])
+    assert sql == "INSERT INTO ai_events (action, meta) VALUES (%s, %s), (%s, %s)"
+    assert args == ["a", {"x": 1}, "b", None]
+
+
+@pytest.mark.asyncio
+async def test_sink_batches_rows_into_one_statement():
+    calls = []
+
+    async def writer(sql, *args):
+        calls.append((sql, args))
+
+    sink = TelemetrySink(batch_size=50, flush_ms=20, writer=writer)
+    for i in range(10):
+        assert sink.enqueue(TelemetryRow("ai_events", {"action": f"e{i}", "meta": {}}))
+    await sink.flush()
+    await sink.stop()
+
+    assert len(calls) == 1
+    assert calls[0][0].count("(%s, %s)") == 10
+    assert sink.get_stats()["written"] == 10
+
+
+@pytest.mark.asyncio
+async def test_sink_falls_back_to_basic_columns():
+    calls = []
+
+    async def writer(sql, *args):
+        calls.append(sql)
+        if "raw_prompt" in sql:
+            raise RuntimeError("column raw_prompt does not exist")
+
+    sink = TelemetrySink(flush_ms=10, writer=writer)
+    sink.enqueue(TelemetryRow("ai_events", {"action": "x", "meta": {}, "raw_prompt": "p"},
+                              fallback_columns=("action", "meta")))
+    await sink.stop()
+
+    assert calls[-1] == "INSERT INTO ai_events (action, meta) VALUES (%s, %s)"
+    assert sink.get_stats()["written"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sink_drop_policies_count_drops():
+    blocker = asyncio.Event()
+
+    async def writer(sql, *args):
+        await blocker.wait()
+
+    sink = TelemetrySink(max_queue=2, batch_size=1, flush_ms=1, writer=writer)
+    results = [sink.enqueue(TelemetryRow("t", {"a": i})) for i in range(5)]
+    await asyncio.sleep(0)
+    # Worker holds at most one row; the rest beyond the queue bound are dropped
+    assert results.count(False) >= 2
+    assert sink.get_stats()["dropped"] == results.count(False)
+    blocker.set()
+    await sink.stop()
+
+    sink = TelemetrySink(max_queue=1, batch_size=1, flush_ms=1, drop_policy="drop_oldest", writer=writer)
+    assert all(sink.enqueue(TelemetryRow("t", {"a": i})) for i in range(3))
+    assert sink.get_stats()["dropped"] >= 1
+    await sink.stop()
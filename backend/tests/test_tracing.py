@@ -0,0 +1,183 @@
+import asyncio
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import tracing
+from app.middleware.request_id import RequestIDMiddleware
+
+
+@pytest.fixture
+def exported():
+    memory = tracing.InMemoryExporter()
+    tracing.set_exporters([memory])
+    yield memory
+    tracing.set_exporters([])
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(RequestIDMiddleware)
+
+    @tracing.traced("embedding", "client")
+    async def embed(text):
+        tracing.set_attribute("cache.hit", False)
+        return [0.0]
+
+    @tracing.traced("rag.mmr")
+    def mmr(items):
+        return items
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        with tracing.span("rag.retrieval"):
+            await embed("q")
+            await asyncio.gather(embed("a"), embed("b"))
+        return {"items": mmr([item_id])}
+
+    @app.get("/fail")
+    async def fail():
+        with tracing.span("llm", "client"):
+            raise ValueError("provider down")
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(3):
+                with tracing.span("chunk"):
+                    yield f"{i}\n"
+        return StreamingResponse(body(), media_type="text/plain")
+
+    return app
+
+
+def only_trace(exported):
+    assert tracing.get_exporter().flush()
+    assert len(exported.traces) == 1
+    return exported.traces[0]
+
+
+def test_spans_nest_under_request_root_keyed_by_request_id(exported):
+    request_id = str(uuid.uuid4())
+    response = TestClient(make_app()).get("/items/7", headers={"X-Request-ID": request_id})
+    assert response.status_code == 200 and response.headers["X-Request-ID"] == request_id
+
+    trace = only_trace(exported)
+    assert trace.trace_id == uuid.UUID(request_id).hex and trace.request_id == request_id
+    spans = {s.name: s for s in trace.spans}
+    root = spans["GET /items/{item_id}"]
+    assert root.kind == "server" and root.attributes["http.route"] == "/items/{item_id}"
+    assert root.attributes["http.status_code"] == 200
+    assert spans["rag.retrieval"].parent_span_id == root.span_id
+    assert spans["rag.mmr"].parent_span_id == root.span_id
+    embeddings = [s for s in trace.spans if s.name == "embedding"]
+    # Concurrent children (gather) still attach to the span that awaited them
+    assert len(embeddings) == 3
+    assert all(s.parent_span_id == spans["rag.retrieval"].span_id for s in embeddings)
+    assert all(s.attributes["cache.hit"] is False for s in embeddings)
+    assert all(s.start_ns <= s.end_ns for s in trace.spans)
+
+
+def test_errors_recorded_and_traceparent_continued(exported):
+    parent_trace, parent_span = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    client = TestClient(make_app(), raise_server_exceptions=False)
+    response = client.get("/fail", headers={"X-Request-ID": "not-a-uuid",
+                                            "traceparent": f"00-{parent_trace}-{parent_span}-01"})
+    assert response.status_code == 500
+
+    trace = only_trace(exported)
+    assert trace.trace_id == parent_trace
+    root = next(s for s in trace.spans if s.kind == "server")
+    assert root.parent_span_id == parent_span
+    llm = next(s for s in trace.spans if s.name == "llm")
+    assert llm.status == tracing.STATUS_ERROR and llm.events[0]["attributes"]["exception.type"] == "ValueError"
+    assert tracing.trace_id_for("not-a-uuid") != tracing.trace_id_for("other") and len(tracing.trace_id_for("x")) == 32
+
+
+def test_streaming_trace_ends_with_body(exported):
+    response = TestClient(make_app()).get("/stream")
+    assert response.text == "0\n1\n2\n"
+    trace = only_trace(exported)
+    root = next(s for s in trace.spans if s.kind == "server")
+    chunks = [s for s in trace.spans if s.name == "chunk"]
+    assert len(chunks) == 3 and root.end_ns >= max(s.end_ns for s in chunks)
+
+
+def test_no_spans_outside_a_request(exported, monkeypatch):
+    monkeypatch.setattr(tracing, "_span_listeners", [])
+    calls = []
+
+    @tracing.traced("db.fetch")
+    def query():
+        calls.append(tracing.current_span())
+        return 1
+
+    with tracing.span("orphan") as span:
+        assert span is None
+    assert query() == 1 and calls == [None]
+    assert tracing.current_request_id() is None
+    assert tracing.get_exporter().flush() and exported.traces == []
+
+
+def test_listeners_see_untraced_spans_without_exporting(exported, monkeypatch):
+    ended = []
+    monkeypatch.setattr(tracing, "_span_listeners", [])
+    tracing.add_span_listener(ended.append)
+
+    @tracing.traced("llm", "client")
+    async def call():
+        tracing.set_attribute("gen_ai.system", "gemini")
+        with tracing.span("db.fetch", "client"):
+            pass
+        tracing.set_error("fallback answer")
+        return ""
+
+    assert asyncio.run(call()) == ""
+    assert [s.name for s in ended] == ["db.fetch", "llm"]
+    llm = ended[1]
+    assert llm.attributes["gen_ai.system"] == "gemini" and llm.status == tracing.STATUS_ERROR
+    assert ended[0].parent_span_id == llm.span_id and not llm.trace.recording and llm.trace.spans == []
+    assert tracing.current_request_id() is None
+    assert tracing.get_exporter().flush() and exported.traces == []
+
+
+def test_otlp_export_shape(exported):
+    received = []
+
+    class Collector(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Collector)
+    threading.Thread(target=server.handle_request, daemon=True).start()
+    tracing.set_exporters([tracing.OTLPHttpExporter(f"http://127.0.0.1:{server.server_port}/v1/traces")])
+    try:
+        TestClient(make_app()).get("/items/1")
+        assert tracing.get_exporter().flush()
+    finally:
+        server.server_close()
+
+    path, payload = received[0]
+    assert path == "/v1/traces"
+    resource = payload["resourceSpans"][0]
+    assert {"key": "service.name", "value": {"stringValue": tracing.TRACING_SERVICE_NAME}} in resource["resource"]["attributes"]
+    spans = resource["scopeSpans"][0]["spans"]
+    assert {s["name"] for s in spans} == {"GET /items/{item_id}", "rag.retrieval", "embedding", "rag.mmr"}
+    for span in spans:
+        assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+        assert int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+    root = next(s for s in spans if s["kind"] == 2)
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
+    summary = tracing.summarize(tracing.Trace("t", "r"))
+    assert "no child spans" in summary
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app.db.db as db
+from app.ai import training_data
+from app.ai.training_data import TRAINING_COLUMNS, concat_frames, load_training_frame, rows_to_frame, stream_frames
+
+
+def _row(i, source="web", score=50.0):
+    ts = datetime(2025, 1, 1 + i % 28, 9, tzinfo=timezone.utc)
+    return (
+        f"id-{i}", score, "lead", ts, None if i % 3 == 0 else 70.0, 0.1, None, "new", 12.5,
+        i % 2, source, "Computer Science", "London", "medium", 1.0, 3.0, 9.0,
+    )
+
+
+async def _aiter(rows):
+    for row in rows:
+        yield row
+
+
+def test_rows_to_frame_builds_typed_columns():
+    df = rows_to_frame([_row(0), _row(1, source="agent")])
+    assert len(TRAINING_COLUMNS) == len(_row(0))
+    assert isinstance(df["application_source"].dtype, pd.CategoricalDtype)
+    assert df["engagement_score"].dtype == np.float64 and np.isnan(df["engagement_score"][0])
+    assert df["has_application"].dtype == np.int8
+    assert str(df["created_at"].dt.tz) == "UTC"
+
+
+@pytest.mark.asyncio
+async def test_stream_frames_chunks_and_concat_keeps_categories():
+    rows = [_row(i, source="web" if i < 5 else "agent") for i in range(12)]
+    frames = [f async for f in stream_frames(_aiter(rows), chunk_rows=5)]
+    assert [len(f) for f in frames] == [5, 5, 2]
+
+    df = concat_frames(frames)
+    assert len(df) == 12
+    assert isinstance(df["application_source"].dtype, pd.CategoricalDtype)
+    assert set(df["application_source"].cat.categories) == {"web", "agent"}
+    assert df["application_source"].tolist() == ["web"] * 5 + ["agent"] * 7
+
+
+@pytest.mark.asyncio
+async def test_load_training_frame_streams_copy_and_cleans(monkeypatch):
+    calls = []
+
+    def fake_copy_rows(sql, types):
+        calls.append((sql, types))
+        return _aiter([_row(i) for i in range(6)])
+
+    monkeypatch.setattr(db, "copy_rows", fake_copy_rows)
+    df = await load_training_frame(limit=6, chunk_rows=4)
+
+    sql, types = calls[0]
+    assert sql.startswith("COPY (") and "TO STDOUT (FORMAT BINARY)" in sql and "LIMIT 6" in sql
+    assert "email" not in sql and "first_name" not in sql
+    assert types == [t for _, _, t, _ in TRAINING_COLUMNS]
+    assert df["touchpoint_count"].tolist() == [0.0] * 6
+    assert df["has_application"].dtype == int
+
+
+@pytest.mark.asyncio
+async def test_auto_snapshot_skips_the_database_on_repeat_runs(monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    calls = []
+
+    def fake_copy_rows(sql, types):
+        calls.append(sql)
+        return _aiter([_row(i) for i in range(4)])
+
+    monkeypatch.setattr(db, "copy_rows", fake_copy_rows)
+    first = await load_training_frame(limit=4, snapshot="auto", snapshot_dir=tmp_path)
+    second = await load_training_frame(limit=4, snapshot="auto", snapshot_dir=tmp_path)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert isinstance(second["campus_name"].dtype, pd.CategoricalDtype)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_skipped_without_pyarrow(monkeypatch, tmp_path):
+    monkeypatch.setattr(db, "copy_rows", lambda sql, types: _aiter([_row(0)]))
+    monkeypatch.setattr(training_data, "_parquet_available", lambda: False)
+    await load_training_frame(limit=1, snapshot="refresh", snapshot_dir=tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_engineer_features_encodes_categorical_columns():
+    from app.ai.advanced_ml_hardened import AdvancedMLPipeline, FeatureEngineeringConfig
+
+    df = training_data.clean_training_frame(rows_to_frame([_row(i) for i in range(5)]))
+    out = AdvancedMLPipeline().engineer_features(df, FeatureEngineeringConfig())
+    assert "engagement_level_encoded" in out.columns and "status_encoded" in out.columns
@@ -0,0 +1,154 @@
+import asyncio
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ai.training_jobs import TrainingCancelled, TrainingJob, TrainingJobRunner, save_artifact_atomic
+
+
+def _training_frame(n=240, seed=0):
+    rng = np.random.default_rng(seed)
+    lead_score = rng.integers(0, 100, n)
+    engagement = rng.integers(0, 100, n)
+    return pd.DataFrame({
+        "id": [f"lead_{i}" for i in range(n)],
+        "created_at": pd.date_range("2025-01-01", periods=n, freq="6h"),
+        "lead_score": lead_score,
+        "engagement_score": engagement,
+        "touchpoint_count": rng.integers(0, 12, n),
+        "conversion_probability": rng.random(n),
+        "days_since_creation": rng.random(n) * 90,
+        "status": rng.choice(["new", "contacted"], n),
+        "engagement_level": np.where(engagement >= 80, "high", np.where(engagement >= 50, "medium", "low")),
+        "lifecycle_state": "lead",
+        "has_application": ((lead_score + engagement + rng.normal(0, 20, n)) > 100).astype(int),
+    })
+
+
+REQUEST = {
+    "config": {"model_type": "random_forest", "features": [], "hyperparameters": {"n_estimators": 20}},
+    "feature_config": {},
+    "save_model": True,
+    "model_name": "advanced_ml_random_forest_test",
+}
+
+
+@pytest.mark.asyncio
+async def test_job_trains_in_pool_and_writes_artifact_atomically(tmp_path):
+    runner = TrainingJobRunner(max_workers=1, models_dir=tmp_path, n_jobs=2)
+    registered = []
+
+    async def load():
+        return _training_frame()
+
+    try:
+        job = await runner.start(REQUEST, load, "app.ai.advanced_ml_hardened", on_success=registered.append)
+        assert job.status in ("queued", "loading_data")
+        job = await runner.wait(job.job_id, timeout=120)
+    finally:
+        runner.shutdown()
+
+    assert job.status == "succeeded", job.error
+    assert job.progress == 1.0
+    assert job.result["training_samples"] == 240
+    assert "model_data" not in job.result
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["advanced_ml_random_forest_test.joblib", "training_jobs"]
+    assert [p.name for p in (tmp_path / "training_jobs").iterdir()] == [f"{job.job_id}.json"]
+    saved = joblib.load(tmp_path / "advanced_ml_random_forest_test.joblib")
+    assert saved["model"].n_jobs == 2
+    assert registered and registered[0]["model_data"]["feature_names"] == saved["feature_names"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_while_loading_data_never_starts_training(tmp_path):
+    runner = TrainingJobRunner(max_workers=1, models_dir=tmp_path)
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return _training_frame()
+
+    job = await runner.start(REQUEST, load, "app.ai.advanced_ml_hardened")
+    await asyncio.sleep(0)
+    assert runner.cancel(job.job_id).status == "cancelling"
+    release.set()
+    job = await runner.wait(job.job_id, timeout=5)
+
+    assert job.status == "cancelled"
+    assert runner._pool is None
+    assert [p.name for p in tmp_path.iterdir()] == ["training_jobs"]
+
+
+def test_train_model_reports_progress_and_can_be_cancelled():
+    from app.ai.advanced_ml_hardened import AdvancedMLPipeline, MLModelConfig
+
+    df = _training_frame()
+    X = df[["lead_score", "engagement_score", "touchpoint_count"]]
+    config = MLModelConfig(model_type="gradient_boosting", features=[], hyperparameters={"n_estimators": 10})
+    pipeline = AdvancedMLPipeline()
+    pipeline.feature_names = list(X.columns)
+
+    stages = []
+    pipeline.train_model(X, df["has_application"], config, n_jobs=2, progress=lambda s, f: stages.append(s))
+    assert stages == ["cross_validating", "evaluating"]
+
+    def cancel(stage, fraction):
+        raise TrainingCancelled(stage)
+
+    with pytest.raises(TrainingCancelled):
+        pipeline.train_model(X, df["has_application"], config, progress=cancel)
+
+
+def test_save_artifact_atomic_leaves_no_temp_files(tmp_path):
+    path = save_artifact_atomic({"a": 1}, tmp_path / "m.joblib", "job1")
+    assert joblib.load(path) == {"a": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["m.joblib"]
+
+
+def test_save_artifact_atomic_writes_json_leaderboards(tmp_path):
+    import json
+
+    path = save_artifact_atomic({"leaderboard": [{"rank": 1, "mean_score": np.float64(0.9)}]}, tmp_path / "m.leaderboard.json")
+    assert json.loads(path.read_text())["leaderboard"][0]["rank"] == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["m.leaderboard.json"]
+
+
+@pytest.mark.asyncio
+async def test_other_workers_see_and_cancel_jobs_through_the_job_files(tmp_path):
+    owner = TrainingJobRunner(max_workers=1, models_dir=tmp_path)
+    other = TrainingJobRunner(max_workers=1, models_dir=tmp_path)
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return _training_frame()
+
+    job = await owner.start(REQUEST, load, "app.ai.advanced_ml_hardened")
+    await asyncio.sleep(0)
+    seen = other.get(job.job_id)
+    assert seen.status == "loading_data" and seen.model_type == "random_forest"
+    assert [j.job_id for j in other.list_jobs()] == [job.job_id]
+
+    # The cancel lands on a worker that does not own the job
+    assert other.cancel(job.job_id).status == "cancelling"
+    release.set()
+    job = await owner.wait(job.job_id, timeout=5)
+
+    assert job.status == "cancelled"
+    assert other.get(job.job_id).status == "cancelled"
+    assert not (tmp_path / "training_jobs" / f"{job.job_id}.cancel").exists()
+    assert other.get("0123456789ab") is None
+    assert other.get("../../etc/passwd") is None
+
+
+def test_job_of_an_exited_worker_is_reported_failed(tmp_path):
+    runner = TrainingJobRunner(models_dir=tmp_path)
+    job = TrainingJob(job_id="abcdefabcdef", model_type="random_forest", status="running")
+    runner.jobs_dir.mkdir()
+    save_artifact_atomic({**job.to_dict(), "owner_pid": 2 ** 22 + 1}, tmp_path / "training_jobs" / "abcdefabcdef.json")
+
+    seen = runner.get("abcdefabcdef")
+    assert seen.status == "failed"
+    assert "exited" in seen.error
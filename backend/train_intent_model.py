@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Train the local Ask Ivy intent model (app/ai/intent_model.py).
+
+Sources:
+- scripts/prompt_eval/cases.yaml   (labelled expected_intent)
+- scripts/eval_prompts.json        (weakly labelled via the regex classifier)
+- ivy_ai_telemetry                 (logged intents; skip with --no-telemetry)
+- INTENT_PATTERNS literal phrases  (seed coverage for every routable intent)
+
+Writes models/intent_model_<version>.joblib plus a .report.json with
+cross-validated accuracy, coverage at the confidence threshold and latency.
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+# Ensure env vars
+from app.bootstrap_env import bootstrap_env
+bootstrap_env()
+
+from app.ai.intent_model import (
+    MODELS_DIR, _pattern_phrases, load_cases_yaml, load_eval_prompts,
+    load_telemetry_examples, save_intent_model, train_intent_model,
+)
+from app.ai.router import INTENT_ORDER, INTENT_PATTERNS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+KNOWN_INTENTS = set(INTENT_ORDER) | set(INTENT_PATTERNS) | {"admissions_decision"}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the local intent classifier")
+    parser.add_argument("--cases", type=Path, default=REPO_ROOT / "scripts" / "prompt_eval" / "cases.yaml")
+    parser.add_argument("--eval-prompts", type=Path, default=REPO_ROOT / "scripts" / "eval_prompts.json")
+    parser.add_argument("--no-telemetry", action="store_true", help="Don't read ivy_ai_telemetry")
+    parser.add_argument("--telemetry-limit", type=int, default=5000)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--out", type=Path, default=MODELS_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="Train and report without writing the artifact")
+    args = parser.parse_args()
+
+    examples = _pattern_phrases(INTENT_PATTERNS)
+    examples += load_cases_yaml(args.cases, KNOWN_INTENTS)
+    examples += load_eval_prompts(args.eval_prompts, KNOWN_INTENTS)
+    if not args.no_telemetry:
+        try:
+            examples += await load_telemetry_examples(KNOWN_INTENTS, limit=args.telemetry_limit)
+        except Exception as e:
+            print(f"⚠️  Telemetry unavailable, training without it: {e}")
+
+    print(f"📚 {len(examples)} training examples")
+    model = train_intent_model(examples, cv_folds=args.folds)
+    print(json.dumps(model.metrics, indent=2))
+
+    if args.dry_run:
+        print("ℹ️  Dry run: artifact not written")
+        return
+    path = save_intent_model(model, args.out)
+    print(f"✅ Saved intent model {model.version} → {path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -144,7 +144,21 @@ const AdvancedMLDashboard: React.FC = () => {
       });
       
       if (response.ok) {
-        const result = await response.json();
+        // Training runs as a background job; poll until it finishes
+        let job = await response.json();
+        while (!['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+          setTrainingStatus(`Training: ${job.stage.replace(/_/g, ' ')} (${Math.round(job.progress * 100)}%)`);
+          await new Promise(resolve => setTimeout(resolve, 2000));
+          const jobResponse = await fetch(`http://localhost:8000/ai/advanced-ml/train/jobs/${job.job_id}`);
+          if (!jobResponse.ok) {
+            throw new Error('Lost track of training job');
+          }
+          job = await jobResponse.json();
+        }
+        if (job.status !== 'succeeded') {
+          throw new Error(job.error || `Training ${job.status}`);
+        }
+        const result = job.result;
         setTrainingStatus('Training completed successfully!');
         setPredictionResult({
           success: true,